@@ -3,10 +3,25 @@ Enhanced Risk Management Module for Trading Bot
 Handles adaptive position sizing, dynamic stop losses, and multi-factor risk assessment.
 """
 
+import logging
+import os
+import sys
 from datetime import datetime, timedelta
 import numpy as np
 from typing import Dict, List, Optional
 
+# The portfolio risk engine lives at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from portfolio_risk import get_portfolio_risk_engine, exposures_from_positions
+    PORTFOLIO_RISK_AVAILABLE = True
+except ImportError:
+    PORTFOLIO_RISK_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+_RISK_LEVELS = ('LOW', 'MEDIUM', 'HIGH')
+
 class EnhancedRiskManager:
     def __init__(self):
         # Base risk limits
@@ -257,6 +272,11 @@ class EnhancedRiskManager:
             elif total_risk_pct > 5 or concentration_risk > 2.5:
                 risk_level = 'MEDIUM'
 
+            # Correlated VaR/stress can only raise the stop-distance level
+            var_report = self.portfolio_var(open_positions, account_balance)
+            if var_report and var_report.get('risk_level'):
+                risk_level = max(risk_level, var_report['risk_level'], key=_RISK_LEVELS.index)
+
             return {
                 'total_risk_amount': round(total_risk_amount, 2),
                 'total_risk_pct': round(total_risk_pct, 2),
@@ -264,6 +284,7 @@ class EnhancedRiskManager:
                 'concentration_risk_pct': round(concentration_risk, 2),
                 'risk_level': risk_level,
                 'risk_by_asset': risk_by_asset,
+                'var_report': var_report,
                 'max_positions_allowed': self._calculate_max_positions(total_risk_pct),
                 'recommendations': self._get_risk_recommendations(risk_level, concentration_risk)
             }
@@ -271,6 +292,25 @@ class EnhancedRiskManager:
         except Exception as e:
             return {'error': f"Portfolio risk assessment failed: {e}"}
 
+    def portfolio_var(self, positions: List[Dict], balance: float) -> Optional[Dict]:
+        """
+        VaR/CVaR and stress report from the portfolio risk engine.
+
+        None without sized positions, or while the engine is still loading the
+        price histories (this never waits on a download).
+        """
+        if not PORTFOLIO_RISK_AVAILABLE:
+            return None
+        try:
+            exposures = exposures_from_positions(positions)
+            if not any(exposures.values()):
+                return None
+            return get_portfolio_risk_engine().evaluate(exposures, balance or None, positions=len(positions),
+                                                        fetch=False)
+        except Exception as e:
+            logger.warning(f"Portfolio VaR failed: {e}")
+            return None
+
     def _calculate_max_positions(self, current_risk_pct: float) -> int:
         """Calculate maximum additional positions allowed"""
         remaining_risk_capacity = max(0, self.MAX_PORTFOLIO_RISK * 100 - current_risk_pct)
@@ -382,12 +422,15 @@ class EnhancedRiskManager:
             exposure_map[pair] = exposure_map.get(pair, 0) + risk
             
         risk_pct = total_risk / balance if balance > 0 else 0
+        var_report = self.portfolio_var(open_trades, balance)
         
         return {
             'total_risk_amount': total_risk,
             'total_risk_pct': risk_pct * 100,
-            'is_overexposed': risk_pct > self.MAX_PORTFOLIO_RISK,
-            'exposure_map': exposure_map
+            'is_overexposed': risk_pct > self.MAX_PORTFOLIO_RISK or
+                              bool(var_report and var_report.get('risk_level') == 'HIGH'),
+            'exposure_map': exposure_map,
+            'var_report': var_report
         }
 
     def check_drawdown(self, trade_history, starting_balance):
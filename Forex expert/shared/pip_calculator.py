@@ -3,6 +3,17 @@ Forex Pip Calculator
 Calculate pips, position sizes, and P&L for forex trading
 """
 
+import os
+import sys
+
+# Position sizes come from the batch sizer at the repository root when it is available
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+try:
+    from position_sizing import size_positions
+    POSITION_SIZING_AVAILABLE = True
+except ImportError:
+    POSITION_SIZING_AVAILABLE = False
+
 
 def calculate_pips(pair, entry, exit):
     """
@@ -42,6 +53,9 @@ def calculate_position_size(pair, account_balance, risk_percent, entry, stop_los
     Returns:
         dict: {"lots": float, "units": int, "risk_amount": float}
     """
+    if POSITION_SIZING_AVAILABLE:
+        return calculate_position_sizes(pair, [account_balance], risk_percent, entry, stop_loss)[0]
+
     # Calculate risk amount
     risk_amount = account_balance * (risk_percent / 100)
     
@@ -72,6 +86,37 @@ def calculate_position_size(pair, account_balance, risk_percent, entry, stop_los
     }
 
 
+def calculate_position_sizes(pair, account_balances, risk_percents, entry, stop_loss):
+    """
+    Position sizes for many accounts on one setup, in one vectorized step
+    
+    Args:
+        pair: Forex pair
+        account_balances: Account sizes in USD
+        risk_percents: Risk percentage per account, or one for all
+        entry: Entry price
+        stop_loss: Stop loss price
+    
+    Returns:
+        list: One calculate_position_size() dict per account
+    """
+    batch = size_positions(pair, entry, stop_loss, account_balances, risk_percents)
+    lots = batch.raw_lots.round(2)
+    units = (batch.raw_lots * batch.spec.contract_size).astype(int)
+    pip_values = (batch.raw_lots * batch.pip_value_per_lot).round(2)
+    return [
+        {
+            "lots": lot,
+            "units": unit,
+            "risk_amount": round(risk, 2),
+            "sl_pips": round(batch.sl_pips, 1),
+            "pip_value": pip_value
+        }
+        for lot, unit, risk, pip_value in zip(lots.tolist(), units.tolist(), batch.risk_amount.tolist(),
+                                              pip_values.tolist())
+    ]
+
+
 def calculate_pnl(pair, entry, exit, lots, direction="BUY"):
     """
     Calculate P&L for a trade
@@ -109,7 +109,7 @@ class ETHSignalGenerator:
 
         # Create DataFrame
         data = pd.DataFrame({
-            'timestamp': pd.date_range(end=datetime.now(), periods=periods, freq='15min' if timeframe == 'M15' else '1H'),
+            'timestamp': pd.date_range(end=datetime.now(), periods=periods, freq='15min' if timeframe == 'M15' else '1h'),
             'open': opens,
             'high': highs,
             'low': lows,
@@ -157,7 +157,9 @@ class ETHSignalGenerator:
         support, resistance = self._find_support_resistance(high_prices, low_prices)
 
         # Trend analysis
-        trend = self._determine_trend(sma_10, sma_30, ema_12)
+        trend = self._determine_trend(sma_10[-1] if len(sma_10) > 0 else None,
+                                      sma_30[-1] if len(sma_30) > 0 else None,
+                                      ema_12[-1] if len(ema_12) > 0 else None)
 
         # Volatility analysis (crucial for crypto)
         volatility = self._calculate_volatility(close_prices)
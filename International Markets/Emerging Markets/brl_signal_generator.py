@@ -108,7 +108,7 @@ class BRLSignalGenerator:
 
         # Create DataFrame
         data = pd.DataFrame({
-            'timestamp': pd.date_range(end=datetime.now(), periods=periods, freq='15min' if timeframe == 'M15' else '1H'),
+            'timestamp': pd.date_range(end=datetime.now(), periods=periods, freq='15min' if timeframe == 'M15' else '1h'),
             'open': opens,
             'high': highs,
             'low': lows,
@@ -154,7 +154,9 @@ class BRLSignalGenerator:
         support, resistance = self._find_support_resistance(high_prices, low_prices)
 
         # Trend analysis
-        trend = self._determine_trend(sma_20, sma_50, ema_21)
+        trend = self._determine_trend(sma_20[-1] if len(sma_20) > 0 else None,
+                                      sma_50[-1] if len(sma_50) > 0 else None,
+                                      ema_21[-1] if len(ema_21) > 0 else None)
 
         # Volatility analysis (important for emerging markets)
         volatility = self._calculate_volatility(close_prices)
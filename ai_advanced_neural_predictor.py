@@ -25,6 +25,8 @@ import logging
 from datetime import datetime
 import warnings
 
+from ai_model_server import get_model_server
+
 # Suppress TensorFlow warnings
 warnings.filterwarnings('ignore')
 tf.get_logger().setLevel(logging.ERROR)
@@ -242,6 +244,10 @@ class QuantumEliteNeuralPredictor:
         self.models = {}
         self.sequence_length = 120  # Extended sequence length
         self.prediction_horizons = [1, 3, 6, 12, 24]  # Multiple prediction horizons
+        self.mc_dropout_samples = 50  # Monte Carlo samples for confidence estimation
+
+        # Warm models are shared through the model server
+        self.model_server = get_model_server()
 
         # Initialize advanced components
         self.quantum_optimizer = QuantumInspiredOptimizer()
@@ -554,14 +560,45 @@ class QuantumEliteNeuralPredictor:
             'params': best_params,
             'training_history': history.history
         }
+        self.model_server.register(self._served_name(asset_symbol), model=final_model)
 
         logger.info(f"Quantum Elite model trained for {asset_symbol} with validation loss: {min(history.history['val_loss']):.4f}")
 
         return self.models[asset_symbol]
 
+    def _served_name(self, asset_symbol: str) -> str:
+        """Model server key for an asset's multi-horizon model"""
+        return f"quantum_elite:{os.path.abspath(self.model_dir)}:{asset_symbol}"
+
+    def load_model(self, asset_symbol: str) -> bool:
+        """Load a saved model and its scalers from disk (once per process, via the model server)"""
+        model_path = f"{self.model_dir}/{asset_symbol}_quantum_elite"
+        scaler_path = f"{model_path}_scaler.pkl"
+        target_scaler_path = f"{model_path}_target_scaler.pkl"
+
+        if not all(os.path.exists(p) for p in [model_path, scaler_path, target_scaler_path]):
+            return False
+
+        try:
+            name = self._served_name(asset_symbol)
+            if not self.model_server.is_registered(name):
+                self.model_server.register(
+                    name, loader=lambda: tf.keras.models.load_model(model_path), warm=True
+                )
+            self.models[asset_symbol] = {
+                'model': self.model_server.get_model(name),
+                'scaler': joblib.load(scaler_path),
+                'target_scaler': joblib.load(target_scaler_path)
+            }
+            return True
+        except Exception as e:
+            logger.error(f"Error loading Quantum Elite model for {asset_symbol}: {e}")
+            self.model_server.unregister(self._served_name(asset_symbol))
+            return False
+
     def predict_multi_horizon(self, df: pd.DataFrame, asset_symbol: str) -> Dict[str, Dict[str, float]]:
         """Make multi-horizon predictions with confidence intervals"""
-        if asset_symbol not in self.models:
+        if asset_symbol not in self.models and not self.load_model(asset_symbol):
             raise ValueError(f"Model not trained for {asset_symbol}")
 
         model_info = self.models[asset_symbol]
@@ -578,8 +615,16 @@ class QuantumEliteNeuralPredictor:
         scaled_features = scaler.transform(features[-self.sequence_length:])
         X_pred = scaled_features.reshape(1, self.sequence_length, -1)
 
-        # Make predictions
-        predictions = model.predict(X_pred, verbose=0)
+        # Make predictions (batched with other generators' requests)
+        name = self._served_name(asset_symbol)
+        if not self.model_server.is_registered(name):
+            self.model_server.register(name, model=model)
+        predictions = self.model_server.predict(name, X_pred)
+        if not isinstance(predictions, list):
+            predictions = [predictions]
+
+        # One batched Monte Carlo dropout pass serves every horizon
+        mc_samples = self._monte_carlo_samples(model, X_pred)
 
         # Inverse transform predictions
         results = {}
@@ -588,7 +633,7 @@ class QuantumEliteNeuralPredictor:
             pred_scaled = target_scaler.inverse_transform([[pred_value]])[0][0]
 
             # Calculate confidence intervals using model uncertainty
-            confidence = self._calculate_prediction_confidence(model, X_pred, horizon)
+            confidence = self._calculate_prediction_confidence(model, X_pred, i, mc_samples)
 
             results[f'h{horizon}'] = {
                 'prediction': pred_scaled,
@@ -599,19 +644,20 @@ class QuantumEliteNeuralPredictor:
 
         return results
 
-    def _calculate_prediction_confidence(self, model, X, horizon_idx: int) -> float:
+    def _monte_carlo_samples(self, model, X) -> List[np.ndarray]:
+        """Run all Monte Carlo dropout samples as one batch; returns one array per output"""
+        X_repeated = np.repeat(np.asarray(X, dtype=np.float32), self.mc_dropout_samples, axis=0)
+        pred = model(X_repeated, training=True)  # Dropout stays active for uncertainty estimation
+        outputs = pred if isinstance(pred, (list, tuple)) else [pred]
+        return [np.asarray(o).reshape(self.mc_dropout_samples, -1)[:, 0] for o in outputs]
+
+    def _calculate_prediction_confidence(self, model, X, horizon_idx: int,
+                                         mc_samples: Optional[List[np.ndarray]] = None) -> float:
         """Calculate prediction confidence using Monte Carlo dropout"""
-        # Enable dropout during inference for uncertainty estimation
-        predictions = []
-        for _ in range(50):  # Monte Carlo samples
-            pred = model(X, training=True)
-            if isinstance(pred, list):
-                pred_value = pred[horizon_idx].numpy().flatten()[0]
-            else:
-                pred_value = pred.numpy().flatten()[0]
-            predictions.append(pred_value)
+        if mc_samples is None:
+            mc_samples = self._monte_carlo_samples(model, X)
+        predictions = mc_samples[min(horizon_idx, len(mc_samples) - 1)]
 
-        predictions = np.array(predictions)
         mean_pred = np.mean(predictions)
         std_pred = np.std(predictions)
 
@@ -0,0 +1,349 @@
+"""
+AI Model Server
+In-process serving layer for the neural predictors: warm models and micro-batching
+
+Each registered model is loaded once and owned by a worker thread. Prediction
+requests from any generator are queued per model and coalesced into a single
+batched ``model(x, training=False)`` call, waiting at most ``max_latency_ms``
+for more requests to arrive. Keras ``predict()`` on a batch of one carries a
+large fixed overhead, so /allsignals-style fan-outs submit all of their
+sequences first and then collect the results.
+"""
+
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from queue import Queue, Empty
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger('ai_model_server')
+
+
+@dataclass
+class PredictionRequest:
+    """A batch of samples (leading axis) waiting for inference"""
+    inputs: np.ndarray
+    future: Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+@dataclass
+class ModelStats:
+    """Serving statistics for a single model"""
+    requests: int = 0
+    samples: int = 0
+    batches: int = 0
+    errors: int = 0
+    load_time_ms: float = 0.0
+    latencies_ms: deque = field(default_factory=lambda: deque(maxlen=1000))
+    inference_ms: deque = field(default_factory=lambda: deque(maxlen=1000))
+
+    def to_dict(self) -> Dict[str, Any]:
+        latencies = np.asarray(self.latencies_ms, dtype=float)
+        inference = np.asarray(self.inference_ms, dtype=float)
+        return {
+            'requests': self.requests,
+            'samples': self.samples,
+            'batches': self.batches,
+            'errors': self.errors,
+            'avg_batch_size': self.samples / self.batches if self.batches else 0.0,
+            'load_time_ms': self.load_time_ms,
+            'latency_avg_ms': float(latencies.mean()) if latencies.size else 0.0,
+            'latency_p50_ms': float(np.percentile(latencies, 50)) if latencies.size else 0.0,
+            'latency_p95_ms': float(np.percentile(latencies, 95)) if latencies.size else 0.0,
+            'inference_avg_ms': float(inference.mean()) if inference.size else 0.0,
+        }
+
+
+def _to_numpy(output: Any) -> Any:
+    """Convert a model output (tensor, array or list of them) to NumPy"""
+    if isinstance(output, (list, tuple)):
+        return [_to_numpy(o) for o in output]
+    if isinstance(output, dict):
+        return {k: _to_numpy(v) for k, v in output.items()}
+    if hasattr(output, 'numpy'):
+        return output.numpy()
+    return np.asarray(output)
+
+
+def _slice_output(output: Any, start: int, stop: int) -> Any:
+    """Slice the batch axis of every array in a (possibly nested) output"""
+    if isinstance(output, list):
+        return [_slice_output(o, start, stop) for o in output]
+    if isinstance(output, dict):
+        return {k: _slice_output(v, start, stop) for k, v in output.items()}
+    return output[start:stop]
+
+
+class ServedModel:
+    """A warm model with its own request queue and batching worker"""
+
+    def __init__(self, name: str, loader: Optional[Callable[[], Any]] = None,
+                 model: Any = None, max_batch_size: int = 32,
+                 max_latency_ms: float = 5.0):
+        if loader is None and model is None:
+            raise ValueError(f"Model '{name}' needs a loader or a model instance")
+
+        self.name = name
+        self.loader = loader
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_latency_ms = max_latency_ms
+
+        self.queue: Queue = Queue()
+        self.stats = ModelStats()
+        self._load_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._running = True
+        self._worker = threading.Thread(target=self._serve, daemon=True,
+                                        name=f"ModelServer-{name}")
+        self._worker.start()
+
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None
+
+    def ensure_loaded(self) -> Any:
+        """Load the model once; concurrent callers share the same instance"""
+        if self.model is None:
+            with self._load_lock:
+                if self.model is None:
+                    start = time.perf_counter()
+                    self.model = self.loader()
+                    self.stats.load_time_ms = (time.perf_counter() - start) * 1000
+                    logger.info(f"Loaded model {self.name} in {self.stats.load_time_ms:.0f}ms")
+        return self.model
+
+    def submit(self, inputs: np.ndarray) -> Future:
+        future: Future = Future()
+        if not self._running:
+            future.set_exception(RuntimeError(f"Model '{self.name}' is not being served"))
+            return future
+        self.queue.put(PredictionRequest(inputs=inputs, future=future))
+        return future
+
+    def stop(self):
+        self._running = False
+        self.queue.put(None)
+        self._worker.join(timeout=5)
+
+    def _collect_batch(self, first: PredictionRequest) -> List[PredictionRequest]:
+        """Gather requests until the batch is full or the latency budget is spent"""
+        batch = [first]
+        samples = len(first.inputs)
+        deadline = first.enqueued_at + self.max_latency_ms / 1000.0
+
+        while samples < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except Empty:
+                break
+            if request is None:
+                self.queue.put(None)  # Re-post the stop marker for the serve loop
+                break
+            batch.append(request)
+            samples += len(request.inputs)
+
+        return batch
+
+    def _serve(self):
+        while self._running:
+            request = self.queue.get()
+            if request is None:
+                break
+
+            batch = self._collect_batch(request)
+
+            # Requests with different sample shapes cannot share a tensor
+            groups: Dict[tuple, List[PredictionRequest]] = {}
+            for req in batch:
+                groups.setdefault(req.inputs.shape[1:], []).append(req)
+
+            for group in groups.values():
+                self._run_group(group)
+
+        # Fail anything left behind so callers never hang
+        while True:
+            try:
+                request = self.queue.get_nowait()
+            except Empty:
+                break
+            if request is not None and not request.future.done():
+                request.future.set_exception(RuntimeError(f"Model '{self.name}' was shut down"))
+
+    def _run_group(self, group: List[PredictionRequest]):
+        try:
+            model = self.ensure_loaded()
+            x = group[0].inputs if len(group) == 1 else np.concatenate([r.inputs for r in group])
+
+            start = time.perf_counter()
+            outputs = _to_numpy(model(x, training=False))
+            finished = time.perf_counter()
+        except Exception as e:
+            logger.error(f"Batch inference failed for {self.name}: {e}")
+            with self._stats_lock:
+                self.stats.errors += len(group)
+            for req in group:
+                req.future.set_exception(e)
+            return
+
+        offset = 0
+        for req in group:
+            n = len(req.inputs)
+            req.future.set_result(_slice_output(outputs, offset, offset + n))
+            offset += n
+
+        with self._stats_lock:
+            self.stats.batches += 1
+            self.stats.requests += len(group)
+            self.stats.samples += offset
+            self.stats.inference_ms.append((finished - start) * 1000)
+            for req in group:
+                self.stats.latencies_ms.append((finished - req.enqueued_at) * 1000)
+
+
+class ModelServer:
+    """Registry of warm models serving batched predictions to all generators"""
+
+    def __init__(self, max_batch_size: int = 32, max_latency_ms: float = 5.0):
+        self.max_batch_size = max_batch_size
+        self.max_latency_ms = max_latency_ms
+        self._models: Dict[str, ServedModel] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Optional[Callable[[], Any]] = None,
+                 model: Any = None, warm: bool = False,
+                 max_batch_size: Optional[int] = None,
+                 max_latency_ms: Optional[float] = None) -> ServedModel:
+        """
+        Register a model under ``name``.
+
+        Pass either an already-built ``model`` or a ``loader`` that builds it on
+        first use (or immediately with ``warm=True``). Registering an existing
+        name replaces the served model, e.g. after retraining.
+        """
+        served = ServedModel(
+            name, loader=loader, model=model,
+            max_batch_size=max_batch_size or self.max_batch_size,
+            max_latency_ms=self.max_latency_ms if max_latency_ms is None else max_latency_ms
+        )
+
+        with self._lock:
+            previous = self._models.get(name)
+            self._models[name] = served
+        if previous is not None:
+            previous.stop()
+
+        if warm:
+            served.ensure_loaded()
+        return served
+
+    def is_registered(self, name: str) -> bool:
+        return name in self._models
+
+    def unregister(self, name: str):
+        with self._lock:
+            served = self._models.pop(name, None)
+        if served is not None:
+            served.stop()
+
+    def get_model(self, name: str) -> Any:
+        """Return the warm model instance (for calls the server does not batch)"""
+        return self._get(name).ensure_loaded()
+
+    def submit(self, name: str, inputs: np.ndarray) -> Future:
+        """Queue a batch of samples (leading axis) and return a Future of the outputs"""
+        inputs = np.asarray(inputs, dtype=np.float32)
+        if inputs.ndim == 0:
+            raise ValueError("Model inputs need a leading batch axis")
+        return self._get(name).submit(inputs)
+
+    def predict(self, name: str, inputs: np.ndarray, timeout: Optional[float] = 30.0) -> Any:
+        """Blocking prediction; coalesced with concurrent requests for the same model"""
+        return self.submit(name, inputs).result(timeout=timeout)
+
+    def predict_many(self, name: str, batch_inputs: List[np.ndarray],
+                     timeout: Optional[float] = 30.0) -> List[Any]:
+        """Submit several requests at once so they share forward passes"""
+        futures = [self.submit(name, inputs) for inputs in batch_inputs]
+        return [f.result(timeout=timeout) for f in futures]
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model latency, batch size and queue depth"""
+        with self._lock:
+            models = dict(self._models)
+
+        stats = {}
+        for name, served in models.items():
+            with served._stats_lock:
+                model_stats = served.stats.to_dict()
+            model_stats['queue_depth'] = served.queue.qsize()
+            model_stats['loaded'] = served.loaded
+            stats[name] = model_stats
+        return stats
+
+    def shutdown(self):
+        with self._lock:
+            models = list(self._models.values())
+            self._models.clear()
+        for served in models:
+            served.stop()
+
+    def _get(self, name: str) -> ServedModel:
+        served = self._models.get(name)
+        if served is None:
+            raise KeyError(f"Model '{name}' is not registered")
+        return served
+
+
+# Global server instance
+_server_instance = None
+_server_lock = threading.Lock()
+
+
+def get_model_server() -> ModelServer:
+    """Get global model server instance"""
+    global _server_instance
+    if _server_instance is None:
+        with _server_lock:
+            if _server_instance is None:
+                _server_instance = ModelServer()
+    return _server_instance
+
+
+def main():
+    """Demonstrate micro-batching with a stand-in model"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    print("=" * 60)
+    print("AI MODEL SERVER DEMO")
+    print("=" * 60)
+
+    def dummy_model(x, training=False):
+        time.sleep(0.02)  # Fixed per-call overhead, like Keras
+        return x.mean(axis=(1, 2), keepdims=False)[:, None]
+
+    server = ModelServer(max_batch_size=16, max_latency_ms=10)
+    server.register('demo', model=dummy_model)
+
+    sequences = [np.random.randn(1, 60, 12) for _ in range(15)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=15) as pool:
+        list(pool.map(lambda s: server.predict('demo', s), sequences))
+    print(f"15 concurrent predictions in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    for name, stats in server.get_stats().items():
+        print(f"{name}: {stats['batches']} batches, avg batch {stats['avg_batch_size']:.1f}, "
+              f"p95 latency {stats['latency_p95_ms']:.1f}ms")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
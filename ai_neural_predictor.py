@@ -13,13 +13,204 @@ from tensorflow.keras.optimizers import Adam
 from sklearn.preprocessing import StandardScaler, MinMaxScaler
 from sklearn.model_selection import train_test_split
 import joblib
+import math
 import os
-from typing import Dict, List, Tuple, Optional
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple, Optional
 import logging
 
+from ai_model_server import get_model_server
+from unified_cache import TTLCache
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@dataclass
+class FeatureState:
+    """Computed features for one asset plus the key they were computed for"""
+    features: np.ndarray
+    last_timestamp: Any
+    length: int
+    last_row: np.ndarray
+    signature: Tuple[str, ...]
+
+
+class StreamingFeaturePipeline:
+    """
+    Incremental float32 feature computation for NeuralPredictor.
+
+    Results are kept per asset and keyed by (asset, last timestamp, length).
+    When a frame extends the previous one, only the newly appended rows (plus
+    the previous last bar, which may still have been forming) are computed,
+    using a short warm-up tail so rolling windows see their full history. If
+    the frame also slid forward, its first WARMUP_ROWS rows are recomputed too.
+    """
+
+    MOMENTUM_PERIODS = (5, 10, 20)
+    ROLLING_WINDOW = 20
+    WARMUP_ROWS = 21  # Longest lookback: 20-period momentum / rolling std of returns
+    INPUT_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+    INDICATOR_COLUMNS = ('sma_20', 'sma_50', 'rsi', 'macd', 'bb_upper', 'bb_lower')
+
+    def __init__(self, max_assets: int = 64):
+        self.max_assets = max_assets
+        self._states: "OrderedDict[str, FeatureState]" = OrderedDict()
+        self.stats = {'hits': 0, 'incremental': 0, 'full': 0, 'rows_computed': 0}
+
+    @classmethod
+    def signature(cls, df: pd.DataFrame) -> Tuple[str, ...]:
+        """Columns that decide which features exist"""
+        return tuple(c for c in cls.INPUT_COLUMNS + cls.INDICATOR_COLUMNS if c in df.columns)
+
+    @classmethod
+    def compute(cls, df: pd.DataFrame) -> np.ndarray:
+        """Full feature pass over ``df`` into a preallocated float32 array"""
+        close = df['close']
+        returns = close.pct_change().fillna(0)
+
+        columns = [
+            returns,                             # Returns
+            df['high'].pct_change().fillna(0),   # High returns
+            df['low'].pct_change().fillna(0),    # Low returns
+            df['volume'].pct_change().fillna(0), # Volume changes
+        ]
+
+        # Technical indicators
+        if 'sma_20' in df.columns:
+            columns.append((close - df['sma_20']) / df['sma_20'])  # Price vs SMA20
+        if 'sma_50' in df.columns:
+            columns.append((close - df['sma_50']) / df['sma_50'])  # Price vs SMA50
+        if 'rsi' in df.columns:
+            columns.append(df['rsi'] / 100.0)  # Normalized RSI
+        if 'macd' in df.columns:
+            columns.append(df['macd'].fillna(0))  # MACD
+        if 'bb_upper' in df.columns and 'bb_lower' in df.columns:
+            columns.append((close - df['bb_lower']) / (df['bb_upper'] - df['bb_lower']))  # Bollinger position
+
+        # Volatility features
+        columns.append(returns.rolling(cls.ROLLING_WINDOW).std().fillna(0))  # Rolling volatility
+
+        # Volume features
+        if 'volume' in df.columns:
+            columns.append(df['volume'] / df['volume'].rolling(cls.ROLLING_WINDOW).mean())  # Volume ratio
+
+        # Momentum features
+        for period in cls.MOMENTUM_PERIODS:
+            columns.append(close.pct_change(period).fillna(0))
+
+        features = np.empty((len(df), len(columns)), dtype=np.float32)
+        for j, column in enumerate(columns):
+            features[:, j] = column.to_numpy(dtype=np.float64, na_value=np.nan)
+        return features
+
+    def features(self, df: pd.DataFrame, asset_symbol: str) -> np.ndarray:
+        """Features for ``df``, reusing rows already computed for this asset"""
+        length = len(df)
+        if length == 0:
+            return self.compute(df)
+
+        signature = self.signature(df)
+        last_timestamp = df.index[-1]
+        last_row = df[list(signature)].iloc[-1].to_numpy(dtype=np.float64)
+        state = self._states.get(asset_symbol)
+
+        features = None
+        if state is not None and state.signature == signature:
+            if (state.last_timestamp == last_timestamp and state.length == length
+                    and np.array_equal(state.last_row, last_row, equal_nan=True)):
+                self._states.move_to_end(asset_symbol)
+                self.stats['hits'] += 1
+                return state.features
+            features = self._extend(df, state)
+
+        if features is None:
+            features = self.compute(df)
+            self.stats['full'] += 1
+            self.stats['rows_computed'] += length
+
+        self._states[asset_symbol] = FeatureState(
+            features=features, last_timestamp=last_timestamp, length=length,
+            last_row=last_row, signature=signature
+        )
+        self._states.move_to_end(asset_symbol)
+        while len(self._states) > self.max_assets:
+            self._states.popitem(last=False)
+
+        return features
+
+    def _extend(self, df: pd.DataFrame, state: FeatureState) -> Optional[np.ndarray]:
+        """Reuse cached rows up to the previous last bar and compute the rest"""
+        try:
+            pos = df.index.get_loc(state.last_timestamp)
+        except (KeyError, TypeError):
+            return None
+        if not isinstance(pos, (int, np.integer)) or pos + 1 > state.length:
+            return None
+
+        # Rows [0, pos) are reused; the previous last bar is recomputed in case it was still forming
+        reuse_from = state.length - (pos + 1)
+
+        # Once the frame has slid, the new leading rows lost their history: a full pass sees
+        # them as warm-up rows, so recompute them from the new frame's start
+        head_rows = min(self.WARMUP_ROWS, pos) if reuse_from > 0 else 0
+        head = self.compute(df.iloc[:head_rows])
+        kept = state.features[reuse_from + head_rows:reuse_from + pos]
+
+        tail_start = max(0, pos - self.WARMUP_ROWS)
+        block = self.compute(df.iloc[tail_start:])[pos - tail_start:]
+
+        self.stats['incremental'] += 1
+        self.stats['rows_computed'] += head_rows + len(block)
+        return np.concatenate([head, kept, block])
+
+    def clear(self, asset_symbol: Optional[str] = None):
+        if asset_symbol is None:
+            self._states.clear()
+        else:
+            self._states.pop(asset_symbol, None)
+
+
+def build_sequence_windows(features: np.ndarray, sequence_length: int) -> np.ndarray:
+    """
+    Zero-copy view of every ``sequence_length`` window over ``features``.
+
+    Returns an array of shape (n_windows, sequence_length, n_features) whose
+    rows share memory with ``features``; nothing is materialized until a batch
+    is gathered from it.
+    """
+    if len(features) < sequence_length:
+        return np.empty((0, sequence_length, features.shape[1]), dtype=features.dtype)
+    windows = np.lib.stride_tricks.sliding_window_view(features, sequence_length, axis=0)
+    return windows.transpose(0, 2, 1)  # (n, features, seq) -> (n, seq, features), still a view
+
+
+class WindowBatchSequence(tf.keras.utils.Sequence):
+    """Feeds Keras batches gathered from a window view instead of a materialized tensor"""
+
+    def __init__(self, windows: np.ndarray, targets: np.ndarray, indices: np.ndarray,
+                 batch_size: int = 32, shuffle: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        self.windows = windows
+        self.targets = targets
+        self.indices = np.array(indices)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        if shuffle:
+            np.random.shuffle(self.indices)
+
+    def __len__(self):
+        return math.ceil(len(self.indices) / self.batch_size)
+
+    def __getitem__(self, idx):
+        batch = self.indices[idx * self.batch_size:(idx + 1) * self.batch_size]
+        return self.windows[batch], self.targets[batch]
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            np.random.shuffle(self.indices)
+
+
 class NeuralPredictor:
     """Advanced neural network for market direction and probability prediction"""
 
@@ -33,92 +224,46 @@ class NeuralPredictor:
         self.prediction_horizon = 12  # Predict 12 periods ahead
 
         # Performance optimizations
-        self._feature_cache = {}
-        self._prediction_cache = {}
+        self.feature_pipeline = StreamingFeaturePipeline()
         self._cache_ttl = 30 if performance_mode else 60  # seconds
+        self._prediction_cache = TTLCache(name='neural_predictions', maxsize=30, ttl=self._cache_ttl)
+
+        # Warm models are shared through the model server
+        self.model_server = get_model_server()
 
         if not os.path.exists(model_dir):
             os.makedirs(model_dir)
 
-    def prepare_data(self, df: pd.DataFrame, target_col: str = 'close') -> Tuple[np.ndarray, np.ndarray]:
-        """Prepare data for neural network training"""
+    def prepare_data(self, df: pd.DataFrame, target_col: str = 'close',
+                     asset_symbol: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Prepare data for neural network training.
+
+        X is a zero-copy window view over the scaled features (see
+        ``build_sequence_windows``); gather batches from it rather than
+        copying it whole.
+        """
         # Feature engineering
-        features = self._create_features(df)
+        features = self._create_features(df, asset_symbol)
 
         # Create target (direction and magnitude)
         target = self._create_target(df, target_col)
 
         # Scale features
         scaled_features = self.scaler.fit_transform(features)
-        scaled_target = self.price_scaler.fit_transform(target.reshape(-1, 1)).flatten()
+        scaled_target = self.price_scaler.fit_transform(target.reshape(-1, 1)).flatten().astype(np.float32)
 
         # Create sequences
         X, y = self._create_sequences(scaled_features, scaled_target)
 
         return X, y
 
-    def _create_features(self, df: pd.DataFrame) -> np.ndarray:
+    def _create_features(self, df: pd.DataFrame, asset_symbol: Optional[str] = None) -> np.ndarray:
         """Create comprehensive feature set for neural network - OPTIMIZED"""
-        # Check cache first
-        if self.performance_mode:
-            cache_key = hash(df.values.tobytes()) if hasattr(df, 'values') else hash(str(df))
-            current_time = time.time()
-
-            if cache_key in self._feature_cache:
-                cache_entry = self._feature_cache[cache_key]
-                if current_time - cache_entry['timestamp'] < self._cache_ttl:
-                    return cache_entry['features']
-
-        features = []
-
-        # Price features
-        features.extend([
-            df['close'].pct_change().fillna(0),  # Returns
-            df['high'].pct_change().fillna(0),   # High returns
-            df['low'].pct_change().fillna(0),    # Low returns
-            df['volume'].pct_change().fillna(0), # Volume changes
-        ])
-
-        # Technical indicators
-        if 'sma_20' in df.columns:
-            features.append((df['close'] - df['sma_20']) / df['sma_20'])  # Price vs SMA20
-        if 'sma_50' in df.columns:
-            features.append((df['close'] - df['sma_50']) / df['sma_50'])  # Price vs SMA50
-        if 'rsi' in df.columns:
-            features.append(df['rsi'] / 100.0)  # Normalized RSI
-        if 'macd' in df.columns:
-            features.append(df['macd'].fillna(0))  # MACD
-        if 'bb_upper' in df.columns and 'bb_lower' in df.columns:
-            features.append((df['close'] - df['bb_lower']) / (df['bb_upper'] - df['bb_lower']))  # Bollinger position
-
-        # Volatility features
-        returns = df['close'].pct_change().fillna(0)
-        features.append(returns.rolling(20).std().fillna(0))  # Rolling volatility
-
-        # Volume features
-        if 'volume' in df.columns:
-            features.append(df['volume'] / df['volume'].rolling(20).mean())  # Volume ratio
-
-        # Momentum features
-        for period in [5, 10, 20]:
-            features.append(df['close'].pct_change(period).fillna(0))  # Momentum
-
-        feature_array = np.column_stack(features)
-
-        # Cache the result
-        if self.performance_mode:
-            self._feature_cache[cache_key] = {
-                'features': feature_array,
-                'timestamp': current_time
-            }
-
-            # Limit cache size
-            if len(self._feature_cache) > 50:
-                oldest_key = min(self._feature_cache.keys(),
-                               key=lambda k: self._feature_cache[k]['timestamp'])
-                del self._feature_cache[oldest_key]
-
-        return feature_array
+        if asset_symbol is None:
+            return StreamingFeaturePipeline.compute(df)
+        # Keyed by (asset, last timestamp, length); appended rows are computed incrementally
+        return self.feature_pipeline.features(df, asset_symbol)
 
     def _create_target(self, df: pd.DataFrame, target_col: str) -> np.ndarray:
         """Create prediction target"""
@@ -132,14 +277,11 @@ class NeuralPredictor:
         return target.values
 
     def _create_sequences(self, features: np.ndarray, target: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
-        """Create input sequences for LSTM"""
-        X, y = [], []
-
-        for i in range(len(features) - self.sequence_length - self.prediction_horizon):
-            X.append(features[i:i+self.sequence_length])
-            y.append(target[i+self.sequence_length])
-
-        return np.array(X), np.array(y)
+        """Create input sequences for LSTM (window views, no per-sequence copies)"""
+        n_sequences = max(0, len(features) - self.sequence_length - self.prediction_horizon)
+        X = build_sequence_windows(features, self.sequence_length)[:n_sequences]
+        y = target[self.sequence_length:self.sequence_length + n_sequences]
+        return X, y
 
     def build_direction_model(self) -> Model:
         """Build LSTM model for price direction prediction"""
@@ -222,14 +364,16 @@ class NeuralPredictor:
         logger.info(f"Training neural network for {asset_symbol}")
 
         # Prepare data
-        X, y = self.prepare_data(df)
+        X, y = self.prepare_data(df, asset_symbol=asset_symbol)
 
         if len(X) < 100:  # Minimum data requirement
             logger.warning(f"Insufficient data for {asset_symbol}: {len(X)} sequences")
             return {'status': 'insufficient_data'}
 
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        # Split indices, not tensors: batches are gathered from the window view
+        train_idx, test_idx = train_test_split(np.arange(len(X)), test_size=0.2, random_state=42)
+        train_batches = WindowBatchSequence(X, y, train_idx, batch_size=32, shuffle=True)
+        test_batches = WindowBatchSequence(X, y, test_idx, batch_size=32)
 
         # Build model
         model = self.build_direction_model()
@@ -246,10 +390,9 @@ class NeuralPredictor:
 
         # Train model
         history = model.fit(
-            X_train, y_train,
-            validation_data=(X_test, y_test),
+            train_batches,
+            validation_data=test_batches,
             epochs=epochs,
-            batch_size=32,
             callbacks=callbacks,
             verbose=1
         )
@@ -261,9 +404,10 @@ class NeuralPredictor:
 
         # Store model reference
         self.models[asset_symbol] = model
+        self.model_server.register(self._served_name(asset_symbol), model=model)
 
         # Evaluate model
-        test_loss = model.evaluate(X_test, y_test, verbose=0)
+        test_loss = model.evaluate(test_batches, verbose=0)
 
         return {
             'status': 'trained',
@@ -275,40 +419,75 @@ class NeuralPredictor:
 
     def predict_direction(self, df: pd.DataFrame, asset_symbol: str) -> Dict:
         """Predict market direction using trained model - OPTIMIZED"""
-        # Check prediction cache
-        if self.performance_mode:
-            cache_key = f"{asset_symbol}_{hash(df.values.tobytes()) if hasattr(df, 'values') else hash(str(df))}"
-            current_time = time.time()
-
-            if cache_key in self._prediction_cache:
-                cache_entry = self._prediction_cache[cache_key]
-                if current_time - cache_entry['timestamp'] < self._cache_ttl:
-                    return cache_entry['prediction']
-
-        if asset_symbol not in self.models:
-            if not self.load_model(asset_symbol):
-                return {'error': f'No trained model for {asset_symbol}'}
-
-        model = self.models[asset_symbol]
-
-        # Prepare recent data for prediction (features now cached)
-        features = self._create_features(df)
-        scaled_features = self.scaler.transform(features)
-
-        # Get last sequence
-        if len(scaled_features) < self.sequence_length:
-            return {'error': 'Insufficient data for prediction'}
-
-        recent_sequence = scaled_features[-self.sequence_length:].reshape(1, self.sequence_length, -1)
-
-        # Make prediction
-        prediction = model.predict(recent_sequence, verbose=0)[0][0]
-
-        # Convert to direction and confidence
+        return self.predict_directions({asset_symbol: df})[asset_symbol]
+
+    def predict_directions(self, frames: Dict[str, pd.DataFrame]) -> Dict[str, Dict]:
+        """Predict direction for several assets at once, keyed by asset"""
+        return dict(zip(frames, self.predict_direction_batch(list(frames.items()))))
+
+    def predict_direction_batch(self, requests: List[Tuple[str, pd.DataFrame]]) -> List[Dict]:
+        """
+        Predict direction for several (asset, frame) pairs, in input order.
+
+        All sequences are submitted to the model server before any result is
+        awaited, so requests for the same model share a forward pass. The same
+        asset may appear more than once, with different frames.
+        """
+        results: List[Optional[Dict]] = [None] * len(requests)
+        pending = {}
+
+        for i, (asset_symbol, df) in enumerate(requests):
+            # Check prediction cache
+            cache_key = None
+            if self.performance_mode:
+                cache_key = (asset_symbol, df.index[-1], len(df), float(df['close'].iloc[-1]))
+                cached = self._prediction_cache.get(cache_key)
+                if cached is not None:
+                    results[i] = cached
+                    continue
+
+            if asset_symbol not in self.models:
+                if not self.load_model(asset_symbol):
+                    results[i] = {'error': f'No trained model for {asset_symbol}'}
+                    continue
+
+            # Prepare recent data for prediction (features now cached)
+            features = self._create_features(df, asset_symbol)
+
+            # Get last sequence
+            if len(features) < self.sequence_length:
+                results[i] = {'error': 'Insufficient data for prediction'}
+                continue
+
+            # Only the last window needs scaling
+            scaled_window = self.scaler.transform(features[-self.sequence_length:])
+            recent_sequence = scaled_window.reshape(1, self.sequence_length, -1)
+            future = self.model_server.submit(self._served_name(asset_symbol), recent_sequence)
+            pending[i] = (asset_symbol, future, df, cache_key)
+
+        for i, (asset_symbol, future, df, cache_key) in pending.items():
+            try:
+                prediction = float(np.ravel(future.result(timeout=30))[0])
+            except Exception as e:
+                logger.error(f"Prediction failed for {asset_symbol}: {e}")
+                results[i] = {'error': f'Prediction failed for {asset_symbol}'}
+                continue
+
+            result = self._format_prediction(asset_symbol, prediction, df)
+            results[i] = result
+
+            # Cache the prediction
+            if self.performance_mode:
+                self._prediction_cache.set(cache_key, result)
+
+        return results
+
+    def _format_prediction(self, asset_symbol: str, prediction: float, df: pd.DataFrame) -> Dict:
+        """Convert raw model output to direction and confidence"""
         direction = 'bullish' if prediction > 0.1 else 'bearish' if prediction < -0.1 else 'neutral'
         confidence = min(abs(prediction) * 100, 95)  # Scale to 0-95%
 
-        result = {
+        return {
             'asset': asset_symbol,
             'direction': direction,
             'prediction_strength': float(prediction),
@@ -316,23 +495,12 @@ class NeuralPredictor:
             'timestamp': df.index[-1] if hasattr(df, 'index') else None
         }
 
-        # Cache the prediction
-        if self.performance_mode:
-            self._prediction_cache[cache_key] = {
-                'prediction': result,
-                'timestamp': current_time
-            }
-
-            # Limit cache size
-            if len(self._prediction_cache) > 30:
-                oldest_key = min(self._prediction_cache.keys(),
-                               key=lambda k: self._prediction_cache[k]['timestamp'])
-                del self._prediction_cache[oldest_key]
-
-        return result
+    def _served_name(self, asset_symbol: str) -> str:
+        """Model server key for an asset's direction model"""
+        return f"neural_direction:{os.path.abspath(self.model_dir)}:{asset_symbol}"
 
     def load_model(self, asset_symbol: str) -> bool:
-        """Load trained model from disk"""
+        """Load trained model from disk (once per process, via the model server)"""
         model_path = f"{self.model_dir}/{asset_symbol}_model.h5"
         scaler_path = f"{self.model_dir}/{asset_symbol}_scaler.pkl"
         price_scaler_path = f"{self.model_dir}/{asset_symbol}_price_scaler.pkl"
@@ -341,12 +509,18 @@ class NeuralPredictor:
             return False
 
         try:
-            self.models[asset_symbol] = tf.keras.models.load_model(model_path)
+            name = self._served_name(asset_symbol)
+            if not self.model_server.is_registered(name):
+                self.model_server.register(
+                    name, loader=lambda: tf.keras.models.load_model(model_path), warm=True
+                )
+            self.models[asset_symbol] = self.model_server.get_model(name)
             self.scaler = joblib.load(scaler_path)
             self.price_scaler = joblib.load(price_scaler_path)
             return True
         except Exception as e:
             logger.error(f"Error loading model for {asset_symbol}: {e}")
+            self.model_server.unregister(self._served_name(asset_symbol))
             return False
 
     def get_model_performance(self, asset_symbol: str) -> Dict:
@@ -379,7 +553,21 @@ class AdvancedAIPredictor:
 
         # Get neural network prediction
         nn_prediction = self.neural_predictor.predict_direction(market_data, asset)
+        return self._quality_from_prediction(signal_data, nn_prediction)
+
+    def predict_signal_quality_batch(self, requests: List[Tuple[Dict, pd.DataFrame]]) -> List[Dict]:
+        """Assess several signals with one batched neural pass per model (e.g. /allsignals)"""
+        predictions = self.neural_predictor.predict_direction_batch([
+            (signal_data.get('asset', 'unknown'), market_data) for signal_data, market_data in requests
+        ])
+
+        return [
+            self._quality_from_prediction(signal_data, prediction)
+            for (signal_data, _), prediction in zip(requests, predictions)
+        ]
 
+    def _quality_from_prediction(self, signal_data: Dict, nn_prediction: Dict) -> Dict:
+        """Merge a neural prediction into the signal quality assessment"""
         if 'error' in nn_prediction:
             # Fallback to rule-based assessment
             return self._rule_based_quality(signal_data)
@@ -24,22 +24,110 @@ import json
 import os
 import threading
 import time
+import hashlib
+import copy
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import warnings
 
+from unified_cache import TTLCache
+
 warnings.filterwarnings('ignore')
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Text cleanup, compiled once instead of on every analyzed text
+_URL_RE = re.compile(r'http\S+|www\S+|https\S+')
+_MENTION_RE = re.compile(r'@\w+')
+_WHITESPACE_RE = re.compile(r'\s+')
+_SPECIAL_CHARS_RE = re.compile(r'[^\w\s\$€£¥%+-]')
+
+SCORE_MAPPING = {'very_negative': -1.0, 'negative': -0.5, 'neutral': 0.0, 'positive': 0.5, 'very_positive': 1.0}
+
+ASPECT_KEYWORDS = {
+    'price': ['price', 'pricing', 'cost', 'value', 'valuation'],
+    'volume': ['volume', 'trading', 'liquidity', 'flow'],
+    'market': ['market', 'index', 'sector', 'industry'],
+    'company': ['company', 'firm', 'corporation', 'business'],
+    'economy': ['economy', 'economic', 'GDP', 'growth', 'inflation'],
+    'earnings': ['earnings', 'revenue', 'profit', 'income', 'EPS'],
+    'regulatory': ['regulation', 'regulator', 'compliance', 'SEC', 'FDA'],
+    'technical': ['technical', 'chart', 'pattern', 'support', 'resistance'],
+    'fundamental': ['fundamental', 'valuation', 'PE', 'dividend', 'growth']
+}
+
+FINANCIAL_TERMS = (
+    'bull', 'bear', 'rally', 'crash', 'surge', 'plunge', 'volatile',
+    'profit', 'loss', 'gain', 'decline', 'momentum', 'breakout',
+    'resistance', 'support', 'trend', 'correction', 'reversal'
+)
+
+# Simple entity extraction vocabularies (would use NER model in production)
+COMPANY_INDICATORS = ('corp', 'inc', 'ltd', 'plc', 'company', 'group')
+ENTITY_WORDS = {
+    'currencies': ({'usd', 'eur', 'gbp', 'jpy', 'btc', 'eth'}, str.upper),
+    'commodities': ({'gold', 'oil', 'silver', 'copper', 'wheat', 'corn'}, str.title),
+    'indices': ({'spx', 'ndx', 'dji', 'ftse', 'dax', 'nikkei'}, str.upper),
+    'sectors': ({'tech', 'technology', 'healthcare', 'finance', 'energy', 'consumer'}, str.title),
+}
+_COMPANY_INDICATOR_RE = re.compile('|'.join(COMPANY_INDICATORS))
+
+
+def _keyword_pattern(keywords, whole_word: bool = False) -> 're.Pattern':
+    """Single alternation regex for a keyword list (longest first)"""
+    alternation = '|'.join(re.escape(k.lower()) for k in sorted(set(keywords), key=len, reverse=True))
+    if whole_word:
+        # Whitespace-delimited tokens, the same tokens text.split() produces
+        return re.compile(rf'(?<!\S)(?:{alternation})(?!\S)')
+    return re.compile(alternation)
+
+
+_ASPECT_PATTERNS = {aspect: _keyword_pattern(words) for aspect, words in ASPECT_KEYWORDS.items()}
+
+
+class SentimentCache(TTLCache):
+    """
+    TTL cache of sentiment results keyed by a hash of the cleaned text.
+
+    Shared by every analyzer in the process, so a headline scored by the news
+    aggregator is not scored again by the assistant or the monitoring loop.
+    """
+
+    def __init__(self, ttl_seconds: int = 900, max_entries: int = 5000):
+        super().__init__(name='sentiment', maxsize=max_entries, ttl=ttl_seconds)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+    @staticmethod
+    def make_key(cleaned_text: str, aspects: Optional[List[str]] = None, analyzer: str = '') -> str:
+        """Key of a text scored with the given aspects by the given analyzer ('bert' or 'rules')"""
+        payload = cleaned_text if not aspects else f"{cleaned_text}\x00{','.join(sorted(aspects))}"
+        if analyzer:
+            payload = f"{analyzer}\x00{payload}"
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        stats['ttl_seconds'] = self.ttl_seconds
+        return stats
+
+
+# Shared sentiment result cache
+sentiment_cache = SentimentCache()
+
+
 class MarketSentimentAnalyzer:
     """Advanced sentiment analysis for market-related text"""
 
-    def __init__(self, model_path: str = "market_sentiment_model"):
+    def __init__(self, model_path: str = "market_sentiment_model", bert_batch_size: int = 16,
+                 cache: Optional[SentimentCache] = None):
         self.model_path = model_path
         self.sentiment_model = None
         self.tokenizer = None
         self.label_encoder = LabelEncoder()
+        self.bert_batch_size = bert_batch_size
+        self.cache = cache if cache is not None else sentiment_cache
 
         # Sentiment categories
         self.sentiment_labels = ['very_negative', 'negative', 'neutral', 'positive', 'very_positive']
@@ -47,6 +135,7 @@ class MarketSentimentAnalyzer:
 
         # Financial lexicon
         self.financial_lexicon = self._load_financial_lexicon()
+        self._lexicon_re = _keyword_pattern(self.financial_lexicon, whole_word=True)
 
         # Aspect-based sentiment tracking
         self.aspect_sentiments = {
@@ -111,23 +200,71 @@ class MarketSentimentAnalyzer:
 
     def analyze_sentiment(self, text: str, aspects: List[str] = None) -> Dict[str, Any]:
         """Analyze sentiment of market-related text"""
-        if not text or not text.strip():
-            return {'sentiment': 'neutral', 'confidence': 0.5, 'score': 0.0}
-
-        # Preprocess text
-        cleaned_text = self._preprocess_text(text)
+        return self.analyze_sentiment_batch([text], aspects)[0]
+
+    def analyze_sentiment_batch(self, texts: List[str], aspects: List[str] = None) -> List[Dict[str, Any]]:
+        """
+        Analyze sentiment of several texts at once.
+
+        Results are cached by content hash, and texts that miss the cache share
+        batched BERT forward passes instead of one pass per text.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        pending: Dict[str, List[int]] = {}     # cache key -> positions waiting on it
+        cleaned_by_key: Dict[str, str] = {}
+        analyzer = 'bert' if self.sentiment_model is not None else 'rules'
+        now = datetime.now()
+
+        for i, text in enumerate(texts):
+            if not text or not text.strip():
+                results[i] = {'sentiment': 'neutral', 'confidence': 0.5, 'score': 0.0}
+                continue
+
+            # Preprocess text
+            cleaned_text = self._preprocess_text(text)
+            key = self.cache.make_key(cleaned_text, aspects, analyzer)
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[i] = self._deliver(cached, now)
+            elif key in pending:
+                pending[key].append(i)     # Same text twice in one batch
+            else:
+                pending[key] = [i]
+                cleaned_by_key[key] = cleaned_text
+
+        if pending:
+            keys = list(pending)
+            cleaned = [cleaned_by_key[k] for k in keys]
+
+            # BERT-based sentiment if model is available, batched over all misses
+            bert_sentiments = [None] * len(cleaned)
+            if self.sentiment_model is not None:
+                try:
+                    bert_sentiments = self._bert_sentiment_batch(cleaned)
+                except Exception as e:
+                    logger.warning(f"BERT sentiment analysis failed: {e}")
+
+            for key, cleaned_text, bert_sentiment in zip(keys, cleaned, bert_sentiments):
+                result = self._build_result(cleaned_text, bert_sentiment, aspects)
+                self.cache.set(key, result)
+                for i in pending[key]:
+                    results[i] = self._deliver(result, now)
+
+        return results
+
+    def _deliver(self, result: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+        """A caller's own copy of a (possibly cached) result, stamped now and recorded for trends"""
+        result = copy.deepcopy(result)
+        result['timestamp'] = now
+        self._store_sentiment_history({'label': result['sentiment'], 'score': result['score'],
+                                       'confidence': result['confidence']})
+        return result
 
+    def _build_result(self, cleaned_text: str, bert_sentiment: Optional[Dict], aspects: List[str] = None) -> Dict[str, Any]:
+        """Combine rule-based and model sentiment for one cleaned text"""
         # Rule-based sentiment analysis as fallback/primary method
         rule_based_sentiment = self._rule_based_sentiment(cleaned_text)
 
-        # BERT-based sentiment if model is available
-        bert_sentiment = None
-        if self.sentiment_model is not None:
-            try:
-                bert_sentiment = self._bert_sentiment_analysis(cleaned_text)
-            except Exception as e:
-                logger.warning(f"BERT sentiment analysis failed: {e}")
-
         # Combine sentiments
         final_sentiment = self._combine_sentiments(rule_based_sentiment, bert_sentiment)
 
@@ -137,10 +274,7 @@ class MarketSentimentAnalyzer:
             for aspect in aspects:
                 aspect_sentiments[aspect] = self._analyze_aspect_sentiment(cleaned_text, aspect)
 
-        # Store for trend analysis
-        self._store_sentiment_history(final_sentiment)
-
-        result = {
+        return {
             'sentiment': final_sentiment['label'],
             'confidence': final_sentiment['confidence'],
             'score': final_sentiment['score'],
@@ -151,57 +285,36 @@ class MarketSentimentAnalyzer:
             'timestamp': datetime.now()
         }
 
-        return result
-
     def _preprocess_text(self, text: str) -> str:
         """Preprocess text for sentiment analysis"""
         # Convert to lowercase
         text = text.lower()
 
         # Remove URLs
-        text = re.sub(r'http\S+|www\S+|https\S+', '', text)
+        text = _URL_RE.sub('', text)
 
         # Remove mentions and hashtags (keep for social media analysis)
-        text = re.sub(r'@\w+', '', text)
+        text = _MENTION_RE.sub('', text)
 
         # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = _WHITESPACE_RE.sub(' ', text).strip()
 
         # Remove special characters but keep financial symbols
-        text = re.sub(r'[^\w\s\$€£¥%+-]', '', text)
+        text = _SPECIAL_CHARS_RE.sub('', text)
 
         return text
 
     def _rule_based_sentiment(self, text: str) -> Dict[str, Any]:
         """Rule-based sentiment analysis using financial lexicon"""
-        words = text.split()
-        sentiment_score = 0.0
-        matched_words = []
-
-        for word in words:
-            word = word.strip('.,!?')
-            if word in self.financial_lexicon:
-                sentiment_score += self.financial_lexicon[word]
-                matched_words.append((word, self.financial_lexicon[word]))
+        matched_words = [(word, self.financial_lexicon[word]) for word in self._lexicon_re.findall(text)]
 
         # Normalize score
         if matched_words:
-            sentiment_score = sentiment_score / len(matched_words)
+            sentiment_score = sum(score for _, score in matched_words) / len(matched_words)
         else:
             sentiment_score = 0.0
 
-        # Convert to label
-        if sentiment_score >= 0.6:
-            label = 'very_positive'
-        elif sentiment_score >= 0.2:
-            label = 'positive'
-        elif sentiment_score <= -0.6:
-            label = 'very_negative'
-        elif sentiment_score <= -0.2:
-            label = 'negative'
-        else:
-            label = 'neutral'
-
+        label = self._score_to_label(sentiment_score)
         confidence = min(abs(sentiment_score) * 2, 1.0) if matched_words else 0.3
 
         return {
@@ -211,37 +324,54 @@ class MarketSentimentAnalyzer:
             'matched_words': matched_words
         }
 
+    @staticmethod
+    def _score_to_label(score: float) -> str:
+        """Convert a -1..1 score to a sentiment label"""
+        if score >= 0.6:
+            return 'very_positive'
+        elif score >= 0.2:
+            return 'positive'
+        elif score <= -0.6:
+            return 'very_negative'
+        elif score <= -0.2:
+            return 'negative'
+        return 'neutral'
+
     def _bert_sentiment_analysis(self, text: str) -> Dict[str, Any]:
         """BERT-based sentiment analysis"""
-        # Tokenize text
-        inputs = self.tokenizer(
-            text,
-            max_length=512,
-            padding='max_length',
-            truncation=True,
-            return_tensors='tf'
-        )
-
-        # Get prediction
-        predictions = self.classification_model.predict({
-            'input_ids': inputs['input_ids'],
-            'attention_mask': inputs['attention_mask']
-        }, verbose=0)
+        return self._bert_sentiment_batch([text])[0]
+
+    def _bert_sentiment_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """BERT-based sentiment analysis, bert_batch_size texts per forward pass"""
+        results = []
+        for start in range(0, len(texts), self.bert_batch_size):
+            chunk = texts[start:start + self.bert_batch_size]
+
+            # Tokenize the whole chunk at once
+            inputs = self.tokenizer(
+                chunk,
+                max_length=512,
+                padding='max_length',
+                truncation=True,
+                return_tensors='tf'
+            )
 
-        # Get predicted class and confidence
-        predicted_class_idx = np.argmax(predictions[0])
-        confidence = np.max(predictions[0])
-        predicted_label = self.sentiment_labels[predicted_class_idx]
+            # One forward pass for the chunk (direct call avoids predict()'s per-call setup)
+            predictions = np.asarray(self.classification_model(
+                {'input_ids': inputs['input_ids'], 'attention_mask': inputs['attention_mask']},
+                training=False
+            ))
 
-        # Convert to score (-1 to 1)
-        score_mapping = {'very_negative': -1.0, 'negative': -0.5, 'neutral': 0.0, 'positive': 0.5, 'very_positive': 1.0}
-        score = score_mapping[predicted_label]
+            # Get predicted class and confidence
+            for row in predictions:
+                predicted_label = self.sentiment_labels[int(np.argmax(row))]
+                results.append({
+                    'label': predicted_label,
+                    'score': SCORE_MAPPING[predicted_label],  # Convert to score (-1 to 1)
+                    'confidence': float(np.max(row))
+                })
 
-        return {
-            'label': predicted_label,
-            'score': score,
-            'confidence': float(confidence)
-        }
+        return results
 
     def _combine_sentiments(self, rule_based: Dict, bert: Dict = None) -> Dict[str, Any]:
         """Combine rule-based and BERT sentiments"""
@@ -256,16 +386,7 @@ class MarketSentimentAnalyzer:
         combined_confidence = rule_weight * rule_based['confidence'] + bert_weight * bert['confidence']
 
         # Convert score to label
-        if combined_score >= 0.6:
-            label = 'very_positive'
-        elif combined_score >= 0.2:
-            label = 'positive'
-        elif combined_score <= -0.6:
-            label = 'very_negative'
-        elif combined_score <= -0.2:
-            label = 'negative'
-        else:
-            label = 'neutral'
+        label = self._score_to_label(combined_score)
 
         return {
             'label': label,
@@ -275,27 +396,10 @@ class MarketSentimentAnalyzer:
 
     def _analyze_aspect_sentiment(self, text: str, aspect: str) -> Dict[str, Any]:
         """Analyze sentiment for specific aspect"""
-        # Define aspect keywords
-        aspect_keywords = {
-            'price': ['price', 'pricing', 'cost', 'value', 'valuation'],
-            'volume': ['volume', 'trading', 'liquidity', 'flow'],
-            'market': ['market', 'index', 'sector', 'industry'],
-            'company': ['company', 'firm', 'corporation', 'business'],
-            'economy': ['economy', 'economic', 'GDP', 'growth', 'inflation'],
-            'earnings': ['earnings', 'revenue', 'profit', 'income', 'EPS'],
-            'regulatory': ['regulation', 'regulator', 'compliance', 'SEC', 'FDA'],
-            'technical': ['technical', 'chart', 'pattern', 'support', 'resistance'],
-            'fundamental': ['fundamental', 'valuation', 'PE', 'dividend', 'growth']
-        }
-
-        keywords = aspect_keywords.get(aspect, [aspect])
-        aspect_text = []
+        pattern = _ASPECT_PATTERNS.get(aspect) or _keyword_pattern([aspect])
 
         # Extract sentences containing aspect keywords
-        sentences = text.split('.')
-        for sentence in sentences:
-            if any(keyword in sentence.lower() for keyword in keywords):
-                aspect_text.append(sentence)
+        aspect_text = [sentence for sentence in text.split('.') if pattern.search(sentence.lower())]
 
         if not aspect_text:
             return {'sentiment': 'neutral', 'confidence': 0.0, 'mentions': 0}
@@ -313,17 +417,8 @@ class MarketSentimentAnalyzer:
 
     def _count_financial_terms(self, text: str) -> int:
         """Count financial terms in text"""
-        financial_terms = [
-            'bull', 'bear', 'rally', 'crash', 'surge', 'plunge', 'volatile',
-            'profit', 'loss', 'gain', 'decline', 'momentum', 'breakout',
-            'resistance', 'support', 'trend', 'correction', 'reversal'
-        ]
-
-        count = 0
-        for term in financial_terms:
-            count += text.lower().count(term)
-
-        return count
+        text = text.lower()
+        return sum(text.count(term) for term in FINANCIAL_TERMS)
 
     def _store_sentiment_history(self, sentiment: Dict):
         """Store sentiment for trend analysis"""
@@ -333,7 +428,8 @@ class MarketSentimentAnalyzer:
 class NewsAggregator:
     """Aggregates and analyzes financial news from multiple sources"""
 
-    def __init__(self):
+    def __init__(self, sentiment_analyzer: Optional[MarketSentimentAnalyzer] = None,
+                 refresh_interval: int = 300):
         self.news_sources = {
             'yahoo_finance': 'https://finance.yahoo.com/news',
             'marketwatch': 'https://www.marketwatch.com/news',
@@ -342,7 +438,7 @@ class NewsAggregator:
             'cnbc': 'https://www.cnbc.com/world/?region=world'
         }
 
-        self.sentiment_analyzer = MarketSentimentAnalyzer()
+        self.sentiment_analyzer = sentiment_analyzer or MarketSentimentAnalyzer()
         self.news_cache = deque(maxlen=1000)  # Cache recent news
 
         # News filtering
@@ -351,6 +447,15 @@ class NewsAggregator:
             'earnings', 'revenue', 'profit', 'loss', 'forecast', 'guidance',
             'bitcoin', 'crypto', 'forex', 'commodities', 'gold', 'oil'
         ]
+        self._relevance_re = _keyword_pattern(self.relevant_keywords)
+
+        # Background refresh: a single worker, at most one refresh in flight
+        self.refresh_interval = refresh_interval
+        self.latest_news: List[Dict[str, Any]] = []
+        self.last_refresh: Optional[datetime] = None
+        self._refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='NewsRefresh')
+        self._refresh_future = None
+        self._refresh_lock = threading.Lock()
 
     def fetch_latest_news(self, max_articles: int = 50) -> List[Dict[str, Any]]:
         """Fetch latest financial news"""
@@ -366,17 +471,52 @@ class NewsAggregator:
             except Exception as e:
                 logger.warning(f"Failed to fetch news from {source_name}: {e}")
 
-        # Filter and analyze news
-        filtered_news = []
-        for news_item in all_news:
-            if self._is_relevant_news(news_item):
-                analyzed_news = self._analyze_news_item(news_item)
-                filtered_news.append(analyzed_news)
+        # Filter and analyze news (sentiment for all relevant items in one batch)
+        relevant_news = [news_item for news_item in all_news if self._is_relevant_news(news_item)]
+        filtered_news = self._analyze_news_items(relevant_news)
 
         # Sort by recency and relevance
         filtered_news.sort(key=lambda x: (x['relevance_score'], x['timestamp']), reverse=True)
 
-        return filtered_news[:max_articles]
+        latest = filtered_news[:max_articles]
+        self.latest_news = latest
+        self.last_refresh = datetime.now()
+        return latest
+
+    def refresh_news_async(self, max_articles: int = 50) -> bool:
+        """
+        Refresh news on the background worker without waiting for it.
+
+        Returns False if a refresh is already running (refreshes never queue up).
+        """
+        with self._refresh_lock:
+            if self._refresh_future is not None and not self._refresh_future.done():
+                return False
+            self._refresh_future = self._refresh_executor.submit(self._refresh_worker, max_articles)
+            return True
+
+    def _refresh_worker(self, max_articles: int):
+        try:
+            self.fetch_latest_news(max_articles)
+        except Exception as e:
+            logger.error(f"Background news refresh failed: {e}")
+
+    def get_latest_news(self, max_articles: int = 50) -> List[Dict[str, Any]]:
+        """
+        Latest analyzed news without blocking the caller.
+
+        Serves the last refreshed snapshot and schedules a background refresh
+        when it is older than refresh_interval (or missing).
+        """
+        stale = (self.last_refresh is None or
+                 (datetime.now() - self.last_refresh).total_seconds() > self.refresh_interval)
+        if stale:
+            self.refresh_news_async(max(max_articles, 50))
+        return self.latest_news[:max_articles]
+
+    def shutdown(self):
+        """Stop the background refresh worker"""
+        self._refresh_executor.shutdown(wait=False)
 
     def _simulate_news_fetch(self, source: str, count: int) -> List[Dict[str, Any]]:
         """Simulate news fetching (would be replaced with real API calls)"""
@@ -421,13 +561,15 @@ class NewsAggregator:
         content = news_item.get('content', '').lower()
 
         # Check for relevant keywords
-        for keyword in self.relevant_keywords:
-            if keyword in title or keyword in content:
-                return True
+        return bool(self._relevance_re.search(title) or self._relevance_re.search(content))
 
-        return False
+    def _analyze_news_items(self, news_items: List[Dict]) -> List[Dict[str, Any]]:
+        """Analyze several news items, scoring their sentiment in one batch"""
+        full_texts = [f"{item.get('title', '')}. {item.get('content', '')}" for item in news_items]
+        sentiments = self.sentiment_analyzer.analyze_sentiment_batch(full_texts)
+        return [self._analyze_news_item(item, sentiment) for item, sentiment in zip(news_items, sentiments)]
 
-    def _analyze_news_item(self, news_item: Dict) -> Dict[str, Any]:
+    def _analyze_news_item(self, news_item: Dict, sentiment: Optional[Dict] = None) -> Dict[str, Any]:
         """Analyze a news item with sentiment and relevance"""
         title = news_item.get('title', '')
         content = news_item.get('content', '')
@@ -436,7 +578,8 @@ class NewsAggregator:
         full_text = f"{title}. {content}"
 
         # Sentiment analysis
-        sentiment = self.sentiment_analyzer.analyze_sentiment(full_text)
+        if sentiment is None:
+            sentiment = self.sentiment_analyzer.analyze_sentiment(full_text)
 
         # Calculate relevance score
         relevance_score = self._calculate_relevance_score(news_item)
@@ -492,41 +635,21 @@ class NewsAggregator:
             'sectors': []
         }
 
-        # Simple entity extraction (would use NER model in production)
-        company_indicators = ['corp', 'inc', 'ltd', 'plc', 'company', 'group']
-        currencies = ['usd', 'eur', 'gbp', 'jpy', 'btc', 'eth']
-        commodities = ['gold', 'oil', 'silver', 'copper', 'wheat', 'corn']
-        indices = ['spx', 'ndx', 'dji', 'ftse', 'dax', 'nikkei']
-        sectors = ['tech', 'technology', 'healthcare', 'finance', 'energy', 'consumer']
-
         words = text.lower().split()
 
         for i, word in enumerate(words):
             # Company detection
-            if any(indicator in word for indicator in company_indicators):
+            if _COMPANY_INDICATOR_RE.search(word):
                 # Get company name (previous words)
-                company_name = []
-                for j in range(max(0, i-2), i+1):
-                    if words[j] not in company_indicators:
-                        company_name.append(words[j].title())
+                company_name = [words[j].title() for j in range(max(0, i-2), i+1)
+                                if words[j] not in COMPANY_INDICATORS]
                 if company_name:
                     entities['companies'].append(' '.join(company_name))
 
-            # Currency detection
-            if word in currencies:
-                entities['currencies'].append(word.upper())
-
-            # Commodity detection
-            if word in commodities:
-                entities['commodities'].append(word.title())
-
-            # Index detection
-            if word in indices:
-                entities['indices'].append(word.upper())
-
-            # Sector detection
-            if word in sectors:
-                entities['sectors'].append(word.title())
+            # Currency, commodity, index and sector detection
+            for entity_type, (vocabulary, normalize) in ENTITY_WORDS.items():
+                if word in vocabulary:
+                    entities[entity_type].append(normalize(word))
 
         # Remove duplicates
         for key in entities:
@@ -615,9 +738,10 @@ class NewsAggregator:
 class ConversationalAITradingAssistant:
     """AI-powered conversational assistant for trading advice"""
 
-    def __init__(self):
-        self.sentiment_analyzer = MarketSentimentAnalyzer()
-        self.news_aggregator = NewsAggregator()
+    def __init__(self, sentiment_analyzer: Optional[MarketSentimentAnalyzer] = None,
+                 news_aggregator: Optional[NewsAggregator] = None):
+        self.sentiment_analyzer = sentiment_analyzer or MarketSentimentAnalyzer()
+        self.news_aggregator = news_aggregator or NewsAggregator(self.sentiment_analyzer)
 
         # Conversation memory
         self.conversation_history = deque(maxlen=50)
@@ -743,7 +867,8 @@ class ConversationalAITradingAssistant:
             response_data['data'] = sentiment_summary
 
         elif intent == 'news_request':
-            latest_news = self.news_aggregator.fetch_latest_news(max_articles=5)
+            # Served from the background-refreshed snapshot, never fetched inline
+            latest_news = self.news_aggregator.get_latest_news(max_articles=5)
             if latest_news:
                 top_news = latest_news[0]
                 response_data['message'] = f"Latest market news: {top_news['title']} - Sentiment: {top_news['sentiment']['sentiment']}"
@@ -867,9 +992,10 @@ class QuantumEliteNLPMarketIntelligence:
     """Complete NLP-powered market intelligence system"""
 
     def __init__(self):
+        # One analyzer (one BERT model) shared by every component
         self.sentiment_analyzer = MarketSentimentAnalyzer()
-        self.news_aggregator = NewsAggregator()
-        self.trading_assistant = ConversationalAITradingAssistant()
+        self.news_aggregator = NewsAggregator(self.sentiment_analyzer)
+        self.trading_assistant = ConversationalAITradingAssistant(self.sentiment_analyzer, self.news_aggregator)
 
         # Real-time processing
         self.is_running = False
@@ -1045,7 +1171,8 @@ class QuantumEliteNLPMarketIntelligence:
             'system_active': self.is_running,
             'sentiment_analyzer': {
                 'status': 'active',
-                'model_loaded': self.sentiment_analyzer.sentiment_model is not None
+                'model_loaded': self.sentiment_analyzer.sentiment_model is not None,
+                'cache': self.sentiment_analyzer.cache.get_stats()
             },
             'news_aggregator': {
                 'status': 'active',
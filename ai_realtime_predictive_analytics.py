@@ -19,137 +19,152 @@ import tensorflow as tf
 from tensorflow.keras.models import Model
 from tensorflow.keras.layers import Input, Dense, LSTM, Dropout, BatchNormalization
 from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
-from sklearn.ensemble import IsolationForest
 from sklearn.metrics import mean_squared_error, mean_absolute_error
 import warnings
 
+from ring_buffer import RingBuffer, OnlineStatistics, ZScoreScratch, anomaly_scores
+
 warnings.filterwarnings('ignore')
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class StreamingDataProcessor:
-    """Handles real-time data streaming and preprocessing"""
+    """
+    Handles real-time data streaming and preprocessing
+
+    Ticks land in preallocated ring buffers, so appending is O(1) and the
+    recent window is a contiguous view: nothing is allocated per tick.
+    Anomaly scoring reuses preallocated scratch arrays, and readers on other
+    threads get copies taken under the processor's lock.
+    """
+
+    ANOMALY_MIN_ROWS = 100      # Need minimum data for anomaly detection
 
     def __init__(self, window_size=1000, feature_dim=50):
         self.window_size = window_size
         self.feature_dim = feature_dim
-        self.data_buffer = deque(maxlen=window_size)
-        self.feature_buffer = deque(maxlen=window_size)
-        self.anomaly_detector = IsolationForest(contamination=0.1, random_state=42)
+        self.data_buffer = RingBuffer(window_size, feature_dim)                         # Raw features
+        self.feature_buffer = RingBuffer(window_size, feature_dim, dtype=np.float32)    # Standardized features
+        self.stats = OnlineStatistics(feature_dim)
+        self._scratch = ZScoreScratch(self.ANOMALY_MIN_ROWS, feature_dim)
+        self._lock = threading.RLock()
 
-        # Streaming statistics
+        # Streaming statistics (arrays are updated in place by self.stats)
         self.stats_tracker = {
-            'mean': np.zeros(feature_dim),
-            'std': np.ones(feature_dim),
+            'mean': self.stats.mean,
+            'std': self.stats.std,
             'count': 0
         }
 
     def process_streaming_data(self, new_data: Dict) -> np.ndarray:
         """Process incoming streaming data"""
-        # Extract features from raw data
-        features = self._extract_features(new_data)
+        with self._lock:
+            # Extract features from raw data straight into the raw ring slot
+            raw = self.data_buffer.next_slot()
+            self._extract_features(new_data, out=raw)
 
-        # Update streaming statistics
-        self._update_statistics(features)
+            # Update streaming statistics
+            self._update_statistics(raw)
+            self.data_buffer.commit()
 
-        # Standardize features using streaming stats
-        standardized_features = (features - self.stats_tracker['mean']) / self.stats_tracker['std']
+            # Standardize features using streaming stats, written into the feature ring
+            standardized_features = self.feature_buffer.next_slot()
+            self.stats.standardize(raw, out=standardized_features)
+            standardized_features = self.feature_buffer.commit()
 
-        # Store in buffer
-        self.feature_buffer.append(standardized_features)
+            # Detect anomalies
+            anomaly_score = self._detect_anomaly()
 
-        # Detect anomalies
-        anomaly_score = self._detect_anomaly(standardized_features)
+            return standardized_features, anomaly_score
+
+    def _extract_features(self, data: Dict, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Extract features from raw market data (zero-padded / truncated to feature_dim)"""
+        if out is None:
+            out = np.zeros(self.feature_dim)
+        else:
+            out.fill(0.0)
 
-        return standardized_features, anomaly_score
+        n = 0
+        dim = self.feature_dim
+        seen = self.stats_tracker['count'] > 0
+        price = data.get('price')
 
-    def _extract_features(self, data: Dict) -> np.ndarray:
-        """Extract features from raw market data"""
-        features = []
+        def put(value):
+            nonlocal n
+            if n < dim:
+                out[n] = value
+            n += 1
 
         # Price-based features
-        if 'price' in data:
-            price = data['price']
-            features.extend([
-                price,
-                np.log(price),  # Log price
-                price - self.stats_tracker['mean'][0] if self.stats_tracker['count'] > 0 else 0,  # Price deviation
-            ])
+        if price is not None:
+            put(price)
+            put(np.log(price))  # Log price
+            put(price - self.stats.mean[0] if seen else 0)  # Price deviation
 
         # Volume features
         if 'volume' in data:
             volume = data['volume']
-            features.extend([
-                volume,
-                np.log(volume + 1),  # Log volume
-                volume / (self.stats_tracker['mean'][1] + 1) if self.stats_tracker['count'] > 0 else 1,  # Volume ratio
-            ])
+            put(volume)
+            put(np.log(volume + 1))  # Log volume
+            put(volume / (self.stats.mean[1] + 1) if seen else 1)  # Volume ratio
 
         # Order book features
         if 'orderbook' in data:
             ob = data['orderbook']
-            spread = (ob.get('ask', price) - ob.get('bid', price)) / price if 'ask' in ob else 0
-            depth_imbalance = (ob.get('bid_volume', 0) - ob.get('ask_volume', 0)) / (ob.get('bid_volume', 0) + ob.get('ask_volume', 0) + 1)
-
-            features.extend([
-                spread,  # Bid-ask spread
-                depth_imbalance,  # Order book imbalance
-                ob.get('bid_volume', 0),
-                ob.get('ask_volume', 0),
-            ])
+            spread = (ob.get('ask', price) - ob.get('bid', price)) / price if 'ask' in ob and price else 0
+            bid_volume = ob.get('bid_volume', 0)
+            ask_volume = ob.get('ask_volume', 0)
+            put(spread)  # Bid-ask spread
+            put((bid_volume - ask_volume) / (bid_volume + ask_volume + 1))  # Order book imbalance
+            put(bid_volume)
+            put(ask_volume)
 
         # Time-based features
         if 'timestamp' in data:
-            dt = pd.to_datetime(data['timestamp'])
-            features.extend([
-                dt.hour / 24.0,  # Hour of day
-                dt.weekday() / 7.0,  # Day of week
-                dt.minute / 60.0,  # Minute of hour
-            ])
-
-        # Pad or truncate to fixed dimension
-        features = np.array(features)
-        if len(features) < self.feature_dim:
-            features = np.pad(features, (0, self.feature_dim - len(features)))
-        elif len(features) > self.feature_dim:
-            features = features[:self.feature_dim]
-
-        return features
+            ts = data['timestamp']
+            dt = ts if isinstance(ts, datetime) else pd.Timestamp(ts)
+            put(dt.hour / 24.0)  # Hour of day
+            put(dt.weekday() / 7.0)  # Day of week
+            put(dt.minute / 60.0)  # Minute of hour
+
+        return out
 
     def _update_statistics(self, features: np.ndarray):
         """Update streaming statistics using Welford's online algorithm"""
-        self.stats_tracker['count'] += 1
-        delta = features - self.stats_tracker['mean']
-        self.stats_tracker['mean'] += delta / self.stats_tracker['count']
-        delta2 = features - self.stats_tracker['mean']
-        self.stats_tracker['std'] = np.sqrt(
-            ((self.stats_tracker['count'] - 1) * self.stats_tracker['std']**2 + delta * delta2) / self.stats_tracker['count']
-        )
-
-    def _detect_anomaly(self, features: np.ndarray) -> float:
-        """Detect anomalies in streaming data"""
-        if len(self.feature_buffer) < 100:  # Need minimum data for anomaly detection
-            return 0.0
-
-        # Fit anomaly detector on recent data
-        recent_features = np.array(list(self.feature_buffer)[-100:])
-        if len(recent_features) >= 100:
-            self.anomaly_detector.fit(recent_features)
-
-            # Predict anomaly score
-            score = self.anomaly_detector.score_samples(features.reshape(1, -1))[0]
-            return -score  # Convert to positive anomaly score
-
-        return 0.0
+        self.stats.update(features)
+        self.stats_tracker['count'] = self.stats.count
+
+    def anomaly_scores(self, window_size: int = None) -> Optional[np.ndarray]:
+        """Anomaly score of every row in the recent window, scored in one vectorized pass"""
+        window_size = window_size or self.ANOMALY_MIN_ROWS
+        with self._lock:
+            if len(self.feature_buffer) < window_size:
+                return None
+            return anomaly_scores(self.feature_buffer.window(window_size))
+
+    def _detect_anomaly(self) -> float:
+        """Anomaly score of the latest tick (0 = normal, towards 1 = anomalous)"""
+        with self._lock:
+            if len(self.feature_buffer) < self.ANOMALY_MIN_ROWS:
+                return 0.0
+
+            # Score the row against the spread of the recent window, in the scratch arrays
+            window = self.feature_buffer.window(self.ANOMALY_MIN_ROWS)
+            return float(anomaly_scores(window, scratch=self._scratch)[-1])
 
     def get_recent_window(self, window_size: int = None) -> np.ndarray:
-        """Get recent feature window for prediction"""
-        window_size = window_size or min(len(self.feature_buffer), 100)
-        if len(self.feature_buffer) < window_size:
-            return None
-
-        return np.array(list(self.feature_buffer)[-window_size:])
+        """
+        Get recent feature window for prediction.
+
+        Returns a copy taken under the lock, so the processing thread can keep
+        writing ticks while the caller reads it.
+        """
+        with self._lock:
+            window_size = window_size or min(len(self.feature_buffer), 100)
+            if window_size == 0 or len(self.feature_buffer) < window_size:
+                return None
+            return self.feature_buffer.window(window_size).copy()
 
 class OnlineLearningModel:
     """Online learning model that adapts to streaming data"""
@@ -192,16 +207,21 @@ class OnlineLearningModel:
         """Make prediction with confidence estimate"""
         if features.ndim == 2:
             features = features.reshape(1, *features.shape)
+        features = features.astype(np.float32, copy=False)
+
+        # Estimate prediction uncertainty using ensemble of slightly perturbed inputs.
+        # The clean input and all perturbations go through a single forward pass.
+        n_perturbations = 10
+        noise = np.random.normal(0, 0.01, (n_perturbations, *features.shape)).astype(np.float32)
+        perturbed_features = (features[None, ...] + noise).reshape(-1, *features.shape[1:])
+        batch = np.concatenate([features, perturbed_features])
 
-        prediction = self.model.predict(features, verbose=0)
+        outputs = self.model(batch, training=False)
+        outputs = outputs.numpy() if hasattr(outputs, 'numpy') else np.asarray(outputs)
 
-        # Estimate prediction uncertainty using ensemble of slightly perturbed inputs
-        uncertainties = []
-        for _ in range(10):
-            noise = np.random.normal(0, 0.01, features.shape)
-            perturbed_features = features + noise
-            perturbed_pred = self.model.predict(perturbed_features, verbose=0)
-            uncertainties.append(perturbed_pred)
+        batch_size = len(features)
+        prediction = outputs[:batch_size]
+        uncertainties = outputs[batch_size:].reshape(n_perturbations, batch_size, -1)
 
         uncertainty = np.std(uncertainties, axis=0).mean()
         confidence = 1.0 / (1.0 + uncertainty)
@@ -219,8 +239,8 @@ class OnlineLearningModel:
         gradients = tape.gradient(loss, self.model.trainable_variables)
         self.optimizer.apply_gradients(zip(gradients, self.model.trainable_variables))
 
-        # Store in memory for experience replay
-        self.memory_buffer.append((features, target))
+        # Store in memory for experience replay (features may be a view into a ring buffer)
+        self.memory_buffer.append((np.array(features, copy=True), target))
 
         return loss.numpy()
 
@@ -724,7 +744,7 @@ class QuantumElitePredictiveAnalytics:
             'direction': direction,
             'strength': signal_strength,
             'signal_quality': 'high' if confidence > 0.8 else 'medium' if confidence > 0.6 else 'low',
-            'anomaly_detected': self.stream_processor._detect_anomaly(recent_window[-1]) > 0.5,
+            'anomaly_detected': self.stream_processor._detect_anomaly() > 0.5,
             'timestamp': datetime.now(),
             'model_version': 'quantum_elite_v2.0'
         }
@@ -3,6 +3,8 @@ Comprehensive Backtest Analytics Module
 Calculates institutional-grade performance metrics and generates reports
 """
 
+import heapq
+import math
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -12,18 +14,342 @@ import os
 from pathlib import Path
 
 
+class _Moments:
+    """Welford running mean/variance of a scalar stream, with O(1) merge of constant runs"""
+
+    __slots__ = ('count', 'mean', 'm2')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x: float):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    def add_constant(self, x: float, k: int):
+        """Add ``k`` copies of ``x`` at once (Chan's parallel update)"""
+        if k <= 0:
+            return
+        total = self.count + k
+        delta = x - self.mean
+        self.m2 += delta * delta * self.count * k / total
+        self.mean += delta * k / total
+        self.count = total
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation (ddof=1, as pandas)"""
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+
+class StreamingMetrics:
+    """
+    Single-pass accumulator for the BacktestAnalytics metrics.
+
+    The engine feeds it one equity point per bar and every trade as it
+    closes. It keeps running peak/drawdown/duration, Welford moments of the
+    bar returns (all and downside) and win/loss streaks, so get_metrics()
+    returns the same dict as BacktestAnalytics.calculate_all_metrics() in
+    O(1) - mid-run or at the end - without storing the equity curve.
+    """
+
+    def __init__(self, initial_capital: float):
+        self.initial_capital = initial_capital
+
+        # Equity curve state
+        self.bars = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.equity = None
+        self.peak = None
+        self.drawdown_pct = 0.0
+        self.max_drawdown_pct = 0.0
+        self.drawdown_bars = 0
+        self.max_drawdown_bars = 0
+        self.returns = _Moments()
+        self.downside_returns = _Moments()
+
+        # Trade state
+        self.trade_count = 0
+        self.win_count = 0
+        self.loss_count = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.best_trade = None
+        self.worst_trade = None
+        self.win_streak = 0
+        self.loss_streak = 0
+        self.max_win_streak = 0
+        self.max_loss_streak = 0
+        self.tp1_hits = 0
+        self.tp2_hits = 0
+        self.total_duration_hours = 0.0
+        self.total_fees = 0.0
+        self.total_slippage = 0.0
+        self.exit_reasons: Dict[str, Dict] = {}
+        # Running median of trade durations: max-heap of the lower half, min-heap of the upper half
+        self._low_durations: List[float] = []
+        self._high_durations: List[float] = []
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def update_equity(self, timestamp, equity: float):
+        """Add one bar's (mark-to-market) equity"""
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+        self.last_timestamp = timestamp
+        self.bars += 1
+
+        if self.equity is not None and self.equity != 0:
+            ret = equity / self.equity - 1
+            self.returns.add(ret)
+            if ret < 0:
+                self.downside_returns.add(ret)
+        self.equity = equity
+
+        if self.peak is None or equity > self.peak:
+            self.peak = equity
+        if self.peak != 0 and equity < self.peak:
+            self.drawdown_pct = (equity - self.peak) / self.peak * 100
+            self.max_drawdown_pct = min(self.max_drawdown_pct, self.drawdown_pct)
+            self.drawdown_bars += 1
+            self.max_drawdown_bars = max(self.max_drawdown_bars, self.drawdown_bars)
+        else:
+            self.drawdown_pct = 0.0
+            self.drawdown_bars = 0
+
+    def hold_equity(self, first_timestamp, last_timestamp, count: int):
+        """Add ``count`` bars over which equity did not change (forward-filled bars)"""
+        if count <= 0:
+            return
+        if self.equity is None:
+            self.update_equity(first_timestamp, self.initial_capital)
+            count -= 1
+            if count == 0:
+                return
+
+        self.last_timestamp = last_timestamp
+        self.bars += count
+        if self.equity != 0:
+            self.returns.add_constant(0.0, count)
+        if self.drawdown_bars > 0:
+            self.drawdown_bars += count
+            self.max_drawdown_bars = max(self.max_drawdown_bars, self.drawdown_bars)
+
+    def record_trade(self, trade):
+        """Add a closed trade (a backtest_engine.Trade or any object with the same fields)"""
+        pnl = trade.pnl
+        self.trade_count += 1
+
+        if pnl > 0:
+            self.win_count += 1
+            self.gross_profit += pnl
+            self.win_streak += 1
+            self.loss_streak = 0
+            self.max_win_streak = max(self.max_win_streak, self.win_streak)
+        else:
+            # Break-even trades end a winning streak, as in _max_consecutive
+            if pnl < 0:
+                self.loss_count += 1
+                self.gross_loss += pnl
+            self.loss_streak += 1
+            self.win_streak = 0
+            self.max_loss_streak = max(self.max_loss_streak, self.loss_streak)
+
+        self.best_trade = pnl if self.best_trade is None else max(self.best_trade, pnl)
+        self.worst_trade = pnl if self.worst_trade is None else min(self.worst_trade, pnl)
+
+        self.tp1_hits += bool(trade.tp1_hit)
+        self.tp2_hits += bool(trade.tp2_hit)
+        self.total_fees += trade.total_fees
+        self.total_slippage += trade.entry_slippage + trade.exit_slippage
+
+        duration = trade.duration_hours
+        self.total_duration_hours += duration
+        if not self._low_durations or duration <= -self._low_durations[0]:
+            heapq.heappush(self._low_durations, -duration)
+        else:
+            heapq.heappush(self._high_durations, duration)
+        if len(self._low_durations) > len(self._high_durations) + 1:
+            heapq.heappush(self._high_durations, -heapq.heappop(self._low_durations))
+        elif len(self._high_durations) > len(self._low_durations):
+            heapq.heappush(self._low_durations, -heapq.heappop(self._high_durations))
+
+        reason = trade.exit_reason
+        stats = self.exit_reasons.setdefault(reason, {'count': 0, 'pnl': 0.0, 'wins': 0})
+        stats['count'] += 1
+        stats['pnl'] += pnl
+        stats['wins'] += pnl > 0
+
+    # ------------------------------------------------------------------
+    # Results
+    # ------------------------------------------------------------------
+
+    @property
+    def final_capital(self) -> float:
+        return self.equity if self.equity is not None else self.initial_capital
+
+    @property
+    def median_duration_hours(self) -> float:
+        if not self._low_durations:
+            return 0
+        if len(self._low_durations) > len(self._high_durations):
+            return -self._low_durations[0]
+        return (-self._low_durations[0] + self._high_durations[0]) / 2
+
+    def get_metrics(self, start_date=None, end_date=None) -> Dict:
+        """
+        Metrics for everything seen so far.
+
+        The trading period defaults to the first and last equity timestamps.
+        """
+        if self.trade_count == 0:
+            return {
+                'total_trades': 0,
+                'total_return_pct': 0,
+                'total_pnl': 0,
+                'message': 'No trades executed'
+            }
+
+        start_date = self.first_timestamp if start_date is None else start_date
+        end_date = self.last_timestamp if end_date is None else end_date
+        try:
+            trading_days = (end_date - start_date).days
+        except TypeError:
+            trading_days = 0
+        trading_years = trading_days / 365.25
+
+        n = self.trade_count
+        initial = self.initial_capital
+        final = self.final_capital
+        total_pnl = self.gross_profit + self.gross_loss
+        avg_win = self.gross_profit / self.win_count if self.win_count else 0
+        avg_loss = self.gross_loss / self.loss_count if self.loss_count else 0
+        win_prob = self.win_count / n
+
+        if trading_years > 0 and initial > 0:
+            cagr = -100 if final <= 0 else ((final / initial) ** (1 / trading_years) - 1) * 100
+        else:
+            cagr = 0
+
+        risk = self._risk_metrics(start_date, end_date, trading_years, cagr)
+        max_dd = abs(risk['max_drawdown_pct'])
+        total_costs = self.total_fees + self.total_slippage
+
+        metrics = {
+            'total_trades': n,
+            'winning_trades': self.win_count,
+            'losing_trades': self.loss_count,
+            'win_rate': win_prob * 100,
+            'total_pnl': total_pnl,
+            'total_return_pct': (final - initial) / initial * 100,
+            'avg_win': avg_win,
+            'avg_loss': avg_loss,
+            'profit_factor': abs(self.gross_profit / self.gross_loss) if self.gross_loss != 0 else 0,
+            'best_trade': self.best_trade,
+            'worst_trade': self.worst_trade,
+            'initial_capital': initial,
+            'final_capital': final,
+        }
+        metrics.update(risk)
+        metrics.update({
+            'avg_trade_duration_hours': self.total_duration_hours / n,
+            'median_trade_duration_hours': self.median_duration_hours,
+            'tp1_hit_rate': self.tp1_hits / n * 100,
+            'tp2_hit_rate': self.tp2_hits / n * 100,
+            'exit_reasons': {reason: s['count'] for reason, s in self.exit_reasons.items()},
+            'max_consecutive_wins': self.max_win_streak,
+            'max_consecutive_losses': self.max_loss_streak,
+            'expectancy': win_prob * avg_win - (1 - win_prob) * abs(avg_loss),
+            'exposure_time_pct': self.total_duration_hours / (trading_days * 24) * 100 if trading_days > 0 else 0,
+            'total_exposure_hours': self.total_duration_hours,
+            'cagr': cagr,
+            'turnover': n / max(trading_years, 0.01),
+            'win_loss_ratio': abs(avg_win / avg_loss) if avg_loss != 0 else 0,
+            'recovery_factor': total_pnl / (initial * max_dd / 100) if max_dd > 0 else 0,
+            'exit_reason_stats': {
+                reason: {'count': s['count'], 'avg_pnl': s['pnl'] / s['count'], 'win_rate': s['wins'] / s['count'] * 100}
+                for reason, s in self.exit_reasons.items()
+            },
+            'trading_days': trading_days,
+            'trading_years': trading_years,
+            'total_fees': self.total_fees,
+            'total_slippage': self.total_slippage,
+            'total_costs': total_costs,
+            'cost_drag_pct': total_costs / initial * 100,
+            'avg_fee_per_trade': self.total_fees / n,
+            'avg_slippage_per_trade': self.total_slippage / n,
+        })
+        return metrics
+
+    def _risk_metrics(self, start_date, end_date, trading_years: float, cagr: float) -> Dict:
+        if self.bars < 2:
+            return {
+                'sharpe_ratio': 0,
+                'sortino_ratio': 0,
+                'calmar_ratio': 0,
+                'max_drawdown_pct': 0,
+                'max_drawdown_duration_days': 0,
+                'volatility': 0,
+                'downside_deviation': 0
+            }
+
+        returns = self.returns
+        periods_per_year = returns.count / max(trading_years, 0.01)
+        annualizer = math.sqrt(periods_per_year)
+        std = returns.std
+        downside_std = self.downside_returns.std
+
+        sharpe = returns.mean / std * annualizer if std != 0 else 0
+        if downside_std != 0:
+            sortino = returns.mean / downside_std * annualizer
+            downside_dev = downside_std * annualizer * 100
+        else:
+            sortino = 0
+            downside_dev = 0
+
+        # Drawdown duration in days, at the curve's average bar spacing
+        max_dd_duration = self.max_drawdown_bars
+        try:
+            span_days = (pd.Timestamp(self.last_timestamp) - pd.Timestamp(self.first_timestamp)).total_seconds() / 86400
+            max_dd_duration = self.max_drawdown_bars * span_days / self.bars
+        except (TypeError, ValueError):
+            pass
+
+        return {
+            'sharpe_ratio': sharpe,
+            'sortino_ratio': sortino,
+            'calmar_ratio': abs(cagr / self.max_drawdown_pct) if self.max_drawdown_pct != 0 else 0,
+            'max_drawdown_pct': self.max_drawdown_pct,
+            'max_drawdown_duration_days': max_dd_duration,
+            'volatility': std * annualizer * 100,
+            'downside_deviation': downside_dev
+        }
+
+
 class BacktestAnalytics:
     """Comprehensive analytics for backtest results"""
     
     def __init__(self, trades_df: pd.DataFrame, equity_curve_df: pd.DataFrame,
-                 initial_capital: float, start_date: datetime, end_date: datetime):
+                 initial_capital: float, start_date: datetime, end_date: datetime,
+                 streaming_metrics: Optional[StreamingMetrics] = None):
         self.trades_df = trades_df
         self.equity_curve_df = equity_curve_df
         self.initial_capital = initial_capital
         self.start_date = start_date
         self.end_date = end_date
+        # When given, calculate_all_metrics() reads the accumulator instead of rescanning the frames
+        self.streaming_metrics = streaming_metrics
         
-        if len(equity_curve_df) > 0:
+        if streaming_metrics is not None:
+            self.final_capital = streaming_metrics.final_capital
+        elif len(equity_curve_df) > 0:
             self.final_capital = equity_curve_df['equity'].iloc[-1]
         else:
             self.final_capital = initial_capital
@@ -32,8 +358,22 @@ class BacktestAnalytics:
         self.trading_days = (end_date - start_date).days
         self.trading_years = self.trading_days / 365.25
     
+    @classmethod
+    def from_engine(cls, engine, start_date: datetime = None, end_date: datetime = None) -> 'BacktestAnalytics':
+        """Analytics backed by an engine's streaming metrics (works with keep_equity_curve=False)"""
+        metrics = engine.metrics
+        start_date = metrics.first_timestamp if start_date is None else start_date
+        end_date = metrics.last_timestamp if end_date is None else end_date
+        if start_date is None:
+            start_date = end_date = datetime.now()
+        return cls(engine.get_trades_df(), engine.get_equity_curve_df(), engine.initial_capital,
+                   start_date, end_date, streaming_metrics=metrics)
+    
     def calculate_all_metrics(self) -> Dict:
         """Calculate all performance metrics"""
+        if self.streaming_metrics is not None:
+            return self.streaming_metrics.get_metrics(self.start_date, self.end_date)
+        
         if len(self.trades_df) == 0:
             return self._empty_metrics()
         
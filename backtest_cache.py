@@ -0,0 +1,444 @@
+"""
+Backtest Result Cache
+Content-addressed, size-bounded disk cache for BacktestEngine results
+
+A result is keyed by a hash of the input data (values and index), the engine
+configuration (risk, fees, slippage, PositionMode, ExecutionPriority, ...),
+the run method and its options, and the strategy identity/version, including
+the parameters a closure or functools.partial captured. Trades and
+equity curves are stored column by column in a compressed .npz next to a small
+JSON file with the metrics; the least recently used entries are evicted once
+the cache exceeds its size limit.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('backtest_cache')
+
+CACHE_FORMAT_VERSION = 2
+
+
+class UncacheableStrategy(ValueError):
+    """The strategy's identity (code or captured parameters) cannot be determined"""
+
+
+@dataclass
+class BacktestResult:
+    """Outputs of one backtest run, fresh or from cache"""
+    key: str
+    trades_df: pd.DataFrame
+    equity_curve_df: pd.DataFrame
+    metrics: Dict[str, Any] = field(default_factory=dict)
+    cache_hit: bool = False
+    run_seconds: float = 0.0
+
+
+def fingerprint_data(data) -> str:
+    """Hash of a DataFrame (values + index) or a {symbol: DataFrame} mapping"""
+    digest = hashlib.blake2b(digest_size=20)
+    frames = data.items() if isinstance(data, dict) else [('', data)]
+    for name, df in frames:
+        digest.update(str(name).encode())
+        digest.update(repr((df.shape, list(df.columns))).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return digest.hexdigest()
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=12).hexdigest()
+
+
+def _fingerprint_value(value, seen: frozenset) -> str:
+    """Stable text for a parameter a strategy captured; raises UncacheableStrategy if there is none"""
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        return repr(value)
+    if isinstance(value, Enum):
+        return f"{type(value).__qualname__}.{value.name}"
+    if isinstance(value, np.generic):
+        return repr(value.item())
+    if isinstance(value, np.ndarray):
+        return f"nd:{value.dtype}:{value.shape}:" + hashlib.blake2b(
+            np.ascontiguousarray(value).tobytes(), digest_size=12).hexdigest()
+    if isinstance(value, pd.Series):
+        value = value.to_frame()
+    if isinstance(value, pd.DataFrame):
+        return 'df:' + fingerprint_data(value)
+    if id(value) in seen:
+        return 'cycle'
+    seen = seen | {id(value)}
+    if isinstance(value, (list, tuple)):
+        return type(value).__name__ + '[' + ','.join(_fingerprint_value(v, seen) for v in value) + ']'
+    if isinstance(value, (set, frozenset)):
+        return 'set[' + ','.join(sorted(_fingerprint_value(v, seen) for v in value)) + ']'
+    if isinstance(value, dict):
+        items = sorted((_fingerprint_value(k, seen), _fingerprint_value(v, seen)) for k, v in value.items())
+        return 'dict{' + ','.join(f"{k}:{v}" for k, v in items) + '}'
+    if inspect.ismodule(value):
+        return 'module:' + value.__name__
+    if callable(value):
+        return json.dumps(_identity(value, None, seen), sort_keys=True)
+    if hasattr(value, '__dict__'):
+        return f"{type(value).__module__}.{type(value).__qualname__}" + _fingerprint_value(vars(value), seen)
+    raise UncacheableStrategy(f"cannot fingerprint captured {type(value).__name__}")
+
+
+def _captured_state(strategy, seen: frozenset) -> Optional[str]:
+    """Parameters bound into a strategy: closure cells, defaults and the bound instance"""
+    target = getattr(strategy, '__func__', strategy)
+    parts = []
+    if inspect.isfunction(target):
+        if target.__closure__:
+            try:
+                cells = [cell.cell_contents for cell in target.__closure__]
+            except ValueError:
+                raise UncacheableStrategy(f"{target.__qualname__} has an empty closure cell")
+            parts.append(('closure', _fingerprint_value(tuple(cells), seen)))
+        if target.__defaults__:
+            parts.append(('defaults', _fingerprint_value(target.__defaults__, seen)))
+        if target.__kwdefaults__:
+            parts.append(('kwdefaults', _fingerprint_value(target.__kwdefaults__, seen)))
+    owner = getattr(strategy, '__self__', None)
+    if owner is not None and not inspect.ismodule(owner) and not inspect.isclass(owner):
+        parts.append(('self', _fingerprint_value(owner, seen)))
+    elif not inspect.isroutine(strategy) and hasattr(strategy, '__dict__'):
+        parts.append(('instance', _fingerprint_value(vars(strategy), seen)))
+    return _digest(repr(parts)) if parts else None
+
+
+def _identity(strategy, version: Optional[str], seen: frozenset) -> Dict[str, str]:
+    if isinstance(strategy, functools.partial):
+        identity = _identity(strategy.func, version, seen)
+        identity['partial'] = _digest(_fingerprint_value((strategy.args, strategy.keywords), seen))
+        return identity
+
+    target = getattr(strategy, '__func__', strategy)
+    name = f"{getattr(target, '__module__', '?')}.{getattr(target, '__qualname__', type(target).__name__)}"
+    explicit = version or getattr(strategy, '__version__', None)
+    if explicit is None:
+        try:
+            source = inspect.getsource(target if inspect.isroutine(target) else type(target))
+        except (OSError, TypeError):
+            raise UncacheableStrategy(f"no source or version for {name}")
+        version = 'src:' + _digest(source)
+    identity = {'name': name, 'version': str(explicit or version)}
+    try:
+        state = _captured_state(strategy, seen)
+    except UncacheableStrategy:
+        if explicit is None:
+            raise
+        state = None  # An explicit version vouches for whatever could not be fingerprinted
+    if state is not None:
+        identity['state'] = state
+    return identity
+
+
+def strategy_identity(strategy, version: Optional[str] = None) -> Dict[str, str]:
+    """
+    Identify a strategy (or {symbol: strategy} mapping) for cache keys.
+
+    Uses ``version`` or the strategy's ``__version__`` attribute when given,
+    otherwise a hash of its source, so edits to the strategy miss the cache.
+    Parameters captured by closures, defaults, bound instances and
+    functools.partial are part of the identity too.
+
+    Raises:
+        UncacheableStrategy: No version and no source, or captured parameters
+            that cannot be fingerprinted without an explicit version.
+    """
+    if isinstance(strategy, dict):
+        return {str(symbol): json.dumps(strategy_identity(func, version), sort_keys=True)
+                for symbol, func in sorted(strategy.items(), key=lambda item: str(item[0]))}
+    return _identity(strategy, version, frozenset())
+
+
+def _encode_frame(df: pd.DataFrame, prefix: str, arrays: Dict[str, np.ndarray]) -> Dict:
+    """Store a DataFrame column by column; returns the schema needed to rebuild it"""
+    index_name = None
+    if not isinstance(df.index, pd.RangeIndex):
+        df = df.reset_index()
+        index_name = str(df.columns[0])
+
+    schema = {'columns': [], 'index': index_name}
+    for i, column in enumerate(df.columns):
+        series = df[column]
+        name = f"{prefix}{i}"
+        column_schema = {'name': str(column)}
+        if pd.api.types.is_datetime64_any_dtype(series):
+            values = pd.DatetimeIndex(series)
+            arrays[name] = values.as_unit('ns').asi8
+            kind = 'datetime'
+            column_schema.update(unit=values.unit, tz=str(values.tz) if values.tz is not None else None)
+        elif series.dtype == object or pd.api.types.is_string_dtype(series):
+            mask = series.isna().to_numpy()
+            arrays[name] = np.array(['' if m else str(v) for v, m in zip(series, mask)], dtype=str)
+            arrays[f"{name}_null"] = mask
+            kind = 'str'
+        else:
+            arrays[name] = series.to_numpy()
+            kind = 'plain'
+        column_schema['kind'] = kind
+        schema['columns'].append(column_schema)
+    return schema
+
+
+def _decode_frame(schema: Dict, prefix: str, arrays) -> pd.DataFrame:
+    data = {}
+    for i, column in enumerate(schema['columns']):
+        name = f"{prefix}{i}"
+        values = arrays[name]
+        if column['kind'] == 'datetime':
+            values = pd.DatetimeIndex(pd.to_datetime(values, unit='ns', utc=column['tz'] is not None))
+            if column['tz'] is not None:
+                values = values.tz_convert(column['tz'])
+            values = values.as_unit(column['unit'])
+        elif column['kind'] == 'str':
+            values = pd.Series(values, dtype=object).where(~arrays[f"{name}_null"], None)
+        data[column['name']] = values
+    df = pd.DataFrame(data)
+    if schema['index'] is not None and len(df.columns):
+        df = df.set_index(schema['index'])
+    return df
+
+
+def _json_default(value):
+    if isinstance(value, (np.integer,)):
+        return int(value)
+    if isinstance(value, (np.floating,)):
+        return float(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+class BacktestResultCache:
+    """Content-addressed disk cache of backtest results with an LRU size limit"""
+
+    def __init__(self, cache_dir: str = 'backtest_cache', max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._index_path = os.path.join(cache_dir, 'index.json')
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index = self._load_index()
+
+    # ------------------------------------------------------------------ keys
+
+    def make_key(self, engine, data, strategy, method: str = 'run_backtest',
+                 strategy_version: Optional[str] = None, run_options: Optional[Dict] = None) -> str:
+        """
+        Cache key for running ``strategy`` on ``data`` with ``engine``'s configuration.
+
+        Raises UncacheableStrategy when the strategy cannot be identified.
+        """
+        payload = {
+            'format': CACHE_FORMAT_VERSION,
+            'data': fingerprint_data(data),
+            'engine': engine.get_config(),
+            'method': method,
+            'strategy': strategy_identity(strategy, strategy_version),
+            'options': {k: (strategy_identity(v) if callable(v) else v) for k, v in sorted((run_options or {}).items())},
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=_json_default).encode()
+        return hashlib.blake2b(encoded, digest_size=20).hexdigest()
+
+    # ------------------------------------------------------------ get / put
+
+    def get(self, key: str) -> Optional[BacktestResult]:
+        """Load a cached result, or None"""
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            try:
+                with open(self._path(key, 'json')) as f:
+                    meta = json.load(f)
+                with np.load(self._path(key, 'npz'), allow_pickle=False) as arrays:
+                    trades_df = _decode_frame(meta['trades_schema'], 't', arrays)
+                    equity_df = _decode_frame(meta['equity_schema'], 'e', arrays)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Dropping unreadable cache entry {key}: {e}")
+                self._remove(key)
+                self._save_index()
+                self.misses += 1
+                return None
+
+            entry['last_access'] = time.time()
+            self._save_index()
+            self.hits += 1
+
+        return BacktestResult(key=key, trades_df=trades_df, equity_curve_df=equity_df,
+                              metrics=meta.get('metrics', {}), cache_hit=True,
+                              run_seconds=meta.get('run_seconds', 0.0))
+
+    def put(self, result: BacktestResult):
+        """Store a result and evict least recently used entries over the size limit"""
+        arrays: Dict[str, np.ndarray] = {}
+        meta = {
+            'trades_schema': _encode_frame(result.trades_df, 't', arrays),
+            'equity_schema': _encode_frame(result.equity_curve_df, 'e', arrays),
+            'metrics': result.metrics,
+            'run_seconds': result.run_seconds,
+            'created': time.time(),
+        }
+
+        with self._lock:
+            npz_path = self._path(result.key, 'npz')
+            tmp_path = npz_path + '.tmp.npz'
+            np.savez_compressed(tmp_path, **arrays)
+            os.replace(tmp_path, npz_path)
+            with open(self._path(result.key, 'json'), 'w') as f:
+                json.dump(meta, f, default=_json_default)
+
+            size = os.path.getsize(npz_path) + os.path.getsize(self._path(result.key, 'json'))
+            self._index[result.key] = {'size': size, 'last_access': time.time()}
+            self._evict()
+            self._save_index()
+
+    def get_or_run(self, engine, data, strategy, method: str = 'run_backtest',
+                   strategy_version: Optional[str] = None,
+                   metrics_func: Optional[Callable] = None, **run_options) -> BacktestResult:
+        """
+        Return the cached result for this configuration, or run the backtest and cache it.
+
+        Args:
+            engine: A fresh BacktestEngine (its configuration is part of the key)
+            data: OHLCV DataFrame, or {symbol: DataFrame} for run_portfolio_backtest
+            strategy: Strategy function (or {symbol: function}) for ``method``
+            method: 'run_backtest', 'run_vectorized_backtest' or 'run_portfolio_backtest'
+            strategy_version: Explicit version; defaults to __version__ or a source hash
+            metrics_func: (engine, trades_df, equity_df) -> metrics dict; defaults to BacktestAnalytics
+            **run_options: Passed to the run method (verbose is never part of the key)
+        """
+        keyed_options = {k: v for k, v in run_options.items() if k != 'verbose'}
+        try:
+            key = self.make_key(engine, data, strategy, method, strategy_version, keyed_options)
+        except UncacheableStrategy as e:
+            logger.warning(f"Running backtest uncached: {e}")
+            key = None
+
+        if key is not None:
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+
+        run_options.setdefault('verbose', False)
+        start = time.time()
+        outcome = getattr(engine, method)(data, strategy, **run_options)
+        run_seconds = time.time() - start
+
+        trades_df = engine.get_trades_df()
+        equity_df = engine.get_equity_curve_df()
+        if isinstance(outcome, dict) and not outcome.get('success', True):
+            # Skipped run (e.g. error-risk avoidance): hand back the reason, never cache it
+            logger.warning(f"Backtest not cached: {outcome.get('error', 'run did not succeed')}")
+            return BacktestResult(key=key or '', trades_df=trades_df, equity_curve_df=equity_df,
+                                  metrics=dict(outcome), cache_hit=False, run_seconds=run_seconds)
+
+        metrics = (metrics_func or default_metrics)(engine, trades_df, equity_df)
+        result = BacktestResult(key=key or '', trades_df=trades_df, equity_curve_df=equity_df,
+                                metrics=metrics, cache_hit=False, run_seconds=run_seconds)
+        if key is not None:
+            self.put(result)
+        return result
+
+    # ------------------------------------------------------------ housekeeping
+
+    def total_bytes(self) -> int:
+        return sum(entry['size'] for entry in self._index.values())
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._index):
+                self._remove(key)
+            self._save_index()
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._index),
+            'total_bytes': self.total_bytes(),
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def _path(self, key: str, ext: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.{ext}")
+
+    def _evict(self):
+        total = self.total_bytes()
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]['last_access']):
+            if total <= self.max_bytes:
+                break
+            total -= entry['size']
+            self._remove(key)
+
+    def _remove(self, key: str):
+        self._index.pop(key, None)
+        for ext in ('npz', 'json'):
+            try:
+                os.remove(self._path(key, ext))
+            except FileNotFoundError:
+                pass
+
+    def _load_index(self) -> Dict[str, Dict]:
+        try:
+            with open(self._index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Drop entries whose files were removed behind our back
+        return {k: v for k, v in index.items()
+                if os.path.exists(self._path(k, 'npz')) and os.path.exists(self._path(k, 'json'))}
+
+    def _save_index(self):
+        tmp = self._index_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self._index, f)
+        os.replace(tmp, self._index_path)
+
+
+def default_metrics(engine, trades_df: pd.DataFrame, equity_df: pd.DataFrame) -> Dict[str, Any]:
+    """Full BacktestAnalytics metrics for a finished run"""
+    from backtest_analytics import BacktestAnalytics
+
+    if not getattr(engine, 'keep_equity_curve', True):
+        return BacktestAnalytics.from_engine(engine).calculate_all_metrics()  # Streamed, no curve to read
+    if len(equity_df) > 0:
+        start_date, end_date = equity_df.index[0], equity_df.index[-1]
+    else:
+        start_date = end_date = pd.Timestamp.now()
+    analytics = BacktestAnalytics(trades_df, equity_df, engine.initial_capital, start_date, end_date)
+    return analytics.calculate_all_metrics()
+
+
+# Global cache instance
+_cache_instance = None
+
+
+def get_backtest_cache() -> BacktestResultCache:
+    """Get the shared backtest result cache (BACKTEST_CACHE_DIR / BACKTEST_CACHE_MAX_MB)"""
+    global _cache_instance
+    if _cache_instance is None:
+        _cache_instance = BacktestResultCache(
+            cache_dir=os.getenv('BACKTEST_CACHE_DIR', 'backtest_cache'),
+            max_bytes=int(float(os.getenv('BACKTEST_CACHE_MAX_MB', '512')) * 1024 * 1024)
+        )
+    return _cache_instance
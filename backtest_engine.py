@@ -7,15 +7,18 @@ PERFORMANCE OPTIMIZED VERSION
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Callable, Generator
+from typing import List, Dict, Optional, Callable, Generator, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 import warnings
 import time
+import heapq
 import logging
 from numba import jit, njit
 from functools import lru_cache
 from global_error_learning import global_error_manager, record_error
+from intrabar_store import IntrabarStore, replay_exits
+from backtest_analytics import StreamingMetrics
 
 logger = logging.getLogger(__name__)
 
@@ -84,6 +87,62 @@ def vectorized_slippage_calculation(price: float, direction: int, volatility: fl
     return final_price, slippage_amount
 
 
+def merge_bar_streams(index_by_symbol: Dict[str, pd.Index]) -> Generator:
+    """
+    K-way merge of per-symbol bar indexes into one timestamp-ordered stream.
+
+    Yields (timestamp, symbol, position) without building a combined frame;
+    bars sharing a timestamp come out in the order the symbols were given.
+    """
+    def stream(order: int, symbol: str, index: pd.Index):
+        for position, timestamp in enumerate(index):
+            yield timestamp, order, position, symbol
+
+    streams = [stream(order, symbol, index) for order, (symbol, index) in enumerate(index_by_symbol.items())]
+    for timestamp, _, position, symbol in heapq.merge(*streams):
+        yield timestamp, symbol, position
+
+
+SIGNAL_COLUMNS = ('direction', 'entry_price', 'stop_loss', 'take_profit_1', 'take_profit_2')
+
+_DIRECTION_CODES = {'BUY': 1, 'LONG': 1, 'SELL': -1, 'SHORT': -1, 'HOLD': 0}
+
+
+def normalize_signal_arrays(signals, length: int) -> Dict[str, np.ndarray]:
+    """
+    Validate the output of a vectorized strategy.
+
+    Accepts a DataFrame or a dict of array-likes with SIGNAL_COLUMNS, aligned
+    with the input bars. Direction may be numeric (+1 buy, -1 sell, 0/NaN none)
+    or 'BUY'/'SELL'/'HOLD' strings. Returns float arrays plus an int8
+    'direction' and a boolean 'valid' mask (direction set, entry and stop finite).
+    """
+    missing = [col for col in ('direction', 'entry_price', 'stop_loss') if col not in signals]
+    if missing:
+        raise ValueError(f"Vectorized strategy output is missing {missing}")
+
+    arrays = {}
+    for col in SIGNAL_COLUMNS:
+        if col not in signals:
+            arrays[col] = np.full(length, np.nan)
+            continue
+        values = np.asarray(signals[col])
+        if len(values) != length:
+            raise ValueError(f"Signal column '{col}' has {len(values)} rows, expected {length}")
+        if col == 'direction':
+            if values.dtype.kind in 'OUS':
+                values = np.array([_DIRECTION_CODES.get(str(v).upper(), 0) if v is not None else 0 for v in values])
+            values = np.nan_to_num(np.sign(values.astype(float)), nan=0.0).astype(np.int8)
+        else:
+            values = values.astype(float)
+        arrays[col] = values
+
+    arrays['valid'] = ((arrays['direction'] != 0) &
+                       np.isfinite(arrays['entry_price']) &
+                       np.isfinite(arrays['stop_loss']))
+    return arrays
+
+
 class ExecutionPriority(Enum):
     """Order execution priority"""
     STOP_LOSS_FIRST = "stop_loss_first"
@@ -139,6 +198,9 @@ class Trade:
     realized_pnl: float = 0.0
     unrealized_pnl: float = 0.0
     
+    # Entry notional still held in the engine's reserved margin
+    margin_reserved: float = 0.0
+    
     def __post_init__(self):
         self.remaining_size = self.lot_size
         self.total_fees = self.entry_fee
@@ -226,13 +288,16 @@ class BacktestEngine:
         max_daily_loss_pct: Optional[float] = None,  # Stop trading if daily loss exceeds this
         max_drawdown_pct: Optional[float] = None,  # Stop trading if drawdown exceeds this
         max_leverage: Optional[float] = None,  # Maximum leverage
+        margin_requirement: Optional[float] = None,  # Fraction of notional posted as margin (None = fully funded)
         per_asset_cap_pct: Optional[float] = None,  # Max capital per asset
         # Risk-based sizing
         use_atr_sizing: bool = False,
         atr_period: int = 14,
         volatility_factor: float = 1.0,  # Multiplier for volatility-based sizing
         # Random seed for reproducibility
-        random_seed: Optional[int] = None
+        random_seed: Optional[int] = None,
+        # Keep the per-bar equity curve (metrics are streamed either way, see self.metrics)
+        keep_equity_curve: bool = True
     ):
         self.initial_capital = initial_capital
         self.capital = initial_capital
@@ -265,6 +330,7 @@ class BacktestEngine:
         self.max_daily_loss_pct = max_daily_loss_pct
         self.max_drawdown_pct = max_drawdown_pct
         self.max_leverage = max_leverage
+        self.margin_requirement = margin_requirement
         self.per_asset_cap_pct = per_asset_cap_pct
         
         # Risk-based sizing
@@ -277,6 +343,8 @@ class BacktestEngine:
         self.open_trades: List[Trade] = []
         self.positions_by_symbol: Dict[str, List[Trade]] = {}  # Track positions per symbol
         self.equity_curve = []
+        self.keep_equity_curve = keep_equity_curve
+        self.metrics = StreamingMetrics(initial_capital)  # Updated per bar and per closed trade
         self.balance_history = []
         self.daily_pnl = {}  # Track daily P&L for daily loss limits
         self.peak_equity = initial_capital  # For drawdown calculation
@@ -291,6 +359,105 @@ class BacktestEngine:
         self._volatility_cache = {}
         self._atr_cache = {}
         self._performance_mode = False  # Toggle for performance optimizations
+
+        # Optional sub-bar exit resolution (see set_intrabar_store)
+        self.intrabar_stores: Dict[Optional[str], IntrabarStore] = {}
+        self.bar_durations: Dict[Optional[str], pd.Timedelta] = {}
+        self.intrabar_stats = {'ambiguous_bars': 0, 'resolved': 0, 'target_first': 0, 'unresolved': 0}
+
+    def get_config(self) -> Dict:
+        """Engine parameters that affect results (used to key cached results)"""
+        return {
+            'initial_capital': self.initial_capital,
+            'risk_per_trade': self.risk_per_trade,
+            'slippage': self.slippage_base,
+            'bid_ask_spread': self.bid_ask_spread,
+            'fee_entry': self.fee_entry,
+            'fee_exit': self.fee_exit,
+            'volatility_lookback': self.volatility_lookback,
+            'max_concurrent_trades': self.max_concurrent_trades,
+            'max_positions_per_symbol': self.max_positions_per_symbol,
+            'position_mode': self.position_mode.value,
+            'execution_priority': self.execution_priority.value,
+            'max_daily_loss_pct': self.max_daily_loss_pct,
+            'max_drawdown_pct': self.max_drawdown_pct,
+            'max_leverage': self.max_leverage,
+            'margin_requirement': self.margin_requirement,
+            'per_asset_cap_pct': self.per_asset_cap_pct,
+            'use_atr_sizing': self.use_atr_sizing,
+            'atr_period': self.atr_period,
+            'volatility_factor': self.volatility_factor,
+            'intrabar_stores': {str(symbol): store.path for symbol, store in self.intrabar_stores.items()},
+            'bar_durations': {str(symbol): str(duration) for symbol, duration in self.bar_durations.items()},
+            'keep_equity_curve': self.keep_equity_curve,  # Without it the result has no equity frame
+        }
+
+    def set_intrabar_store(self, store: IntrabarStore, symbol: Optional[str] = None,
+                           bar_duration: Optional[pd.Timedelta] = None):
+        """
+        Resolve ambiguous bars with lower-timeframe data.
+
+        When a bar touches both a trade's stop and its next target, the
+        matching 1m/5m slice is replayed from ``store``: the first level hit,
+        then (after TP1) the breakeven stop and TP2 for the rest of the bar.
+        Other bars are unaffected. ``symbol=None`` registers a
+        store used for any symbol without its own; ``bar_duration`` defaults to
+        the spacing of the backtested bars.
+        """
+        self.intrabar_stores[symbol] = store
+        if bar_duration is not None:
+            self.bar_durations[symbol] = pd.Timedelta(bar_duration)
+
+    def _prepare_intrabar(self, index_by_symbol: Dict[Optional[str], pd.Index]):
+        """Infer bar durations for intrabar resolution from the backtested data"""
+        if not self.intrabar_stores:
+            return
+        for symbol, index in index_by_symbol.items():
+            if symbol not in self.bar_durations and len(index) > 1:
+                self.bar_durations[symbol] = pd.Timedelta(int(np.median(np.diff(pd.DatetimeIndex(index).as_unit('ns').asi8))))
+
+    def _bar_exits(self, trade: 'Trade', high: float, low: float,
+                   current_time: datetime) -> List[Tuple[str, float]]:
+        """
+        Exits a bar triggers for a trade, in order, as (reason, level) pairs.
+
+        A bar touching both the stop and the next target is replayed on its
+        sub-bars when an intrabar store covers it; otherwise the execution
+        priority decides (stop first unless TAKE_PROFIT_FIRST).
+        """
+        sign = 1 if trade.direction == 'BUY' else -1
+        target = trade.take_profit_2 if trade.tp1_hit else trade.take_profit_1
+        stop_hit = (low <= trade.stop_loss) if sign == 1 else (high >= trade.stop_loss)
+        target_hit = not trade.tp2_hit and ((high >= target) if sign == 1 else (low <= target))
+        target_first = self.execution_priority == ExecutionPriority.TAKE_PROFIT_FIRST
+
+        if stop_hit and target_hit and self.intrabar_stores:
+            stats = self.intrabar_stats
+            stats['ambiguous_bars'] += 1
+            store = self.intrabar_stores.get(trade.symbol, self.intrabar_stores.get(None))
+            duration = self.bar_durations.get(trade.symbol, self.bar_durations.get(None))
+            window = store.window(current_time, current_time + duration) \
+                if store is not None and duration is not None else None
+            exits = replay_exits(window[0], window[1], trade.direction, trade.entry_price, trade.stop_loss,
+                                 trade.take_profit_1, trade.take_profit_2, trade.tp1_hit,
+                                 target_first_on_tie=target_first) if window else None
+            if exits is not None:
+                stats['resolved'] += 1
+                if exits and exits[0][0] != 'SL':
+                    stats['target_first'] += 1
+                return exits
+            # Not covered or still ambiguous: the execution priority decides
+            stats['unresolved'] += 1
+
+        if stop_hit and not (target_hit and target_first):
+            return [('SL', trade.stop_loss)]
+        exits = []
+        if not trade.tp1_hit and target_hit:
+            exits.append(('TP1', trade.take_profit_1))
+        if not trade.tp2_hit and (trade.tp1_hit or exits) and \
+                ((high >= trade.take_profit_2) if sign == 1 else (low <= trade.take_profit_2)):
+            exits.append(('TP2', trade.take_profit_2))
+        return exits
     
     def calculate_atr(self, data: pd.DataFrame, period: int = None) -> pd.Series:
         """Calculate Average True Range (optimized version)"""
@@ -434,7 +601,8 @@ class BacktestEngine:
             if date_key not in self.daily_pnl:
                 self.daily_pnl[date_key] = 0.0
             
-            daily_loss_pct = abs(self.daily_pnl[date_key]) / self.initial_capital * 100
+            # Only losses count towards the limit
+            daily_loss_pct = max(-self.daily_pnl[date_key], 0.0) / self.initial_capital * 100
             if daily_loss_pct >= self.max_daily_loss_pct:
                 if self.trading_enabled:
                     warnings.warn(f"Daily loss limit ({self.max_daily_loss_pct}%) reached. Stopping trading.")
@@ -474,8 +642,9 @@ class BacktestEngine:
         return True
     
     def open_trade(self, signal: Dict, current_time: datetime, 
-                  data: pd.DataFrame = None, tags: Dict[str, str] = None) -> Optional[Trade]:
-        """Open a new trade based on signal"""
+                  data: pd.DataFrame = None, tags: Dict[str, str] = None,
+                  volatility: Optional[float] = None) -> Optional[Trade]:
+        """Open a new trade based on signal (volatility, if given, skips recomputing it from data)"""
         if signal['direction'] == 'HOLD':
             return None
         
@@ -496,9 +665,10 @@ class BacktestEngine:
             return None
         
         # Calculate volatility for adaptive slippage
-        volatility = 0.001
-        if data is not None and len(data) >= self.volatility_lookback:
-            volatility = self.calculate_volatility(data, self.volatility_lookback)
+        if volatility is None:
+            volatility = 0.001
+            if data is not None and len(data) >= self.volatility_lookback:
+                volatility = self.calculate_volatility(data, self.volatility_lookback)
         
         # Apply slippage to entry
         entry_price, entry_slippage = self.apply_slippage(
@@ -511,11 +681,16 @@ class BacktestEngine:
         # Calculate fees
         entry_fee = self.calculate_fee(entry_price, lot_size, is_entry=True)
         
-        # Check if we have enough capital
+        # Check if we have enough capital (margin is shared by every open position)
         position_value = entry_price * lot_size
-        required_capital = position_value + entry_fee
+        if self.margin_requirement is not None:
+            required_capital = position_value * self.margin_requirement + entry_fee
+            available_capital = self.cash - self.reserved_margin * self.margin_requirement
+        else:
+            required_capital = position_value + entry_fee
+            available_capital = self.cash - self.reserved_margin
         
-        if self.cash < required_capital:
+        if available_capital < required_capital:
             return None  # Insufficient capital
         
         # Create trade
@@ -537,6 +712,7 @@ class BacktestEngine:
         self.cash -= entry_fee
         self.capital -= entry_fee
         self.reserved_margin += position_value
+        trade.margin_reserved = position_value
         trade.pnl -= entry_fee
         trade.realized_pnl -= entry_fee
         
@@ -551,93 +727,55 @@ class BacktestEngine:
         return trade
     
     def check_exits(self, candle: pd.Series, current_time: datetime, 
-                   data: pd.DataFrame = None, volatility: float = 0.001):
-        """Check if any open trades should be closed with proper execution priority"""
+                   data: pd.DataFrame = None, volatility: float = 0.001,
+                   symbol: Optional[str] = None):
+        """
+        Check if any open trades should be closed with proper execution priority
+
+        With ``symbol`` only that symbol's trades are checked (the candle
+        belongs to it); otherwise every open trade is checked.
+        """
         trades_to_close = []
+        open_trades = self.open_trades if symbol is None else [t for t in self.open_trades if t.symbol == symbol]
         
         # Sort trades by priority if needed
         if self.execution_priority == ExecutionPriority.STOP_LOSS_FIRST:
             # Check stop losses first
-            priority_trades = [t for t in self.open_trades if self._check_stop_loss(t, candle, current_time, data, volatility)]
-            other_trades = [t for t in self.open_trades if t not in priority_trades]
+            priority_trades = [t for t in open_trades if self._check_stop_loss(t, candle, current_time, data, volatility)]
+            other_trades = [t for t in open_trades if t not in priority_trades]
             sorted_trades = priority_trades + other_trades
         else:
-            sorted_trades = self.open_trades
+            sorted_trades = open_trades
         
         for trade in sorted_trades:
-            high = candle['high']
-            low = candle['low']
-            close = candle['close']
-            
-            if trade.direction == 'BUY':
-                # Check stop loss (highest priority for risk management)
-                if low <= trade.stop_loss:
-                    exit_price, exit_slippage = self.apply_slippage(trade.stop_loss, 'SELL', volatility)
-                    exit_fee = self.calculate_fee(exit_price, trade.remaining_size, is_entry=False)
-                    trade.exit_slippage = exit_slippage
-                    trade.close_full(current_time, exit_price, 'SL', exit_fee)
-                    trades_to_close.append(trade)
-                    continue
-                
-                # Check TP1
-                if not trade.tp1_hit and high >= trade.take_profit_1:
-                    exit_price, exit_slippage = self.apply_slippage(trade.take_profit_1, 'SELL', volatility)
+            exit_side = 'SELL' if trade.direction == 'BUY' else 'BUY'
+            for reason, level in self._bar_exits(trade, candle['high'], candle['low'], current_time):
+                exit_price, exit_slippage = self.apply_slippage(level, exit_side, volatility)
+                trade.exit_slippage = exit_slippage
+                if reason == 'TP1':
                     exit_fee = self.calculate_fee(exit_price, trade.lot_size * 0.5, is_entry=False)
-                    trade.exit_slippage = exit_slippage
                     pnl = trade.close_partial(current_time, exit_price, 0.5, 'TP1', exit_fee)
                     self.capital += pnl
                     self.cash += pnl
-                    self.reserved_margin -= trade.lot_size * 0.5 * exit_price
+                    self._release_margin(trade, 0.5)
                     # Move SL to breakeven
                     trade.stop_loss = trade.entry_price
-                
-                # Check TP2
-                if trade.tp1_hit and not trade.tp2_hit and high >= trade.take_profit_2:
-                    exit_price, exit_slippage = self.apply_slippage(trade.take_profit_2, 'SELL', volatility)
-                    exit_fee = self.calculate_fee(exit_price, trade.remaining_size, is_entry=False)
-                    trade.exit_slippage = exit_slippage
-                    trade.close_full(current_time, exit_price, 'TP2', exit_fee)
-                    trades_to_close.append(trade)
-            
-            else:  # SELL
-                # Check stop loss
-                if high >= trade.stop_loss:
-                    exit_price, exit_slippage = self.apply_slippage(trade.stop_loss, 'BUY', volatility)
-                    exit_fee = self.calculate_fee(exit_price, trade.remaining_size, is_entry=False)
-                    trade.exit_slippage = exit_slippage
-                    trade.close_full(current_time, exit_price, 'SL', exit_fee)
-                    trades_to_close.append(trade)
-                    continue
-                
-                # Check TP1
-                if not trade.tp1_hit and low <= trade.take_profit_1:
-                    exit_price, exit_slippage = self.apply_slippage(trade.take_profit_1, 'BUY', volatility)
-                    exit_fee = self.calculate_fee(exit_price, trade.lot_size * 0.5, is_entry=False)
-                    trade.exit_slippage = exit_slippage
-                    pnl = trade.close_partial(current_time, exit_price, 0.5, 'TP1', exit_fee)
-                    self.capital += pnl
-                    self.cash += pnl
-                    self.reserved_margin -= trade.lot_size * 0.5 * exit_price
-                    trade.stop_loss = trade.entry_price
-                
-                # Check TP2
-                if trade.tp1_hit and not trade.tp2_hit and low <= trade.take_profit_2:
-                    exit_price, exit_slippage = self.apply_slippage(trade.take_profit_2, 'BUY', volatility)
+                else:
                     exit_fee = self.calculate_fee(exit_price, trade.remaining_size, is_entry=False)
-                    trade.exit_slippage = exit_slippage
-                    trade.close_full(current_time, exit_price, 'TP2', exit_fee)
+                    trade.close_full(current_time, exit_price, reason, exit_fee)
                     trades_to_close.append(trade)
         
         # Remove closed trades from open trades
         for trade in trades_to_close:
             if trade in self.open_trades:
                 self.open_trades.remove(trade)
+                self.metrics.record_trade(trade)
                 # Add final P&L to capital
                 exit_fee = self.calculate_fee(trade.exit_price, trade.remaining_size, is_entry=False)
                 final_pnl = trade.pnl
                 self.capital += final_pnl
                 self.cash += final_pnl
-                self.reserved_margin -= trade.remaining_size * trade.exit_price
+                self._release_margin(trade)
                 
                 # Update daily P&L
                 date_key = current_time.date()
@@ -650,6 +788,14 @@ class BacktestEngine:
                     if trade in self.positions_by_symbol[trade.symbol]:
                         self.positions_by_symbol[trade.symbol].remove(trade)
     
+    def _release_margin(self, trade: Trade, fraction: float = 1.0):
+        """Release a fraction of what the trade reserved at entry (all of the rest by default)"""
+        amount = trade.margin_reserved if fraction >= 1.0 else trade.margin_reserved * fraction
+        trade.margin_reserved -= amount
+        self.reserved_margin -= amount
+        if abs(self.reserved_margin) < 1e-9:
+            self.reserved_margin = 0.0  # Float residue once everything is released
+
     def _check_stop_loss(self, trade: Trade, candle: pd.Series, 
                         current_time: datetime, data: pd.DataFrame = None,
                         volatility: float = 0.001) -> bool:
@@ -659,6 +805,112 @@ class BacktestEngine:
         else:
             return candle['high'] >= trade.stop_loss
     
+    def _mark_to_market(self, price: float, symbol: Optional[str] = None) -> float:
+        """
+        Revalue open trades at ``price`` and return current equity.
+
+        With ``symbol`` only that symbol's trades are revalued; the others keep
+        the unrealized P&L from their own last bar (portfolio mode).
+        """
+        current_equity = self.capital
+        for trade in self.open_trades:
+            if symbol is None or trade.symbol == symbol:
+                trade.update_unrealized_pnl(price)
+            current_equity += trade.unrealized_pnl
+        return current_equity
+
+    def _record_equity(self, timestamp: datetime, current_equity: float):
+        """Stream a point into the metrics and, if kept, append it to the equity curve"""
+        self.metrics.update_equity(timestamp, current_equity)
+        if not self.keep_equity_curve:
+            return
+        self.equity_curve.append({
+            'timestamp': timestamp,
+            'equity': current_equity,
+            'capital': self.capital,
+            'cash': self.cash,
+            'reserved_margin': self.reserved_margin,
+            'open_trades': len(self.open_trades),
+            'drawdown_pct': (self.peak_equity - current_equity) / self.peak_equity * 100 if self.peak_equity > 0 else 0
+        })
+
+    def _close_open_trades(self, final_time: datetime, prices: Dict[str, float],
+                           volatilities: Dict[str, float], default_price: float = None,
+                           default_volatility: float = 0.001):
+        """Close every remaining open trade at its symbol's final price ('END')"""
+        for trade in self.open_trades[:]:
+            price = prices.get(trade.symbol, default_price)
+            volatility = volatilities.get(trade.symbol, default_volatility)
+            exit_price, exit_slippage = self.apply_slippage(price,
+                                                             'SELL' if trade.direction == 'BUY' else 'BUY',
+                                                             volatility)
+            exit_fee = self.calculate_fee(exit_price, trade.remaining_size, is_entry=False)
+            trade.exit_slippage = exit_slippage
+            trade.close_full(final_time, exit_price, 'END', exit_fee)
+            self.capital += trade.pnl
+            self.cash += trade.pnl
+            self._release_margin(trade)
+
+            # Update daily P&L
+            date_key = final_time.date()
+            if date_key not in self.daily_pnl:
+                self.daily_pnl[date_key] = 0.0
+            self.daily_pnl[date_key] += trade.pnl
+
+            self.open_trades.remove(trade)
+            self.metrics.record_trade(trade)
+            if trade.symbol in self.positions_by_symbol:
+                if trade in self.positions_by_symbol[trade.symbol]:
+                    self.positions_by_symbol[trade.symbol].remove(trade)
+
+    def _create_error_result(self, message: str) -> Dict:
+        """Result returned when a backtest is not run"""
+        return {'success': False, 'error': message, 'trades': 0}
+
+    def _begin_run(self, operation_context: Dict, verbose: bool, start_time: float) -> Optional[Dict]:
+        """Consult the error predictor; returns an error result if the run should be skipped"""
+        error_prediction = global_error_manager.predict_error_likelihood('backtest_engine', operation_context)
+
+        if error_prediction['should_attempt']:
+            return None
+
+        logger.warning(f"[BACKTEST_ENGINE] Avoiding backtest due to high error risk: {error_prediction['error_probability']:.1%}")
+        if verbose:
+            print("⚠️ Backtest cancelled due to high error risk prediction")
+            print(f"   Alternative suggestions: {error_prediction['alternative_suggestions']}")
+
+        record_error('backtest_engine', operation_context, had_error=False,
+                    error_details="Proactively avoided due to error prediction",
+                    success_metrics={'avoided_error': True, 'error_probability': error_prediction['error_probability']},
+                    execution_time=time.time() - start_time)
+
+        return self._create_error_result("Backtest cancelled due to high error risk prediction")
+
+    def _record_success(self, operation_context: Dict, start_time: float):
+        """Record a completed run with the error learning system"""
+        record_error('backtest_engine', operation_context, had_error=False,
+                    success_metrics={
+                        'backtest_completed': True,
+                        'trades_executed': len(self.trades),
+                        'total_return': self.capital - self.initial_capital,
+                        'win_rate': len([t for t in self.trades if t.pnl > 0]) / len(self.trades) if self.trades else 0
+                    },
+                    execution_time=time.time() - start_time)
+
+    def _record_failure(self, operation_context: Dict, start_time: float, error: Exception):
+        """Record a failed run with the error learning system"""
+        error_details = str(error)
+        record_error('backtest_engine', operation_context, had_error=True,
+                    error_details=error_details,
+                    execution_time=time.time() - start_time)
+        logger.error(f"[BACKTEST_ENGINE] Backtest failed: {error_details}")
+
+    def _reset_run_state(self):
+        """Reset per-run risk state"""
+        self.peak_equity = self.initial_capital
+        self.daily_pnl = {}
+        self.trading_enabled = True
+
     def run_backtest(self, data: pd.DataFrame, strategy_func: Callable,
                     verbose: bool = True, tags_func: Optional[Callable] = None,
                     performance_mode: bool = False):
@@ -689,24 +941,11 @@ class BacktestEngine:
         }
 
         # Predict error likelihood
-        error_prediction = global_error_manager.predict_error_likelihood('backtest_engine', operation_context)
-
-        if not error_prediction['should_attempt']:
-            logger.warning(f"[BACKTEST_ENGINE] Avoiding backtest due to high error risk: {error_prediction['error_probability']:.1%}")
-            if verbose:
-                print("⚠️ Backtest cancelled due to high error risk prediction")
-                print(f"   Alternative suggestions: {error_prediction['alternative_suggestions']}")
-
-            record_error('backtest_engine', operation_context, had_error=False,
-                        error_details="Proactively avoided due to error prediction",
-                        success_metrics={'avoided_error': True, 'error_probability': error_prediction['error_probability']},
-                        execution_time=time.time() - start_time)
-
-            return self._create_error_result("Backtest cancelled due to high error risk prediction")
+        avoided = self._begin_run(operation_context, verbose, start_time)
+        if avoided is not None:
+            return avoided
 
         self._performance_mode = performance_mode
-        success = False
-        error_details = None
 
         # Pre-compute expensive operations if in performance mode
         if performance_mode:
@@ -731,141 +970,370 @@ class BacktestEngine:
                 print()
 
             # Reset state
-            self.peak_equity = self.initial_capital
-            self.daily_pnl = {}
-            self.trading_enabled = True
+            self._reset_run_state()
+            self._prepare_intrabar({None: data.index})
 
-            # Use optimized iteration
+            # Performance mode: pre-computed data available
+            volatility_array = None
             if performance_mode and self._precomputed_data is not None:
-                # Performance mode: pre-computed data available
                 volatility_array = self._precomputed_data['volatility']
 
-                for i, (timestamp, candle) in enumerate(data.iterrows()):
-                    # Calculate current equity (mark-to-market)
-                    current_equity = self.capital
-                    for trade in self.open_trades:
-                        trade.update_unrealized_pnl(candle['close'])
-                        current_equity += trade.unrealized_pnl
-
-                    # Check risk limits
-                    if not self.check_risk_limits(timestamp, current_equity):
-                        # Still update equity curve but don't open new trades
-                        self.equity_curve.append({
-                            'timestamp': timestamp,
-                            'equity': current_equity,
-                            'capital': self.capital,
-                            'cash': self.cash,
-                            'reserved_margin': self.reserved_margin,
-                            'open_trades': len(self.open_trades),
-                            'drawdown_pct': (self.peak_equity - current_equity) / self.peak_equity * 100 if self.peak_equity > 0 else 0
-                        })
-                        continue
-            
-            # Calculate volatility for adaptive slippage (optimized)
-            if performance_mode and self._precomputed_data is not None:
-                volatility = volatility_array[i] if i < len(volatility_array) else 0.001
-            else:
-                volatility = 0.001
-                if i >= self.volatility_lookback:
-                    volatility = self.calculate_volatility(data.iloc[:i+1], self.volatility_lookback)
-            
-            # Check exits for open trades (optimized data passing)
-            if performance_mode:
-                # In performance mode, pass current candle data directly
-                self.check_exits(candle, timestamp, None, volatility)
-            else:
-                self.check_exits(candle, timestamp, data.iloc[:i+1] if i > 0 else data.iloc[:1], volatility)
+            for i, (timestamp, candle) in enumerate(data.iterrows()):
+                # Calculate current equity (mark-to-market)
+                current_equity = self._mark_to_market(candle['close'])
+
+                # Check risk limits
+                if not self.check_risk_limits(timestamp, current_equity):
+                    # Still update equity curve but don't open new trades
+                    self._record_equity(timestamp, current_equity)
+                    continue
 
-            # Generate signal
-            if self.trading_enabled:
+                # Calculate volatility for adaptive slippage (optimized)
+                if volatility_array is not None:
+                    volatility = volatility_array[i] if i < len(volatility_array) else 0.001
+                else:
+                    volatility = 0.001
+                    if i >= self.volatility_lookback:
+                        volatility = self.calculate_volatility(data.iloc[:i+1], self.volatility_lookback)
+
+                # Check exits for open trades (optimized data passing)
                 if performance_mode:
-                    # In performance mode, create minimal data slice for strategy
-                    historical_data = data.iloc[max(0, i-100):i+1]  # Last 100 candles for context
+                    # In performance mode, pass current candle data directly
+                    self.check_exits(candle, timestamp, None, volatility)
                 else:
-                    historical_data = data.iloc[:i+1]
-                signal = strategy_func(historical_data)
-                
-                if signal and signal['direction'] != 'HOLD':
-                    # Get tags if function provided
-                    tags = None
-                    if tags_func:
-                        tags = tags_func(historical_data, timestamp)
-                    
-                    self.open_trade(signal, timestamp, historical_data, tags)
-            
-            # Record equity
+                    self.check_exits(candle, timestamp, data.iloc[:i+1] if i > 0 else data.iloc[:1], volatility)
+
+                # Generate signal
+                if self.trading_enabled:
+                    if performance_mode:
+                        # In performance mode, create minimal data slice for strategy
+                        historical_data = data.iloc[max(0, i-100):i+1]  # Last 100 candles for context
+                    else:
+                        historical_data = data.iloc[:i+1]
+                    signal = strategy_func(historical_data)
+
+                    if signal and signal['direction'] != 'HOLD':
+                        # Get tags if function provided
+                        tags = None
+                        if tags_func:
+                            tags = tags_func(historical_data, timestamp)
+
+                        self.open_trade(signal, timestamp, historical_data, tags)
+
+                # Record equity
+                current_equity = self._mark_to_market(candle['close'])
+
+                # Update peak equity
+                if current_equity > self.peak_equity:
+                    self.peak_equity = current_equity
+
+                self._record_equity(timestamp, current_equity)
+
+            # Close any remaining open trades at final price
+            if self.open_trades:
+                final_close = data['close'].iloc[-1]
+                final_volatility = self.calculate_volatility(data, self.volatility_lookback)
+                self._close_open_trades(data.index[-1], {}, {}, final_close, final_volatility)
+
+            if verbose:
+                self.print_summary()
+
+            # Record successful operation
+            self._record_success(operation_context, start_time)
+
+        except Exception as e:
+            self._record_failure(operation_context, start_time, e)
+            raise
+
+    def run_vectorized_backtest(self, data: pd.DataFrame, signal_func: Callable,
+                                verbose: bool = True, tags_func: Optional[Callable] = None,
+                                symbol: str = "UNKNOWN"):
+        """
+        Run a backtest with a vectorized strategy.
+
+        The strategy is called once with the whole OHLCV frame and returns
+        signal arrays aligned with it (see normalize_signal_arrays):
+        direction, entry_price, stop_loss, take_profit_1, take_profit_2, with
+        NaN meaning "no signal". The engine then only visits bars that carry a
+        signal or have open trades; the equity curve for skipped bars is filled
+        forward, so it still has one row per input bar.
+
+        Execution matches run_backtest(performance_mode=True) for a strategy
+        producing the same signals.
+
+        Args:
+            data: DataFrame with OHLCV data
+            signal_func: (data: pd.DataFrame) -> DataFrame or dict of arrays
+            verbose: Print progress
+            tags_func: Optional (data up to the bar, timestamp) -> Dict[str, str], called on signal bars
+            symbol: Symbol recorded on the trades
+        """
+        start_time = time.time()
+        n = len(data)
+
+        operation_context = {
+            'operation_type': 'run_vectorized_backtest',
+            'strategy_type': 'vectorized',
+            'timeframe': 'unknown',
+            'data_points': n,
+            'computation_time': 0,
+            'parallel_jobs': 1,
+            'system_load': 0.5,
+            'memory_usage': 0.5
+        }
+
+        avoided = self._begin_run(operation_context, verbose, start_time)
+        if avoided is not None:
+            return avoided
+
+        try:
+            signals = normalize_signal_arrays(signal_func(data), n)
+            valid = signals['valid']
+            signal_bars = np.flatnonzero(valid)
+
+            index = data.index
+            high = data['high'].values
+            low = data['low'].values
+            close = data['close'].values
+            returns = data['close'].pct_change().fillna(0).values
+            volatility_array = calculate_volatility_numba(returns, self.volatility_lookback)
+
+            if verbose:
+                print("=" * 70)
+                print("🔄 Running Vectorized Backtest...")
+                print("=" * 70)
+                print(f"Initial Capital: ${self.initial_capital:,.2f}")
+                print(f"Total Candles: {n}")
+                print(f"Signal Bars: {len(signal_bars)}")
+                print()
+
+            self._reset_run_state()
+            self._prepare_intrabar({None: index, symbol: index})
+            start_state = {
+                'equity': self.capital, 'capital': self.capital, 'cash': self.cash,
+                'reserved_margin': self.reserved_margin, 'open_trades': len(self.open_trades),
+                'drawdown_pct': 0.0
+            }
+            curve_start = len(self.equity_curve)
+            visited = []
+
+            i = 0
+            while i < n:
+                if not self.open_trades:
+                    # Nothing to manage: jump straight to the next signal bar
+                    k = np.searchsorted(signal_bars, i)
+                    next_bar = int(signal_bars[k]) if k < len(signal_bars) else n
+                    if next_bar > i:
+                        # Skipped bars keep the last equity (what _fill_equity_curve forward-fills)
+                        self.metrics.hold_equity(index[i], index[next_bar - 1], next_bar - i)
+                    if next_bar >= n:
+                        break
+                    i = next_bar
+
+                timestamp = index[i]
+                visited.append(i)
+                current_equity = self._mark_to_market(close[i])
+
+                if not self.check_risk_limits(timestamp, current_equity):
+                    self._record_equity(timestamp, current_equity)
+                    i += 1
+                    continue
+
+                if self.open_trades:
+                    candle = {'high': high[i], 'low': low[i], 'close': close[i]}
+                    self.check_exits(candle, timestamp, None, volatility_array[i])
+
+                if self.trading_enabled and valid[i]:
+                    signal = {
+                        'direction': 'BUY' if signals['direction'][i] > 0 else 'SELL',
+                        'entry_price': signals['entry_price'][i],
+                        'stop_loss': signals['stop_loss'][i],
+                        'symbol': symbol
+                    }
+                    for key in ('take_profit_1', 'take_profit_2'):
+                        if np.isfinite(signals[key][i]):
+                            signal[key] = signals[key][i]
+
+                    # Same volatility open_trade would derive from a 100-bar slice
+                    entry_volatility = max(volatility_array[i], 0.0001) if i >= self.volatility_lookback else 0.001
+                    historical_data = None
+                    if self.use_atr_sizing or tags_func:
+                        historical_data = data.iloc[max(0, i-100):i+1]
+                    tags = tags_func(data.iloc[:i+1], timestamp) if tags_func else None
+                    self.open_trade(signal, timestamp, historical_data, tags, volatility=entry_volatility)
+
+                current_equity = self._mark_to_market(close[i])
+                if current_equity > self.peak_equity:
+                    self.peak_equity = current_equity
+
+                self._record_equity(timestamp, current_equity)
+                i += 1
+
+            if self.keep_equity_curve:
+                self._fill_equity_curve(index, visited, curve_start, start_state)
+
+            # Close any remaining open trades at final price
+            if self.open_trades:
+                final_volatility = max(volatility_array[-1], 0.0001) if n > self.volatility_lookback else 0.001
+                self._close_open_trades(index[-1], {}, {}, close[-1], final_volatility)
+
+            if verbose:
+                self.print_summary()
+
+            self._record_success(operation_context, start_time)
+
+        except Exception as e:
+            self._record_failure(operation_context, start_time, e)
+            raise
+
+    def _fill_equity_curve(self, index: pd.Index, visited: List[int], curve_start: int, start_state: Dict):
+        """Expand the equity points of visited bars into one row per bar (forward-filled)"""
+        n = len(index)
+        if len(visited) == n:
+            return
+
+        columns = list(start_state)
+        recorded = self.equity_curve[curve_start:]
+        rows = np.array([[point[c] for c in columns] for point in recorded] + [[start_state[c] for c in columns]],
+                        dtype=float).reshape(-1, len(columns))
+
+        # For every bar, the last visited bar at or before it (-1 = before the first, i.e. start_state)
+        source = np.full(n, -1)
+        source[np.asarray(visited, dtype=int)] = np.arange(len(visited))
+        source = np.maximum.accumulate(source)
+
+        filled = pd.DataFrame(rows[source], columns=columns)
+        filled['open_trades'] = filled['open_trades'].astype(int)
+        filled.insert(0, 'timestamp', index)
+        self.equity_curve[curve_start:] = filled.to_dict('records')
+
+    def run_portfolio_backtest(self, data_by_symbol: Dict[str, pd.DataFrame],
+                               strategies, verbose: bool = True,
+                               tags_func: Optional[Callable] = None,
+                               lookback: int = 100):
+        """
+        Replay several symbols together against one capital pool.
+
+        Per-symbol bar arrays are k-way merged into a single timestamp-ordered
+        stream (frames are never concatenated) and each bar is dispatched to
+        its symbol's strategy. Capital, margin, concurrent-trade, daily-loss
+        and drawdown limits are shared by all symbols.
+
+        Args:
+            data_by_symbol: {symbol: OHLCV DataFrame indexed by timestamp}
+            strategies: One strategy function for every symbol, or {symbol: strategy_func}.
+                        Strategies receive the symbol's last ``lookback`` bars, as in
+                        run_backtest's performance mode. Signals are tagged with the symbol.
+            verbose: Print progress
+            tags_func: Optional function to add scenario tags to trades
+                      Signature: (data: pd.DataFrame, timestamp: datetime) -> Dict[str, str]
+            lookback: Bars of history passed to the strategy
+        """
+        start_time = time.time()
+        symbols = list(data_by_symbol)
+
+        operation_context = {
+            'operation_type': 'run_portfolio_backtest',
+            'strategy_type': 'custom',
+            'timeframe': 'unknown',
+            'data_points': sum(len(df) for df in data_by_symbol.values()),
+            'computation_time': 0,
+            'parallel_jobs': 1,
+            'system_load': 0.5,
+            'memory_usage': 0.5
+        }
+
+        avoided = self._begin_run(operation_context, verbose, start_time)
+        if avoided is not None:
+            return avoided
+
+        if callable(strategies):
+            strategies = {symbol: strategies for symbol in symbols}
+        missing = [symbol for symbol in symbols if symbol not in strategies]
+        if missing:
+            raise ValueError(f"No strategy for symbols: {missing}")
+
+        try:
+            # Per-symbol arrays, computed once instead of per bar
+            bars = {}
+            for symbol, df in data_by_symbol.items():
+                returns = df['close'].pct_change().fillna(0).values
+                bars[symbol] = {
+                    'data': df,
+                    'high': df['high'].values,
+                    'low': df['low'].values,
+                    'close': df['close'].values,
+                    'volatility': calculate_volatility_numba(returns, self.volatility_lookback),
+                }
+
+            if verbose:
+                print("=" * 70)
+                print("🔄 Running Portfolio Backtest...")
+                print("=" * 70)
+                print(f"Initial Capital: ${self.initial_capital:,.2f}")
+                print(f"Symbols: {', '.join(symbols)}")
+                print(f"Total Bars: {operation_context['data_points']}")
+                print(f"Max Concurrent Trades: {self.max_concurrent_trades}")
+                print()
+
+            self._reset_run_state()
+            self._prepare_intrabar({s: df.index for s, df in data_by_symbol.items()})
+
+            last_timestamp = None
             current_equity = self.capital
-            for trade in self.open_trades:
-                trade.update_unrealized_pnl(candle['close'])
-                current_equity += trade.unrealized_pnl
-            
-            # Update peak equity
-            if current_equity > self.peak_equity:
-                self.peak_equity = current_equity
-            
-            self.equity_curve.append({
-                'timestamp': timestamp,
-                'equity': current_equity,
-                'capital': self.capital,
-                'cash': self.cash,
-                'reserved_margin': self.reserved_margin,
-                'open_trades': len(self.open_trades),
-                'drawdown_pct': (self.peak_equity - current_equity) / self.peak_equity * 100 if self.peak_equity > 0 else 0
-            })
-        
-        # Close any remaining open trades at final price
-        if self.open_trades:
-            final_candle = data.iloc[-1]
-            final_time = data.index[-1]
-            final_volatility = self.calculate_volatility(data, self.volatility_lookback)
-            
-            for trade in self.open_trades[:]:
-                exit_price, exit_slippage = self.apply_slippage(final_candle['close'], 
-                                                                 'SELL' if trade.direction == 'BUY' else 'BUY',
-                                                                 final_volatility)
-                exit_fee = self.calculate_fee(exit_price, trade.remaining_size, is_entry=False)
-                trade.exit_slippage = exit_slippage
-                trade.close_full(final_time, exit_price, 'END', exit_fee)
-                self.capital += trade.pnl
-                self.cash += trade.pnl
-                self.reserved_margin -= trade.remaining_size * exit_price
-                
-                # Update daily P&L
-                date_key = final_time.date()
-                if date_key not in self.daily_pnl:
-                    self.daily_pnl[date_key] = 0.0
-                self.daily_pnl[date_key] += trade.pnl
-                
-                self.open_trades.remove(trade)
-                if trade.symbol in self.positions_by_symbol:
-                    if trade in self.positions_by_symbol[trade.symbol]:
-                        self.positions_by_symbol[trade.symbol].remove(trade)
 
-        success = True
-        execution_time = time.time() - start_time
+            for timestamp, symbol, i in merge_bar_streams({s: df.index for s, df in data_by_symbol.items()}):
+                # One equity point per timestamp, after every symbol's bar at that time
+                if last_timestamp is not None and timestamp != last_timestamp:
+                    self._record_equity(last_timestamp, current_equity)
+                last_timestamp = timestamp
 
-        if verbose:
-            self.print_summary()
+                arrays = bars[symbol]
+                close = arrays['close'][i]
+                candle = {'high': arrays['high'][i], 'low': arrays['low'][i], 'close': close}
+                volatility = max(arrays['volatility'][i], 0.0001) if i >= self.volatility_lookback else 0.001
 
-        # Record successful operation
-        record_error('backtest_engine', operation_context, had_error=False,
-                    success_metrics={
-                        'backtest_completed': True,
-                        'trades_executed': len(self.trades),
-                        'total_return': self.capital - self.initial_capital,
-                        'win_rate': len([t for t in self.trades if t.pnl > 0]) / len(self.trades) if self.trades else 0
-                    },
-                    execution_time=execution_time)
+                current_equity = self._mark_to_market(close, symbol)
+                if not self.check_risk_limits(timestamp, current_equity):
+                    continue
+
+                # Exits only for this symbol's trades
+                self.check_exits(candle, timestamp, None, volatility, symbol=symbol)
+
+                if self.trading_enabled and self.can_open_trade(symbol):
+                    historical_data = arrays['data'].iloc[max(0, i - lookback + 1):i + 1]
+                    signal = strategies[symbol](historical_data)
+
+                    if signal and signal['direction'] != 'HOLD':
+                        signal = {**signal, 'symbol': symbol}
+                        tags = tags_func(historical_data, timestamp) if tags_func else None
+                        self.open_trade(signal, timestamp, historical_data, tags)
+
+                current_equity = self._mark_to_market(close, symbol)
+                if current_equity > self.peak_equity:
+                    self.peak_equity = current_equity
+
+            if last_timestamp is not None:
+                self._record_equity(last_timestamp, current_equity)
+
+            # Close any remaining open trades at each symbol's final price
+            if self.open_trades:
+                final_time = max(df.index[-1] for df in data_by_symbol.values() if len(df))
+                self._close_open_trades(
+                    final_time,
+                    {s: b['close'][-1] for s, b in bars.items() if len(b['close'])},
+                    {s: max(b['volatility'][-1], 0.0001) for s, b in bars.items() if len(b['volatility'])}
+                )
+
+            if verbose:
+                self.print_summary()
+
+            self._record_success(operation_context, start_time)
 
         except Exception as e:
-            error_details = str(e)
-            execution_time = time.time() - start_time
-            record_error('backtest_engine', operation_context, had_error=True,
-                        error_details=error_details,
-                        execution_time=execution_time)
-            logger.error(f"[BACKTEST_ENGINE] Backtest failed: {error_details}")
+            self._record_failure(operation_context, start_time, e)
             raise
-    
+
     def print_summary(self):
         """Print backtest summary"""
         print("=" * 70)
@@ -908,12 +1376,8 @@ class BacktestEngine:
             print(f"Profit Factor:       {abs(avg_win / avg_loss):.2f}")
         
         # Drawdown info
-        if self.equity_curve:
-            equity_values = [e['equity'] for e in self.equity_curve]
-            peak = max(equity_values)
-            final_equity = equity_values[-1]
-            max_dd = min([e['drawdown_pct'] for e in self.equity_curve])
-            print(f"Max Drawdown:        {max_dd:.2f}%")
+        if self.metrics.bars:
+            print(f"Max Drawdown:        {self.metrics.max_drawdown_pct:.2f}%")
         
         print("=" * 70)
     
@@ -1,6 +1,10 @@
 """
 Automated Backup System
 Creates regular backups of database and JSON files
+
+By default backups go into an incremental, deduplicated repository (see
+incremental_backup.py), so running every few minutes only stores what changed.
+Pass incremental=False for the previous full tar.gz / pg_dump archives.
 """
 
 import os
@@ -8,19 +12,49 @@ import shutil
 import json
 import subprocess
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Dict, List, Optional
 import gzip
 import tarfile
+import tempfile
+
+from incremental_backup import BackupRepository
+
+JSON_FILES = [
+    'users_data.json',
+    'trade_history.json',
+    'signals_db.json',
+    'user_notifications.json',
+    'user_profiles.json',
+    'community_data.json',
+    'referral_data.json',
+    'paper_trading.json',
+    'sentiment_data.json',
+    'broker_connections.json'
+]
+
 
 class BackupManager:
     """Manages automated backups of database and files"""
     
     def __init__(self, backup_dir: str = "backups", 
                  db_url: Optional[str] = None,
-                 retention_days: int = 30):
+                 retention_days: int = 30,
+                 incremental: bool = True,
+                 io_limit: Optional[float] = None,
+                 json_files: Optional[List[str]] = None,
+                 data_dir: str = '.'):
+        """
+        Args:
+            incremental: Store deduplicated snapshots instead of full archives
+            io_limit: Bytes per second the incremental engine may read/write
+            json_files: JSON stores to back up (default JSON_FILES)
+            data_dir: Directory the JSON stores live in
+        """
         self.backup_dir = backup_dir
         self.db_url = db_url
         self.retention_days = retention_days
+        self.json_files = json_files or list(JSON_FILES)
+        self.data_dir = data_dir
         os.makedirs(backup_dir, exist_ok=True)
         
         # Create subdirectories
@@ -28,6 +62,22 @@ class BackupManager:
         self.json_backup_dir = os.path.join(backup_dir, 'json')
         os.makedirs(self.db_backup_dir, exist_ok=True)
         os.makedirs(self.json_backup_dir, exist_ok=True)
+        
+        self.repository = None
+        if incremental:
+            self.repository = BackupRepository(os.path.join(backup_dir, 'repository'), io_limit=io_limit)
+    
+    def _parse_db_url(self):
+        """(user, password, host, port, database) from the database URL, or None"""
+        import re
+        match = re.match(r'postgresql://([^:]+):([^@]+)@([^:]+):(\d+)/(.+)', self.db_url)
+        return match.groups() if match else None
+    
+    def _report_snapshot(self, manifest: Dict):
+        stats = manifest['stats']
+        print(f"✅ Snapshot {manifest['id']}: {stats['changed']}/{stats['files']} changed, "
+              f"{stats['new_chunks']} new chunks, {stats['bytes_stored'] / 1024:.1f} KB stored "
+              f"in {stats['duration_s']:.2f}s")
     
     def backup_database(self) -> str:
         """Backup PostgreSQL database using pg_dump"""
@@ -35,6 +85,9 @@ class BackupManager:
             print("⚠️  No database URL provided, skipping database backup")
             return None
         
+        if self.repository:
+            return self._backup_database_incremental()
+        
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         backup_file = os.path.join(self.db_backup_dir, f'db_backup_{timestamp}.sql.gz')
         
@@ -86,29 +139,58 @@ class BackupManager:
             print(f"❌ Error backing up database: {e}")
             return None
     
+    def _backup_database_incremental(self) -> str:
+        """Stream a plain-SQL pg_dump straight into the incremental repository"""
+        parts = self._parse_db_url()
+        if not parts:
+            print("❌ Invalid database URL format")
+            return None
+        user, password, host, port, database = parts
+        env = os.environ.copy()
+        env['PGPASSWORD'] = password
+        
+        # Plain format keeps unchanged rows byte-identical between dumps, so they deduplicate
+        cmd = ['pg_dump', '-h', host, '-p', port, '-U', user, '-d', database, '--no-password',
+               '--format=plain', '--clean', '--if-exists']
+        try:
+            # stderr goes to a temp file: a full pipe nobody reads while stdout streams would block pg_dump
+            with tempfile.TemporaryFile() as errors:
+                process = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, stderr=errors)
+                manifest = self.repository.backup_stream(process.stdout, f'{database}.sql', kind='database')
+                returncode = process.wait()
+                errors.seek(0)
+                stderr = errors.read().decode(errors='replace')
+            if returncode != 0:
+                # Discard the partial dump; its chunks are removed by the next prune
+                self.repository.delete_snapshot(manifest['id'])
+                print(f"❌ Database backup failed: {stderr}")
+                return None
+            self._report_snapshot(manifest)
+            return manifest['id']
+        except Exception as e:
+            print(f"❌ Error backing up database: {e}")
+            return None
+    
     def backup_json_files(self) -> str:
         """Backup all JSON data files"""
+        if self.repository:
+            try:
+                manifest = self.repository.backup_files(self.json_files, kind='json', base_dir=self.data_dir)
+                self._report_snapshot(manifest)
+                return manifest['id']
+            except Exception as e:
+                print(f"❌ Error backing up JSON files: {e}")
+                return None
+        
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         backup_file = os.path.join(self.json_backup_dir, f'json_backup_{timestamp}.tar.gz')
         
-        json_files = [
-            'users_data.json',
-            'trade_history.json',
-            'signals_db.json',
-            'user_notifications.json',
-            'user_profiles.json',
-            'community_data.json',
-            'referral_data.json',
-            'paper_trading.json',
-            'sentiment_data.json',
-            'broker_connections.json'
-        ]
-        
         try:
             with tarfile.open(backup_file, 'w:gz') as tar:
-                for json_file in json_files:
-                    if os.path.exists(json_file):
-                        tar.add(json_file, arcname=json_file)
+                for json_file in self.json_files:
+                    path = os.path.join(self.data_dir, json_file)
+                    if os.path.exists(path):
+                        tar.add(path, arcname=json_file)
                         print(f"  ✅ Added {json_file} to backup")
             
             print(f"✅ JSON files backup created: {backup_file}")
@@ -171,17 +253,84 @@ class BackupManager:
                     # If we can't parse the date, skip it
                     pass
         
+        if self.repository:
+            pruned = self.repository.prune(older_than=cutoff_date)
+            deleted_count += pruned['snapshots']
+            if pruned['chunks']:
+                print(f"  🗑️  Removed {pruned['chunks']} unreferenced chunk(s)")
+        
         if deleted_count > 0:
             print(f"✅ Cleaned up {deleted_count} old backup(s)")
         else:
             print("✅ No old backups to clean up")
     
-    def restore_database(self, backup_file: str) -> bool:
-        """Restore database from backup"""
+    def _find_snapshot(self, kind: str, snapshot_id: Optional[str], at: Optional[datetime]) -> Optional[Dict]:
+        if not self.repository:
+            print("❌ Incremental backups are disabled")
+            return None
+        if snapshot_id:
+            return self.repository.get_snapshot(snapshot_id)
+        snapshot = self.repository.snapshot_at(kind, at or datetime.now())
+        if not snapshot:
+            print(f"❌ No {kind} snapshot at or before {at or 'now'}")
+        return snapshot
+    
+    def restore_json_files(self, snapshot_id: Optional[str] = None, at: Optional[datetime] = None,
+                           target_dir: Optional[str] = None) -> List[str]:
+        """Restore the JSON stores from a snapshot, or as they were at time ``at``"""
+        snapshot = self._find_snapshot('json', snapshot_id, at)
+        if not snapshot:
+            return []
+        restored = self.repository.restore(snapshot, target_dir or self.data_dir)
+        print(f"✅ Restored {len(restored)} file(s) from {snapshot['id']}")
+        return restored
+    
+    def _restore_database_snapshot(self, snapshot_id: Optional[str], at: Optional[datetime]) -> bool:
+        """Replay a plain-SQL snapshot through psql without writing it to disk"""
+        snapshot = self._find_snapshot('database', snapshot_id, at)
+        parts = self._parse_db_url()
+        if not snapshot or not parts:
+            return False
+        user, password, host, port, database = parts
+        env = os.environ.copy()
+        env['PGPASSWORD'] = password
+        
+        cmd = ['psql', '-h', host, '-p', port, '-U', user, '-d', database, '--no-password',
+               '-v', 'ON_ERROR_STOP=1', '-q']
+        print(f"🔄 Restoring database from {snapshot['id']}...")
+        try:
+            # psql prints a NOTICE per DROP of a --clean dump; a temp file can't fill up and stall the restore
+            with tempfile.TemporaryFile() as errors:
+                process = subprocess.Popen(cmd, env=env, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                           stderr=errors)
+                name = next(iter(snapshot['files']))
+                try:
+                    for data in self.repository.iter_file(snapshot, name):
+                        process.stdin.write(data)
+                    process.stdin.close()
+                except BrokenPipeError:
+                    pass  # psql stopped early (ON_ERROR_STOP); its exit code and stderr say why
+                returncode = process.wait()
+                errors.seek(0)
+                stderr = errors.read().decode(errors='replace')
+            if returncode == 0:
+                print("✅ Database restored successfully")
+                return True
+            print(f"❌ Database restore failed: {stderr}")
+            return False
+        except Exception as e:
+            print(f"❌ Error restoring database: {e}")
+            return False
+    
+    def restore_database(self, backup_file: Optional[str] = None, at: Optional[datetime] = None) -> bool:
+        """Restore database from a backup file, a snapshot id, or the snapshot in effect at ``at``"""
         if not self.db_url:
             print("❌ No database URL provided")
             return False
         
+        if not backup_file or not os.path.isfile(backup_file):
+            return self._restore_database_snapshot(backup_file, at)
+        
         try:
             # Decompress if needed
             if backup_file.endswith('.gz'):
@@ -240,7 +389,8 @@ class BackupManager:
         """List all available backups"""
         backups = {
             'database': [],
-            'json': []
+            'json': [],
+            'snapshots': []
         }
         
         for backup_type in ['database', 'json']:
@@ -248,7 +398,25 @@ class BackupManager:
             if os.path.exists(backup_dir):
                 backups[backup_type] = sorted(os.listdir(backup_dir))
         
+        if self.repository:
+            backups['snapshots'] = self.repository.list_snapshots()
+        
         return backups
+    
+    def import_directory(self, directory: str, created_at: Optional[datetime] = None) -> Optional[str]:
+        """Add an old copied-out directory of JSON files (e.g. backup_json_YYYYMMDD_HHMMSS) as a snapshot"""
+        if not self.repository:
+            return None
+        if created_at is None:
+            try:
+                created_at = datetime.strptime(os.path.basename(directory.rstrip('/'))[-15:], '%Y%m%d_%H%M%S')
+            except ValueError:
+                created_at = datetime.fromtimestamp(os.path.getmtime(directory))
+        names = sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+        manifest = self.repository.backup_files(names, kind='json', base_dir=directory,
+                                                created_at=created_at, verify=True)
+        self._report_snapshot(manifest)
+        return manifest['id']
 
 
 def schedule_backups(backup_manager: BackupManager, interval_hours: int = 24):
@@ -295,15 +463,36 @@ if __name__ == "__main__":
             print("\nJSON backups:")
             for backup in backups['json']:
                 print(f"  - {backup}")
-        elif command == 'restore' and len(sys.argv) > 2:
-            backup_file = sys.argv[2]
-            backup_manager.restore_database(backup_file)
+            print("\nSnapshots:")
+            for backup in backups['snapshots']:
+                print(f"  - {backup}")
+        elif command in ('restore', 'restore-json'):
+            # Argument: a backup file, a snapshot id, or an ISO time to restore as of
+            target = sys.argv[2] if len(sys.argv) > 2 else None
+            at = None
+            if target and not os.path.isfile(target) and target[:4].isdigit():
+                at, target = datetime.fromisoformat(target), None
+            if command == 'restore':
+                backup_manager.restore_database(target, at=at)
+            else:
+                backup_manager.restore_json_files(target, at=at)
+        elif command == 'import' and len(sys.argv) > 2:
+            for directory in sys.argv[2:]:
+                backup_manager.import_directory(directory)
+        elif command == 'check' and backup_manager.repository:
+            problems = backup_manager.repository.check()
+            for problem in problems:
+                print(f"  ❌ {problem}")
+            print("✅ Repository OK" if not problems else f"❌ {len(problems)} problem(s)")
         else:
             print("Usage:")
             print("  python backup_system.py backup    - Create backups")
             print("  python backup_system.py cleanup    - Clean old backups")
             print("  python backup_system.py list        - List backups")
-            print("  python backup_system.py restore <file> - Restore database")
+            print("  python backup_system.py restore [file|snapshot|ISO time] - Restore database")
+            print("  python backup_system.py restore-json [snapshot|ISO time] - Restore JSON files")
+            print("  python backup_system.py import <dir>... - Import copied-out JSON directories")
+            print("  python backup_system.py check      - Verify every stored chunk")
     else:
         backup_manager.backup_all()
 
@@ -9,6 +9,8 @@ from datetime import datetime
 from typing import Dict, List, Optional
 from enum import Enum
 
+from position_book import PositionBook, get_position_book
+
 # Try to import MetaTrader5
 try:
     import MetaTrader5 as mt5
@@ -45,10 +47,11 @@ class TradeDirection(Enum):
 class BrokerConnector:
     """Manages broker connections and trade execution"""
     
-    def __init__(self, data_file="broker_connections.json"):
+    def __init__(self, data_file="broker_connections.json", book: Optional[PositionBook] = None):
         self.data_file = data_file
         self.connections = {}  # {user_id: {broker_type, credentials, status}}
         self.partnerships = {}  # {broker_name: {revenue_share, api_access, co_marketing}}
+        self.book = book if book is not None else get_position_book()  # Simulated fills, marked to market with everyone else's
         self.load_connections()
         self.load_partnerships()
     
@@ -262,6 +265,13 @@ class BrokerConnector:
             connection['last_used'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             connection['trades_executed'] += 1
             self.save_connections()
+
+            # Simulated fills have no broker to report P&L, so the position book tracks them
+            if str(result.get('broker', '')).endswith('_paper'):
+                self.book.open(self._book_source(broker_type), user_id, result['trade_id'], result['symbol'],
+                               result['direction'], result['entry_price'], result['lots'],
+                               stop_loss=result.get('sl'), take_profit=result.get('tp'),
+                               multiplier=100000, opened_at=result['timestamp'])
         
         return result
     
@@ -486,12 +496,15 @@ class BrokerConnector:
                 'error': 'Not connected to broker'
             }
         
+        # Simulated fills close at their last marked price
+        closed = self.book.close(self._book_source(broker_type), user_id, position_id)
+        
         # Placeholder - would actually close position via broker API
         return {
             'success': True,
             'position_id': position_id,
-            'close_price': 0.0,
-            'pnl': 0.0,
+            'close_price': closed['current_price'] if closed else 0.0,
+            'pnl': closed['pnl'] if closed else 0.0,
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
     
@@ -517,6 +530,8 @@ class BrokerConnector:
                 'error': 'Not connected to broker'
             }
         
+        self.book.modify(self._book_source(broker_type), user_id, position_id, new_sl, new_tp)
+        
         # Placeholder - would actually modify position via broker API
         return {
             'success': True,
@@ -580,8 +595,23 @@ class BrokerConnector:
                 mt5.shutdown()
                 return []
         
-        # Placeholder for other brokers
-        return []
+        # Simulated fills, marked to market by the position book
+        return [{
+            'ticket': pos['id'],
+            'symbol': pos['symbol'],
+            'type': pos['direction'],
+            'volume': pos['size'],
+            'open_price': pos['entry'],
+            'current_price': pos['current_price'],
+            'sl': pos['stop_loss'] or 0.0,
+            'tp': pos['take_profit'] or 0.0,
+            'profit': pos['pnl'],
+            'open_time': pos['opened_at']
+        } for pos in self.book.positions(user_id, source=self._book_source(broker_type))]
+
+    @staticmethod
+    def _book_source(broker_type: str) -> str:
+        return f"broker_{broker_type}"
     
     # ============================================================================
     # ACCOUNT INFORMATION
@@ -0,0 +1,291 @@
+"""
+Command Scheduler
+Tier-aware admission control for expensive bot command work
+
+Signal generation behind /btc, /gold and /allsignals is blocking work. The
+handlers pass it to the scheduler, which runs it on a worker thread once a
+slot is free, so the event loop keeps serving other updates. While waiting
+for a slot, work sits in one lane per tier (admin, vip, premium, free):
+
+- free slots go to lanes by weighted-fair (stride) scheduling. Under a burst,
+  each lane gets slots in proportion to its weight instead of paid requests
+  queueing behind a pile of free-tier ones.
+- each lane has a concurrency cap, so no tier can occupy every worker.
+- each lane has a queue-depth limit and a latency budget. A request that
+  would exceed either is shed with SchedulerBusy, which carries a retry-after
+  estimate for the "busy, retry in Ns" reply.
+"""
+
+import asyncio
+import functools
+import logging
+import math
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LaneConfig:
+    """Scheduling parameters for one tier"""
+    weight: float          # Share of free slots while several lanes are waiting
+    max_concurrency: int   # Jobs from this lane running at once
+    max_queue: int         # Waiting jobs beyond which new requests are shed
+    max_wait: float        # Seconds; requests whose estimated wait exceeds this are shed
+
+
+DEFAULT_LANES = {
+    'admin': LaneConfig(weight=8, max_concurrency=4, max_queue=50, max_wait=60.0),
+    'vip': LaneConfig(weight=4, max_concurrency=3, max_queue=40, max_wait=20.0),
+    'premium': LaneConfig(weight=2, max_concurrency=2, max_queue=30, max_wait=30.0),
+    'free': LaneConfig(weight=1, max_concurrency=1, max_queue=10, max_wait=45.0),
+}
+
+DEFAULT_LANE = 'free'
+
+
+class SchedulerBusy(Exception):
+    """A request was shed; retry_after is the estimated wait in seconds"""
+
+    def __init__(self, lane: str, retry_after: float, reason: str):
+        self.lane = lane
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.reason = reason
+        super().__init__(f"{lane} lane {reason}, retry in {self.retry_after}s")
+
+    @property
+    def message(self) -> str:
+        """Reply text for the user"""
+        return f"⏳ The bot is busy right now, please retry in {self.retry_after}s."
+
+
+@dataclass
+class _Lane:
+    name: str
+    config: LaneConfig
+    order: int
+    waiters: deque = field(default_factory=deque)
+    running: int = 0
+    pass_value: float = 0.0       # Stride scheduling position; lowest eligible lane goes next
+    service_time: float = 0.0     # EWMA of job run time, seconds
+    admitted: int = 0
+    shed: int = 0
+    completed: int = 0
+    failed: int = 0
+    total_wait: float = 0.0
+    max_wait_seen: float = 0.0
+
+    def queued(self) -> int:
+        while self.waiters and self.waiters[0].cancelled():
+            self.waiters.popleft()
+        return len(self.waiters)
+
+
+class CommandScheduler:
+    """Weighted-fair, tier-laned admission in front of blocking command work"""
+
+    def __init__(self, lanes: Optional[Dict[str, LaneConfig]] = None, max_workers: int = 4,
+                 lane_resolver: Optional[Callable[[int], str]] = None,
+                 default_service_time: float = 2.0, service_time_alpha: float = 0.2,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            lanes: Lane name -> LaneConfig (DEFAULT_LANES if omitted)
+            max_workers: Jobs running at once across all lanes
+            lane_resolver: user_id -> lane name; unknown names use the 'free' lane
+            default_service_time: Assumed job duration until real ones are measured
+            service_time_alpha: EWMA weight of the latest job duration
+        """
+        lanes = lanes or DEFAULT_LANES
+        self._lanes = {name: _Lane(name, config, order, service_time=default_service_time)
+                       for order, (name, config) in enumerate(lanes.items())}
+        self.max_workers = max_workers
+        self.lane_resolver = lane_resolver
+        self.service_time_alpha = service_time_alpha
+        self.clock = clock
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="CommandScheduler")
+        self._running = 0
+        self._virtual_time = 0.0
+
+    def lane_for(self, user_id: int) -> str:
+        """Lane a user's work goes into"""
+        if self.lane_resolver is None:
+            return DEFAULT_LANE
+        try:
+            lane = (self.lane_resolver(user_id) or DEFAULT_LANE).lower()
+        except Exception as e:
+            logger.warning(f"Lane lookup failed for user {user_id}: {e}")
+            lane = DEFAULT_LANE
+        return lane if lane in self._lanes else DEFAULT_LANE
+
+    def estimated_wait(self, lane_name: str) -> float:
+        """Seconds a request entering this lane now would wait for a slot"""
+        lane = self._lanes[lane_name]
+        busy = [other for other in self._lanes.values() if other is lane or other.queued() or other.running]
+        share = self.max_workers * lane.config.weight / sum(other.config.weight for other in busy)
+        slots = max(min(lane.config.max_concurrency, share), 1e-3)
+        ahead = lane.queued()
+        if lane.running < lane.config.max_concurrency and self._running < self.max_workers and not ahead:
+            return 0.0
+        return (ahead + 1) * lane.service_time / slots
+
+    def _admit(self, lane: _Lane):
+        queued = lane.queued()
+        wait = self.estimated_wait(lane.name)
+        if queued >= lane.config.max_queue:
+            reason = f"queue full ({queued} waiting)"
+        elif wait > lane.config.max_wait:
+            reason = f"estimated wait {wait:.1f}s over {lane.config.max_wait:.0f}s budget"
+        else:
+            lane.admitted += 1
+            return
+        lane.shed += 1
+        logger.info(f"Shedding {lane.name} request: {reason}")
+        raise SchedulerBusy(lane.name, wait, reason)
+
+    def _dispatch(self):
+        """Hand free slots to waiting lanes, lowest stride pass first"""
+        while self._running < self.max_workers:
+            eligible = [lane for lane in self._lanes.values()
+                        if lane.queued() and lane.running < lane.config.max_concurrency]
+            if not eligible:
+                return
+            lane = min(eligible, key=lambda lane: (lane.pass_value, lane.order))
+            waiter = lane.waiters.popleft()
+            lane.running += 1
+            self._running += 1
+            self._virtual_time = lane.pass_value
+            lane.pass_value += 1.0 / lane.config.weight
+            waiter.set_result(None)
+
+    def _release(self, lane: _Lane):
+        lane.running -= 1
+        self._running -= 1
+        self._dispatch()
+
+    async def run(self, user_id: int, func: Callable, *args, lane: Optional[str] = None, **kwargs) -> Any:
+        """
+        Run func(*args, **kwargs) in the user's lane and return its result.
+
+        Plain functions run on the scheduler's worker threads; coroutine
+        functions are awaited while holding the slot. Raises SchedulerBusy
+        (before waiting) if the request is shed.
+        """
+        lane = self._lanes[lane if lane in self._lanes else self.lane_for(user_id)]
+        self._admit(lane)
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        if not lane.queued() and not lane.running:
+            # A lane coming back from idle does not get credit for the time it was away
+            lane.pass_value = max(lane.pass_value, self._virtual_time)
+        lane.waiters.append(waiter)
+        enqueued = self.clock()
+        self._dispatch()
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release(lane)  # Granted a slot but never used it
+            raise
+
+        wait = self.clock() - enqueued
+        lane.total_wait += wait
+        lane.max_wait_seen = max(lane.max_wait_seen, wait)
+
+        start = self.clock()
+        try:
+            if asyncio.iscoroutinefunction(func):
+                result = await func(*args, **kwargs)
+            else:
+                result = await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+            lane.completed += 1
+            return result
+        except BaseException:
+            lane.failed += 1
+            raise
+        finally:
+            duration = self.clock() - start
+            lane.service_time += self.service_time_alpha * (duration - lane.service_time)
+            self._release(lane)
+
+    def get_stats(self) -> Dict:
+        """Per-lane counters and the current load"""
+        lanes = {}
+        for name, lane in self._lanes.items():
+            started = lane.completed + lane.failed + lane.running
+            lanes[name] = {
+                'queued': lane.queued(),
+                'running': lane.running,
+                'admitted': lane.admitted,
+                'shed': lane.shed,
+                'completed': lane.completed,
+                'failed': lane.failed,
+                'avg_wait': lane.total_wait / started if started else 0.0,
+                'max_wait': lane.max_wait_seen,
+                'service_time': lane.service_time,
+                'estimated_wait': self.estimated_wait(name),
+            }
+        return {'running': self._running, 'max_workers': self.max_workers, 'lanes': lanes}
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker threads"""
+        self.executor.shutdown(wait=wait)
+
+
+# Global scheduler instance
+command_scheduler = CommandScheduler()
+
+
+def get_command_scheduler() -> CommandScheduler:
+    """Get the global command scheduler"""
+    return command_scheduler
+
+
+def main():
+    """Simulate a burst of free-tier requests with a few paid ones mixed in"""
+    print("=" * 60)
+    print("COMMAND SCHEDULER DEMO")
+    print("=" * 60)
+
+    tiers = {user_id: 'free' for user_id in range(40)}
+    tiers.update({100: 'vip', 101: 'premium', 102: 'admin'})
+    scheduler = CommandScheduler(max_workers=2, lane_resolver=tiers.get, default_service_time=0.1)
+
+    def generate_signal():
+        time.sleep(0.1)
+        return 'signal'
+
+    async def request(user_id):
+        start = time.monotonic()
+        try:
+            await scheduler.run(user_id, generate_signal)
+            return tiers[user_id], time.monotonic() - start
+        except SchedulerBusy as busy:
+            return tiers[user_id], busy.message
+
+    async def burst():
+        free = [asyncio.create_task(request(user_id)) for user_id in range(40)]
+        await asyncio.sleep(0.05)
+        paid = [asyncio.create_task(request(user_id)) for user_id in (100, 101, 102)]
+        return await asyncio.gather(*free, *paid)
+
+    results = asyncio.run(burst())
+    for tier in ('admin', 'vip', 'premium', 'free'):
+        latencies = [outcome for name, outcome in results if name == tier and isinstance(outcome, float)]
+        shed = sum(1 for name, outcome in results if name == tier and isinstance(outcome, str))
+        if latencies:
+            print(f"{tier:8s} served {len(latencies):2d}, max latency {max(latencies):.2f}s, shed {shed}")
+        else:
+            print(f"{tier:8s} served  0, shed {shed}")
+
+    scheduler.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,24 +2,15 @@
 Comprehensive News Fetcher for All Trading Assets
 Covers: Crypto, Commodities, Forex, and Futures
 Uses multiple free sources - No API key required!
+
+Feeds are fetched concurrently by the shared news ingestion service and the
+lookups below read its in-memory store, so they do not wait on RSS hosts.
 """
 
-import requests
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
-import xml.etree.ElementTree as ET
-
-try:
-    from bs4 import BeautifulSoup
-    HAS_BS4 = True
-except:
-    HAS_BS4 = False
 
-try:
-    import feedparser
-    HAS_FEEDPARSER = True
-except:
-    HAS_FEEDPARSER = False
+from news_ingestion import NewsIngestionService, get_news_service
 
 
 class ComprehensiveNewsFetcher:
@@ -31,7 +22,7 @@ class ComprehensiveNewsFetcher:
     - Futures (Stock indexes: S&P 500, NASDAQ)
     """
     
-    def __init__(self):
+    def __init__(self, ingestion: Optional[NewsIngestionService] = None):
         # RSS Feeds (Free, no API key needed)
         self.feeds = {
             'crypto': [
@@ -49,38 +40,16 @@ class ComprehensiveNewsFetcher:
             ]
         }
         
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        self.ingestion = ingestion or get_news_service()
+        self.ingestion.add_feeds(self.feeds)
     
     def get_crypto_news(self, limit: int = 10) -> List[Dict]:
         """Get latest cryptocurrency news (Bitcoin, Ethereum, etc.)"""
-        all_news = []
-        
-        for feed_url in self.feeds['crypto']:
-            try:
-                news = self._fetch_rss_feed(feed_url, limit=limit)
-                all_news.extend(news)
-            except Exception as e:
-                print(f"Error fetching from {feed_url}: {e}")
-                continue
-        
-        # Sort by date and return top items
-        all_news = sorted(all_news, key=lambda x: x['published_at'], reverse=True)
-        return all_news[:limit]
+        return self.ingestion.get_news('crypto', limit=limit)
     
     def get_commodities_news(self, limit: int = 10) -> List[Dict]:
         """Get latest commodities news (Gold, Silver, Oil, etc.)"""
-        all_news = []
-        
-        for feed_url in self.feeds['commodities']:
-            try:
-                news = self._fetch_rss_feed(feed_url, limit=limit)
-                all_news.extend(news)
-            except Exception as e:
-                print(f"Error fetching from {feed_url}: {e}")
-                continue
+        all_news = self.ingestion.get_news('commodities')
         
         # Filter for gold-specific news
         gold_news = [n for n in all_news if any(keyword in n['title'].lower() 
@@ -93,15 +62,7 @@ class ComprehensiveNewsFetcher:
     
     def get_forex_news(self, limit: int = 10, pair: Optional[str] = None) -> List[Dict]:
         """Get latest forex/currency news"""
-        all_news = []
-        
-        for feed_url in self.feeds['forex']:
-            try:
-                news = self._fetch_rss_feed(feed_url, limit=limit * 2)
-                all_news.extend(news)
-            except Exception as e:
-                print(f"Error fetching from {feed_url}: {e}")
-                continue
+        all_news = self.ingestion.get_news('forex')
         
         # If specific pair requested, filter
         if pair:
@@ -115,15 +76,7 @@ class ComprehensiveNewsFetcher:
     
     def get_futures_news(self, limit: int = 10, contract: Optional[str] = None) -> List[Dict]:
         """Get latest futures/stock market news (ES, NQ, etc.)"""
-        all_news = []
-        
-        for feed_url in self.feeds['futures']:
-            try:
-                news = self._fetch_rss_feed(feed_url, limit=limit * 2)
-                all_news.extend(news)
-            except Exception as e:
-                print(f"Error fetching from {feed_url}: {e}")
-                continue
+        all_news = self.ingestion.get_news('futures')
         
         # Filter for stock market / index news
         if contract:
@@ -146,6 +99,7 @@ class ComprehensiveNewsFetcher:
     
     def get_all_news(self, limit_per_category: int = 5) -> Dict[str, List[Dict]]:
         """Get news for all asset categories"""
+        self.ingestion.refresh_if_stale(list(self.feeds))
         return {
             'crypto': self.get_crypto_news(limit=limit_per_category),
             'commodities': self.get_commodities_news(limit=limit_per_category),
@@ -153,108 +107,6 @@ class ComprehensiveNewsFetcher:
             'futures': self.get_futures_news(limit=limit_per_category)
         }
     
-    def _fetch_rss_feed(self, feed_url: str, limit: int = 10) -> List[Dict]:
-        """Fetch and parse RSS feed"""
-        try:
-            # Try feedparser first if available
-            if HAS_FEEDPARSER:
-                return self._fetch_with_feedparser(feed_url, limit)
-            else:
-                return self._fetch_with_xml(feed_url, limit)
-            
-        except Exception as e:
-            print(f"Error parsing feed {feed_url}: {e}")
-            return []
-    
-    def _fetch_with_feedparser(self, feed_url: str, limit: int = 10) -> List[Dict]:
-        """Fetch using feedparser library"""
-        import feedparser
-        feed = feedparser.parse(feed_url)
-        
-        news_items = []
-        
-        for entry in feed.entries[:limit * 2]:
-            try:
-                # Parse published date
-                if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                    pub_time = datetime(*entry.published_parsed[:6])
-                elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
-                    pub_time = datetime(*entry.updated_parsed[:6])
-                else:
-                    pub_time = datetime.now()
-                
-                # Get description
-                description = ''
-                if hasattr(entry, 'summary'):
-                    description = entry.summary
-                elif hasattr(entry, 'description'):
-                    description = entry.description
-                
-                # Clean HTML from description
-                if description and HAS_BS4:
-                    try:
-                        from bs4 import BeautifulSoup
-                        soup = BeautifulSoup(description, 'html.parser')
-                        description = soup.get_text()[:200]
-                    except:
-                        pass
-                
-                news_items.append({
-                    'title': entry.title if hasattr(entry, 'title') else 'No title',
-                    'description': description,
-                    'published_at': pub_time,
-                    'source': feed.feed.title if hasattr(feed.feed, 'title') else 'News',
-                    'url': entry.link if hasattr(entry, 'link') else ''
-                })
-                
-            except Exception as e:
-                continue
-        
-        return news_items
-    
-    def _fetch_with_xml(self, feed_url: str, limit: int = 10) -> List[Dict]:
-        """Fallback: Fetch using basic XML parsing"""
-        response = self.session.get(feed_url, timeout=10)
-        if response.status_code != 200:
-            return []
-        
-        root = ET.fromstring(response.content)
-        news_items = []
-        
-        # Try to find items
-        for item in root.findall('.//item')[:limit]:
-            try:
-                title_elem = item.find('title')
-                link_elem = item.find('link')
-                pubdate_elem = item.find('pubDate')
-                desc_elem = item.find('description')
-                
-                title = title_elem.text if title_elem is not None else 'No title'
-                description = desc_elem.text if desc_elem is not None else ''
-                url = link_elem.text if link_elem is not None else ''
-                
-                # Try to parse date
-                try:
-                    if pubdate_elem is not None and pubdate_elem.text:
-                        pub_time = datetime.strptime(pubdate_elem.text, "%a, %d %b %Y %H:%M:%S %z")
-                        pub_time = pub_time.replace(tzinfo=None)
-                    else:
-                        pub_time = datetime.now()
-                except:
-                    pub_time = datetime.now()
-                
-                news_items.append({
-                    'title': title,
-                    'description': description[:200] if description else '',
-                    'published_at': pub_time,
-                    'source': 'News',
-                    'url': url
-                })
-            except:
-                continue
-        
-        return news_items
-    
     def check_high_impact_news(self, asset_type: str, hours_back: int = 2) -> Dict:
         """
         Check for high-impact news in the last N hours for specific asset type
@@ -1,19 +1,43 @@
 """
 Concurrent Processing Framework
-Multi-threaded operations for data fetching, signal generation, and backtesting
+Priority-scheduled thread and process pools for data fetching, signal generation, and backtesting
+
+I/O-bound work (API calls, data fetching) runs on a thread pool. CPU-bound
+work (signal generation, backtests) runs on a process pool sized to the CPU
+count, so it does not serialize on the GIL and batch backtests scale with
+cores. DataFrames passed to process tasks are placed in shared memory once
+and attached by the workers instead of being pickled through the pool's pipe.
+
+Tasks wait in one priority heap per backend and are only handed to a pool
+when it has a free slot, so a HIGH task overtakes queued NORMAL/LOW work
+rather than queueing behind it in the executor. The queue is bounded: when
+it is full, a new task either displaces the newest lowest-priority task or
+is rejected with AdmissionRejected.
+
+A background monitor thread samples CPU and memory. Dispatch reads that
+cached snapshot (it never blocks on psutil) and holds back non-HIGH tasks
+while memory is over the limit, and LOW tasks while CPU is over the limit.
 """
 
-import threading
-import time
+import heapq
+import itertools
 import logging
-from concurrent.futures import ThreadPoolExecutor, Future, as_completed
-from typing import Dict, List, Callable, Any, Optional
-from queue import Queue, PriorityQueue
-import psutil
 import os
+import pickle
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
-from dataclasses import dataclass, field
 from enum import Enum
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import psutil
+
 
 class TaskPriority(Enum):
     """Task priority levels"""
@@ -29,6 +53,16 @@ class TaskStatus(Enum):
     FAILED = "failed"
     CANCELLED = "cancelled"
 
+class ExecutorBackend(Enum):
+    """Pool a task runs on"""
+    THREAD = "thread"    # I/O-bound: API calls, file and database access
+    PROCESS = "process"  # CPU-bound: backtests, indicator-heavy signal generation
+
+
+class AdmissionRejected(RuntimeError):
+    """The task queue is full of work of equal or higher priority"""
+
+
 @dataclass
 class Task:
     """Represents a concurrent task"""
@@ -37,6 +71,7 @@ class Task:
     args: tuple = field(default_factory=tuple)
     kwargs: dict = field(default_factory=dict)
     priority: TaskPriority = TaskPriority.NORMAL
+    backend: ExecutorBackend = ExecutorBackend.THREAD
     created_at: datetime = field(default_factory=datetime.now)
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
@@ -45,38 +80,243 @@ class Task:
     error: Optional[Exception] = None
     retry_count: int = 0
     max_retries: int = 3
+    execution_time: float = 0.0  # Seconds spent in func on the last attempt
+    shared_frames: list = field(default_factory=list, repr=False)  # Keys into the processor's shared blocks
+
+
+@dataclass
+class ResourceSnapshot:
+    """Resource usage sampled by the monitor thread"""
+    cpu_percent: float = 0.0     # System-wide, 0-100
+    memory_percent: float = 0.0  # This process plus its children (the pool workers)
+    sampled_at: float = 0.0      # time.monotonic() of the sample, 0 if never sampled
+
+
+# Shared-memory DataFrame handoff
+
+SHAREABLE_KINDS = 'biufcmM'  # bool, int, uint, float, complex, timedelta, datetime
+ALIGNMENT = 64
+
+
+@dataclass
+class SharedFrame:
+    """
+    Picklable handle to a DataFrame whose plain numpy columns live in shared memory.
+
+    Columns with a numpy numeric/bool/datetime dtype are laid out back to back
+    in one block; other columns (strings, categoricals, tz-aware datetimes)
+    travel in other_columns and are pickled with the handle, as is any index
+    that is not a plain numpy array.
+    """
+    shm_name: str
+    nrows: int
+    columns: pd.Index
+    layout: Dict[int, Tuple[str, int]]  # Column position -> (dtype, byte offset)
+    other_columns: Dict[int, Any]
+    index: Any = None                   # Pickled index, when it is not in the block
+    index_layout: Optional[Tuple[str, int]] = None
+    index_name: Any = None
+    index_tz: Optional[str] = None
+    index_freq: Any = None
+
+
+def _plain_array(values) -> Optional[np.ndarray]:
+    """values as a numpy array if it can go in shared memory, else None"""
+    dtype = getattr(values, 'dtype', None)
+    if isinstance(dtype, np.dtype) and dtype.kind in SHAREABLE_KINDS:
+        return np.ascontiguousarray(np.asarray(values))
+    return None
+
+
+def share_dataframe(df: pd.DataFrame) -> Tuple[shared_memory.SharedMemory, SharedFrame]:
+    """
+    Copy df into a new shared memory block.
+
+    The caller owns the block and must close() and unlink() it once every
+    task using the handle has finished; ConcurrentProcessor does this itself
+    for DataFrames passed to process tasks.
+    """
+    arrays: List[Tuple[Any, np.ndarray]] = []
+    other_columns = {}
+    for position in range(df.shape[1]):
+        column = df.iloc[:, position]
+        values = _plain_array(column.to_numpy()) if isinstance(column.dtype, np.dtype) else None
+        if values is None:
+            other_columns[position] = column.array
+        else:
+            arrays.append((position, values))
+
+    index, index_tz = df.index, None
+    if isinstance(index, pd.DatetimeIndex) and index.tz is not None:
+        index_tz = str(index.tz)
+        index_values = _plain_array(index.tz_convert('UTC').tz_localize(None))
+    elif isinstance(index, pd.RangeIndex):
+        index_values = None
+    else:
+        index_values = _plain_array(index)
+    if index_values is not None:
+        arrays.append(('index', index_values))
+
+    offsets, size = {}, 0
+    for key, values in arrays:
+        offsets[key] = size
+        size += -(-values.nbytes // ALIGNMENT) * ALIGNMENT
+
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for key, values in arrays:
+        view = np.ndarray(values.shape, values.dtype, buffer=shm.buf, offset=offsets[key])
+        view[:] = values
+        del view
+
+    layout = {key: (values.dtype.str, offsets[key]) for key, values in arrays}
+    handle = SharedFrame(
+        shm_name=shm.name,
+        nrows=len(df),
+        columns=df.columns,
+        layout={key: value for key, value in layout.items() if key != 'index'},
+        other_columns=other_columns,
+        index=index if index_values is None else None,
+        index_layout=layout.get('index'),
+        index_name=index.name,
+        index_tz=index_tz,
+        index_freq=getattr(index, 'freq', None) if index_values is not None else None,
+    )
+    return shm, handle
+
+
+def _open_shared_memory(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13: no track flag; pool workers share the parent's resource tracker
+        return shared_memory.SharedMemory(name=name)
+
+
+def attach_dataframe(handle: SharedFrame) -> Tuple[pd.DataFrame, shared_memory.SharedMemory]:
+    """
+    Rebuild the DataFrame from a SharedFrame without copying the block.
+
+    The shared columns are read-only views (the block is shared by every task
+    given the same handle); call .copy() before modifying values in place.
+    Keep the returned SharedMemory open for as long as the frame is used.
+    """
+    shm = _open_shared_memory(handle.shm_name)
+
+    def view(dtype: str, offset: int) -> np.ndarray:
+        values = np.ndarray((handle.nrows,), np.dtype(dtype), buffer=shm.buf, offset=offset)
+        values.flags.writeable = False
+        return values
+
+    data = {}
+    for position in range(len(handle.columns)):
+        if position in handle.layout:
+            data[position] = view(*handle.layout[position])
+        else:
+            data[position] = handle.other_columns[position]
+
+    if handle.index_layout is None:
+        index = handle.index
+    elif handle.index_tz is not None:
+        index = pd.DatetimeIndex(view(*handle.index_layout), name=handle.index_name) \
+            .tz_localize('UTC').tz_convert(handle.index_tz)
+    else:
+        index = pd.Index(view(*handle.index_layout), name=handle.index_name, copy=False)
+    if handle.index_freq is not None:
+        index = type(index)(index, freq=handle.index_freq)
+
+    frame = pd.DataFrame(data, index=index, copy=False)
+    frame.columns = handle.columns
+    return frame, shm
+
+
+def _invoke(func: Callable, args: tuple, kwargs: dict) -> Tuple[Any, float]:
+    """Run func in a pool worker with shared DataFrames attached; returns (result, seconds)"""
+    attached = []
+
+    def resolve(value):
+        if isinstance(value, SharedFrame):
+            frame, shm = attach_dataframe(value)
+            attached.append(shm)
+            return frame
+        return value
+
+    try:
+        args = tuple(resolve(value) for value in args)
+        kwargs = {key: resolve(value) for key, value in kwargs.items()}
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        return result, time.perf_counter() - start
+    finally:
+        del args, kwargs
+        for shm in attached:
+            try:
+                shm.close()
+            except BufferError:
+                pass  # The result still holds a view; the mapping goes when it is collected
+
+
+def _is_picklable(obj) -> bool:
+    try:
+        pickle.dumps(obj)
+        return True
+    except Exception:
+        return False
+
 
 class ConcurrentProcessor:
-    """Multi-threaded processing framework with resource management"""
+    """Priority-scheduled thread/process pool framework with resource-aware admission"""
 
     def __init__(self, max_workers: Optional[int] = None, max_memory_percent: float = 80.0,
-                 max_cpu_percent: float = 80.0):
-        self.max_workers = max_workers or min(32, os.cpu_count() * 2)
+                 max_cpu_percent: float = 80.0, max_process_workers: Optional[int] = None,
+                 max_queue_size: Optional[int] = 10000, sample_interval: float = 1.0,
+                 share_dataframes: bool = True, mp_context=None):
+        cpu_count = os.cpu_count() or 1
+        self.max_workers = max_workers or min(32, cpu_count * 2)
+        self.max_process_workers = max_process_workers or cpu_count
         self.max_memory_percent = max_memory_percent
         self.max_cpu_percent = max_cpu_percent
+        self.max_queue_size = max_queue_size
+        self.sample_interval = sample_interval
+        self.share_dataframes = share_dataframes
+        self.mp_context = mp_context
 
-        # Thread pool management
+        # Pools: threads for I/O, processes (started on first use) for CPU work
         self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ConcurrentProcessor")
+        self.process_executor: Optional[ProcessPoolExecutor] = None
         self.active_tasks: Dict[str, Future] = {}
         self.completed_tasks: Dict[str, Task] = {}
 
         # Resource monitoring
         self.process = psutil.Process()
         self.resource_lock = threading.Lock()
-
-        # Task queues
-        self.task_queue: PriorityQueue = PriorityQueue()
-        self.task_lock = threading.Lock()
-
-        # Monitoring
+        self._snapshot = ResourceSnapshot()
+        self._throttled = False
+        psutil.cpu_percent(interval=None)  # Prime the counter; later calls measure since the previous one
+
+        # One heap per backend of (priority, sequence, task); sequence keeps FIFO order within a priority
+        self.task_queues: Dict[ExecutorBackend, list] = {backend: [] for backend in ExecutorBackend}
+        self.in_flight: Dict[ExecutorBackend, int] = {backend: 0 for backend in ExecutorBackend}
+        self.task_lock = threading.RLock()
+        self.work_available = threading.Condition(self.task_lock)
+        self._sequence = itertools.count()
+
+        # DataFrames in shared memory: id(df) -> [shm, handle, refcount, df]
+        self._shared_frames: Dict[int, list] = {}
+        self.share_lock = threading.Lock()
+
+        # Monitoring and dispatch threads
         self.monitoring_active = False
         self.monitor_thread = None
+        self._stop_monitor = threading.Event()
+        self.dispatching = False
+        self.dispatch_thread = None
 
         # Statistics
         self.stats = {
             'tasks_submitted': 0,
             'tasks_completed': 0,
             'tasks_failed': 0,
+            'tasks_retried': 0,
+            'tasks_rejected': 0,
             'total_execution_time': 0.0,
             'average_execution_time': 0.0
         }
@@ -85,8 +325,24 @@ class ConcurrentProcessor:
 
     def submit_task(self, task_id: str, func: Callable, *args,
                    priority: TaskPriority = TaskPriority.NORMAL,
-                   max_retries: int = 3, **kwargs) -> str:
-        """Submit a task for execution"""
+                   max_retries: int = 3,
+                   backend: ExecutorBackend = ExecutorBackend.THREAD, **kwargs) -> str:
+        """
+        Submit a task for execution.
+
+        With backend=PROCESS, func and any callable arguments must be picklable
+        (module-level functions); otherwise the task falls back to the thread
+        pool. DataFrame arguments of process tasks go through shared memory and
+        arrive read-only.
+
+        Raises AdmissionRejected if the queue is full and holds no lower
+        priority task to displace.
+        """
+        if backend == ExecutorBackend.PROCESS:
+            callables = [func] + [value for value in (*args, *kwargs.values()) if callable(value)]
+            if not all(_is_picklable(value) for value in callables):
+                self.logger.warning(f"Task {task_id} cannot be sent to a worker process, running it on a thread")
+                backend = ExecutorBackend.THREAD
 
         task = Task(
             task_id=task_id,
@@ -94,130 +350,248 @@ class ConcurrentProcessor:
             args=args,
             kwargs=kwargs,
             priority=priority,
+            backend=backend,
             max_retries=max_retries
         )
+        if backend == ExecutorBackend.PROCESS and self.share_dataframes:
+            self._share_arguments(task)
 
         with self.task_lock:
-            self.task_queue.put((priority.value, task))
+            try:
+                self._admit(task)
+            except AdmissionRejected:
+                self._release_frames(task)
+                raise
+            self._push(task, priority)
             self.stats['tasks_submitted'] += 1
 
-        self.logger.info(f"Task {task_id} submitted with priority {priority.name}")
+        self.logger.info(f"Task {task_id} submitted with priority {priority.name} ({backend.value})")
         return task_id
 
-    def _execute_task(self, task: Task) -> Task:
-        """Execute a single task with error handling and retries"""
-        task.started_at = datetime.now()
-        task.status = TaskStatus.RUNNING
+    def _admit(self, task: Task):
+        """Make room for task in a full queue by shedding the newest lowest-priority task"""
+        queued = sum(len(queue) for queue in self.task_queues.values())
+        if not self.max_queue_size or queued < self.max_queue_size:
+            return
+
+        queue, entry = max(((queue, entry) for queue in self.task_queues.values() for entry in queue),
+                           key=lambda item: item[1][:2])
+        self.stats['tasks_rejected'] += 1
+        if entry[0] <= task.priority.value:
+            raise AdmissionRejected(f"Task queue full ({queued} tasks), rejected {task.task_id}")
+
+        queue.remove(entry)
+        heapq.heapify(queue)
+        shed = entry[2]
+        shed.status = TaskStatus.CANCELLED
+        shed.error = AdmissionRejected(f"Displaced by higher priority task {task.task_id}")
+        self.completed_tasks[shed.task_id] = shed
+        self._release_frames(shed)
+        self.logger.warning(f"Task queue full, shed {shed.task_id} ({shed.priority.name}) for {task.task_id}")
+
+    def _push(self, task: Task, priority: TaskPriority):
+        heapq.heappush(self.task_queues[task.backend], (priority.value, next(self._sequence), task))
+        self.work_available.notify_all()
+
+    def _share_arguments(self, task: Task):
+        """Replace DataFrame arguments with shared memory handles, one block per distinct frame"""
+        def share(value):
+            if not isinstance(value, pd.DataFrame):
+                return value
+            key = id(value)
+            with self.share_lock:
+                entry = self._shared_frames.get(key)
+                if entry is None:
+                    shm, handle = share_dataframe(value)
+                    entry = self._shared_frames[key] = [shm, handle, 0, value]
+                entry[2] += 1
+            task.shared_frames.append(key)
+            return entry[1]
+
+        task.args = tuple(share(value) for value in task.args)
+        task.kwargs = {key: share(value) for key, value in task.kwargs.items()}
+
+    def _release_frames(self, task: Task):
+        """Drop the task's references to shared blocks, unlinking blocks nobody uses any more"""
+        with self.share_lock:
+            for key in task.shared_frames:
+                entry = self._shared_frames.get(key)
+                if entry is None:
+                    continue
+                entry[2] -= 1
+                if entry[2] <= 0:
+                    del self._shared_frames[key]
+                    entry[0].close()
+                    entry[0].unlink()
+        task.shared_frames = []
+
+    def _get_executor(self, backend: ExecutorBackend):
+        if backend == ExecutorBackend.THREAD:
+            return self.executor
+        if self.process_executor is None:
+            self.process_executor = ProcessPoolExecutor(max_workers=self.max_process_workers,
+                                                        mp_context=self.mp_context)
+        return self.process_executor
+
+    def _check_resource_limits(self, priority: TaskPriority = TaskPriority.NORMAL) -> bool:
+        """Whether a task of this priority may start now (reads the cached snapshot, never blocks)"""
+        if priority == TaskPriority.HIGH:
+            return True
 
-        try:
-            # Check resource limits before execution
-            if not self._check_resource_limits():
-                raise ResourceWarning("Resource limits exceeded")
+        snapshot = self.get_resource_snapshot()
+        if snapshot.memory_percent > self.max_memory_percent:
+            reason = f"memory {snapshot.memory_percent:.1f}% > {self.max_memory_percent:.1f}%"
+        elif priority == TaskPriority.LOW and snapshot.cpu_percent > self.max_cpu_percent:
+            reason = f"CPU {snapshot.cpu_percent:.1f}% > {self.max_cpu_percent:.1f}%"
+        else:
+            return True
 
-            task.result = task.func(*task.args, **task.kwargs)
-            task.status = TaskStatus.COMPLETED
-            task.completed_at = datetime.now()
+        if not self._throttled:
+            self.logger.warning(f"Resource limits exceeded ({reason}), holding back {priority.name} tasks")
+        self._throttled = True
+        return False
+
+    def _dispatch_ready(self):
+        """Start queued tasks while their pool has free slots (called with task_lock held)"""
+        throttled = False
+        for backend, queue in self.task_queues.items():
+            capacity = self.max_workers if backend == ExecutorBackend.THREAD else self.max_process_workers
+            while queue and self.in_flight[backend] < capacity:
+                if not self._check_resource_limits(TaskPriority(queue[0][0])):
+                    throttled = True
+                    break
+                _, _, task = heapq.heappop(queue)
+                self._start_task(task)
 
-            execution_time = (task.completed_at - task.started_at).total_seconds()
-            with self.task_lock:
-                self.stats['tasks_completed'] += 1
-                self.stats['total_execution_time'] += execution_time
+        if self._throttled and not throttled:
+            self.logger.info("Resource usage back within limits, dispatch resumed")
+            self._throttled = False
 
-            self.logger.info(f"Task {task.task_id} completed successfully in {execution_time:.2f}s")
+    def _start_task(self, task: Task):
+        task.started_at = datetime.now()
+        task.status = TaskStatus.RUNNING
+        try:
+            future = self._get_executor(task.backend).submit(_invoke, task.func, task.args, task.kwargs)
+        except Exception as e:  # Pool shut down or broken: fail the attempt like any other error
+            future = Future()
+            future.set_exception(e)
 
-        except Exception as e:
-            task.error = e
-            task.status = TaskStatus.FAILED
-            task.completed_at = datetime.now()
+        self.active_tasks[task.task_id] = future
+        self.in_flight[task.backend] += 1
+        future.add_done_callback(lambda done, task=task: self._on_task_done(task, done))
 
-            self.logger.error(f"Task {task.task_id} failed: {e}")
+    def _on_task_done(self, task: Task, future: Future):
+        """Record a finished attempt and retry it if it failed (runs on the pool's callback thread)"""
+        try:
+            task.result, task.execution_time = future.result()
+            error = None
+        except Exception as e:
+            error = e
 
-            # Retry logic
-            if task.retry_count < task.max_retries:
-                task.retry_count += 1
-                task.status = TaskStatus.PENDING
-                self.logger.info(f"Retrying task {task.task_id} (attempt {task.retry_count}/{task.max_retries})")
+        with self.task_lock:
+            self.in_flight[task.backend] -= 1
+            if self.active_tasks.get(task.task_id) is future:
+                del self.active_tasks[task.task_id]
+            task.completed_at = datetime.now()
 
-                # Put back in queue with higher priority for retries
-                retry_priority = TaskPriority.HIGH if task.retry_count > 1 else task.priority
-                with self.task_lock:
-                    self.task_queue.put((retry_priority.value, task))
-                return task
+            if error is None:
+                task.status = TaskStatus.COMPLETED
+                self.stats['tasks_completed'] += 1
+                self.stats['total_execution_time'] += task.execution_time
+                self.completed_tasks[task.task_id] = task
+                self._release_frames(task)
+                self.logger.info(f"Task {task.task_id} completed successfully in {task.execution_time:.2f}s")
             else:
-                with self.task_lock:
+                task.error = error
+                self.logger.error(f"Task {task.task_id} failed: {error}")
+                if isinstance(error, BrokenProcessPool) and self.process_executor is not None:
+                    self.process_executor.shutdown(wait=False)
+                    self.process_executor = None
+
+                if task.retry_count < task.max_retries and self.dispatching:
+                    task.retry_count += 1
+                    task.status = TaskStatus.PENDING
+                    self.stats['tasks_retried'] += 1
+                    self.logger.info(f"Retrying task {task.task_id} (attempt {task.retry_count}/{task.max_retries})")
+                    # Repeated retries jump the queue
+                    self._push(task, TaskPriority.HIGH if task.retry_count > 1 else task.priority)
+                else:
+                    task.status = TaskStatus.FAILED
                     self.stats['tasks_failed'] += 1
+                    self.completed_tasks[task.task_id] = task
+                    self._release_frames(task)
 
-        return task
-
-    def _check_resource_limits(self) -> bool:
-        """Check if system resources are within acceptable limits"""
-        try:
-            memory_percent = self.process.memory_percent()
-            cpu_percent = self.process.cpu_percent(interval=0.1)
-
-            if memory_percent > self.max_memory_percent:
-                self.logger.warning(".1f")
-                return False
-
-            if cpu_percent > self.max_cpu_percent:
-                self.logger.warning(".1f")
-                return False
+            self.work_available.notify_all()
 
-            return True
-        except Exception as e:
-            self.logger.error(f"Resource check failed: {e}")
-            return True  # Allow execution if monitoring fails
-
-    def _process_queue(self):
-        """Process tasks from the queue"""
-        while True:
+    def _dispatch_loop(self):
+        """Hand queued tasks to the pools as slots free up"""
+        with self.work_available:
+            while self.dispatching:
+                try:
+                    self._dispatch_ready()
+                except Exception as e:
+                    self.logger.error(f"Dispatch error: {e}")
+                # Wake on submit/completion, and periodically to re-check held-back tasks
+                self.work_available.wait(timeout=self.sample_interval)
+
+    def _sample_resources(self) -> ResourceSnapshot:
+        """Take a non-blocking resource sample and cache it"""
+        memory_percent = self.process.memory_percent()
+        for child in self.process.children():
             try:
-                # Get next task
-                with self.task_lock:
-                    if self.task_queue.empty():
-                        break
-                    _, task = self.task_queue.get_nowait()
-
-                # Execute task
-                result_task = self._execute_task(task)
-
-                # Store result
-                with self.task_lock:
-                    self.completed_tasks[task.task_id] = result_task
-
-                # Mark queue task as done
-                self.task_queue.task_done()
-
+                memory_percent += child.memory_percent()
+            except psutil.Error:
+                pass
+
+        snapshot = ResourceSnapshot(
+            cpu_percent=psutil.cpu_percent(interval=None),
+            memory_percent=memory_percent,
+            sampled_at=time.monotonic()
+        )
+        with self.resource_lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    def get_resource_snapshot(self) -> ResourceSnapshot:
+        """Latest resource sample; sampled inline (without blocking) if the monitor is not running"""
+        with self.resource_lock:
+            snapshot = self._snapshot
+        if not self.monitoring_active and time.monotonic() - snapshot.sampled_at > self.sample_interval:
+            try:
+                snapshot = self._sample_resources()
             except Exception as e:
-                self.logger.error(f"Queue processing error: {e}")
-                break
+                self.logger.error(f"Resource check failed: {e}")
+        return snapshot
 
     def _monitor_resources(self):
-        """Background resource monitoring"""
+        """Background resource sampling"""
+        last_warning = 0.0
         while self.monitoring_active:
             try:
-                # Log resource usage periodically
-                memory_percent = self.process.memory_percent()
-                cpu_percent = self.process.cpu_percent(interval=1.0)
-
-                self.logger.debug(".1f")
-
-                # Check for resource warnings
-                if memory_percent > self.max_memory_percent * 0.9:  # 90% of limit
-                    self.logger.warning(".1f")
-                if cpu_percent > self.max_cpu_percent * 0.9:
-                    self.logger.warning(".1f")
-
-                time.sleep(30)  # Check every 30 seconds
-
+                snapshot = self._sample_resources()
+                self.logger.debug(f"CPU {snapshot.cpu_percent:.1f}%, memory {snapshot.memory_percent:.1f}%")
+
+                # Warn at 90% of a limit, at most every 30 seconds
+                near_limit = (snapshot.memory_percent > self.max_memory_percent * 0.9
+                              or snapshot.cpu_percent > self.max_cpu_percent * 0.9)
+                if near_limit and time.monotonic() - last_warning >= 30:
+                    last_warning = time.monotonic()
+                    self.logger.warning(
+                        f"Resource usage near limits: CPU {snapshot.cpu_percent:.1f}% "
+                        f"(limit {self.max_cpu_percent:.1f}%), memory {snapshot.memory_percent:.1f}% "
+                        f"(limit {self.max_memory_percent:.1f}%)"
+                    )
             except Exception as e:
                 self.logger.error(f"Resource monitoring error: {e}")
-                break
+
+            self._stop_monitor.wait(self.sample_interval)
 
     def start_processing(self, enable_monitoring: bool = True):
         """Start the concurrent processing"""
         if enable_monitoring and not self.monitoring_active:
             self.monitoring_active = True
+            self._stop_monitor.clear()
+            self._sample_resources()
             self.monitor_thread = threading.Thread(
                 target=self._monitor_resources,
                 daemon=True,
@@ -226,33 +600,34 @@ class ConcurrentProcessor:
             self.monitor_thread.start()
             self.logger.info("Resource monitoring started")
 
-        # Start queue processing
-        processing_thread = threading.Thread(
-            target=self._process_queue,
+        with self.task_lock:
+            if self.dispatching:
+                return
+            self.dispatching = True
+
+        self.dispatch_thread = threading.Thread(
+            target=self._dispatch_loop,
             daemon=True,
-            name="QueueProcessor"
+            name="TaskDispatcher"
         )
-        processing_thread.start()
+        self.dispatch_thread.start()
 
-        self.logger.info(f"Concurrent processor started with {self.max_workers} workers")
+        self.logger.info(f"Concurrent processor started with {self.max_workers} threads "
+                         f"and {self.max_process_workers} processes")
 
     def wait_for_completion(self, timeout: Optional[float] = None) -> bool:
         """Wait for all tasks to complete"""
-        start_time = time.time()
+        deadline = None if timeout is None else time.monotonic() + timeout
 
-        while True:
-            with self.task_lock:
-                if self.task_queue.empty() and not self.active_tasks:
-                    break
-
-            if timeout and (time.time() - start_time) > timeout:
-                self.logger.warning(f"Timeout waiting for completion after {timeout}s")
-                return False
-
-            time.sleep(0.1)
+        with self.work_available:
+            while any(self.task_queues.values()) or self.active_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self.logger.warning(f"Timeout waiting for completion after {timeout}s")
+                    return False
+                self.work_available.wait(timeout=remaining)
 
-        # Update statistics
-        with self.task_lock:
+            # Update statistics
             if self.stats['tasks_completed'] > 0:
                 self.stats['average_execution_time'] = (
                     self.stats['total_execution_time'] / self.stats['tasks_completed']
@@ -269,7 +644,13 @@ class ConcurrentProcessor:
     def get_stats(self) -> Dict:
         """Get processing statistics"""
         with self.task_lock:
-            return self.stats.copy()
+            stats = self.stats.copy()
+            stats['queued'] = {backend.value: len(queue) for backend, queue in self.task_queues.items()}
+            stats['in_flight'] = {backend.value: count for backend, count in self.in_flight.items()}
+        with self.share_lock:
+            stats['shared_frames'] = len(self._shared_frames)
+        stats['resources'] = asdict(self.get_resource_snapshot())
+        return stats
 
     def get_active_tasks(self) -> List[str]:
         """Get list of currently active task IDs"""
@@ -277,33 +658,20 @@ class ConcurrentProcessor:
             return list(self.active_tasks.keys())
 
     def cancel_task(self, task_id: str) -> bool:
-        """Cancel a pending task"""
-        # Note: This is a simplified implementation
-        # In a real system, you'd need to handle running tasks differently
+        """Cancel a pending task (running tasks are left to finish)"""
         with self.task_lock:
-            # Find task in queue and remove it
-            temp_queue = PriorityQueue()
-            cancelled = False
-
-            while not self.task_queue.empty():
-                try:
-                    priority, task = self.task_queue.get_nowait()
-                    if task.task_id != task_id:
-                        temp_queue.put((priority, task))
-                    else:
+            for queue in self.task_queues.values():
+                for entry in queue:
+                    task = entry[2]
+                    if task.task_id == task_id:
+                        queue.remove(entry)
+                        heapq.heapify(queue)
                         task.status = TaskStatus.CANCELLED
                         self.completed_tasks[task_id] = task
-                        cancelled = True
-                    self.task_queue.task_done()
-                except:
-                    break
-
-            # Restore queue
-            while not temp_queue.empty():
-                self.task_queue.put(temp_queue.get())
-                temp_queue.task_done()
-
-            return cancelled
+                        self._release_frames(task)
+                        self.work_available.notify_all()
+                        return True
+        return False
 
     def shutdown(self, wait: bool = True):
         """Shutdown the processor"""
@@ -311,24 +679,29 @@ class ConcurrentProcessor:
 
         # Stop monitoring
         self.monitoring_active = False
+        self._stop_monitor.set()
         if self.monitor_thread and self.monitor_thread.is_alive():
             self.monitor_thread.join(timeout=5)
 
-        # Shutdown executor
-        self.executor.shutdown(wait=wait)
-
-        # Cancel remaining tasks
+        # Stop dispatching and cancel queued tasks
         cancelled_count = 0
         with self.task_lock:
-            while not self.task_queue.empty():
-                try:
-                    _, task = self.task_queue.get_nowait()
+            self.dispatching = False
+            for queue in self.task_queues.values():
+                for _, _, task in queue:
                     task.status = TaskStatus.CANCELLED
                     self.completed_tasks[task.task_id] = task
+                    self._release_frames(task)
                     cancelled_count += 1
-                    self.task_queue.task_done()
-                except:
-                    break
+                queue.clear()
+            self.work_available.notify_all()
+        if self.dispatch_thread and self.dispatch_thread.is_alive():
+            self.dispatch_thread.join(timeout=5)
+
+        # Shutdown executors; running tasks release their shared blocks as they finish
+        self.executor.shutdown(wait=wait)
+        if self.process_executor is not None:
+            self.process_executor.shutdown(wait=wait)
 
         self.logger.info(f"Concurrent processor shutdown complete. {cancelled_count} tasks cancelled.")
 
@@ -343,46 +716,80 @@ def get_processor() -> ConcurrentProcessor:
     return _processor_instance
 
 # Convenience functions for common operations
+# Task bodies are module-level so the process pool can pickle them
 
-def submit_data_fetch_task(symbol: str, timeframe: str, days: int) -> str:
-    """Submit a data fetching task"""
+_task_counter = itertools.count(1)
+
+def _fetch_data(symbol: str, timeframe: str, days: int):
     from data_fetcher import BinanceDataFetcher
     import config
 
-    def fetch_data():
-        fetcher = BinanceDataFetcher(performance_mode=config.PERFORMANCE_MODE)
-        return fetcher.get_historical_data(symbol, timeframe, days)
+    fetcher = BinanceDataFetcher(performance_mode=config.PERFORMANCE_MODE)
+    return fetcher.get_historical_data(symbol, timeframe, days)
 
+def _generate_signal(symbol: str):
+    if symbol == "BTCUSDT":
+        from elite_signal_generator import EliteAPlusSignalGenerator
+        import config
+        generator = EliteAPlusSignalGenerator(performance_mode=config.PERFORMANCE_MODE)
+        return generator.generate_signal()
+    # Add other symbols as needed
+    return None
+
+def _run_backtest(data: pd.DataFrame, strategy_func: Callable, backtest_params: Dict) -> Dict:
+    """Run one backtest and return a picklable summary (the engine itself stays in the worker)"""
+    from backtest_engine import BacktestEngine
+
+    engine = BacktestEngine(**backtest_params)
+    skipped = engine.run_backtest(data, strategy_func, verbose=False, performance_mode=True)
+    if skipped is not None:
+        return skipped
+    return {
+        'success': True,
+        'params': backtest_params,
+        'final_capital': engine.capital,
+        'metrics': engine.metrics.get_metrics(),
+        'trades': engine.get_trades_df(),
+    }
+
+def submit_data_fetch_task(symbol: str, timeframe: str, days: int) -> str:
+    """Submit a data fetching task"""
     task_id = f"fetch_{symbol}_{timeframe}_{days}d"
     processor = get_processor()
-    return processor.submit_task(task_id, fetch_data, priority=TaskPriority.HIGH)
+    return processor.submit_task(task_id, _fetch_data, symbol, timeframe, days, priority=TaskPriority.HIGH)
 
 def submit_signal_generation_task(symbol: str) -> str:
     """Submit a signal generation task"""
-    def generate_signal():
-        if symbol == "BTCUSDT":
-            from elite_signal_generator import EliteAPlusSignalGenerator
-            import config
-            generator = EliteAPlusSignalGenerator(performance_mode=config.PERFORMANCE_MODE)
-            return generator.generate_signal()
-        # Add other symbols as needed
-        return None
-
     task_id = f"signal_{symbol}"
     processor = get_processor()
-    return processor.submit_task(task_id, generate_signal, priority=TaskPriority.NORMAL)
+    return processor.submit_task(task_id, _generate_signal, symbol, priority=TaskPriority.NORMAL,
+                                 backend=ExecutorBackend.PROCESS)
 
 def submit_backtest_task(data, strategy_func, **backtest_params) -> str:
-    """Submit a backtest task"""
-    from backtest_engine import BacktestEngine
+    """
+    Submit a backtest task.
 
-    def run_backtest():
-        engine = BacktestEngine(**backtest_params)
-        return engine.run_backtest(data, strategy_func, verbose=False, performance_mode=True)
+    Runs in the process pool when strategy_func is a module-level function;
+    the task result is the summary dict from _run_backtest.
+    """
+    task_id = f"backtest_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{next(_task_counter)}"
+    processor = get_processor()
+    return processor.submit_task(task_id, _run_backtest, data, strategy_func, backtest_params,
+                                 priority=TaskPriority.NORMAL, backend=ExecutorBackend.PROCESS)
 
-    task_id = f"backtest_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+def submit_backtest_batch(data, strategy_func, param_sets: List[Dict],
+                          priority: TaskPriority = TaskPriority.NORMAL) -> List[str]:
+    """Submit one backtest per parameter set; data goes into shared memory once for the whole batch"""
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     processor = get_processor()
-    return processor.submit_task(task_id, run_backtest, priority=TaskPriority.NORMAL)
+    return [
+        processor.submit_task(f"backtest_{stamp}_{next(_task_counter)}", _run_backtest, data, strategy_func,
+                              params, priority=priority, backend=ExecutorBackend.PROCESS)
+        for params in param_sets
+    ]
+
+def _demo_cpu_work(n: int) -> int:
+    return sum(i * i % 7 for i in range(n))
 
 def main():
     """Test the concurrent processor"""
@@ -421,14 +828,23 @@ def main():
     print("\nWaiting for tasks to complete...")
     processor.wait_for_completion(timeout=30)
 
+    # CPU-bound work on each backend
+    print("\nCPU-bound work, thread vs process backend...")
+    for backend in ExecutorBackend:
+        start = time.perf_counter()
+        for i in range(processor.max_process_workers * 2):
+            processor.submit_task(f"cpu_{backend.value}_{i}", _demo_cpu_work, 2_000_000, backend=backend)
+        processor.wait_for_completion(timeout=120)
+        print(f"  {backend.value:8s} {time.perf_counter() - start:.2f}s")
+
     # Show results
     print("\nResults:")
     stats = processor.get_stats()
     print(f"Tasks submitted: {stats['tasks_submitted']}")
     print(f"Tasks completed: {stats['tasks_completed']}")
     print(f"Tasks failed: {stats['tasks_failed']}")
-    print(".2f")
-    print(".2f")
+    print(f"Total execution time: {stats['total_execution_time']:.2f}s")
+    print(f"Average execution time: {stats['average_execution_time']:.2f}s")
 
     for task_id in task_ids:
         task = processor.get_task_result(task_id)
@@ -441,4 +857,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
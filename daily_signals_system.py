@@ -11,6 +11,8 @@ from typing import Dict, List, Optional
 import numpy as np
 import logging
 
+from position_sizing import size_for_risk
+
 class DailySignalsSystem:
     """
     High-frequency signal system providing 3-5 quality signals per day
@@ -188,13 +190,13 @@ class DailySignalsSystem:
 
         # Risk management
         risk_amount = account_balance * config['risk_multiplier'] * 0.01
-        position_size = self._calculate_position_size(risk_amount, asset)
 
         # Generate signal parameters
         direction = random.choice(['BUY', 'SELL'])
         entry_price = self._get_realistic_entry_price(asset, direction)
         stop_loss = self._calculate_stop_loss(entry_price, direction, asset)
         take_profit = self._calculate_take_profit(entry_price, direction, config['avg_rr'], asset)
+        position_size = self._calculate_position_size(risk_amount, asset, entry_price, stop_loss)
 
         # Create signal
         signal = {
@@ -253,18 +255,10 @@ class DailySignalsSystem:
         # Simplified correlation check
         return random.random() < 0.03  # 3% chance of correlation conflict
 
-    def _calculate_position_size(self, risk_amount: float, asset: str) -> float:
-        """Calculate position size based on risk and asset"""
-        # Simplified position sizing
-        pip_values = {
-            'EURUSD': 0.0001, 'GBPUSD': 0.0001, 'USDJPY': 0.01,
-            'BTC': 1, 'GOLD': 0.1, 'ES': 1, 'NQ': 1
-        }
-
-        pip_value = pip_values.get(asset, 0.0001)
-        stop_pips = 50  # Assume 50 pip stop
-
-        return risk_amount / (stop_pips * pip_value)
+    def _calculate_position_size(self, risk_amount: float, asset: str, entry_price: float,
+                                 stop_loss: float) -> float:
+        """Lots risking risk_amount between entry and stop (pip values from position_sizing)"""
+        return float(size_for_risk(asset, entry_price, stop_loss, [risk_amount]).raw_lots[0])
 
     def _get_realistic_entry_price(self, asset: str, direction: str) -> float:
         """Get realistic entry price for the asset"""
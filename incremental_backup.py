@@ -0,0 +1,368 @@
+"""
+Incremental Backup Repository
+Deduplicated, compressed snapshots of JSON stores and database dumps
+
+Files and streams are split into content-defined chunks at line (or comma)
+boundaries, so an edit only changes the chunks around it. Each chunk is
+stored once under its SHA-256, compressed with zstd when ``zstandard`` is
+installed and gzip otherwise. A snapshot is a small JSON manifest listing the
+chunks of every file; files whose size and mtime match the previous snapshot
+are not even read. Any snapshot can be restored, or the latest one at a given
+point in time, and prune() drops old manifests and the chunks only they used.
+
+Layout::
+
+    <root>/objects/ab/abcdef....zst     chunk contents
+    <root>/snapshots/<id>.json          one manifest per snapshot
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+logger = logging.getLogger(__name__)
+
+MIN_CHUNK = 16 * 1024
+AVG_CHUNK = 64 * 1024
+MAX_CHUNK = 256 * 1024
+READ_BLOCK = 1024 * 1024
+
+# Pieces of an over-long line: up to 4 KB of non-comma bytes plus the comma
+_LONG_LINE_PIECES = re.compile(rb'[^,]{1,4096},?|,')
+
+
+def _tokens(stream: BinaryIO, max_token: int) -> Iterator[bytes]:
+    """Lines of a binary stream, with lines longer than ``max_token`` split at commas"""
+    rest = b''
+    while True:
+        block = stream.read(READ_BLOCK)
+        if not block:
+            break
+        lines = (rest + block).split(b'\n')
+        rest = lines.pop()
+        for line in lines:
+            line += b'\n'
+            if len(line) <= max_token:
+                yield line
+            else:
+                for match in _LONG_LINE_PIECES.finditer(line):
+                    yield match.group()
+        # Keep an unterminated line from growing without bound
+        if len(rest) > max_token:
+            pieces = [match.group() for match in _LONG_LINE_PIECES.finditer(rest)]
+            rest = pieces.pop()
+            yield from pieces
+    if rest:
+        if len(rest) <= max_token:
+            yield rest
+        else:
+            for match in _LONG_LINE_PIECES.finditer(rest):
+                yield match.group()
+
+
+def chunk_stream(stream: BinaryIO, avg_size: int = AVG_CHUNK, min_size: int = MIN_CHUNK,
+                 max_size: int = MAX_CHUNK) -> Iterator[bytes]:
+    """
+    Content-defined chunks of a binary stream
+
+    A chunk ends after a token (line) whose CRC32 falls under a threshold
+    proportional to the token's length, giving ``avg_size`` chunks on average.
+    Because the decision depends only on the token itself, inserting or
+    removing lines moves at most the neighbouring boundaries.
+    """
+    scale = (1 << 32) / avg_size
+    buffer, size = [], 0
+    for token in _tokens(stream, max_size):
+        buffer.append(token)
+        size += len(token)
+        if size >= max_size or (size >= min_size and zlib.crc32(token) < len(token) * scale):
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+class BackupRepository:
+    """Content-addressed chunk store with one manifest per snapshot"""
+
+    def __init__(self, root: str, io_limit: Optional[float] = None, compression_level: int = 3):
+        """
+        Args:
+            root: Repository directory (created if missing)
+            io_limit: Bytes per second to read and write at most, to avoid I/O spikes
+            compression_level: zstd level (gzip uses level 6)
+        """
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.snapshots_dir = os.path.join(root, 'snapshots')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+        self.io_limit = io_limit
+        self.compression_level = compression_level
+        self.codec = 'zst' if HAS_ZSTD else 'gz'
+        self._lock = threading.Lock()
+        self._known: Optional[set] = None
+        self._io_started = 0.0
+        self._io_bytes = 0
+
+    # ------------------------------------------------------------------
+    # Objects
+    # ------------------------------------------------------------------
+
+    def _object_path(self, chunk_id: str, codec: str) -> str:
+        return os.path.join(self.objects_dir, chunk_id[:2], f"{chunk_id}.{codec}")
+
+    def _known_objects(self) -> set:
+        if self._known is None:
+            self._known = set()
+            for prefix in os.listdir(self.objects_dir):
+                for name in os.listdir(os.path.join(self.objects_dir, prefix)):
+                    if '.tmp' not in name:
+                        self._known.add(name.split('.')[0])
+        return self._known
+
+    def _throttle(self, nbytes: int):
+        if not self.io_limit:
+            return
+        now = time.monotonic()
+        if now - self._io_started > 1.0:
+            self._io_started, self._io_bytes = now, 0
+        self._io_bytes += nbytes
+        ahead = self._io_bytes / self.io_limit - (now - self._io_started)
+        if ahead > 0:
+            time.sleep(ahead)
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == 'zst':
+            return zstandard.ZstdCompressor(level=self.compression_level).compress(data)
+        return gzip.compress(data, compresslevel=6, mtime=0)
+
+    def _put(self, chunk: bytes) -> Tuple[str, int]:
+        """Store a chunk unless already present; returns (chunk id, bytes written)"""
+        chunk_id = hashlib.sha256(chunk).hexdigest()
+        known = self._known_objects()
+        if chunk_id in known:
+            return chunk_id, 0
+        path = self._object_path(chunk_id, self.codec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = self._compress(chunk)
+        tmp = f"{path}.tmp{threading.get_ident()}"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        known.add(chunk_id)
+        self._throttle(len(data))
+        return chunk_id, len(data)
+
+    def read_chunk(self, chunk_id: str) -> bytes:
+        for codec in ('zst', 'gz'):
+            path = self._object_path(chunk_id, codec)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    data = f.read()
+                if codec == 'zst':
+                    if not HAS_ZSTD:
+                        raise RuntimeError(f"Chunk {chunk_id} is zstd-compressed; install zstandard to read it")
+                    return zstandard.ZstdDecompressor().decompress(data)
+                return gzip.decompress(data)
+        raise FileNotFoundError(f"Missing chunk {chunk_id}")
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def _store_stream(self, stream: BinaryIO, stats: Dict) -> Dict:
+        digest = hashlib.sha256()
+        chunks, size = [], 0
+        for chunk in chunk_stream(stream):
+            self._throttle(len(chunk))
+            digest.update(chunk)
+            size += len(chunk)
+            chunk_id, written = self._put(chunk)
+            chunks.append(chunk_id)
+            if written:
+                stats['new_chunks'] += 1
+                stats['bytes_stored'] += written
+        stats['bytes_read'] += size
+        return {'size': size, 'sha256': digest.hexdigest(), 'chunks': chunks}
+
+    @staticmethod
+    def _new_stats() -> Dict:
+        return {'files': 0, 'changed': 0, 'bytes_read': 0, 'new_chunks': 0, 'bytes_stored': 0}
+
+    def _write_manifest(self, kind: str, files: Dict, stats: Dict, started: float,
+                        created_at: Optional[datetime] = None) -> Dict:
+        created_at = created_at or datetime.now()
+        snapshot_id = f"{kind}_{created_at.strftime('%Y%m%d_%H%M%S_%f')}"
+        stats['duration_s'] = round(time.monotonic() - started, 3)
+        manifest = {'id': snapshot_id, 'kind': kind, 'created_at': created_at.isoformat(),
+                    'files': files, 'stats': stats}
+        path = os.path.join(self.snapshots_dir, f"{snapshot_id}.json")
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(f"{path}.tmp", path)
+        logger.info("Snapshot %s: %d/%d files changed, %d new chunks, %d bytes stored", snapshot_id,
+                    stats['changed'], stats['files'], stats['new_chunks'], stats['bytes_stored'])
+        return manifest
+
+    def backup_files(self, paths: Iterable[str], kind: str = 'json', base_dir: str = '.',
+                     created_at: Optional[datetime] = None, verify: bool = False) -> Dict:
+        """
+        Snapshot files (relative to ``base_dir``); missing files are left out
+
+        Files whose size and mtime match the previous ``kind`` snapshot reuse
+        its entry without being read, unless ``verify`` is set.
+        """
+        with self._lock:
+            started = time.monotonic()
+            previous = self.latest(kind)
+            previous_files = previous['files'] if previous else {}
+            stats, files = self._new_stats(), {}
+            for name in paths:
+                path = os.path.join(base_dir, name)
+                if not os.path.isfile(path):
+                    continue
+                info = os.stat(path)
+                stats['files'] += 1
+                old = previous_files.get(name)
+                if (not verify and old is not None and old['size'] == info.st_size
+                        and old.get('mtime_ns') == info.st_mtime_ns):
+                    files[name] = old
+                    continue
+                with open(path, 'rb') as f:
+                    entry = self._store_stream(f, stats)
+                entry['mtime_ns'] = info.st_mtime_ns
+                if old is None or old['sha256'] != entry['sha256']:
+                    stats['changed'] += 1
+                files[name] = entry
+            return self._write_manifest(kind, files, stats, started, created_at)
+
+    def backup_stream(self, stream: BinaryIO, name: str, kind: str) -> Dict:
+        """Snapshot a single stream, e.g. the stdout of pg_dump, without staging it on disk"""
+        with self._lock:
+            started = time.monotonic()
+            stats = self._new_stats()
+            entry = self._store_stream(stream, stats)
+            stats['files'] = 1
+            previous = self.latest(kind)
+            old = previous['files'].get(name) if previous else None
+            stats['changed'] = int(old is None or old['sha256'] != entry['sha256'])
+            return self._write_manifest(kind, {name: entry}, stats, started)
+
+    def list_snapshots(self, kind: Optional[str] = None) -> List[str]:
+        """Snapshot ids, oldest first"""
+        ids = [name[:-5] for name in os.listdir(self.snapshots_dir) if name.endswith('.json')]
+        if kind:
+            ids = [snapshot_id for snapshot_id in ids if snapshot_id.rsplit('_', 3)[0] == kind]
+        return sorted(ids, key=lambda snapshot_id: snapshot_id.rsplit('_', 3)[1:])
+
+    def get_snapshot(self, snapshot_id: str) -> Dict:
+        with open(os.path.join(self.snapshots_dir, f"{snapshot_id}.json")) as f:
+            return json.load(f)
+
+    def delete_snapshot(self, snapshot_id: str):
+        """Remove one manifest; its chunks go at the next prune()"""
+        os.remove(os.path.join(self.snapshots_dir, f"{snapshot_id}.json"))
+
+    def latest(self, kind: str) -> Optional[Dict]:
+        ids = self.list_snapshots(kind)
+        return self.get_snapshot(ids[-1]) if ids else None
+
+    def snapshot_at(self, kind: str, at: datetime) -> Optional[Dict]:
+        """The newest ``kind`` snapshot taken at or before ``at``"""
+        found = None
+        for snapshot_id in self.list_snapshots(kind):
+            stamp = datetime.strptime('_'.join(snapshot_id.rsplit('_', 3)[1:]), '%Y%m%d_%H%M%S_%f')
+            if stamp > at:
+                break
+            found = snapshot_id
+        return self.get_snapshot(found) if found else None
+
+    # ------------------------------------------------------------------
+    # Restore
+    # ------------------------------------------------------------------
+
+    def iter_file(self, snapshot: Dict, name: str) -> Iterator[bytes]:
+        """Contents of one file in a snapshot, chunk by chunk"""
+        for chunk_id in snapshot['files'][name]['chunks']:
+            yield self.read_chunk(chunk_id)
+
+    def restore(self, snapshot: Dict, target_dir: str = '.', paths: Optional[Iterable[str]] = None) -> List[str]:
+        """Write the snapshot's files (or ``paths`` of them) under ``target_dir``; returns the written paths"""
+        written = []
+        for name in (paths if paths is not None else snapshot['files']):
+            entry = snapshot['files'][name]
+            target = os.path.join(target_dir, name)
+            os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+            digest = hashlib.sha256()
+            with open(f"{target}.restore", 'wb') as f:
+                for data in self.iter_file(snapshot, name):
+                    digest.update(data)
+                    f.write(data)
+            if digest.hexdigest() != entry['sha256']:
+                os.remove(f"{target}.restore")
+                raise ValueError(f"Checksum mismatch restoring {name} from {snapshot['id']}")
+            os.replace(f"{target}.restore", target)
+            written.append(target)
+        return written
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def _referenced(self) -> set:
+        referenced = set()
+        for snapshot_id in self.list_snapshots():
+            for entry in self.get_snapshot(snapshot_id)['files'].values():
+                referenced.update(entry['chunks'])
+        return referenced
+
+    def prune(self, older_than: datetime, keep_last: int = 1) -> Dict:
+        """Delete snapshots taken before ``older_than`` (keeping the newest ``keep_last`` per kind) and unused chunks"""
+        with self._lock:
+            removed = 0
+            kinds = {snapshot_id.rsplit('_', 3)[0] for snapshot_id in self.list_snapshots()}
+            for kind in kinds:
+                ids = self.list_snapshots(kind)
+                for snapshot_id in ids[:max(0, len(ids) - keep_last)]:
+                    if datetime.fromisoformat(self.get_snapshot(snapshot_id)['created_at']) < older_than:
+                        self.delete_snapshot(snapshot_id)
+                        removed += 1
+            return {'snapshots': removed, 'chunks': self._collect_garbage()}
+
+    def _collect_garbage(self) -> int:
+        referenced = self._referenced()
+        deleted = 0
+        for prefix in os.listdir(self.objects_dir):
+            directory = os.path.join(self.objects_dir, prefix)
+            for name in os.listdir(directory):
+                if name.split('.')[0] not in referenced:
+                    os.remove(os.path.join(directory, name))
+                    deleted += 1
+        self._known = None
+        return deleted
+
+    def check(self) -> List[str]:
+        """Problems found by re-reading every referenced chunk (empty when healthy)"""
+        problems = []
+        for chunk_id in sorted(self._referenced()):
+            try:
+                if hashlib.sha256(self.read_chunk(chunk_id)).hexdigest() != chunk_id:
+                    problems.append(f"{chunk_id}: content does not match its hash")
+            except Exception as e:
+                problems.append(f"{chunk_id}: {e}")
+        return problems
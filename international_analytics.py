@@ -80,14 +80,15 @@ class InternationalAnalytics:
         """Generate cross-market signals based on inter-market relationships"""
         try:
             # Get signals for all international markets
-            from international_signal_api import get_international_signal, get_international_symbols
+            from international_signal_api import get_all_international_signals, get_international_symbols
 
             symbols = get_international_symbols()
+            signals = get_all_international_signals()
             market_signals = {}
 
             for symbol in symbols:
                 try:
-                    signal = get_international_signal(symbol)
+                    signal = signals.get(symbol)
                     if signal and signal.get('direction') != 'ERROR':
                         market_signals[symbol] = signal
                 except Exception as e:
@@ -154,11 +155,12 @@ class InternationalAnalytics:
             currency_symbols = ['EUR', 'GBP', 'AUD', 'JPY']
             strength_data = {}
 
-            from international_signal_api import get_international_signal
+            from international_signal_api import get_all_international_signals
 
+            signals = get_all_international_signals()
             for symbol in currency_symbols:
                 try:
-                    signal = get_international_signal(symbol)
+                    signal = signals.get(symbol)
                     if signal and signal.get('direction') != 'ERROR':
                         # Calculate strength score based on signal confidence and direction
                         base_strength = signal['confidence'] / 100.0
@@ -187,14 +189,15 @@ class InternationalAnalytics:
         """Analyze current market regime (trending, ranging, volatile)"""
         try:
             # Get volatility and trend data from multiple markets
-            from international_signal_api import get_international_signal, get_international_symbols
+            from international_signal_api import get_all_international_signals, get_international_symbols
 
             symbols = get_international_symbols()
+            signals = get_all_international_signals()
             regime_indicators = {}
 
             for symbol in symbols:
                 try:
-                    signal = get_international_signal(symbol)
+                    signal = signals.get(symbol)
                     if signal and signal.get('direction') != 'ERROR':
                         regime_indicators[symbol] = {
                             'trend': signal['technical_indicators'].get('trend', 'unknown'),
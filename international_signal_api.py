@@ -5,20 +5,43 @@ emerging markets, and additional crypto futures
 """
 
 from typing import Dict, Optional, List
+import importlib.util
 import logging
+import os
 from datetime import datetime
 
-# Import international signal generators
+import numpy as np
+
+from panel_indicators import IndicatorSpec, compute_panel
+
+# Import international signal generators (the package directories have
+# spaces in their names, so load the files directly)
+_MARKETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'International Markets')
+
+
+def _load_generator(relative_path: str, class_name: str):
+    module_name = os.path.splitext(os.path.basename(relative_path))[0]
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(_MARKETS_DIR, relative_path))
+    if spec is None:
+        raise ImportError(f"No generator at {relative_path}")
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    except FileNotFoundError as e:
+        raise ImportError(str(e)) from e
+    return getattr(module, class_name)
+
+
 try:
-    from International_Markets.Asian_Markets.cny_signal_generator import CNYSignalGenerator
-    from International_Markets.Asian_Markets.jpy_signal_generator import JPYSignalGenerator
-    from International_Markets.European_Markets.eur_signal_generator import EURSignalGenerator
-    from International_Markets.European_Markets.gbp_signal_generator import GBPUSDGenerator
-    from International_Markets.Pacific_Markets.aud_signal_generator import AUDUSDGenerator
-    from International_Markets.Emerging_Markets.brl_signal_generator import BRLSignalGenerator
-    from International_Markets.Crypto_Futures.eth_signal_generator import ETHSignalGenerator
+    CNYSignalGenerator = _load_generator(os.path.join('Asian Markets', 'cny_signal_generator.py'), 'CNYSignalGenerator')
+    JPYSignalGenerator = _load_generator(os.path.join('Asian Markets', 'jpy_signal_generator.py'), 'JPYSignalGenerator')
+    EURSignalGenerator = _load_generator(os.path.join('European Markets', 'eur_signal_generator.py'), 'EURSignalGenerator')
+    GBPUSDGenerator = _load_generator(os.path.join('European Markets', 'gbp_signal_generator.py'), 'GBPUSDGenerator')
+    AUDUSDGenerator = _load_generator(os.path.join('Pacific Markets', 'aud_signal_generator.py'), 'AUDUSDGenerator')
+    BRLSignalGenerator = _load_generator(os.path.join('Emerging Markets', 'brl_signal_generator.py'), 'BRLSignalGenerator')
+    ETHSignalGenerator = _load_generator(os.path.join('Crypto Futures', 'eth_signal_generator.py'), 'ETHSignalGenerator')
     INTERNATIONAL_GENERATORS_AVAILABLE = True
-except ImportError as e:
+except (ImportError, AttributeError) as e:
     logging.warning(f"International signal generators not available: {e}")
     INTERNATIONAL_GENERATORS_AVAILABLE = False
     CNYSignalGenerator = None
@@ -29,6 +52,24 @@ except ImportError as e:
     BRLSignalGenerator = None
     ETHSignalGenerator = None
 
+# Indicator parameters of each generator's _analyze_timeframe, for panel mode
+PANEL_SPECS = {
+    'cny': IndicatorSpec(),
+    'jpy': IndicatorSpec(),
+    'eur': IndicatorSpec(),
+    'gbp': IndicatorSpec(),
+    'aud': IndicatorSpec(),
+    'brl': IndicatorSpec(bb_std=2.5, volatility_annualization=np.sqrt(252)),
+    'eth': IndicatorSpec(sma_fast=10, sma_slow=30, ema=12, macd_fast=8, macd_slow=21, macd_signal=5,
+                         bb_std=3.0, volatility_annualization=np.sqrt(365 * 24), momentum_period=10),
+}
+
+# Generator-specific step between signal strength and the final signal
+SIGNAL_ADJUSTMENTS = {
+    'brl': '_apply_emerging_market_adjustments',
+    'eth': '_apply_crypto_adjustments',
+}
+
 class InternationalSignalAPI:
     """API for generating signals across international markets"""
 
@@ -144,9 +185,85 @@ class InternationalSignalAPI:
         """Get market information for a symbol"""
         return self.market_configs.get(symbol, {})
 
-    def get_all_market_info(self) -> Dict:
-        """Get information for all international markets"""
-        return self.market_configs
+    def get_all_market_info(self, include_signals: bool = False) -> Dict:
+        """Get information for all international markets, optionally with current signals"""
+        if not include_signals:
+            return self.market_configs
+
+        signals = self.generate_all_signals()
+        return {symbol: dict(config, signal=signals.get(symbol)) for symbol, config in self.market_configs.items()}
+
+    def generate_all_signals(self) -> Dict[str, Dict]:
+        """
+        Generate signals for every international market in panel mode.
+
+        Market data is still fetched per generator, but the close/high/low
+        series of all markets are stacked and every indicator is computed in
+        one vectorized pass per timeframe. Each generator then scores its own
+        slice of the result exactly as generate_signal() would.
+        """
+        market_data = {}
+        for key, generator in self.generators.items():
+            try:
+                market_data[key] = generator._fetch_market_data()
+            except Exception as e:
+                self.logger.warning(f"Failed to fetch {key} market data: {e}")
+                market_data[key] = {}
+
+        technical_analysis = {key: {} for key in self.generators}
+        timeframes = {timeframe for data in market_data.values() for timeframe in data}
+        for timeframe in sorted(timeframes):
+            frames = {key: data[timeframe] for key, data in market_data.items() if timeframe in data}
+            try:
+                indicators = compute_panel(frames, PANEL_SPECS)
+            except Exception as e:
+                self.logger.warning(f"Panel analysis failed for {timeframe}: {e}")
+                continue
+            for key in frames:
+                try:
+                    technical_analysis[key][timeframe] = self._panel_analysis(key, indicators, frames[key])
+                except Exception as e:
+                    self.logger.warning(f"Analysis failed for {key} {timeframe}: {e}")
+
+        symbols = {config['generator']: symbol for symbol, config in self.market_configs.items()}
+        signals = {}
+        for key, generator in self.generators.items():
+            symbol = symbols.get(key, key.upper())
+            try:
+                if not market_data[key]:
+                    signal = generator._empty_signal("Unable to fetch market data")
+                else:
+                    signal = self._signal_from_analysis(key, generator, technical_analysis[key])
+            except Exception as e:
+                self.logger.error(f"Error generating international signal for {symbol}: {e}")
+                signal = self._error_signal(symbol, str(e))
+
+            signal['international'] = True
+            signal['market_config'] = self.market_configs.get(symbol, {})
+            signals[symbol] = signal
+
+        return signals
+
+    def _panel_analysis(self, key: str, indicators, data) -> Dict:
+        """A generator's _analyze_timeframe result, built from its panel slice"""
+        generator = self.generators[key]
+        spec = PANEL_SPECS.get(key, IndicatorSpec())
+        analysis = indicators.analysis(key)
+        analysis['trend'] = generator._determine_trend(analysis[f'sma_{spec.sma_fast}'],
+                                                       analysis[f'sma_{spec.sma_slow}'],
+                                                       analysis[f'ema_{spec.ema}'])
+        if hasattr(generator, '_analyze_volume'):
+            volume = data['volume'].values if 'volume' in data.columns else np.ones(len(data))
+            analysis['volume_analysis'] = generator._analyze_volume(volume)
+        return analysis
+
+    def _signal_from_analysis(self, key: str, generator, technical_analysis: Dict) -> Dict:
+        """Score a precomputed analysis the way the generator's own generate_signal() does"""
+        signal_data = generator._calculate_signal_strength(technical_analysis)
+        adjustment = SIGNAL_ADJUSTMENTS.get(key)
+        if adjustment:
+            signal_data = getattr(generator, adjustment)(signal_data, technical_analysis)
+        return generator._generate_final_signal(signal_data, technical_analysis)
 
     def _map_symbol_to_generator(self, symbol: str) -> Optional[str]:
         """Map symbol to generator key"""
@@ -206,6 +323,10 @@ def get_international_market_info(symbol: str) -> Dict:
     """Convenience function to get market info"""
     return international_api.get_market_info(symbol)
 
+def get_all_international_signals() -> Dict[str, Dict]:
+    """Convenience function to get every international signal from one panel pass"""
+    return international_api.generate_all_signals()
+
 # Example usage and testing
 if __name__ == "__main__":
     print("International Signal API Test")
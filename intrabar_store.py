@@ -0,0 +1,134 @@
+"""
+Intrabar Store
+Memory-mapped lower-timeframe (1m/5m) bars for resolving ambiguous backtest candles
+
+A store is two .npy files: a sorted int64 timestamp column (nanoseconds),
+which doubles as the timestamp -> offset index, and an (n, 2) float64 array
+of high/low. Both are opened with mmap_mode='r', so only the pages around the
+looked-up bars are read from disk.
+"""
+
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class IntrabarStore:
+    """Read-only, memory-mapped lower-timeframe high/low series"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.timestamps = np.load(f"{path}.ts.npy", mmap_mode='r')
+        self.high_low = np.load(f"{path}.hl.npy", mmap_mode='r')
+        if len(self.timestamps) != len(self.high_low):
+            raise ValueError(f"Intrabar store {path} is corrupt: column lengths differ")
+
+    @classmethod
+    def from_dataframe(cls, data: pd.DataFrame, path: str) -> 'IntrabarStore':
+        """Write a lower-timeframe OHLC frame (DatetimeIndex) to disk and open it"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        data = data.sort_index()
+        timestamps = pd.DatetimeIndex(data.index).as_unit('ns').asi8.astype(np.int64)
+        high_low = np.column_stack([data['high'].to_numpy(float), data['low'].to_numpy(float)])
+
+        np.save(f"{path}.ts.npy", timestamps)
+        np.save(f"{path}.hl.npy", high_low)
+        return cls(path)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def offsets(self, start: pd.Timestamp, end: pd.Timestamp) -> Tuple[int, int]:
+        """Row range [first, last) of sub-bars with start <= timestamp < end"""
+        start_ns = pd.Timestamp(start).value
+        end_ns = pd.Timestamp(end).value
+        first = int(np.searchsorted(self.timestamps, start_ns, side='left'))
+        last = int(np.searchsorted(self.timestamps, end_ns, side='left'))
+        return first, last
+
+    def window(self, start: pd.Timestamp, end: pd.Timestamp) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(high, low) views of the sub-bars inside [start, end), or None if not covered"""
+        first, last = self.offsets(start, end)
+        if last <= first:
+            return None
+        block = self.high_low[first:last]
+        return block[:, 0], block[:, 1]
+
+
+def first_touch(high: np.ndarray, low: np.ndarray, direction: str,
+                stop_loss: float, target: float) -> Optional[str]:
+    """
+    Replay sub-bars in order and report which level was touched first.
+
+    Returns 'SL', 'TP', or None when neither is touched or the first touching
+    sub-bar hits both (still ambiguous at this resolution).
+    """
+    if direction == 'BUY':
+        stop_hits = low <= stop_loss
+        target_hits = high >= target
+    else:
+        stop_hits = high >= stop_loss
+        target_hits = low <= target
+
+    either = stop_hits | target_hits
+    if not either.any():
+        return None
+
+    first = int(np.argmax(either))
+    if stop_hits[first] and target_hits[first]:
+        return None
+    return 'SL' if stop_hits[first] else 'TP'
+
+
+def replay_exits(high: np.ndarray, low: np.ndarray, direction: str, entry_price: float, stop_loss: float,
+                 take_profit_1: float, take_profit_2: float, tp1_hit: bool = False,
+                 target_first_on_tie: bool = False) -> Optional[List[Tuple[str, float]]]:
+    """
+    Walk the sub-bars of one bar and list the exits they trigger, in order.
+
+    After TP1 the stop moves to breakeven (``entry_price``) and the walk
+    continues against that stop and TP2 until the trade closes or the
+    sub-bars run out. The sub-bar that fills TP1 is not checked against the
+    new stop.
+
+    Returns [(reason, level), ...] with reasons 'TP1', 'TP2' and 'SL', or None
+    when the first decision is still ambiguous at this resolution. A later
+    sub-bar touching both levels is settled by ``target_first_on_tie``.
+    """
+    sign = 1 if direction == 'BUY' else -1
+    exits: List[Tuple[str, float]] = []
+    start = 0
+    stop, target = stop_loss, (take_profit_2 if tp1_hit else take_profit_1)
+
+    while start < len(high):
+        stop_hits = (low[start:] <= stop) if sign == 1 else (high[start:] >= stop)
+        target_hits = (high[start:] >= target) if sign == 1 else (low[start:] <= target)
+        if exits:
+            stop_hits[0] = False            # The TP1 sub-bar's range is spent reaching TP1
+        either = stop_hits | target_hits
+        if not either.any():
+            break
+
+        first = int(np.argmax(either))
+        if stop_hits[first] and target_hits[first]:
+            if not exits:
+                return None
+            hit_target = target_first_on_tie
+        else:
+            hit_target = bool(target_hits[first])
+
+        if not hit_target:
+            exits.append(('SL', stop))
+            break
+        if tp1_hit or exits:
+            exits.append(('TP2', target))
+            break
+        exits.append(('TP1', target))
+        stop, target = entry_price, take_profit_2
+        start += first
+    return exits
@@ -0,0 +1,337 @@
+"""
+Lazy Loader
+Deferred feature imports, startup import profiling and boot profiles for the bot
+
+Heavy feature modules (pandas, scikit-learn, yfinance and the AI stacks behind
+them) are wrapped in proxies that import on first use, so the bot can come
+online before they load. The startup profiler records how long each module
+took to import, both at boot and when a deferred module is resolved later.
+"""
+
+import importlib
+import importlib.util
+import logging
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger('lazy_loader')
+
+# 'lean': bring the bot online first and warm optional modules in the background
+# 'full': import everything before polling starts (surfaces import errors at boot)
+BOOT_PROFILES = ('lean', 'full')
+DEFAULT_BOOT_PROFILE = 'lean'
+
+
+def get_boot_profile() -> str:
+    """Boot profile selected through the BOT_BOOT_PROFILE environment variable"""
+    profile = os.getenv('BOT_BOOT_PROFILE', DEFAULT_BOOT_PROFILE).strip().lower()
+    if profile not in BOOT_PROFILES:
+        logger.warning(f"Unknown BOT_BOOT_PROFILE '{profile}', using '{DEFAULT_BOOT_PROFILE}'")
+        return DEFAULT_BOOT_PROFILE
+    return profile
+
+
+def module_available(module_name: str) -> bool:
+    """Check that a module can be found without importing it"""
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+@dataclass
+class ImportRecord:
+    """Timing for a single module import"""
+    module: str
+    total_ms: float
+    self_ms: float
+    deferred: bool = False
+    thread: str = 'MainThread'
+
+
+class _TimingLoader:
+    """Wraps a module loader to time exec_module, then steps out of the way"""
+
+    def __init__(self, loader, profiler: 'StartupProfiler', name: str):
+        self._loader = loader
+        self._profiler = profiler
+        self._name = name
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        stack = self._profiler._stack()
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self._profiler._record(self._name, elapsed, elapsed - children)
+
+            # Restore the real loader so nothing downstream sees a wrapper,
+            # including one from another profiler wrapped inside this one
+            loader = self._loader
+            while isinstance(loader, _TimingLoader):
+                loader = loader._loader
+            module.__loader__ = loader
+            if getattr(module, '__spec__', None) is not None:
+                module.__spec__.loader = loader
+
+    def __getattr__(self, item):
+        return getattr(self._loader, item)
+
+
+class _ImportTimer:
+    """Meta path finder that attaches a timing loader to top-level imports"""
+
+    def __init__(self, profiler: 'StartupProfiler'):
+        self._profiler = profiler
+        self._local = threading.local()
+
+    def find_spec(self, fullname, path=None, target=None):
+        if '.' in fullname or getattr(self._local, 'finding', False):
+            return None
+
+        self._local.finding = True
+        try:
+            spec = None
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+        finally:
+            self._local.finding = False
+
+        if spec is not None and spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = _TimingLoader(spec.loader, self._profiler, fullname)
+        return spec
+
+
+class StartupProfiler:
+    """Records per-module import time and named boot milestones"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.imports: Dict[str, ImportRecord] = {}
+        self.marks: List[tuple] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._hook: Optional[_ImportTimer] = None
+        self._deferred = False
+
+    def install(self):
+        """Start timing top-level imports (idempotent)"""
+        if self._hook is None:
+            self._hook = _ImportTimer(self)
+            sys.meta_path.insert(0, self._hook)
+
+    def uninstall(self):
+        """Stop timing imports; deferred proxies keep recording their own resolution"""
+        if self._hook is not None:
+            try:
+                sys.meta_path.remove(self._hook)
+            except ValueError:
+                pass
+            self._hook = None
+
+    def mark(self, label: str):
+        """Record a boot milestone relative to profiler start"""
+        with self._lock:
+            self.marks.append((label, (time.perf_counter() - self.started_at) * 1000))
+
+    def finish_boot(self):
+        """Boot is over: later imports are reported as deferred"""
+        self.mark('boot complete')
+        self._deferred = True
+
+    def record_deferred(self, name: str, seconds: float):
+        """Record the resolution of a lazily imported feature"""
+        with self._lock:
+            if name not in self.imports:
+                self.imports[name] = ImportRecord(
+                    module=name, total_ms=seconds * 1000, self_ms=seconds * 1000,
+                    deferred=True, thread=threading.current_thread().name
+                )
+
+    def _stack(self) -> List[float]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, name: str, total: float, self_time: float):
+        with self._lock:
+            self.imports[name] = ImportRecord(
+                module=name, total_ms=total * 1000, self_ms=self_time * 1000,
+                deferred=self._deferred, thread=threading.current_thread().name
+            )
+
+    def summary(self, top: int = 15) -> Dict[str, Any]:
+        with self._lock:
+            records = list(self.imports.values())
+            marks = list(self.marks)
+
+        boot = [r for r in records if not r.deferred]
+        deferred = [r for r in records if r.deferred]
+        by_self_time = sorted(boot, key=lambda r: r.self_ms, reverse=True)
+
+        return {
+            'elapsed_ms': (time.perf_counter() - self.started_at) * 1000,
+            'modules_imported_at_boot': len(boot),
+            'boot_import_ms': sum(r.self_ms for r in boot),
+            'slowest_imports': [(r.module, round(r.self_ms, 1), round(r.total_ms, 1)) for r in by_self_time[:top]],
+            'deferred_imports': [(r.module, round(r.total_ms, 1), r.thread) for r in deferred],
+            'marks': [(label, round(ms, 1)) for label, ms in marks],
+        }
+
+    def report(self, top: int = 15) -> str:
+        summary = self.summary(top)
+        lines = [
+            "=" * 60,
+            "STARTUP IMPORT PROFILE",
+            "=" * 60,
+            f"Modules imported at boot: {summary['modules_imported_at_boot']} "
+            f"({summary['boot_import_ms']:.0f}ms of import time)",
+            "",
+            f"{'module':<36}{'self ms':>10}{'total ms':>12}",
+        ]
+        for module, self_ms, total_ms in summary['slowest_imports']:
+            lines.append(f"{module:<36}{self_ms:>10.1f}{total_ms:>12.1f}")
+
+        if summary['marks']:
+            lines.append("")
+            for label, ms in summary['marks']:
+                lines.append(f"[{ms:>9.1f}ms] {label}")
+
+        if summary['deferred_imports']:
+            lines.append("")
+            lines.append("Deferred (loaded after boot):")
+            for module, ms, thread in summary['deferred_imports']:
+                lines.append(f"  {module:<56}{ms:>10.1f}ms  ({thread})")
+
+        return "\n".join(lines)
+
+
+# Global profiler instance
+startup_profiler = StartupProfiler()
+
+
+class LazyProxy:
+    """
+    Stand-in for a module attribute or singleton that is built on first use.
+
+    Attribute access, calls and truth tests resolve the target. With
+    ``optional=True`` a failed import resolves to None (falsy), matching the
+    "set it to None if it fails to initialize" pattern used by the bot.
+    """
+
+    __slots__ = ('_factory', '_name', '_optional', '_target', '_resolved', '_lock')
+
+    def __init__(self, factory: Callable[[], Any], name: str, optional: bool = False):
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_optional', optional)
+        object.__setattr__(self, '_target', None)
+        object.__setattr__(self, '_resolved', False)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._resolved
+
+    def _resolve(self) -> Any:
+        if not self._resolved:
+            with self._lock:
+                if not self._resolved:
+                    start = time.perf_counter()
+                    try:
+                        target = self._factory()
+                    except Exception as e:
+                        if not self._optional:
+                            raise
+                        logger.warning(f"Deferred feature '{self._name}' unavailable: {e}")
+                        target = None
+                    startup_profiler.record_deferred(self._name, time.perf_counter() - start)
+                    object.__setattr__(self, '_target', target)
+                    object.__setattr__(self, '_resolved', True)
+        return self._target
+
+    def __getattr__(self, item):
+        target = self._resolve()
+        if target is None:
+            raise AttributeError(f"Deferred feature '{self._name}' is not available")
+        return getattr(target, item)
+
+    def __setattr__(self, key, value):
+        setattr(self._resolve(), key, value)
+
+    def __call__(self, *args, **kwargs):
+        target = self._resolve()
+        if target is None:
+            raise RuntimeError(f"Deferred feature '{self._name}' is not available")
+        return target(*args, **kwargs)
+
+    def __bool__(self):
+        return bool(self._resolve())
+
+    def __repr__(self):
+        state = repr(self._target) if self._resolved else 'not loaded'
+        return f"<LazyProxy {self._name}: {state}>"
+
+
+def lazy_import(module_name: str, optional: bool = False) -> LazyProxy:
+    """Proxy for a module that is imported on first attribute access"""
+    return LazyProxy(lambda: importlib.import_module(module_name), module_name, optional)
+
+
+def lazy_attr(module_name: str, attr: str, optional: bool = False) -> LazyProxy:
+    """Proxy for ``from module_name import attr`` resolved on first use"""
+    return LazyProxy(lambda: getattr(importlib.import_module(module_name), attr),
+                     f"{module_name}.{attr}", optional)
+
+
+def lazy_instance(factory: Callable[[], Any], name: str, optional: bool = True) -> LazyProxy:
+    """Proxy for a module-level singleton constructed on first use"""
+    return LazyProxy(factory, name, optional)
+
+
+def lazy_object(module_name: str, class_name: str, *args, optional: bool = True, **kwargs) -> LazyProxy:
+    """Proxy for ``module_name.class_name(*args, **kwargs)`` constructed on first use"""
+    def factory():
+        cls = getattr(importlib.import_module(module_name), class_name)
+        return cls(*args, **kwargs)
+    return LazyProxy(factory, f"{module_name}.{class_name}", optional)
+
+
+def warm_up(proxies: Iterable[LazyProxy], background: bool = True) -> Optional[threading.Thread]:
+    """Resolve deferred features now, optionally in a daemon thread"""
+    proxies = list(proxies)
+
+    def _load_all():
+        start = time.perf_counter()
+        for proxy in proxies:
+            try:
+                proxy._resolve()
+            except Exception as e:
+                logger.warning(f"Warm-up failed for '{proxy._name}': {e}")
+        startup_profiler.mark(f"warm-up of {len(proxies)} deferred features "
+                              f"({(time.perf_counter() - start) * 1000:.0f}ms)")
+
+    if not background:
+        _load_all()
+        return None
+
+    thread = threading.Thread(target=_load_all, daemon=True, name="FeatureWarmUp")
+    thread.start()
+    return thread
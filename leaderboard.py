@@ -6,14 +6,215 @@ Manages leaderboards for win rate, profit, activity, and streaks
 import json
 import os
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from itertools import islice
+from typing import Callable, Dict, List, Optional
+
+from sortedcontainers import SortedList
+
+CATEGORIES = ('winrate', 'profit', 'active', 'streak')
+PERIODS = ('all', 'monthly', 'weekly')
+WINDOW_PERIODS = ('monthly', 'weekly')
+MIN_TRADES = 20  # Minimum trades to appear on a leaderboard (prevents gaming)
+WINDOWS_FILE = 'leaderboard_windows.json'
+
+
+def period_key(period: str, now: datetime) -> str:
+    """Identifier of the week/month ``now`` falls in ('2025-W07', '2025-02')"""
+    if period == 'weekly':
+        year, week, _ = now.isocalendar()
+        return f"{year}-W{week:02d}"
+    return now.strftime('%Y-%m')
+
+
+def _sort_key(category: str, stats: Dict) -> tuple:
+    """Ascending sort key for best-first order"""
+    if category == 'winrate':
+        return (-stats['win_rate'], -stats['total_trades'])
+    if category == 'profit':
+        return (-stats['total_pips'],)
+    if category == 'active':
+        return (-stats['total_trades'],)
+    return (-abs(stats['best_streak']),)
+
+
+class RankedIndex:
+    """One leaderboard's eligible users, best first: O(log n) update, rank and top-N start"""
+
+    def __init__(self, category: str):
+        self.category = category
+        self._entries = SortedList()        # (sort key..., seq, user_id)
+        self._keys: Dict[str, tuple] = {}   # user_id -> entry currently in _entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._keys
+
+    def update(self, user_id: str, stats: Dict, seq: int):
+        entry = _sort_key(self.category, stats) + (seq, user_id)
+        old = self._keys.get(user_id)
+        if old == entry:
+            return
+        if old is not None:
+            self._entries.remove(old)
+        self._entries.add(entry)
+        self._keys[user_id] = entry
+
+    def discard(self, user_id: str):
+        old = self._keys.pop(user_id, None)
+        if old is not None:
+            self._entries.remove(old)
+
+    def rank(self, user_id: str) -> Optional[int]:
+        """1-indexed rank, or None if the user is not on this leaderboard"""
+        entry = self._keys.get(user_id)
+        return None if entry is None else self._entries.index(entry) + 1
+
+    def top(self, limit: int) -> List[str]:
+        return [entry[-1] for entry in islice(self._entries, max(limit, 0))]
+
+    def clear(self):
+        self._entries.clear()
+        self._keys.clear()
+
 
 class LeaderboardManager:
-    """Manages various leaderboards for trader rankings"""
+    """Manages various leaderboards for trader rankings
     
-    def __init__(self, profile_manager):
+    Rankings are kept in per-period, per-category sorted indexes that are
+    updated from profile change events (trade recorded, privacy changed), so
+    /leaderboard and rank lookups never rescan or re-sort all profiles.
+    'all' ranks lifetime profile stats; 'weekly' and 'monthly' rank trades
+    recorded in the current calendar week/month and roll off when it ends.
+    Window stats are saved to ``data_file`` (next to the profiles file by
+    default) so a restart keeps the current week/month.
+    """
+    
+    def __init__(self, profile_manager, clock: Callable[[], datetime] = datetime.now,
+                 data_file: Optional[str] = None):
         """Initialize with profile manager for data access"""
         self.profile_manager = profile_manager
+        if data_file is None:
+            profiles_file = getattr(profile_manager, 'data_file', None)
+            if profiles_file:
+                data_file = os.path.join(os.path.dirname(profiles_file), WINDOWS_FILE)
+        self.data_file = data_file
+        self.min_trades = MIN_TRADES
+        self._clock = clock
+        self._seq: Dict[str, int] = {}      # Profile order, breaks ties like a stable sort would
+        self._next_seq = 0
+        self.indexes = {period: {category: RankedIndex(category) for category in CATEGORIES}
+                        for period in PERIODS}
+        now = clock()
+        self.window_keys = {period: period_key(period, now) for period in WINDOW_PERIODS}
+        self.window_stats: Dict[str, Dict[str, Dict]] = {period: {} for period in WINDOW_PERIODS}
+        self.load_windows()
+        
+        self.rebuild()
+        if hasattr(profile_manager, 'add_change_listener'):
+            profile_manager.add_change_listener(self.on_profile_change)
+    
+    # ============================================================================
+    # PERSISTENCE
+    # ============================================================================
+    
+    def load_windows(self):
+        """Restore weekly/monthly stats saved for the current week/month (older windows are dropped)"""
+        if not self.data_file or not os.path.exists(self.data_file):
+            return
+        try:
+            with open(self.data_file, 'r') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        for period in WINDOW_PERIODS:
+            window = saved.get(period) or {}
+            if window.get('key') == self.window_keys[period]:
+                self.window_stats[period] = window.get('stats', {})
+    
+    def save_windows(self):
+        """Save weekly/monthly stats with the window they belong to"""
+        if not self.data_file:
+            return
+        saved = {period: {'key': self.window_keys[period], 'stats': self.window_stats[period]}
+                 for period in WINDOW_PERIODS}
+        with open(self.data_file, 'w') as f:
+            json.dump(saved, f, indent=2)
+    
+    # ============================================================================
+    # INDEX MAINTENANCE
+    # ============================================================================
+    
+    def rebuild(self):
+        """Re-index lifetime stats from every profile (startup, or after profiles are reloaded)"""
+        for index in self.indexes['all'].values():
+            index.clear()
+        for user_id, profile in self.profile_manager.profiles.items():
+            self._assign_seq(user_id)
+            self._reindex_user(user_id, profile)
+    
+    def on_profile_change(self, telegram_id: int, profile: Dict, trade_result: Optional[Dict] = None):
+        """Profile listener: record the trade in the period windows and re-rank the user"""
+        user_id = str(telegram_id)
+        self._assign_seq(user_id)
+        self._roll_windows()
+        if trade_result is not None:
+            for period in WINDOW_PERIODS:
+                self._record_window_trade(period, user_id, trade_result)
+            self.save_windows()
+        self._reindex_user(user_id, profile)
+    
+    def _assign_seq(self, user_id: str):
+        if user_id not in self._seq:
+            self._seq[user_id] = self._next_seq
+            self._next_seq += 1
+    
+    def _period_stats(self, period: str, user_id: str, profile: Dict) -> Optional[Dict]:
+        if period == 'all':
+            return profile['stats']
+        return self.window_stats[period].get(user_id)
+    
+    def _reindex_user(self, user_id: str, profile: Dict):
+        visible = profile['privacy'].get('show_in_leaderboard', True)
+        seq = self._seq[user_id]
+        for period in PERIODS:
+            stats = self._period_stats(period, user_id, profile)
+            eligible = visible and stats is not None and stats['total_trades'] >= self.min_trades
+            for index in self.indexes[period].values():
+                if eligible:
+                    index.update(user_id, stats, seq)
+                else:
+                    index.discard(user_id)
+    
+    def _record_window_trade(self, period: str, user_id: str, trade_result: Dict):
+        """Same bookkeeping as UserProfileManager.update_trade_stats, for one window"""
+        stats = self.window_stats[period].setdefault(user_id, {
+            'total_trades': 0, 'winning_trades': 0, 'losing_trades': 0, 'win_rate': 0.0,
+            'total_pips': 0.0, 'current_streak': 0, 'best_streak': 0
+        })
+        stats['total_trades'] += 1
+        if trade_result['won']:
+            stats['winning_trades'] += 1
+            stats['current_streak'] = max(0, stats['current_streak']) + 1
+        else:
+            stats['losing_trades'] += 1
+            stats['current_streak'] = min(0, stats['current_streak']) - 1
+        if abs(stats['current_streak']) > abs(stats['best_streak']):
+            stats['best_streak'] = stats['current_streak']
+        stats['win_rate'] = round((stats['winning_trades'] / stats['total_trades']) * 100, 1)
+        stats['total_pips'] += trade_result.get('pips', 0)
+    
+    def _roll_windows(self):
+        """Start a new week/month window once the calendar period has changed"""
+        now = self._clock()
+        for period in WINDOW_PERIODS:
+            key = period_key(period, now)
+            if key != self.window_keys[period]:
+                self.window_keys[period] = key
+                self.window_stats[period] = {}
+                for index in self.indexes[period].values():
+                    index.clear()
     
     # ============================================================================
     # LEADERBOARD GENERATION
@@ -30,74 +231,56 @@ class LeaderboardManager:
         Returns:
             List of dicts with user rankings
         """
-        # Get all profiles
+        if category not in CATEGORIES:
+            return []
+        if period not in PERIODS:
+            period = 'all'
+        self._roll_windows()
+        
         profiles = self.profile_manager.profiles
+        leaderboard = []
+        for rank, user_id in enumerate(self.indexes[period][category].top(limit), 1):
+            profile = profiles[user_id]
+            leaderboard.append(self._build_entry(rank, profile, self._period_stats(period, user_id, profile), category))
         
-        # Filter based on privacy settings
-        eligible_users = []
-        for user_id_str, profile in profiles.items():
-            # Check if user opted into leaderboard
-            if not profile['privacy'].get('show_in_leaderboard', True):
-                continue
-            
-            # Check minimum trades requirement (prevents gaming)
-            if profile['stats']['total_trades'] < 20:
-                continue
-            
-            eligible_users.append(profile)
+        return leaderboard
+    
+    def _build_entry(self, rank: int, profile: Dict, stats: Dict, category: str) -> Dict:
+        entry = {
+            'rank': rank,
+            'user_id': profile['telegram_id'],
+            'display_name': profile.get('display_name') or profile.get('username') or 'Anonymous',
+            'badges': profile.get('badges', []),
+            'stats': {}
+        }
         
-        # Sort based on category
+        # Add category-specific stats
         if category == 'winrate':
-            sorted_users = sorted(eligible_users, key=lambda x: (x['stats']['win_rate'], x['stats']['total_trades']), reverse=True)
+            entry['stats'] = {
+                'win_rate': stats['win_rate'],
+                'total_trades': stats['total_trades'],
+                'wins': stats['winning_trades']
+            }
         elif category == 'profit':
-            sorted_users = sorted(eligible_users, key=lambda x: x['stats']['total_pips'], reverse=True)
+            entry['stats'] = {
+                'total_pips': stats['total_pips'],
+                'win_rate': stats['win_rate'],
+                'total_trades': stats['total_trades']
+            }
         elif category == 'active':
-            sorted_users = sorted(eligible_users, key=lambda x: x['stats']['total_trades'], reverse=True)
+            entry['stats'] = {
+                'total_trades': stats['total_trades'],
+                'win_rate': stats['win_rate'],
+                'trades_this_month': profile['stats'].get('trades_this_month', 0)
+            }
         elif category == 'streak':
-            sorted_users = sorted(eligible_users, key=lambda x: abs(x['stats']['best_streak']), reverse=True)
-        else:
-            return []
-        
-        # Build leaderboard
-        leaderboard = []
-        for rank, profile in enumerate(sorted_users[:limit], 1):
-            entry = {
-                'rank': rank,
-                'user_id': profile['telegram_id'],
-                'display_name': profile.get('display_name') or profile.get('username') or 'Anonymous',
-                'badges': profile.get('badges', []),
-                'stats': {}
+            entry['stats'] = {
+                'best_streak': stats['best_streak'],
+                'current_streak': stats['current_streak'],
+                'win_rate': stats['win_rate']
             }
-            
-            # Add category-specific stats
-            if category == 'winrate':
-                entry['stats'] = {
-                    'win_rate': profile['stats']['win_rate'],
-                    'total_trades': profile['stats']['total_trades'],
-                    'wins': profile['stats']['winning_trades']
-                }
-            elif category == 'profit':
-                entry['stats'] = {
-                    'total_pips': profile['stats']['total_pips'],
-                    'win_rate': profile['stats']['win_rate'],
-                    'total_trades': profile['stats']['total_trades']
-                }
-            elif category == 'active':
-                entry['stats'] = {
-                    'total_trades': profile['stats']['total_trades'],
-                    'win_rate': profile['stats']['win_rate'],
-                    'trades_this_month': profile['stats'].get('trades_this_month', 0)
-                }
-            elif category == 'streak':
-                entry['stats'] = {
-                    'best_streak': profile['stats']['best_streak'],
-                    'current_streak': profile['stats']['current_streak'],
-                    'win_rate': profile['stats']['win_rate']
-                }
-            
-            leaderboard.append(entry)
         
-        return leaderboard
+        return entry
     
     # ============================================================================
     # LEADERBOARD FORMATTING
@@ -177,19 +360,16 @@ class LeaderboardManager:
     # USER RANKING
     # ============================================================================
     
-    def get_user_rank(self, telegram_id: int, category: str) -> Optional[int]:
+    def get_user_rank(self, telegram_id: int, category: str, period: str = 'all') -> Optional[int]:
         """Get user's rank in a specific leaderboard
         
         Returns:
             Rank (1-indexed) or None if not ranked
         """
-        leaderboard = self.get_leaderboard(category, 'all', limit=1000)
-        
-        for entry in leaderboard:
-            if entry['user_id'] == telegram_id:
-                return entry['rank']
-        
-        return None
+        if category not in CATEGORIES or period not in PERIODS:
+            return None
+        self._roll_windows()
+        return self.indexes[period][category].rank(str(telegram_id))
     
     def get_user_ranking_message(self, telegram_id: int) -> str:
         """Get user's rankings across all categories"""
@@ -4,14 +4,21 @@ Provides comprehensive monitoring, logging, and alerting for the trading bot
 """
 
 import logging
+import logging.handlers
 import os
 import json
+import queue
+import atexit
+import threading
+from bisect import bisect_left
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from functools import wraps
 import time
 import sys
 
+from unified_cache import cache_stats
+
 # Optional dependency - 
 # psutil for system metrics
 try:
@@ -25,12 +32,232 @@ except ImportError:
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
 
+
+class ResponseTimeHistogram:
+    """Fixed-size, log-spaced histogram of durations in seconds (O(1) memory)"""
+
+    def __init__(self, min_seconds: float = 0.001, max_seconds: float = 120.0, buckets_per_decade: int = 10):
+        bounds = []
+        bound = min_seconds
+        step = 10 ** (1.0 / buckets_per_decade)
+        while bound < max_seconds * step:
+            bounds.append(bound)
+            bound *= step
+        self.bounds = bounds                        # Upper bound of each bucket; last bucket is overflow
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.counts[bisect_left(self.bounds, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+            self.min = seconds if self.min is None else min(self.min, seconds)
+            self.max = seconds if self.max is None else max(self.max, seconds)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket holding the pct-th percentile (clamped to the observed range)"""
+        if not self.count:
+            return 0.0
+        rank = max(1, int(round(pct / 100.0 * self.count + 0.5)))
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                return min(max(upper, self.min), self.max)
+        return self.max
+
+    def snapshot(self) -> Dict:
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'min': self.min or 0.0,
+            'max': self.max or 0.0,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99)
+        }
+
+
+class JsonLineFormatter(logging.Formatter):
+    """One JSON object per record; structured fields come from ``extra={'data': {...}}``"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        data = getattr(record, 'data', None)
+        if data:
+            entry.update(data)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class BatchingJsonlFileHandler(logging.Handler):
+    """
+    JSONL file handler that buffers lines and writes them in batches, with
+    size-based rotation (file, file.1 ... file.N as RotatingFileHandler).
+
+    Meant to run on the QueueListener thread: BatchQueueListener flushes it
+    whenever the queue drains, so lines reach disk in one write per burst.
+    """
+
+    def __init__(self, filename: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5,
+                 batch_size: int = 256, logger_name: Optional[str] = None):
+        super().__init__()
+        self.baseFilename = os.path.abspath(filename)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.logger_name = logger_name        # Only records from this logger (None = all)
+        self.setFormatter(JsonLineFormatter())
+        self._buffer: List[str] = []
+        self._stream = None
+        self._size = 0
+        self.batches_written = 0
+        self.rotations = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.logger_name is not None and record.name != self.logger_name:
+            return False
+        return super().filter(record)
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self._buffer.append(self.format(record) + '\n')
+            if len(self._buffer) >= self.batch_size:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        if not self._buffer:
+            return
+        with self.lock:
+            data = ''.join(self._buffer).encode('utf-8')
+            self._buffer.clear()
+            if self._stream is None:
+                self._open()
+            if self.max_bytes > 0 and self._size > 0 and self._size + len(data) > self.max_bytes:
+                self._rotate()
+            self._stream.write(data)
+            self._stream.flush()
+            self._size += len(data)
+            self.batches_written += 1
+
+    def _open(self):
+        self._stream = open(self.baseFilename, 'ab')
+        self._size = self._stream.tell()
+
+    def _rotate(self):
+        self._stream.close()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                source = f"{self.baseFilename}.{i}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.baseFilename}.{i + 1}")
+            os.replace(self.baseFilename, f"{self.baseFilename}.1")
+        else:
+            open(self.baseFilename, 'wb').close()
+        self.rotations += 1
+        self._open()
+
+    def close(self):
+        try:
+            self.flush()
+            with self.lock:
+                if self._stream is not None:
+                    self._stream.close()
+                    self._stream = None
+        finally:
+            super().close()
+
+
+class DropOnFullQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller: records are dropped (and counted) when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DebugSampler(logging.Filter):
+    """Keep every record above DEBUG but only 1 in ``every`` DEBUG records per logger"""
+
+    def __init__(self, every: int = 100):
+        super().__init__()
+        self.every = max(1, every)
+        self.seen: Dict[str, int] = {}
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        n = self.seen.get(record.name, 0)
+        self.seen[record.name] = n + 1
+        if n % self.every == 0:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class BatchQueueListener(logging.handlers.QueueListener):
+    """QueueListener that flushes its handlers whenever the queue runs empty"""
+
+    def enqueue_sentinel(self):
+        # The queue may be full at shutdown: wait for the listener to make room
+        self.queue.put(self._sentinel, timeout=30)
+
+    def handle(self, record: logging.LogRecord):
+        super().handle(record)
+        if self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+
+
 class ProductionLogger:
     """Production-grade logging system"""
     
-    def __init__(self, log_dir="logs", log_level=logging.INFO):
+    def __init__(self, log_dir="logs", log_level=logging.INFO, max_bytes: int = 10 * 1024 * 1024,
+                 backup_count: int = 5, batch_size: int = 256, debug_sample_every: int = 100,
+                 queue_size: int = 10000):
+        """
+        Args:
+            log_dir: Directory for app.log, errors.log, performance.log and security.log (JSONL)
+            log_level: Level of the main application logger
+            max_bytes / backup_count: Size-based rotation of each log file
+            batch_size: Lines buffered before a write (the queue running empty also flushes)
+            debug_sample_every: Keep 1 in N DEBUG records per logger
+            queue_size: Records held in memory before new ones are dropped
+        """
         self.log_dir = log_dir
         os.makedirs(log_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.debug_sample_every = debug_sample_every
+        self.queue_size = queue_size
         
         # Setup loggers
         self.setup_loggers(log_level)
@@ -41,25 +268,27 @@ class ProductionLogger:
             'signals_generated': 0,
             'errors': 0,
             'warnings': 0,
-            'api_calls': 0,
-            'response_times': []
+            'api_calls': 0
         }
+        self.response_times = ResponseTimeHistogram()
 
     def log_info(self, message: str, data: Dict = None):
         """Generic info logging method"""
-        # #region agent log - Hypothesis A: Missing log_info method
-        try:
-            import json
-            log_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cursor', 'debug.log')
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"monitoring.py:47","message":"log_info method called","data":{"message":message,"data":data},"timestamp":int(__import__('time').time()*1000)}) + "\n")
-        except: pass
-        # #endregion
-
-        self.app_logger.info(f"{message} - {data if data else ''}")
+        self.app_logger.info(message, extra={'data': data} if data else None)
+
+    def log_debug(self, message: str, data: Dict = None):
+        """High-volume diagnostic logging (sampled, see debug_sample_every)"""
+        self.app_logger.debug(message, extra={'data': data} if data else None)
         
     def setup_loggers(self, log_level):
-        """Setup multiple loggers for different purposes"""
+        """
+        Setup multiple loggers for different purposes.
+
+        Loggers only enqueue records (QueueHandler on 'trading_bot'; the other
+        loggers propagate to it). A background BatchQueueListener formats them
+        as JSONL and writes them in batches, so slow disks never block a
+        command handler.
+        """
         
         # Main application logger
         self.app_logger = logging.getLogger('trading_bot')
@@ -77,48 +306,50 @@ class ProductionLogger:
         self.security_logger = logging.getLogger('trading_bot.security')
         self.security_logger.setLevel(logging.WARNING)
         
-        # Setup file handlers
-        handlers = [
-            logging.FileHandler(
-                os.path.join(self.log_dir, 'app.log'),
-                encoding='utf-8'
-            ),
-            logging.FileHandler(
-                os.path.join(self.log_dir, 'errors.log'),
-                encoding='utf-8'
-            ),
-            logging.FileHandler(
-                os.path.join(self.log_dir, 'performance.log'),
-                encoding='utf-8'
-            ),
-            logging.FileHandler(
-                os.path.join(self.log_dir, 'security.log'),
-                encoding='utf-8'
-            )
+        # File handlers (run on the listener thread); app.log receives every record
+        def file_handler(filename, logger_name=None):
+            return BatchingJsonlFileHandler(os.path.join(self.log_dir, filename), self.max_bytes,
+                                            self.backup_count, self.batch_size, logger_name)
+
+        self.file_handlers = [
+            file_handler('app.log'),
+            file_handler('errors.log', 'trading_bot.errors'),
+            file_handler('performance.log', 'trading_bot.performance'),
+            file_handler('security.log', 'trading_bot.security')
         ]
+        handlers = list(self.file_handlers)
         
         # Add console handler for development
         if os.getenv('DEBUG_MODE', 'false').lower() == 'true':
-            handlers.append(logging.StreamHandler(sys.stdout))
+            console = logging.StreamHandler(sys.stdout)
+            console.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT))
+            handlers.append(console)
         
-        formatter = logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+        # Hot path: sample debug records and enqueue without blocking
+        self.log_queue = queue.Queue(maxsize=self.queue_size)
+        self.queue_handler = DropOnFullQueueHandler(self.log_queue)
+        self.debug_sampler = DebugSampler(self.debug_sample_every)
+        self.queue_handler.addFilter(self.debug_sampler)
+        self.app_logger.addHandler(self.queue_handler)
         
-        for handler in handlers:
-            handler.setFormatter(formatter)
-            if 'errors.log' in handler.baseFilename:
-                self.error_logger.addHandler(handler)
-            elif 'performance.log' in handler.baseFilename:
-                self.perf_logger.addHandler(handler)
-            elif 'security.log' in handler.baseFilename:
-                self.security_logger.addHandler(handler)
-            else:
-                self.app_logger.addHandler(handler)
+        self.listener = BatchQueueListener(self.log_queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.close)
+    
+    def close(self):
+        """Drain the queue, write the last batch and stop the listener thread"""
+        if self.listener is None:
+            return
+        self.app_logger.removeHandler(self.queue_handler)
+        self.listener.stop()
+        self.listener = None
+        for handler in self.file_handlers:
+            handler.close()
     
     def log_command(self, command: str, user_id: int, success: bool = True, 
                     execution_time: float = None, error: str = None):
         """Log command execution"""
         log_data = {
-            'timestamp': datetime.now().isoformat(),
             'command': command,
             'user_id': user_id,
             'success': success,
@@ -128,68 +359,69 @@ class ProductionLogger:
         if error:
             log_data['error'] = error
             self.metrics['errors'] += 1
-            self.error_logger.error(json.dumps(log_data))
+            self.error_logger.error('command_failed', extra={'data': log_data})
         else:
             self.metrics['commands_executed'] += 1
-            self.app_logger.info(json.dumps(log_data))
+            self.app_logger.info('command', extra={'data': log_data})
         
         if execution_time:
-            self.metrics['response_times'].append(execution_time)
-            if len(self.metrics['response_times']) > 1000:
-                self.metrics['response_times'] = self.metrics['response_times'][-1000:]
+            self.response_times.record(execution_time)
     
     def log_signal(self, pair: str, direction: str, confidence: int):
         """Log signal generation"""
         self.metrics['signals_generated'] += 1
-        self.app_logger.info(json.dumps({
-            'timestamp': datetime.now().isoformat(),
-            'event': 'signal_generated',
+        self.app_logger.info('signal_generated', extra={'data': {
             'pair': pair,
             'direction': direction,
             'confidence': confidence
-        }))
+        }})
     
     def log_error(self, error: Exception, context: Dict = None):
         """Log errors with context"""
         self.metrics['errors'] += 1
         error_data = {
-            'timestamp': datetime.now().isoformat(),
             'error_type': type(error).__name__,
             'error_message': str(error),
             'context': context or {}
         }
-        self.error_logger.error(json.dumps(error_data))
+        self.error_logger.error('error', extra={'data': error_data})
     
     def log_security_event(self, event_type: str, user_id: int = None, 
                           details: Dict = None):
         """Log security-related events"""
-        self.security_logger.warning(json.dumps({
-            'timestamp': datetime.now().isoformat(),
+        self.security_logger.warning('security_event', extra={'data': {
             'event_type': event_type,
             'user_id': user_id,
             'details': details or {}
-        }))
+        }})
     
     def log_performance(self, operation: str, duration: float, 
                        metadata: Dict = None):
         """Log performance metrics"""
         perf_data = {
-            'timestamp': datetime.now().isoformat(),
             'operation': operation,
             'duration_ms': duration * 1000,
             'metadata': metadata or {}
         }
-        self.perf_logger.info(json.dumps(perf_data))
+        self.perf_logger.info('performance', extra={'data': perf_data})
+    
+    def get_logging_stats(self) -> Dict:
+        """Queue depth, dropped/sampled records and writer activity"""
+        return {
+            'queue_depth': self.log_queue.qsize(),
+            'dropped_records': self.queue_handler.dropped,
+            'sampled_out_debug': self.debug_sampler.sampled_out,
+            'batches_written': sum(h.batches_written for h in self.file_handlers),
+            'rotations': sum(h.rotations for h in self.file_handlers)
+        }
     
     def get_metrics(self) -> Dict:
         """Get current metrics"""
-        avg_response_time = 0
-        if self.metrics['response_times']:
-            avg_response_time = sum(self.metrics['response_times']) / len(self.metrics['response_times'])
-        
         return {
             **self.metrics,
-            'avg_response_time': avg_response_time,
+            'response_times': self.response_times.snapshot(),
+            'avg_response_time': self.response_times.mean,
+            'logging': self.get_logging_stats(),
             'system_metrics': self.get_system_metrics()
         }
     
@@ -406,6 +638,7 @@ class PerformanceMonitor:
             'api_performance': {
                 'total_calls': self.performance_metrics['api_calls']
             },
+            'caches': cache_stats(),
             'optimization_effectiveness': self.check_optimization_effectiveness()
         }
 
@@ -8,51 +8,49 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import time
 
+from news_ingestion import get_news_service
+
 class NewsFetcher:
     """
     Fetches BTC news from CoinDesk RSS feed
     100% FREE - No API key needed!
+
+    The feed is fetched by the shared news ingestion service; lookups read
+    its in-memory store.
     """
     
-    def __init__(self):
+    def __init__(self, ingestion=None):
         # CoinDesk Bitcoin RSS feed (always free, no key needed)
         self.rss_url = "https://www.coindesk.com/arc/outboundfeeds/rss/?outputType=xml"
-        
+        self.category = 'btc_coindesk'
+        self.ingestion = ingestion or get_news_service()
+        self.ingestion.add_feeds({self.category: [self.rss_url]})
+    
+    def _btc_news(self, since: Optional[datetime] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Bitcoin-related stored items, newest first, in this fetcher's item format"""
+        news_items = []
+        for item in self.ingestion.get_news(self.category, since=since):
+            title = item['title'] or ''
+            if 'bitcoin' in title.lower() or 'btc' in title.lower():
+                news_items.append({
+                    'title': title,
+                    'description': item['description'],
+                    'published_at': item.get('published_raw') or item['published_at'].strftime(
+                        "%a, %d %b %Y %H:%M:%S"),
+                    'source': 'CoinDesk',
+                    'url': item['url']
+                })
+                if limit is not None and len(news_items) >= limit:
+                    break
+        return news_items
+    
     def get_crypto_news(self, limit: int = 10) -> Optional[List[Dict]]:
         """
         Get latest BTC news from CoinDesk RSS feed
         100% free, no API key required
         """
         try:
-            response = requests.get(self.rss_url, timeout=10)
-            
-            if response.status_code != 200:
-                return None
-            
-            # Parse RSS XML
-            import xml.etree.ElementTree as ET
-            root = ET.fromstring(response.content)
-            
-            news_items = []
-            
-            # Find all items in the RSS feed
-            for item in root.findall('.//item')[:limit]:
-                title_elem = item.find('title')
-                link_elem = item.find('link')
-                pubdate_elem = item.find('pubDate')
-                desc_elem = item.find('description')
-                
-                # Only include Bitcoin-related news
-                title = title_elem.text if title_elem is not None else ''
-                if 'bitcoin' in title.lower() or 'btc' in title.lower():
-                    news_items.append({
-                        'title': title,
-                        'description': desc_elem.text if desc_elem is not None else '',
-                        'published_at': pubdate_elem.text if pubdate_elem is not None else '',
-                        'source': 'CoinDesk',
-                        'url': link_elem.text if link_elem is not None else ''
-                    })
-            
+            news_items = self._btc_news(limit=limit)
             return news_items if news_items else None
                 
         except Exception as e:
@@ -65,34 +63,9 @@ class NewsFetcher:
         Returns warning if important news found
         """
         try:
-            news = self.get_crypto_news(limit=20)
-            
-            # If news API unavailable, assume safe (don't block trades)
-            if not news:
-                return {
-                    'has_high_impact': False,
-                    'warning': None,  # No warning if we just can't fetch news
-                    'news_count': 0,
-                    'recent_news': []
-                }
-            
-            # Filter news from last N hours
-            from datetime import datetime, timedelta
+            # Time-indexed lookup: only items published inside the window
             cutoff_time = datetime.now() - timedelta(hours=hours_back)
-            recent_news = []
-            
-            for item in news:
-                try:
-                    # Parse RSS date format: "Mon, 25 Nov 2025 18:30:00 +0000"
-                    pub_time_str = item['published_at']
-                    pub_time = datetime.strptime(pub_time_str, "%a, %d %b %Y %H:%M:%S %z")
-                    pub_time = pub_time.replace(tzinfo=None)  # Remove timezone for comparison
-                    
-                    if pub_time > cutoff_time:
-                        recent_news.append(item)
-                except:
-                    # If can't parse time, skip it (don't include to avoid false positives)
-                    pass
+            recent_news = self._btc_news(since=cutoff_time)
             
             # Determine if high impact
             # Consider it high impact if there are 2+ Bitcoin news items in the timeframe
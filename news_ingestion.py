@@ -0,0 +1,408 @@
+"""
+News Ingestion Service
+Concurrent, conditional RSS ingestion into a time-indexed in-memory store
+
+All feeds are fetched in parallel on a thread pool. Each request carries the
+feed's last ETag / Last-Modified, so an unchanged feed costs a 304 and no
+parsing; a 200 whose body hashes the same as last time is not re-parsed
+either. Items are deduplicated per category by GUID (or a hash of the link)
+and indexed by publish time, so news lookups are answered from memory.
+
+Readers never wait on a warm store: a stale store triggers a refresh in the
+background and the current items are returned straight away. Only the first
+read of a never-fetched feed blocks, and only up to ``first_load_timeout``
+seconds - a slow feed host keeps loading in the background and its items
+appear on the next read.
+"""
+
+import bisect
+import hashlib
+import logging
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+try:
+    import feedparser
+    HAS_FEEDPARSER = True
+except ImportError:
+    HAS_FEEDPARSER = False
+
+try:
+    from bs4 import BeautifulSoup
+    HAS_BS4 = True
+except ImportError:
+    HAS_BS4 = False
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+
+def _to_local(value: datetime) -> datetime:
+    """Naive local time, the convention the news consumers compare against datetime.now()"""
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def _clean_description(description: str) -> str:
+    if not description:
+        return ''
+    if HAS_BS4:
+        try:
+            return BeautifulSoup(description, 'html.parser').get_text()[:200]
+        except Exception:
+            pass
+    return re.sub('<[^<]+?>', '', description)[:200]
+
+
+def _item_id(guid: Optional[str], url: str, title: str) -> str:
+    """GUID when the feed provides one, otherwise a hash of the link (or title)"""
+    if guid:
+        return guid
+    return hashlib.sha1((url or title).encode('utf-8', 'replace')).hexdigest()
+
+
+def parse_feed(content: bytes, fetched_at: Optional[datetime] = None) -> List[Dict]:
+    """Parse an RSS/Atom document into news items (feedparser when installed, plain XML otherwise)"""
+    fetched_at = fetched_at or datetime.now()
+    if HAS_FEEDPARSER:
+        return _parse_with_feedparser(content, fetched_at)
+    return _parse_with_xml(content, fetched_at)
+
+
+def _parse_with_feedparser(content: bytes, fetched_at: datetime) -> List[Dict]:
+    feed = feedparser.parse(content)
+    source = getattr(feed.feed, 'title', None) or 'News'
+    items = []
+    for entry in feed.entries:
+        try:
+            parsed = getattr(entry, 'published_parsed', None) or getattr(entry, 'updated_parsed', None)
+            if parsed:
+                pub_time = _to_local(datetime(*parsed[:6], tzinfo=timezone.utc))
+            else:
+                pub_time = fetched_at
+            url = getattr(entry, 'link', '')
+            title = getattr(entry, 'title', 'No title')
+            items.append({
+                'id': _item_id(getattr(entry, 'id', None), url, title),
+                'title': title,
+                'description': _clean_description(getattr(entry, 'summary', None)
+                                                  or getattr(entry, 'description', '')),
+                'published_at': pub_time,
+                'published_raw': getattr(entry, 'published', None) or getattr(entry, 'updated', ''),
+                'source': source,
+                'url': url,
+            })
+        except Exception:
+            continue
+    return items
+
+
+def _parse_with_xml(content: bytes, fetched_at: datetime) -> List[Dict]:
+    root = ET.fromstring(content)
+    channel_title = root.find('./channel/title')
+    source = channel_title.text if channel_title is not None and channel_title.text else 'News'
+    items = []
+    for item in root.findall('.//item'):
+        try:
+            def text(tag):
+                elem = item.find(tag)
+                return elem.text if elem is not None and elem.text else ''
+
+            raw_date = text('pubDate')
+            try:
+                pub_time = _to_local(parsedate_to_datetime(raw_date)) if raw_date else fetched_at
+            except (TypeError, ValueError):
+                pub_time = fetched_at
+            url, title = text('link'), text('title') or 'No title'
+            items.append({
+                'id': _item_id(text('guid'), url, title),
+                'title': title,
+                'description': _clean_description(text('description')),
+                'published_at': pub_time,
+                'published_raw': raw_date,
+                'source': source,
+                'url': url,
+            })
+        except Exception:
+            continue
+    return items
+
+
+class NewsStore:
+    """Deduplicated news items per category, indexed by publish time"""
+
+    def __init__(self, max_age_hours: float = 48, max_items_per_category: int = 500):
+        self.max_age = timedelta(hours=max_age_hours)
+        self.max_items_per_category = max_items_per_category
+        self._items: Dict[str, Dict[str, Dict]] = {}                       # category -> {id: item}
+        self._index: Dict[str, List[Tuple[datetime, int, str]]] = {}       # category -> sorted keys
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(items) for items in self._items.values())
+
+    def add_many(self, category: str, items: List[Dict]) -> int:
+        """Insert items not seen before in this category; returns how many were new"""
+        added = 0
+        with self._lock:
+            seen = self._items.setdefault(category, {})
+            index = self._index.setdefault(category, [])
+            for item in items:
+                if item['id'] in seen:
+                    continue
+                item = dict(item, category=category)
+                seen[item['id']] = item
+                self._seq += 1
+                bisect.insort(index, (item['published_at'], self._seq, item['id']))
+                added += 1
+            self._prune(category)
+        return added
+
+    def _prune(self, category: str):
+        index, seen = self._index[category], self._items[category]
+        cutoff = datetime.now() - self.max_age
+        drop = bisect.bisect_left(index, (cutoff,))
+        drop = max(drop, len(index) - self.max_items_per_category)
+        for _, _, item_id in index[:drop]:
+            seen.pop(item_id, None)
+        del index[:drop]
+
+    def query(self, category: str, since: Optional[datetime] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Items of a category published after ``since``, newest first"""
+        with self._lock:
+            index = self._index.get(category, [])
+            start = bisect.bisect_right(index, (since, float('inf'))) if since is not None else 0
+            keys = index[start:][::-1]
+            if limit is not None:
+                keys = keys[:limit]
+            seen = self._items[category] if keys else {}
+            return [dict(seen[item_id]) for _, _, item_id in keys]
+
+
+@dataclass
+class FeedState:
+    """Validators and counters for one feed"""
+    url: str
+    category: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    last_fetch: Optional[float] = None
+    last_error: Optional[str] = None
+    fetches: int = 0
+    not_modified: int = 0
+    unchanged: int = 0
+    errors: int = 0
+    items_added: int = 0
+
+
+class NewsIngestionService:
+    """Fetches every registered feed concurrently into a NewsStore"""
+
+    def __init__(self, feeds: Optional[Dict[str, List[str]]] = None, session=None, store: Optional[NewsStore] = None,
+                 max_workers: int = 8, refresh_interval: float = 300, request_timeout: float = 10,
+                 first_load_timeout: float = 5.0, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            feeds: {category: [feed urls]}
+            session: requests.Session-compatible object used for every fetch
+            refresh_interval: Seconds after which a read triggers a background refresh
+            request_timeout: Per-request HTTP timeout
+            first_load_timeout: How long the first (cold) read waits for feeds
+        """
+        if session is None:
+            session = requests.Session()
+            session.headers.update({'User-Agent': USER_AGENT})
+        self.session = session
+        self.store = store or NewsStore()
+        self.refresh_interval = refresh_interval
+        self.request_timeout = request_timeout
+        self.first_load_timeout = first_load_timeout
+        self.clock = clock
+
+        self.feeds: Dict[str, FeedState] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='news')
+        self._inflight: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._last_refresh: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if feeds:
+            self.add_feeds(feeds)
+
+    def add_feeds(self, feeds: Dict[str, List[str]]):
+        """Register feeds (already registered URLs are left as they are)"""
+        with self._lock:
+            for category, urls in feeds.items():
+                for url in urls:
+                    key = f"{category}|{url}"
+                    if key not in self.feeds:
+                        self.feeds[key] = FeedState(url, category)
+
+    def refresh(self, wait_for: bool = True, timeout: Optional[float] = None,
+                categories: Optional[List[str]] = None) -> Dict:
+        """
+        Fetch all feeds (or those of ``categories``) in parallel
+
+        Args:
+            wait_for: Block until the fetches finish or ``timeout`` passes
+            timeout: Seconds to wait; feeds still loading finish in the background
+
+        Returns:
+            {'feeds': started, 'completed': finished in time, 'added': new items}
+        """
+        futures = []
+        with self._lock:
+            self._last_refresh = self.clock()
+            for key, state in self.feeds.items():
+                if categories is not None and state.category not in categories:
+                    continue
+                running = self._inflight.get(key)
+                if running is None or running.done():
+                    running = self._inflight[key] = self._executor.submit(self._fetch_feed, state)
+                futures.append(running)
+
+        if not wait_for:
+            return {'feeds': len(futures), 'completed': 0, 'added': 0}
+        done, _ = wait(futures, timeout=timeout)
+        added = sum(f.result() for f in done if f.exception() is None)
+        return {'feeds': len(futures), 'completed': len(done), 'added': added}
+
+    def refresh_if_stale(self, categories: Optional[List[str]] = None):
+        """Never-fetched feeds: wait briefly for a first load. Stale store: refresh in the background."""
+        cold = {state.category for state in self.feeds.values()
+                if state.last_fetch is None and (categories is None or state.category in categories)}
+        if cold:
+            self.refresh(timeout=self.first_load_timeout, categories=list(cold))
+        elif self._last_refresh is None or self.clock() - self._last_refresh >= self.refresh_interval:
+            self.refresh(wait_for=False)
+
+    def get_news(self, category: str, since: Optional[datetime] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Stored items of a category, newest first (no network I/O once warm)"""
+        self.refresh_if_stale([category])
+        return self.store.query(category, since=since, limit=limit)
+
+    def _fetch_feed(self, state: FeedState) -> int:
+        """One conditional GET; returns the number of new items stored"""
+        headers = {}
+        if state.etag:
+            headers['If-None-Match'] = state.etag
+        if state.last_modified:
+            headers['If-Modified-Since'] = state.last_modified
+
+        state.fetches += 1
+        state.last_fetch = self.clock()
+        try:
+            response = self.session.get(state.url, headers=headers, timeout=self.request_timeout)
+            if response.status_code == 304:
+                state.not_modified += 1
+                return 0
+            if response.status_code != 200:
+                state.errors += 1
+                state.last_error = f"HTTP {response.status_code}"
+                return 0
+
+            state.etag = response.headers.get('ETag') or state.etag
+            state.last_modified = response.headers.get('Last-Modified') or state.last_modified
+            digest = hashlib.sha1(response.content).hexdigest()
+            if digest == state.content_hash:
+                state.unchanged += 1
+                return 0
+
+            added = self.store.add_many(state.category, parse_feed(response.content))
+            state.content_hash = digest
+            state.items_added += added
+            state.last_error = None
+            return added
+        except Exception as e:
+            state.errors += 1
+            state.last_error = str(e)
+            logger.warning(f"News feed {state.url} failed: {e}")
+            return 0
+
+    def start(self, interval: Optional[float] = None):
+        """Refresh all feeds on a background thread every ``interval`` seconds"""
+        if self._thread and self._thread.is_alive():
+            return
+        interval = interval or self.refresh_interval
+        self._stop.clear()
+
+        def run():
+            while not self._stop.is_set():
+                self.refresh(timeout=interval)
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=run, name='news-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def get_stats(self) -> Dict:
+        """Per-feed fetch counters and store size"""
+        return {
+            'items': len(self.store),
+            'last_refresh': self._last_refresh,
+            'feeds': {key: {'fetches': s.fetches, 'not_modified': s.not_modified, 'unchanged': s.unchanged,
+                            'errors': s.errors, 'items_added': s.items_added, 'last_error': s.last_error}
+                      for key, s in self.feeds.items()},
+        }
+
+
+# Global ingestion service shared by the news fetchers
+news_service = None
+_service_lock = threading.Lock()
+
+
+def get_news_service() -> NewsIngestionService:
+    """Get the global news ingestion service"""
+    global news_service
+    with _service_lock:
+        if news_service is None:
+            news_service = NewsIngestionService()
+    return news_service
+
+
+def main():
+    """Fetch the standard feeds twice to show conditional requests at work"""
+    from comprehensive_news_fetcher import ComprehensiveNewsFetcher
+
+    print("=" * 60)
+    print("NEWS INGESTION SERVICE")
+    print("=" * 60)
+
+    fetcher = ComprehensiveNewsFetcher()
+    service = fetcher.ingestion
+
+    for attempt in ('Cold', 'Warm'):
+        start = time.perf_counter()
+        result = service.refresh(timeout=15)
+        elapsed = time.perf_counter() - start
+        print(f"\n{attempt} refresh: {result['completed']}/{result['feeds']} feeds, "
+              f"{result['added']} new items in {elapsed:.2f}s")
+
+    for key, stats in service.get_stats()['feeds'].items():
+        print(f"  {key}: {stats}")
+
+    start = time.perf_counter()
+    fetcher.get_all_news(limit_per_category=3)
+    print(f"\nget_all_news from store: {(time.perf_counter() - start) * 1000:.1f}ms")
+    print("\n" + "=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,599 @@
+"""
+Offline Load Test Harness
+Drives the real bot handlers in-process against a fake Telegram Bot API
+
+The bot's Application is built with a stand-in request object, so every Bot
+API call (sendMessage, editMessageText, answerCallbackQuery, ...) is answered
+locally, and synthetic updates are put straight onto the update queue. Market
+data requests made through ``requests`` are answered from recorded fixtures.
+A run replays a weighted mix of commands, callbacks, /allsignals and alert
+fan-outs at a fixed arrival rate and reports per-handler p50/p95/p99 latency,
+event-loop lag and throughput. Thresholds turn the report into a pass/fail
+regression gate (see main()).
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from telegram import Update
+from telegram.ext import Application
+from telegram.request import BaseRequest, RequestData
+
+from load_testing import LoadTester
+
+logger = logging.getLogger(__name__)
+
+BOT_TOKEN = "123456:OFFLINE-LOAD-TEST"
+BOT_USER = {'id': 123456, 'is_bot': True, 'first_name': 'Load Test Bot', 'username': 'load_test_bot'}
+FIRST_USER_ID = 900000000
+
+# Weighted actions: "/command args", "cb:<callback data>" or "alert"
+DEFAULT_MIX = {
+    '/start': 6,
+    '/help': 6,
+    '/btc': 10,
+    '/gold': 8,
+    '/eurusd': 6,
+    '/news': 4,
+    '/leaderboard': 3,
+    '/stats': 3,
+    '/allsignals': 2,
+    'cb:help_signals': 4,
+    'cb:cmd_trading': 3,
+    'alert': 1,
+}
+
+
+class FakeBotAPI(BaseRequest):
+    """Answers Bot API calls locally instead of sending them to api.telegram.org"""
+
+    def __init__(self, latency: float = 0.0):
+        """
+        Args:
+            latency: Seconds each call takes, to model the round trip to Telegram
+        """
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self._message_id = 0
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url: str, method: str, request_data: Optional[RequestData] = None,
+                         read_timeout=None, write_timeout=None, connect_timeout=None, pool_timeout=None):
+        api_method = url.rsplit('/', 1)[-1]
+        params = request_data.parameters if request_data else {}
+        self.calls[api_method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return 200, json.dumps({'ok': True, 'result': self._result(api_method, params)}).encode()
+
+    def _result(self, api_method: str, params: Dict):
+        if api_method == 'getMe':
+            return BOT_USER
+        if api_method.startswith(('send', 'edit', 'copy', 'forward')):
+            self._message_id += 1
+            chat_id = params.get('chat_id', 0)
+            try:
+                chat_id = int(chat_id)
+            except (TypeError, ValueError):
+                pass
+            return {'message_id': params.get('message_id', self._message_id), 'date': int(time.time()),
+                    'chat': {'id': chat_id, 'type': 'private'}, 'from': BOT_USER,
+                    'text': params.get('text') or params.get('caption') or ''}
+        if api_method == 'getChat':
+            return {'id': params.get('chat_id', 0), 'type': 'private'}
+        return True
+
+
+class FixtureHTTP:
+    """
+    Serves ``requests`` calls from recorded JSON fixtures while active
+
+    Each fixture file holds {'method', 'url', 'status', 'headers', 'body'}.
+    Requests match on method and full URL, then on method and URL without the
+    query string. Unmatched requests get a 503 so nothing leaves the machine,
+    unless recording, in which case they go out and the response is saved.
+    Only ``requests`` is covered; aiohttp and other HTTP clients are not.
+    """
+
+    def __init__(self, fixture_dir: Optional[str] = None, record: bool = False):
+        self.fixture_dir = fixture_dir
+        self.record = record
+        self.fixtures: Dict[tuple, Dict] = {}
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self._original_send = None
+        if fixture_dir and os.path.isdir(fixture_dir):
+            for name in sorted(os.listdir(fixture_dir)):
+                if name.endswith('.json'):
+                    with open(os.path.join(fixture_dir, name)) as f:
+                        self.add(json.load(f))
+
+    @staticmethod
+    def _keys(method: str, url: str):
+        parts = urlsplit(url)
+        return (method.upper(), url), (method.upper(), f"{parts.scheme}://{parts.netloc}{parts.path}")
+
+    def add(self, fixture: Dict):
+        exact, path = self._keys(fixture.get('method', 'GET'), fixture['url'])
+        self.fixtures[exact] = fixture
+        self.fixtures.setdefault(path, fixture)
+
+    def lookup(self, method: str, url: str) -> Optional[Dict]:
+        exact, path = self._keys(method, url)
+        return self.fixtures.get(exact) or self.fixtures.get(path)
+
+    def _save(self, request, response):
+        fixture = {'method': request.method, 'url': request.url, 'status': response.status_code,
+                   'headers': {'Content-Type': response.headers.get('Content-Type', '')},
+                   'body': response.text}
+        self.add(fixture)
+        if self.fixture_dir:
+            os.makedirs(self.fixture_dir, exist_ok=True)
+            name = hashlib.sha1(f"{request.method} {request.url}".encode()).hexdigest()[:16]
+            with open(os.path.join(self.fixture_dir, f"{name}.json"), 'w') as f:
+                json.dump(fixture, f, indent=2)
+
+    def _send(self, adapter, request, **kwargs):
+        host = urlsplit(request.url).netloc
+        fixture = self.lookup(request.method, request.url)
+        if fixture is None and self.record:
+            response = self._original_send(adapter, request, **kwargs)
+            self._save(request, response)
+            return response
+
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        if fixture is None:
+            self.misses[host] += 1
+            response.status_code, response.reason = 503, 'Offline'
+            response._content = b'{"error": "no recorded fixture"}'
+            return response
+
+        self.hits[host] += 1
+        body = fixture.get('body', '')
+        response.status_code = fixture.get('status', 200)
+        response.reason = 'OK'
+        response.headers.update(fixture.get('headers') or {})
+        response._content = (body if isinstance(body, str) else json.dumps(body)).encode()
+        response.encoding = 'utf-8'
+        return response
+
+    def __enter__(self):
+        self._original_send = HTTPAdapter.send
+        fixtures = self
+
+        def send(adapter, request, **kwargs):
+            return fixtures._send(adapter, request, **kwargs)
+
+        HTTPAdapter.send = send
+        return self
+
+    def __exit__(self, *exc):
+        HTTPAdapter.send = self._original_send
+        return False
+
+
+class EventLoopLagMonitor:
+    """Measures how late the event loop wakes a task that sleeps at a fixed interval"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+def latency_summary(samples: List[float]) -> Dict:
+    """count, mean, p50, p95, p99 and max in milliseconds"""
+    if not samples:
+        return {'count': 0, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+    return {
+        'count': len(samples),
+        'mean_ms': round(sum(samples) / len(samples) * 1000, 2),
+        'p50_ms': round(LoadTester.percentile(samples, 50) * 1000, 2),
+        'p95_ms': round(LoadTester.percentile(samples, 95) * 1000, 2),
+        'p99_ms': round(LoadTester.percentile(samples, 99) * 1000, 2),
+        'max_ms': round(max(samples) * 1000, 2),
+    }
+
+
+@dataclass
+class LoadProfile:
+    """What to replay: action weights, arrival rate and user pool"""
+    mix: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_MIX))
+    rate: float = 20.0              # Arrivals per second (Poisson)
+    duration: float = 30.0          # Seconds of arrivals
+    users: int = 500                # Distinct synthetic users
+    fanout_size: int = 200          # Subscribers reached by each alert
+    seed: Optional[int] = None
+
+
+class OfflineLoadTester:
+    """Boots the bot against FakeBotAPI and replays a LoadProfile"""
+
+    def __init__(self, profile: Optional[LoadProfile] = None, api_latency: float = 0.0,
+                 fixture_dir: Optional[str] = None, record: bool = False,
+                 register: Optional[Callable] = None, concurrent_updates: bool = True,
+                 drain_timeout: float = 60.0):
+        """
+        Args:
+            api_latency: Simulated Bot API round trip in seconds
+            fixture_dir: Recorded market data fixtures (see FixtureHTTP)
+            register: Adds handlers to the Application (default telegram_bot.register_handlers)
+            concurrent_updates: Process updates concurrently, as the bot does in production
+            drain_timeout: Seconds to wait for in-flight updates after the last arrival
+        """
+        self.profile = profile or LoadProfile()
+        self.api_latency = api_latency
+        self.fixture_dir = fixture_dir
+        self.record = record
+        self.register = register
+        self.concurrent_updates = concurrent_updates
+        self.drain_timeout = drain_timeout
+        self.rng = random.Random(self.profile.seed)
+
+        self.api: Optional[FakeBotAPI] = None
+        self.app: Optional[Application] = None
+        self.service_times: Dict[str, List[float]] = defaultdict(list)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self._injected: Dict[int, float] = {}
+        self._update_id = 0
+        self._alerts_running = 0
+        self._saved_alert_state = None
+
+    # ------------------------------------------------------------------
+    # Application setup
+    # ------------------------------------------------------------------
+
+    def _build_app(self) -> Application:
+        self.api = FakeBotAPI(self.api_latency)
+        app = (Application.builder().token(BOT_TOKEN)
+               .request(self.api).get_updates_request(FakeBotAPI())
+               .concurrent_updates(self.concurrent_updates).build())
+        register = self.register
+        if register is None:
+            from telegram_bot import register_handlers as register
+        register(app)
+        self._instrument(app)
+        return app
+
+    @staticmethod
+    def _label(update: Update) -> str:
+        if update.callback_query is not None:
+            return f"cb:{update.callback_query.data}"
+        message = update.effective_message
+        if message is not None and message.text:
+            return message.text.split()[0].split('@')[0]
+        return 'other'
+
+    def _instrument(self, app: Application):
+        """Wrap every handler callback to record service time and end-to-end latency"""
+        for handlers in app.handlers.values():
+            for handler in handlers:
+                handler.callback = self._timed(handler.callback)
+
+    def _timed(self, callback):
+        tester = self
+
+        async def timed(update, context):
+            loop = asyncio.get_running_loop()
+            label = tester._label(update) if isinstance(update, Update) else 'other'
+            start = loop.time()
+            try:
+                return await callback(update, context)
+            except Exception:
+                tester.errors[label] += 1
+                raise
+            finally:
+                end = loop.time()
+                tester.service_times[label].append(end - start)
+                injected = tester._injected.pop(getattr(update, 'update_id', None), None)
+                if injected is not None:
+                    tester.latencies[label].append(end - injected)
+
+        return timed
+
+    # ------------------------------------------------------------------
+    # Synthetic traffic
+    # ------------------------------------------------------------------
+
+    def _user(self, user_id: int) -> Dict:
+        return {'id': user_id, 'is_bot': False, 'first_name': f'Load{user_id}',
+                'username': f'load{user_id}', 'language_code': 'en'}
+
+    def _next_update_id(self) -> int:
+        self._update_id += 1
+        return self._update_id
+
+    def command_update(self, text: str, user_id: int) -> Update:
+        update_id = self._next_update_id()
+        command = text.split()[0]
+        data = {'update_id': update_id, 'message': {
+            'message_id': update_id, 'date': int(time.time()), 'text': text,
+            'chat': {'id': user_id, 'type': 'private'}, 'from': self._user(user_id),
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(command)}]
+            if command.startswith('/') else [],
+        }}
+        return Update.de_json(data, self.app.bot)
+
+    def callback_update(self, callback_data: str, user_id: int) -> Update:
+        update_id = self._next_update_id()
+        data = {'update_id': update_id, 'callback_query': {
+            'id': str(update_id), 'from': self._user(user_id), 'chat_instance': str(user_id),
+            'data': callback_data,
+            'message': {'message_id': update_id, 'date': int(time.time()), 'text': 'Menu',
+                        'chat': {'id': user_id, 'type': 'private'}, 'from': BOT_USER},
+        }}
+        return Update.de_json(data, self.app.bot)
+
+    async def inject(self, update: Update):
+        self._injected[update.update_id] = asyncio.get_running_loop().time()
+        await self.app.update_queue.put(update)
+
+    async def fan_out_alert(self):
+        """
+        Run the bot's signal alert check with every synthetic user subscribed
+
+        The bot's subscriber set and last-signal flags are swapped out while
+        alerts are running and put back when the last overlapping one ends.
+        """
+        import telegram_bot
+
+        if self._alerts_running == 0:
+            self._saved_alert_state = (telegram_bot.subscribed_users,
+                                       telegram_bot.last_btc_signal, telegram_bot.last_gold_signal)
+            subscribers = range(FIRST_USER_ID, FIRST_USER_ID + self.profile.fanout_size)
+            telegram_bot.subscribed_users = set(telegram_bot.subscribed_users).union(subscribers)
+        self._alerts_running += 1
+        telegram_bot.last_btc_signal = telegram_bot.last_gold_signal = False
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            await telegram_bot.check_signals_and_alert(self.app)
+        except Exception:
+            self.errors['alert'] += 1
+        finally:
+            elapsed = loop.time() - start
+            self.service_times['alert'].append(elapsed)
+            self.latencies['alert'].append(elapsed)
+            self._alerts_running -= 1
+            if self._alerts_running == 0:
+                (telegram_bot.subscribed_users,
+                 telegram_bot.last_btc_signal, telegram_bot.last_gold_signal) = self._saved_alert_state
+                self._saved_alert_state = None
+
+    async def _drive(self) -> int:
+        """Poisson arrivals for the profile's duration; returns the number of actions started"""
+        profile = self.profile
+        actions, weights = list(profile.mix), list(profile.mix.values())
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + profile.duration
+        tasks, started = [], 0
+        while True:
+            await asyncio.sleep(self.rng.expovariate(profile.rate))
+            if loop.time() >= deadline:
+                break
+            action = self.rng.choices(actions, weights)[0]
+            user_id = FIRST_USER_ID + self.rng.randrange(profile.users)
+            if action == 'alert':
+                tasks.append(loop.create_task(self.fan_out_alert()))
+            elif action.startswith('cb:'):
+                await self.inject(self.callback_update(action[3:], user_id))
+            else:
+                await self.inject(self.command_update(action, user_id))
+            started += 1
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return started
+
+    async def _drain(self):
+        """Wait until the application has processed every injected update"""
+        try:
+            await asyncio.wait_for(self.app.update_queue.join(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("%d updates still in flight after %.0fs", len(self._injected), self.drain_timeout)
+
+    # ------------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------------
+
+    async def run(self) -> Dict:
+        """Replay the profile once and return the report"""
+        self.service_times.clear()
+        self.latencies.clear()
+        self.errors.clear()
+        self._injected.clear()
+
+        with FixtureHTTP(self.fixture_dir, self.record) as fixtures:
+            self.app = self._build_app()
+            await self.app.initialize()
+            await self.app.start()
+            lag = EventLoopLagMonitor()
+            lag.start()
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            try:
+                started = await self._drive()
+                await self._drain()
+            finally:
+                elapsed = loop.time() - start
+                await lag.stop()
+                await self.app.stop()
+                await self.app.shutdown()
+
+        completed = sum(len(samples) for samples in self.latencies.values())
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'profile': {'rate': self.profile.rate, 'duration': self.profile.duration,
+                        'users': self.profile.users, 'fanout_size': self.profile.fanout_size,
+                        'api_latency': self.api_latency},
+            'started': started,
+            'completed': completed,
+            'unhandled': len(self._injected),
+            'elapsed_s': round(elapsed, 2),
+            'throughput_per_s': round(completed / elapsed, 2) if elapsed else 0.0,
+            'handlers': {label: dict(latency_summary(self.latencies[label]),
+                                     service=latency_summary(self.service_times[label]),
+                                     errors=self.errors[label])
+                         for label in sorted(self.latencies)},
+            'event_loop_lag': latency_summary(lag.samples),
+            'bot_api_calls': dict(self.api.calls),
+            'fixtures': {'hits': dict(fixtures.hits), 'misses': dict(fixtures.misses)},
+        }
+
+
+def check_thresholds(report: Dict, max_p95_ms: Optional[float] = None, max_p99_ms: Optional[float] = None,
+                     max_loop_lag_ms: Optional[float] = None, min_throughput: Optional[float] = None,
+                     max_error_rate: Optional[float] = None) -> List[str]:
+    """Regression gate: one line per breached threshold (empty when the run passes)"""
+    failures = []
+    for label, stats in report['handlers'].items():
+        if max_p95_ms is not None and stats['p95_ms'] > max_p95_ms:
+            failures.append(f"{label}: p95 {stats['p95_ms']}ms > {max_p95_ms}ms")
+        if max_p99_ms is not None and stats['p99_ms'] > max_p99_ms:
+            failures.append(f"{label}: p99 {stats['p99_ms']}ms > {max_p99_ms}ms")
+        if max_error_rate is not None and stats['count'] and stats['errors'] / stats['count'] > max_error_rate:
+            failures.append(f"{label}: {stats['errors']}/{stats['count']} errors")
+    lag = report['event_loop_lag']
+    if max_loop_lag_ms is not None and lag['p99_ms'] > max_loop_lag_ms:
+        failures.append(f"event loop lag p99 {lag['p99_ms']}ms > {max_loop_lag_ms}ms")
+    if min_throughput is not None and report['throughput_per_s'] < min_throughput:
+        failures.append(f"throughput {report['throughput_per_s']}/s < {min_throughput}/s")
+    return failures
+
+
+def print_report(report: Dict):
+    """Print the per-handler table and run totals"""
+    print("\n" + "=" * 60)
+    print("📊 Offline Load Test Results")
+    print("=" * 60)
+    print(f"Actions started:       {report['started']}")
+    print(f"Completed:             {report['completed']}")
+    print(f"Unhandled updates:     {report['unhandled']}")
+    print(f"Elapsed:               {report['elapsed_s']:.2f}s")
+    print(f"Throughput:            {report['throughput_per_s']:.2f}/s")
+
+    lag = report['event_loop_lag']
+    print(f"\nEvent loop lag:        p50 {lag['p50_ms']}ms  p99 {lag['p99_ms']}ms  max {lag['max_ms']}ms")
+
+    print(f"\n{'Handler':<24}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'errors':>8}")
+    for label, stats in sorted(report['handlers'].items(), key=lambda item: -item[1]['p95_ms']):
+        print(f"{label[:23]:<24}{stats['count']:>7}{stats['p50_ms']:>8.1f}ms{stats['p95_ms']:>8.1f}ms"
+              f"{stats['p99_ms']:>8.1f}ms{stats['errors']:>8}")
+
+    calls = report['bot_api_calls']
+    print(f"\nBot API calls:         {sum(calls.values())} " +
+          ", ".join(f"{name}={count}" for name, count in sorted(calls.items())))
+    fixtures = report['fixtures']
+    print(f"Fixture hits/misses:   {sum(fixtures['hits'].values())}/{sum(fixtures['misses'].values())}")
+    print("=" * 60)
+
+
+def parse_mix(spec: Optional[str]) -> Dict[str, float]:
+    """'/btc=5,/help=2,cb:help_signals=1,alert=1' -> weights (default DEFAULT_MIX)"""
+    if not spec:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in spec.split(','):
+        action, _, weight = part.strip().rpartition('=')
+        if not action or not re.match(r'^(/|cb:|alert$)', action):
+            raise ValueError(f"Bad mix entry: {part!r}")
+        mix[action] = float(weight)
+    return mix
+
+
+def main():
+    """Run the harness from the command line; exits non-zero when a threshold is breached"""
+    parser = argparse.ArgumentParser(description="Offline load test for the Telegram bot")
+    parser.add_argument('--rate', type=float, nargs='+', default=[20.0], help="Arrivals per second (several = ramp)")
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds of arrivals per rate")
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--fanout', type=int, default=200, help="Subscribers per alert fan-out")
+    parser.add_argument('--mix', help="Weighted actions, e.g. '/btc=5,/help=2,cb:help_signals=1,alert=1'")
+    parser.add_argument('--api-latency', type=float, default=0.0, help="Simulated Bot API latency (s)")
+    parser.add_argument('--fixtures', default='load_test_fixtures', help="Recorded market data directory")
+    parser.add_argument('--record', action='store_true', help="Record missing fixtures from the network")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--max-p95-ms', type=float)
+    parser.add_argument('--max-p99-ms', type=float)
+    parser.add_argument('--max-loop-lag-ms', type=float)
+    parser.add_argument('--min-throughput', type=float)
+    parser.add_argument('--max-error-rate', type=float)
+    parser.add_argument('--output', help="Write the JSON report here")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🧪 OFFLINE LOAD TEST")
+    print(f"   Rates: {', '.join(str(rate) for rate in args.rate)}/s for {args.duration}s each")
+    print("=" * 60)
+
+    reports, failures = [], []
+    for rate in args.rate:
+        profile = LoadProfile(mix=parse_mix(args.mix), rate=rate, duration=args.duration,
+                              users=args.users, fanout_size=args.fanout, seed=args.seed)
+        tester = OfflineLoadTester(profile, api_latency=args.api_latency,
+                                   fixture_dir=args.fixtures, record=args.record)
+        report = asyncio.run(tester.run())
+        print_report(report)
+        reports.append(report)
+        failures += [f"rate {rate}/s: {line}" for line in check_thresholds(
+            report, args.max_p95_ms, args.max_p99_ms, args.max_loop_lag_ms,
+            args.min_throughput, args.max_error_rate)]
+
+    output = args.output or f"offline_load_test_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, 'w') as f:
+        json.dump({'runs': reports, 'failures': failures}, f, indent=2)
+    print(f"✅ Results saved to {output}")
+
+    if failures:
+        print("\n❌ Regression gate failed:")
+        for line in failures:
+            print(f"  - {line}")
+        raise SystemExit(1)
+    print("\n✅ Regression gate passed")
+
+
+if __name__ == "__main__":
+    main()
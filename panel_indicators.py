@@ -0,0 +1,295 @@
+"""
+Panel Indicators
+Vectorized technical indicators across many assets at once
+
+The international signal generators each compute SMA/EMA/RSI/MACD/Bollinger
+one asset at a time, wrapping every indicator in its own pd.Series. Here the
+aligned close/high/low series of all assets are stacked into 2-D
+(time x asset) arrays and every indicator is computed for every asset in one
+NumPy pass. Assets may use different parameters (periods, band width); those
+are per-column arrays, so mixing parameter sets does not add passes.
+
+Results match the generators' pandas calculations: rolling windows need a
+full window of data, EMAs use pandas' default adjust=True weighting, and the
+Bollinger standard deviation uses ddof=1. Shorter histories are NaN-padded at
+the front, which every indicator treats exactly as a shorter series.
+"""
+
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class IndicatorSpec:
+    """Indicator parameters for one asset (defaults match the forex generators)"""
+    sma_fast: int = 20
+    sma_slow: int = 50
+    ema: int = 21
+    rsi: int = 14
+    macd_fast: int = 12
+    macd_slow: int = 26
+    macd_signal: int = 9
+    bb_period: int = 20
+    bb_std: float = 2.0
+    sr_lookback: int = 20
+    volatility_period: int = 20
+    volatility_annualization: Optional[float] = None  # None: volatility not reported
+    momentum_period: Optional[int] = None              # None: momentum not reported
+
+
+@dataclass
+class PricePanel:
+    """Close/high/low/volume of several assets stacked as (time, asset) arrays"""
+    symbols: List[str]
+    close: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    volume: np.ndarray
+    lengths: np.ndarray  # Real (unpadded) bars per asset
+
+    def column(self, symbol: str) -> int:
+        return self.symbols.index(symbol)
+
+
+def stack_panel(frames: Dict[str, pd.DataFrame]) -> PricePanel:
+    """
+    Stack per-asset OHLCV frames into a PricePanel.
+
+    Rows are aligned on the most recent bar; shorter histories are NaN-padded
+    at the front. Frames without a volume column get a volume of 1 per bar.
+    """
+    symbols = list(frames)
+    rows = max(len(frame) for frame in frames.values())
+
+    def stacked(column: str, default: Optional[float] = None) -> np.ndarray:
+        out = np.full((rows, len(symbols)), np.nan)
+        for j, symbol in enumerate(symbols):
+            frame = frames[symbol]
+            if column in frame.columns:
+                values = frame[column].to_numpy(dtype=float)
+            else:
+                values = np.full(len(frame), default)
+            out[rows - len(values):, j] = values
+        return out
+
+    return PricePanel(
+        symbols=symbols,
+        close=stacked('close'),
+        high=stacked('high'),
+        low=stacked('low'),
+        volume=stacked('volume', default=1.0),
+        lengths=np.array([len(frames[symbol]) for symbol in symbols]),
+    )
+
+
+def _trailing_windows(values: np.ndarray, periods: np.ndarray):
+    """(time, asset, max_period) trailing windows plus a mask of each column's own period"""
+    width = int(periods.max())
+    padded = np.vstack([np.full((width - 1, values.shape[1]), np.nan), values])
+    windows = sliding_window_view(padded, width, axis=0)
+    keep = np.arange(width) >= (width - periods)[:, None]
+    return windows, keep
+
+
+def rolling_mean(values: np.ndarray, periods: np.ndarray) -> np.ndarray:
+    """Rolling mean per column; NaN until a column has a full window"""
+    windows, keep = _trailing_windows(values, periods)
+    masked = np.where(keep, windows, 0.0)
+    mean = masked.sum(axis=-1) / periods
+    mean[np.isnan(masked).any(axis=-1)] = np.nan
+    return mean
+
+
+def rolling_std(values: np.ndarray, periods: np.ndarray) -> np.ndarray:
+    """Rolling sample standard deviation (ddof=1) per column"""
+    windows, keep = _trailing_windows(values, periods)
+    mean = rolling_mean(values, periods)
+    deviations = np.where(keep, windows - mean[..., None], 0.0)
+    return np.sqrt((deviations ** 2).sum(axis=-1) / (periods - 1))
+
+
+@lru_cache(maxsize=32)
+def _decay_weights(spans: Tuple[float, ...], steps: int) -> np.ndarray:
+    """(asset, time, time) EMA weights; the same spans and history length recur every scan"""
+    decay = 1.0 - 2.0 / (np.array(spans) + 1.0)
+    lag = np.arange(steps)[:, None] - np.arange(steps)[None, :]
+    weights = np.where(lag >= 0, decay[:, None, None] ** np.maximum(lag, 0), 0.0)
+    weights.flags.writeable = False
+    return weights
+
+
+def ewm_mean(values: np.ndarray, spans: np.ndarray) -> np.ndarray:
+    """
+    pandas ewm(span).mean() per column, as one batched product with a decay
+    matrix. Meant for the few hundred bars the generators fetch; the matrix
+    grows with the square of the history length.
+    """
+    weights = _decay_weights(tuple(float(span) for span in spans), values.shape[0])
+    valid = ~np.isnan(values)
+    # Numerator and denominator of the weighted mean in one product per asset
+    terms = np.stack([np.where(valid, values, 0.0).T, valid.T.astype(float)], axis=-1)
+    numerator, denominator = np.moveaxis(weights @ terms, -1, 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (numerator / denominator).T
+
+
+def _param(specs: Sequence[IndicatorSpec], name: str, dtype=int) -> np.ndarray:
+    return np.array([getattr(spec, name) for spec in specs], dtype=dtype)
+
+
+class PanelIndicators:
+    """Every indicator for every asset of a panel, computed in one pass"""
+
+    def __init__(self, panel: PricePanel, specs: Sequence[IndicatorSpec]):
+        if len(specs) != len(panel.symbols):
+            raise ValueError(f"Need one IndicatorSpec per asset, got {len(specs)} for {len(panel.symbols)}")
+        self.panel = panel
+        self.specs = list(specs)
+        close = panel.close
+
+        self.sma_fast = rolling_mean(close, _param(specs, 'sma_fast'))
+        self.sma_slow = rolling_mean(close, _param(specs, 'sma_slow'))
+        self.ema = ewm_mean(close, _param(specs, 'ema', float))
+
+        deltas = np.vstack([np.full((1, close.shape[1]), np.nan), np.diff(close, axis=0)])
+        missing = np.isnan(deltas)
+        gains = np.where(deltas > 0, deltas, 0.0)
+        losses = np.where(deltas < 0, -deltas, 0.0)
+        gains[missing] = losses[missing] = np.nan
+        rsi_periods = _param(specs, 'rsi')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rs = rolling_mean(gains, rsi_periods) / rolling_mean(losses, rsi_periods)
+            self.rsi = 100 - (100 / (1 + rs))
+
+        self.macd_line = (ewm_mean(close, _param(specs, 'macd_fast', float))
+                          - ewm_mean(close, _param(specs, 'macd_slow', float)))
+        self.macd_signal = ewm_mean(self.macd_line, _param(specs, 'macd_signal', float))
+        self.macd_histogram = self.macd_line - self.macd_signal
+
+        bb_periods = _param(specs, 'bb_period')
+        bb_width = rolling_std(close, bb_periods) * _param(specs, 'bb_std', float)
+        self.bb_middle = rolling_mean(close, bb_periods)
+        self.bb_upper = self.bb_middle + bb_width
+        self.bb_lower = self.bb_middle - bb_width
+
+        lookback, keep = self._last_rows(_param(specs, 'sr_lookback'))
+        self.support = np.nanmin(np.where(keep, panel.low[lookback], np.nan), axis=0)
+        self.resistance = np.nanmax(np.where(keep, panel.high[lookback], np.nan), axis=0)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = np.diff(close, axis=0) / close[:-1]
+        rows, keep = self._last_rows(_param(specs, 'volatility_period'), steps=len(returns))
+        recent = np.where(keep, returns[rows], np.nan)
+        counts = (~np.isnan(recent)).sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            deviations = recent - np.nansum(recent, axis=0) / counts
+            self.return_std = np.sqrt(np.nansum(deviations ** 2, axis=0) / counts)
+
+        momentum_periods = np.array([spec.momentum_period or 0 for spec in specs])
+        past_rows = np.clip(len(close) - momentum_periods - 1, 0, None)
+        past = close[past_rows, np.arange(len(specs))]
+        self.momentum = (close[-1] - past) / past * 100
+
+    def _last_rows(self, periods: np.ndarray, steps: Optional[int] = None):
+        """Row indices of the longest trailing window, and each column's share of it"""
+        steps = self.panel.close.shape[0] if steps is None else steps
+        width = min(int(periods.max()), steps)
+        rows = np.arange(steps - width, steps)
+        keep = np.arange(width)[:, None] >= (width - periods)[None, :]
+        return rows, keep
+
+    def analysis(self, symbol: str) -> Dict:
+        """
+        Latest values for one asset, shaped like a generator's
+        _analyze_timeframe result (without trend and volume analysis, which
+        are generator-specific).
+        """
+        j = self.panel.column(symbol)
+        spec = self.specs[j]
+        length = self.panel.lengths[j]
+        close = self.panel.close[:, j]
+
+        def latest(values: np.ndarray, required: int):
+            return values[-1, j] if length >= required else None
+
+        result = {
+            f'sma_{spec.sma_fast}': latest(self.sma_fast, spec.sma_fast),
+            f'sma_{spec.sma_slow}': latest(self.sma_slow, spec.sma_slow),
+            f'ema_{spec.ema}': latest(self.ema, spec.ema),
+            'rsi': latest(self.rsi, spec.rsi + 1),
+            'macd': {
+                'line': latest(self.macd_line, spec.macd_slow),
+                'signal': latest(self.macd_signal, spec.macd_slow),
+                'histogram': latest(self.macd_histogram, spec.macd_slow),
+            },
+            'bollinger': {
+                'upper': latest(self.bb_upper, spec.bb_period),
+                'middle': latest(self.bb_middle, spec.bb_period),
+                'lower': latest(self.bb_lower, spec.bb_period),
+            },
+            'support': self.support[j],
+            'resistance': self.resistance[j],
+            'current_price': close[-1],
+            'previous_price': close[-2] if length > 1 else close[-1],
+        }
+        if spec.volatility_annualization is not None:
+            enough = length >= spec.volatility_period
+            result['volatility'] = self.return_std[j] * spec.volatility_annualization if enough else 0.0
+        if spec.momentum_period is not None:
+            result['momentum'] = self.momentum[j] if length >= spec.momentum_period + 1 else 0.0
+        return result
+
+
+def compute_panel(frames: Dict[str, pd.DataFrame], specs: Dict[str, IndicatorSpec]) -> PanelIndicators:
+    """Stack frames and compute every asset's indicators in one pass"""
+    panel = stack_panel(frames)
+    return PanelIndicators(panel, [specs.get(symbol, IndicatorSpec()) for symbol in panel.symbols])
+
+
+def main():
+    """Compare a panel pass with per-asset pandas indicators"""
+    import time
+
+    print("=" * 60)
+    print("PANEL INDICATORS DEMO")
+    print("=" * 60)
+
+    rng = np.random.default_rng(42)
+    frames = {}
+    for i in range(7):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001 * (i + 1), 200)))
+        frames[f'ASSET{i}'] = pd.DataFrame({'close': close, 'high': close * 1.002, 'low': close * 0.998})
+
+    compute_panel(frames, {})  # First scan builds the cached EMA weights
+    start = time.perf_counter()
+    indicators = compute_panel(frames, {})
+    panel_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for frame in frames.values():
+        series = frame['close']
+        series.rolling(20).mean(), series.rolling(50).mean(), series.ewm(span=21).mean()
+        gains, losses = series.diff().clip(lower=0), -series.diff().clip(upper=0)
+        gains.rolling(14).mean() / losses.rolling(14).mean()
+        macd = series.ewm(span=12).mean() - series.ewm(span=26).mean()
+        macd.ewm(span=9).mean()
+        series.rolling(20).std()
+    serial_time = time.perf_counter() - start
+
+    for symbol in frames:
+        analysis = indicators.analysis(symbol)
+        print(f"{symbol}: close {analysis['current_price']:.2f}  rsi {analysis['rsi']:.1f}  "
+              f"macd hist {analysis['macd']['histogram']:+.4f}")
+    print(f"\nPanel pass: {panel_time * 1000:.1f}ms, per-asset pandas: {serial_time * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,13 +8,24 @@ import os
 from datetime import datetime
 from typing import Dict, List, Optional
 
+from position_book import PositionBook, PositionEvent, get_position_book
+
+# Position book source tag; a standard lot is 100,000 units
+BOOK_SOURCE = 'paper'
+LOT_SIZE = 100000
+
 class PaperTrading:
     """Manages paper trading (virtual trading) accounts"""
     
-    def __init__(self, data_file="paper_trading.json"):
+    def __init__(self, data_file="paper_trading.json", book: Optional[PositionBook] = None):
         self.data_file = data_file
         self.accounts = {}  # {user_id: {enabled, balance, equity, trades, positions}}
+        self.book = book if book is not None else get_position_book()  # Marks open positions of all accounts at once
         self.load_data()
+        for user_id_str, account in self.accounts.items():
+            if account.get('enabled'):
+                self._track_account(int(user_id_str))
+        self.book.subscribe(self._on_position_closed)
     
     def load_data(self):
         """Load paper trading data"""
@@ -61,6 +72,7 @@ class PaperTrading:
             }
         else:
             self.accounts[user_id_str]['enabled'] = True
+            self._track_account(user_id)
         
         self.save_data()
         return True
@@ -71,6 +83,8 @@ class PaperTrading:
         
         if user_id_str in self.accounts:
             self.accounts[user_id_str]['enabled'] = False
+            for position in self.accounts[user_id_str]['open_positions']:
+                self.book.close(BOOK_SOURCE, user_id, position['id'])
             self.save_data()
             return True
         return False
@@ -109,7 +123,7 @@ class PaperTrading:
         account = self.accounts[user_id_str]
         
         # Calculate position value (simplified - would use proper margin calculation)
-        position_value = lots * 100000  # Standard lot = 100,000 units
+        position_value = lots * LOT_SIZE
         margin_required = position_value * 0.01  # 1% margin (100:1 leverage)
         
         if account['equity'] < margin_required:
@@ -117,7 +131,7 @@ class PaperTrading:
         
         # Create position
         position = {
-            'id': len(account['open_positions']) + 1,
+            'id': account['total_trades'] + 1,  # Unique per account, even after closes
             'symbol': symbol,
             'direction': direction,
             'entry_price': entry_price,
@@ -131,6 +145,7 @@ class PaperTrading:
         account['open_positions'].append(position)
         account['equity'] -= margin_required
         account['total_trades'] += 1
+        self._track(user_id, position)
         
         self.save_data()
         
@@ -140,13 +155,15 @@ class PaperTrading:
             'position': position
         }
     
-    def close_position(self, user_id: int, position_id: int, exit_price: float) -> Dict:
+    def close_position(self, user_id: int, position_id: int, exit_price: float,
+                       exit_type: str = 'MANUAL') -> Dict:
         """Close a paper trading position
         
         Args:
             user_id: User ID
             position_id: Position ID to close
             exit_price: Exit price
+            exit_type: 'MANUAL', or 'SL'/'TP1' when closed by a price update
         
         Returns:
             Dict with result
@@ -193,10 +210,12 @@ class PaperTrading:
         closed_position['exit_price'] = exit_price
         closed_position['pnl'] = pnl
         closed_position['pips'] = pips
+        closed_position['exit_type'] = exit_type
         closed_position['closed_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
         account['closed_positions'].append(closed_position)
         account['open_positions'].pop(position_index)
+        self.book.close(BOOK_SOURCE, user_id, position_id)
         
         self.save_data()
         
@@ -209,6 +228,29 @@ class PaperTrading:
             'equity': account['equity']
         }
     
+    def _track(self, user_id: int, position: Dict):
+        """Put an open position in the position book"""
+        self.book.open(BOOK_SOURCE, user_id, position['id'], position['symbol'], position['direction'],
+                       position['entry_price'], position['lots'], stop_loss=position.get('sl'),
+                       take_profit=position.get('tp'), multiplier=LOT_SIZE, opened_at=position.get('opened_at'))
+
+    def _track_account(self, user_id: int):
+        for position in self.accounts[str(user_id)]['open_positions']:
+            self._track(user_id, position)
+
+    def _on_position_closed(self, event: PositionEvent):
+        """Book callback: a price update crossed a position's SL or TP"""
+        if event.source == BOOK_SOURCE:
+            self.close_position(event.user_id, event.position_id, event.exit_price, event.exit_type)
+
+    def mark_to_market(self, prices: Dict[str, float]) -> List[PositionEvent]:
+        """Mark open positions of every account to the given prices; SL/TP hits close them"""
+        return self.book.update_prices(prices)
+
+    def get_unrealized_pnl(self, user_id: int) -> float:
+        """Floating P&L of a user's open positions at the latest marked prices"""
+        return self.book.user_unrealized(user_id, source=BOOK_SOURCE)
+
     def get_account_summary(self, user_id: int) -> str:
         """Get formatted account summary"""
         account = self.get_account(user_id)
@@ -227,6 +269,7 @@ class PaperTrading:
         msg += f"*Equity:* ${account['equity']:,.2f}\n"
         msg += f"*Starting Balance:* ${account['starting_balance']:,.2f}\n"
         msg += f"*Total P&L:* ${account['total_pnl']:,.2f}\n"
+        msg += f"*Unrealized P&L:* ${self.get_unrealized_pnl(user_id):,.2f}\n"
         msg += f"*Return:* {((account['balance'] - account['starting_balance']) / account['starting_balance'] * 100):.2f}%\n\n"
         
         msg += f"*Open Positions:* {len(account['open_positions'])}\n"
@@ -236,10 +279,14 @@ class PaperTrading:
         msg += f"*Win Rate:* {win_rate:.1f}%\n\n"
         
         if account['open_positions']:
+            marked = {pos['id']: pos for pos in self.book.positions(user_id, source=BOOK_SOURCE)}
             msg += "*OPEN POSITIONS:*\n"
             for pos in account['open_positions'][:5]:
                 msg += f"• #{pos['id']}: {pos['symbol']} {pos['direction'].upper()} "
-                msg += f"{pos['lots']} lots @ ${pos['entry_price']:,.2f}\n"
+                msg += f"{pos['lots']} lots @ ${pos['entry_price']:,.2f}"
+                if pos['id'] in marked:
+                    msg += f" (P&L ${marked[pos['id']]['pnl']:,.2f})"
+                msg += "\n"
             if len(account['open_positions']) > 5:
                 msg += f"...and {len(account['open_positions']) - 5} more\n"
         
@@ -3,8 +3,7 @@ Performance Analytics Module
 Provides detailed trading performance analysis and visualizations
 """
 
-from datetime import datetime, timedelta
-from collections import defaultdict
+from datetime import date, datetime, timedelta
 import json
 import os
 
@@ -23,61 +22,34 @@ class PerformanceAnalytics:
     
     def get_win_rate_by_pair(self):
         """Get win rate broken down by trading pair"""
-        closed_trades = self.tracker.get_closed_trades()
-        
-        pair_stats = defaultdict(lambda: {'wins': 0, 'losses': 0, 'total': 0})
-        
-        for trade in closed_trades:
-            asset = trade['asset']
-            pair_stats[asset]['total'] += 1
-            
-            if trade['pnl'] > 0:
-                pair_stats[asset]['wins'] += 1
-            else:
-                pair_stats[asset]['losses'] += 1
-        
-        # Calculate win rates
         results = {}
-        for asset, stats in pair_stats.items():
-            win_rate = (stats['wins'] / stats['total'] * 100) if stats['total'] > 0 else 0
+        for asset, stats in self.tracker.stats.breakdown('asset', user=self.tracker.user_id).items():
             results[asset] = {
-                'wins': stats['wins'],
-                'losses': stats['losses'],
-                'total': stats['total'],
-                'win_rate': round(win_rate, 1)
+                'wins': stats.wins,
+                'losses': stats.losses,
+                'total': stats.trades,
+                'win_rate': round(stats.win_rate, 1)
             }
         
         return results
     
     def get_pnl_distribution(self):
         """Get P&L distribution statistics"""
-        closed_trades = self.tracker.get_closed_trades()
+        stats = self.tracker.stats.summary(user=self.tracker.user_id)
         
-        if not closed_trades:
+        if not stats.trades:
             return None
         
-        wins = [t for t in closed_trades if t['pnl'] > 0]
-        losses = [t for t in closed_trades if t['pnl'] <= 0]
-        
-        biggest_win = max([t['pnl'] for t in wins]) if wins else 0
-        biggest_loss = min([t['pnl'] for t in losses]) if losses else 0
-        avg_win = sum([t['pnl'] for t in wins]) / len(wins) if wins else 0
-        avg_loss = sum([t['pnl'] for t in losses]) / len(losses) if losses else 0
-        
-        # Find which trade/pair had biggest win/loss
-        biggest_win_trade = max(wins, key=lambda x: x['pnl']) if wins else None
-        biggest_loss_trade = min(losses, key=lambda x: x['pnl']) if losses else None
-        
         # Calculate achieved R:R
-        achieved_rr = abs(avg_win / avg_loss) if avg_loss != 0 else 0
+        achieved_rr = abs(stats.avg_win / stats.avg_loss) if stats.avg_loss != 0 else 0
         
         return {
-            'biggest_win': round(biggest_win, 2),
-            'biggest_win_pair': biggest_win_trade['asset'] if biggest_win_trade else 'N/A',
-            'biggest_loss': round(biggest_loss, 2),
-            'biggest_loss_pair': biggest_loss_trade['asset'] if biggest_loss_trade else 'N/A',
-            'avg_win': round(avg_win, 2),
-            'avg_loss': round(avg_loss, 2),
+            'biggest_win': round(stats.biggest_win or 0, 2),
+            'biggest_win_pair': stats.biggest_win_asset or 'N/A',
+            'biggest_loss': round(stats.biggest_loss or 0, 2),
+            'biggest_loss_pair': stats.biggest_loss_asset or 'N/A',
+            'avg_win': round(stats.avg_win, 2),
+            'avg_loss': round(stats.avg_loss, 2),
             'achieved_rr': round(achieved_rr, 2)
         }
     
@@ -98,45 +70,32 @@ class PerformanceAnalytics:
             year = now.year
             month = now.month
         
-        closed_trades = self.tracker.get_closed_trades()
-        
-        # Filter trades for this month
-        month_trades = []
-        for trade in closed_trades:
-            if trade['closed_at']:
-                trade_date = datetime.strptime(trade['closed_at'], '%Y-%m-%d %H:%M:%S')
-                if trade_date.year == year and trade_date.month == month:
-                    month_trades.append(trade)
+        # Day buckets for this month
+        first_day = date(year, month, 1)
+        last_day = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+        stats = self.tracker.stats.summary(user=self.tracker.user_id, start=first_day, end=last_day)
         
-        if not month_trades:
+        if not stats.trades:
             return None
         
-        wins = [t for t in month_trades if t['pnl'] > 0]
-        losses = [t for t in month_trades if t['pnl'] <= 0]
-        
-        net_pnl = sum([t['pnl'] for t in month_trades])
-        
         # Find best performing pair
-        pair_pnl = defaultdict(float)
-        for trade in month_trades:
-            pair_pnl[trade['asset']] += trade['pnl']
-        
-        best_pair = max(pair_pnl.items(), key=lambda x: x[1]) if pair_pnl else ('N/A', 0)
+        pair_stats = self.tracker.stats.breakdown('asset', start=first_day, end=last_day, user=self.tracker.user_id)
+        best_pair = max(((asset, s.total_pnl) for asset, s in pair_stats.items()),
+                        key=lambda x: x[1], default=('N/A', 0))
         
         # Calculate ROI for the month
-        first_trade = min(month_trades, key=lambda x: x['opened_at'])
-        capital_start = first_trade['capital_before']
-        roi = (net_pnl / capital_start * 100) if capital_start > 0 else 0
+        capital_start = stats.first_capital_before or 0
+        roi = (stats.total_pnl / capital_start * 100) if capital_start > 0 else 0
         
         return {
             'year': year,
             'month': month,
             'month_name': datetime(year, month, 1).strftime('%B %Y'),
-            'total_trades': len(month_trades),
-            'wins': len(wins),
-            'losses': len(losses),
-            'win_rate': round(len(wins) / len(month_trades) * 100, 1) if month_trades else 0,
-            'net_pnl': round(net_pnl, 2),
+            'total_trades': stats.trades,
+            'wins': stats.wins,
+            'losses': stats.losses,
+            'win_rate': round(stats.win_rate, 1),
+            'net_pnl': round(stats.total_pnl, 2),
             'roi': round(roi, 1),
             'best_pair': best_pair[0],
             'best_pair_pnl': round(best_pair[1], 2)
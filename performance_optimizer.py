@@ -20,16 +20,16 @@ import joblib
 import threading
 import psutil
 import gc
-from functools import lru_cache
 from collections import deque
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
 import logging
 
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(__file__))
 
 from global_error_learning import global_error_manager
+from unified_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
@@ -644,85 +644,45 @@ class ResourceManager:
 class CacheManager:
     """Intelligent caching system for performance optimization"""
 
-    def __init__(self):
-        self.cache_store = {}
-        self.cache_metadata = {}
-        self.hit_rate_history = deque(maxlen=1000)
-        self.cache_strategy = 'lru'  # least recently used
+    def __init__(self, max_entries: int = 100, default_ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = 64 * 1024 * 1024):
+        self.cache = TTLCache(name='performance_optimizer', maxsize=max_entries, ttl=default_ttl,
+                              max_bytes=max_bytes)
 
-    @lru_cache(maxsize=1000)
     def get_cached_result(self, cache_key: str, operation_func: Callable, *args, **kwargs):
-        """Get cached result or compute and cache"""
-        if cache_key in self.cache_store:
-            self._record_cache_hit(cache_key)
-            return self.cache_store[cache_key]
-
-        # Compute result
-        result = operation_func(*args, **kwargs)
-
-        # Cache result
-        self.cache_store[cache_key] = result
-        self.cache_metadata[cache_key] = {
-            'created_at': datetime.now(),
-            'access_count': 1,
-            'size': sys.getsizeof(result)
-        }
-
-        self._record_cache_miss(cache_key)
-        self._cleanup_cache()
-
-        return result
+        """Get cached result or compute and cache (concurrent misses compute once)"""
+        return self.cache.get_or_compute(cache_key, lambda: operation_func(*args, **kwargs))
 
-    def _record_cache_hit(self, cache_key: str):
-        """Record cache hit"""
-        if cache_key in self.cache_metadata:
-            self.cache_metadata[cache_key]['access_count'] += 1
-            self.cache_metadata[cache_key]['last_accessed'] = datetime.now()
+    def get(self, cache_key: str, default=None):
+        return self.cache.get(cache_key, default)
 
-        self.hit_rate_history.append(1)  # Hit
-
-    def _record_cache_miss(self, cache_key: str):
-        """Record cache miss"""
-        self.hit_rate_history.append(0)  # Miss
+    def set(self, cache_key: str, value, ttl: Optional[float] = None):
+        self.cache.set(cache_key, value, ttl)
 
     def get_cache_hit_rate(self) -> float:
         """Get current cache hit rate"""
-        if not self.hit_rate_history:
-            return 0.0
+        return self.cache.stats.hit_rate
 
-        return sum(self.hit_rate_history) / len(self.hit_rate_history)
-
-    def _cleanup_cache(self):
-        """Clean up cache based on strategy"""
-        max_cache_size = 100  # Maximum cache entries
-
-        if len(self.cache_store) > max_cache_size:
-            if self.cache_strategy == 'lru':
-                # Remove least recently used items
-                sorted_items = sorted(
-                    self.cache_metadata.items(),
-                    key=lambda x: x[1].get('last_accessed', x[1]['created_at'])
-                )
-
-                items_to_remove = sorted_items[:len(sorted_items) - max_cache_size + 10]
-                for key, _ in items_to_remove:
-                    del self.cache_store[key]
-                    del self.cache_metadata[key]
+    def get_stats(self) -> Dict:
+        return self.cache.get_stats()
 
 class LoadBalancer:
     """Load balancing for optimal resource utilization"""
 
-    def __init__(self):
-        self.operation_queues = {
-            'high_priority': [],
-            'normal_priority': [],
-            'low_priority': []
-        }
-        self.executor = ThreadPoolExecutor(max_workers=min(psutil.cpu_count(), 8))
+    PRIORITIES = ('high', 'normal', 'low')
+
+    def __init__(self, max_workers: Optional[int] = None):
+        # Operations wait here, highest priority first, until a worker is free
+        self.operation_queues = {priority: deque() for priority in self.PRIORITIES}
+        self.max_workers = max_workers or min(psutil.cpu_count(), 8)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self._lock = threading.Lock()
+        self._running = 0
 
     def submit_operation(self, operation_func: Callable, priority: str = 'normal',
                         *args, **kwargs) -> asyncio.Future:
         """Submit operation with priority-based queuing"""
+        priority = priority.replace('_priority', '')
         if priority not in self.operation_queues:
             priority = 'normal'
 
@@ -732,14 +692,43 @@ class LoadBalancer:
             'args': args,
             'kwargs': kwargs,
             'submitted_at': datetime.now(),
-            'priority': priority
+            'priority': priority,
+            'future': Future()
         }
 
-        self.operation_queues[priority].append(task)
+        with self._lock:
+            self.operation_queues[priority].append(task)
+        self._dispatch()
+        return asyncio.wrap_future(task['future'])
+
+    def _dispatch(self):
+        """Start queued operations, highest priority first, while workers are free"""
+        ready = []
+        with self._lock:
+            while self._running < self.max_workers:
+                queue = next((queue for queue in self.operation_queues.values() if queue), None)
+                if queue is None:
+                    break
+                task = queue.popleft()
+                if task['future'].set_running_or_notify_cancel():
+                    self._running += 1
+                    ready.append(task)
+
+        for task in ready:
+            self.executor.submit(self._run_operation, task)
+
+    def _run_operation(self, task: Dict):
+        try:
+            task['future'].set_result(self._execute_operation(task))
+        finally:
+            with self._lock:
+                self._running -= 1
+            self._dispatch()
 
-        # Submit to executor
-        future = self.executor.submit(self._execute_operation, task)
-        return asyncio.wrap_future(future)
+    def get_queue_depths(self) -> Dict[str, int]:
+        """Operations waiting per priority"""
+        with self._lock:
+            return {priority: len(queue) for priority, queue in self.operation_queues.items()}
 
     def _execute_operation(self, task: Dict):
         """Execute operation with monitoring"""
@@ -818,12 +807,18 @@ def check_system_resources() -> Dict:
     """Check system resource status"""
     return resource_manager.check_resource_limits()
 
+def get_cache_manager() -> CacheManager:
+    """Get the shared cache manager"""
+    return cache_manager
+
 def get_cache_performance() -> Dict:
     """Get cache performance metrics"""
+    stats = cache_manager.get_stats()
     return {
-        'hit_rate': cache_manager.get_cache_hit_rate(),
-        'cache_entries': len(cache_manager.cache_store),
-        'cache_size_mb': sum(sys.getsizeof(v) for v in cache_manager.cache_store.values()) / (1024**2)
+        'hit_rate': stats['hit_rate'],
+        'cache_entries': stats['entries'],
+        'cache_size_mb': stats['bytes'] / (1024**2),
+        'evictions': stats['evictions']
     }
 
 if __name__ == "__main__":
@@ -15,6 +15,7 @@ from typing import Dict, List, Optional
 
 # Import user management service
 from user_management_service import get_user_portfolio_data, authenticate_user
+from position_book import get_position_book
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -65,6 +66,22 @@ class PersonalDashboardAPI:
     def get_current_positions(self, telegram_id: int) -> List[Dict]:
         """Get current open positions for a specific user"""
         try:
+            # Positions already marked to market in the position book
+            booked = get_position_book().positions(telegram_id)
+            if booked:
+                return [{
+                    'asset': pos['symbol'],
+                    'direction': pos['direction'],
+                    'entry': pos['entry'],
+                    'current': pos['current_price'],
+                    'pnl': pos['pnl'],
+                    'pnl_percent': pos['pnl_pct'],
+                    'size': pos['size'],
+                    'stop_loss': pos['stop_loss'],
+                    'take_profit': pos['take_profit'],
+                    'source': pos['source']
+                } for pos in booked]
+
             # Authenticate user and get their data
             user = authenticate_user(telegram_id)
             if not user:
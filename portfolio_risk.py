@@ -0,0 +1,635 @@
+"""
+Portfolio Risk Engine
+Historical and parametric VaR/CVaR plus scenario stress for open portfolios
+
+The risk managers used to size portfolio risk by adding up each position's
+distance to its stop, which ignores how the positions move together. The
+engine keeps one return model for every symbol anyone holds: daily returns
+from real price history (Yahoo Finance, Binance as a fallback for crypto),
+their mean and covariance. A portfolio is a vector of signed notionals, so
+for a users x symbols exposure matrix E:
+
+    historical P&L   = R @ E.T             (days x users)
+    parametric sigma = sqrt(diag(E C E.T))
+    stress P&L       = E @ S.T             (users x scenarios)
+
+Notionals are in USD: positions priced in another quote currency (USDJPY,
+EURJPY) are converted with quote_to_usd_rate() before they are compared with
+USD balances. Each symbol's returns come from its own trading days, so FX and
+index futures get no zero returns over weekends; covariances use the days a
+pair has in common and a portfolio's historical P&L only the days one of its
+markets traded.
+
+VaR/CVaR of one user and of every user in the position book (nightly batch)
+come out of the same few matrix products. Price histories and the model are
+cached, so a /risk command only pays for the products once the model is warm.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from statistics import NormalDist
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from position_book import PositionBook, get_position_book, parse_direction
+from unified_cache import TTLCache
+
+try:
+    import yfinance as yf
+    YFINANCE_AVAILABLE = True
+except ImportError:
+    YFINANCE_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+CONFIDENCE_LEVELS = (0.95, 0.99)
+LOOKBACK_DAYS = 250
+MIN_OBSERVATIONS = 30
+MODEL_TTL = 6 * 3600
+
+_ALIASES = {
+    'BTC': 'BTCUSD', 'ETH': 'ETHUSD', 'SOL': 'SOLUSD', 'BNB': 'BNBUSD', 'XRP': 'XRPUSD',
+    'GOLD': 'XAUUSD', 'SILVER': 'XAGUSD',
+    'CME:ES1!': 'ES', 'CME:NQ1!': 'NQ', 'ES=F': 'ES', 'NQ=F': 'NQ', 'GC=F': 'XAUUSD', 'SI=F': 'XAGUSD',
+}
+CRYPTO = {'BTCUSD', 'ETHUSD', 'SOLUSD', 'BNBUSD', 'XRPUSD', 'ADAUSD', 'LTCUSD', 'DOTUSD', 'MATICUSD'}
+METALS = {'XAUUSD', 'XAGUSD'}
+INDICES = {'ES', 'NQ', 'YM', 'RTY'}
+# Approximate USD value of one unit of a quote currency, for crosses without
+# a live rate (EURJPY notional is in yen, not dollars)
+USD_PER_QUOTE = {'USD': 1.0, 'EUR': 1.085, 'GBP': 1.275, 'AUD': 0.66, 'NZD': 0.61, 'CAD': 0.74,
+                 'CHF': 1.12, 'JPY': 1 / 150}
+_YF_FUTURES = {'XAUUSD': 'GC=F', 'XAGUSD': 'SI=F', 'ES': 'ES=F', 'NQ': 'NQ=F', 'YM': 'YM=F', 'RTY': 'RTY=F'}
+
+
+def canonical_symbol(symbol: str) -> str:
+    """One name per market: 'BTC', 'BTCUSDT' and 'btc/usd' are all BTCUSD"""
+    name = str(symbol).upper().strip()
+    name = _ALIASES.get(name, name)
+    name = name.replace('/', '').replace('-', '').replace('_', '')
+    if name.endswith('=X'):
+        name = name[:-2]
+    if name.endswith('USDT'):
+        name = name[:-1]
+    return _ALIASES.get(name, name)
+
+
+def asset_class(symbol: str) -> str:
+    """crypto, metals, indices, fx_usd_quote (EURUSD), fx_usd_base (USDJPY), fx_cross or other"""
+    symbol = canonical_symbol(symbol)
+    if symbol in CRYPTO:
+        return 'crypto'
+    if symbol in METALS:
+        return 'metals'
+    if symbol in INDICES:
+        return 'indices'
+    if len(symbol) == 6 and symbol.isalpha():
+        if symbol.endswith('USD'):
+            return 'fx_usd_quote'
+        if symbol.startswith('USD'):
+            return 'fx_usd_base'
+        return 'fx_cross'
+    return 'other'
+
+
+def quote_to_usd_rate(symbol: str, price):
+    """
+    USD per unit of a symbol's quote currency; price may be an array.
+
+    USD-base pairs (USDJPY) convert at their own price, crosses at
+    USD_PER_QUOTE; everything else is taken to be quoted in USD.
+    """
+    symbol = canonical_symbol(symbol)
+    kind = asset_class(symbol)
+    if kind == 'fx_usd_base':
+        price = np.asarray(price, dtype=float)
+        return np.divide(1.0, price, out=np.zeros_like(price), where=price != 0)
+    if kind == 'fx_cross':
+        return USD_PER_QUOTE.get(symbol[3:], 1.0)
+    return 1.0
+
+
+@dataclass(frozen=True)
+class StressScenario:
+    """Relative price shocks by symbol or asset class (a symbol entry wins over its class)"""
+    name: str
+    description: str
+    shocks: Dict[str, float] = field(default_factory=dict)
+
+    def shock(self, symbol: str) -> float:
+        symbol = canonical_symbol(symbol)
+        return self.shocks.get(symbol, self.shocks.get(asset_class(symbol), 0.0))
+
+
+DEFAULT_SCENARIOS = (
+    StressScenario('usd_rally', "Broad USD rally", {
+        'fx_usd_quote': -0.02, 'fx_usd_base': 0.02, 'metals': -0.03, 'crypto': -0.05}),
+    StressScenario('usd_selloff', "Broad USD sell-off", {
+        'fx_usd_quote': 0.02, 'fx_usd_base': -0.02, 'metals': 0.03, 'crypto': 0.03}),
+    StressScenario('risk_off', "Equity sell-off and flight to safety", {
+        'indices': -0.07, 'crypto': -0.15, 'metals': 0.04, 'fx_usd_quote': -0.01, 'AUDUSD': -0.025,
+        'NZDUSD': -0.025, 'USDJPY': -0.03, 'USDCHF': -0.015}),
+    StressScenario('rates_shock', "Surprise rate hike", {
+        'indices': -0.04, 'metals': -0.05, 'crypto': -0.08, 'fx_usd_quote': -0.015, 'fx_usd_base': 0.015}),
+    StressScenario('crypto_crash', "Crypto market crash", {'crypto': -0.30}),
+)
+
+
+def yahoo_symbol(symbol: str) -> str:
+    symbol = canonical_symbol(symbol)
+    if symbol in _YF_FUTURES:
+        return _YF_FUTURES[symbol]
+    if asset_class(symbol) == 'crypto':
+        return f"{symbol[:-3]}-USD"
+    if asset_class(symbol).startswith('fx_'):
+        return f"{symbol}=X"
+    return symbol
+
+
+def load_daily_closes(symbol: str, days: int = LOOKBACK_DAYS) -> Optional[pd.Series]:
+    """Daily closes from Yahoo Finance, or Binance klines for crypto; None if neither has the symbol"""
+    symbol = canonical_symbol(symbol)
+    if YFINANCE_AVAILABLE:
+        try:
+            start = datetime.now() - timedelta(days=int(days * 1.5) + 10)
+            history = yf.Ticker(yahoo_symbol(symbol)).history(start=start.strftime('%Y-%m-%d'), interval='1d')
+            if not history.empty:
+                return history['Close']
+        except Exception as e:
+            logger.warning(f"[RISK] Yahoo history for {symbol} failed: {e}")
+    if asset_class(symbol) == 'crypto':
+        try:
+            from data_fetcher import BinanceDataFetcher
+            klines = BinanceDataFetcher(f"{symbol}T").get_klines(interval='1d', limit=min(days + 1, 1000))
+            if klines is not None and not klines.empty:
+                return klines['close']
+        except Exception as e:
+            logger.warning(f"[RISK] Binance history for {symbol} failed: {e}")
+    return None
+
+
+@dataclass
+class RiskModel:
+    """Daily returns of a symbol universe on the union of their trading days, with mean and covariance"""
+    symbols: List[str]
+    returns: np.ndarray                  # days x symbols, 0 where a market did not trade
+    mean: np.ndarray
+    cov: np.ndarray
+    unavailable: frozenset = frozenset()
+    built_at: float = 0.0
+    traded: Optional[np.ndarray] = None  # days x symbols, True where the market traded
+
+    def __post_init__(self):
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        if self.traded is None:
+            self.traded = np.ones(self.returns.shape, dtype=bool)
+
+    @property
+    def observations(self) -> int:
+        return len(self.returns)
+
+
+def _daily(series: pd.Series) -> pd.Series:
+    index = pd.DatetimeIndex(series.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    series = pd.Series(np.asarray(series, dtype=float), index=index.normalize())
+    return series[~series.index.duplicated(keep='last')].dropna()
+
+
+def build_model(closes: Dict[str, pd.Series], lookback: int = LOOKBACK_DAYS,
+                min_observations: int = MIN_OBSERVATIONS, unavailable: Iterable[str] = ()) -> RiskModel:
+    """Turn close series into a return model, each symbol's returns taken over its own trading days"""
+    unavailable = set(unavailable)
+    returns = pd.concat({symbol: _daily(series).pct_change().iloc[1:] for symbol, series in closes.items()},
+                        axis=1) if closes else None
+    if returns is None or returns.empty:
+        return RiskModel([], np.zeros((0, 0)), np.zeros(0), np.zeros((0, 0)), frozenset(unavailable | set(closes)),
+                         time.monotonic())
+
+    # No forward fill: a closed market (FX at the weekend) has no return that day
+    returns = returns.sort_index().tail(lookback)
+    enough = returns.notna().sum() >= min_observations
+    unavailable |= set(returns.columns[~enough])
+    returns = returns.loc[:, enough].dropna(how='all')
+    if len(returns) < min_observations:
+        unavailable |= set(returns.columns)
+        returns = returns.iloc[:, :0]
+
+    traded = returns.notna().to_numpy()
+    # Pairwise covariance over the days both markets traded
+    cov = returns.cov(min_periods=min_observations).fillna(0.0).to_numpy() if len(returns) > 1 \
+        else np.zeros((returns.shape[1], returns.shape[1]))
+    return RiskModel(list(returns.columns), returns.fillna(0.0).to_numpy(), returns.mean().fillna(0.0).to_numpy(),
+                     cov, frozenset(unavailable), time.monotonic(), traded)
+
+
+def _masked_quantile(values: np.ndarray, mask: np.ndarray, q: float) -> np.ndarray:
+    """Per-column quantile (linear interpolation) over the entries where mask is True"""
+    if mask.all():
+        return np.quantile(values, q, axis=0)
+    ordered = np.sort(np.where(mask, values, np.inf), axis=0)
+    position = (mask.sum(axis=0) - 1) * q
+    below = np.floor(position).astype(np.intp)[None, :]
+    above = np.ceil(position).astype(np.intp)[None, :]
+    low = np.take_along_axis(ordered, below, axis=0)[0]
+    high = np.take_along_axis(ordered, above, axis=0)[0]
+    return low + (high - low) * (position - below[0])
+
+
+def _label(confidence: float) -> str:
+    return f"{confidence:.0%}"
+
+
+class PortfolioRiskEngine:
+    """VaR, CVaR and stress P&L for one portfolio or every portfolio in the book"""
+
+    def __init__(self, loader: Callable[[str, int], Optional[pd.Series]] = load_daily_closes,
+                 confidence_levels: Sequence[float] = CONFIDENCE_LEVELS, horizon_days: int = 1,
+                 lookback: int = LOOKBACK_DAYS, scenarios: Sequence[StressScenario] = DEFAULT_SCENARIOS,
+                 ttl: float = MODEL_TTL, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            loader: loader(symbol, days) -> daily close series, or None if unknown
+            confidence_levels: VaR/CVaR levels reported
+            horizon_days: Risk horizon; daily figures are scaled by sqrt(horizon)
+            lookback: Days of returns in the model
+            ttl: Seconds before price histories are reloaded and the model rebuilt
+        """
+        self.loader = loader
+        self.confidence_levels = tuple(confidence_levels)
+        self.horizon_days = horizon_days
+        self.lookback = lookback
+        self.scenarios = tuple(scenarios)
+        self.ttl = ttl
+        self.clock = clock
+        self.closes = TTLCache('risk_closes', maxsize=512, ttl=ttl)
+        self._model: Optional[RiskModel] = None
+        self._model_lock = threading.Lock()
+        self._warming: Optional[threading.Thread] = None
+        self._warm_lock = threading.Lock()
+        self._shocks: Dict[Tuple[str, ...], np.ndarray] = {}
+        self.stats = {'portfolios': 0, 'batches': 0, 'model_builds': 0}
+
+    # ------------------------------------------------------------------
+    # Model
+    # ------------------------------------------------------------------
+
+    def model(self, symbols: Iterable[str] = (), fetch: bool = True) -> Optional[RiskModel]:
+        """
+        The cached return model, rebuilt when stale or when a new symbol is asked for.
+
+        With ``fetch=False`` nothing is downloaded and the model lock is not
+        taken: a model missing one of the symbols returns None, and a missing
+        or stale one is (re)built on a background thread.
+        """
+        wanted = {canonical_symbol(symbol) for symbol in symbols}
+        if not fetch:
+            model = self._model
+            covered = model is not None and wanted <= set(model.symbols) | model.unavailable
+            if not covered or self.clock() - model.built_at >= self.ttl:
+                self.warm(wanted)
+            return model if covered else None
+        with self._model_lock:
+            model = self._model
+            fresh = model is not None and self.clock() - model.built_at < self.ttl
+            known = set(model.symbols) | model.unavailable if fresh else set()
+            if fresh and wanted <= known:
+                return model
+
+            universe = (set(model.symbols) if fresh else set()) | wanted
+            closes = {}
+            for symbol in sorted(universe):
+                series = self.closes.get_or_compute(symbol, lambda symbol=symbol: self.loader(symbol, self.lookback))
+                if series is not None and len(series):
+                    closes[symbol] = series
+            model = build_model(closes, self.lookback, unavailable=universe - set(closes))
+            model.built_at = self.clock()
+            self._model = model
+            self.stats['model_builds'] += 1
+            if model.unavailable:
+                logger.info(f"[RISK] No return history for {sorted(model.unavailable)}")
+            return model
+
+    def warm(self, symbols: Iterable[str] = ()):
+        """Load price histories and build the model on a daemon thread (one at a time)"""
+        symbols = tuple(symbols)
+        with self._warm_lock:
+            if self._warming is not None and self._warming.is_alive():
+                return
+            self._warming = threading.Thread(target=self._warm, args=(symbols,), daemon=True,
+                                             name='portfolio-risk-warm')
+            self._warming.start()
+
+    def _warm(self, symbols: Tuple[str, ...]):
+        try:
+            self.model(symbols)
+        except Exception as e:
+            logger.warning(f"[RISK] Background model build failed: {e}")
+
+    def invalidate(self):
+        """Drop cached histories and the model (e.g. after a data outage)"""
+        with self._model_lock:
+            self._model = None
+        self.closes.clear()
+
+    def _shock_matrix(self, symbols: Tuple[str, ...]) -> np.ndarray:
+        matrix = self._shocks.get(symbols)
+        if matrix is None:
+            matrix = np.array([[scenario.shock(symbol) for symbol in symbols] for scenario in self.scenarios])
+            matrix = self._shocks[symbols] = matrix.reshape(len(self.scenarios), len(symbols))
+        return matrix
+
+    # ------------------------------------------------------------------
+    # Measures
+    # ------------------------------------------------------------------
+
+    def measure(self, exposures: np.ndarray, symbols: Sequence[str],
+                fetch: bool = True) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Risk measures for every row of a portfolios x symbols matrix of signed notionals.
+
+        Returns arrays with one value per portfolio: historical and parametric
+        VaR/CVaR per confidence level (losses as positive numbers), volatility,
+        worst historical day, stress P&L per scenario, and the notional on
+        symbols without a return history. None if ``fetch`` is False and the
+        model is not loaded yet.
+        """
+        symbols = tuple(canonical_symbol(symbol) for symbol in symbols)
+        exposures = np.atleast_2d(np.asarray(exposures, dtype=float)).reshape(-1, len(symbols))
+        if len(set(symbols)) < len(symbols):
+            merged = sorted(set(symbols))
+            combined = np.zeros((len(exposures), len(merged)))
+            np.add.at(combined.T, [merged.index(symbol) for symbol in symbols], exposures.T)
+            symbols, exposures = tuple(merged), combined
+
+        model = self.model(symbols, fetch)
+        if model is None:
+            return None
+        modelled = np.array([symbol in model.index for symbol in symbols], dtype=bool)
+        columns = [model.index[symbol] for symbol in symbols if symbol in model.index]
+        held = exposures[:, modelled]
+        scale = np.sqrt(self.horizon_days)
+        result: Dict = {'symbols': symbols, 'exposures': exposures, 'modelled': modelled,
+                        'observations': model.observations}
+
+        if columns and model.observations:
+            pnl = model.returns[:, columns] @ held.T * scale                  # days x portfolios
+            # Only days one of the portfolio's markets traded count towards its P&L history
+            active = (model.traded[:, columns].astype(float) @ (held != 0).T) > 0
+            active[:, ~active.any(axis=0)] = True
+            marginal = held @ model.cov[np.ix_(columns, columns)]
+            daily_sigma = np.sqrt(np.maximum((held * marginal).sum(axis=1), 0.0))
+            sigma = daily_sigma * scale
+            drift = held @ model.mean[columns] * self.horizon_days
+            worst_day = -np.where(active, pnl, np.inf).min(axis=0)
+            # Euler split of daily sigma over symbols; rows sum to daily_sigma
+            contributions = held * marginal / np.where(daily_sigma > 0, daily_sigma, 1.0)[:, None]
+        else:
+            pnl = np.zeros((1, len(exposures)))
+            active = np.ones(pnl.shape, dtype=bool)
+            sigma = drift = worst_day = np.zeros(len(exposures))
+            contributions = np.zeros_like(held)
+
+        for confidence in self.confidence_levels:
+            label = _label(confidence)
+            cutoff = _masked_quantile(pnl, active, 1 - confidence)
+            tail = active & (pnl <= cutoff)
+            result[f'historical_var_{label}'] = -cutoff
+            result[f'historical_cvar_{label}'] = -(pnl * tail).sum(axis=0) / tail.sum(axis=0)
+            z = NormalDist().inv_cdf(confidence)
+            result[f'parametric_var_{label}'] = z * sigma - drift
+            result[f'parametric_cvar_{label}'] = sigma * NormalDist().pdf(z) / (1 - confidence) - drift
+
+        result['volatility'] = sigma
+        result['worst_day'] = worst_day
+        result['contributions'] = contributions
+        result['stress'] = exposures @ self._shock_matrix(symbols).T            # portfolios x scenarios
+        result['unmodelled_exposure'] = np.abs(exposures[:, ~modelled]).sum(axis=1)
+        return result
+
+    def _report(self, measures: Dict, row: int, balance: Optional[float] = None,
+                positions: Optional[int] = None) -> Dict:
+        """One portfolio's measures as a plain dict"""
+        symbols = measures['symbols']
+        exposure = measures['exposures'][row]
+        var, cvar = {}, {}
+        for confidence in self.confidence_levels:
+            label = _label(confidence)
+            var[label] = {'historical': round(float(measures[f'historical_var_{label}'][row]), 2),
+                          'parametric': round(float(measures[f'parametric_var_{label}'][row]), 2)}
+            cvar[label] = {'historical': round(float(measures[f'historical_cvar_{label}'][row]), 2),
+                           'parametric': round(float(measures[f'parametric_cvar_{label}'][row]), 2)}
+        stress = {scenario.name: round(float(pnl), 2)
+                  for scenario, pnl in zip(self.scenarios, measures['stress'][row])}
+        worst = min(stress, key=stress.get) if stress else None
+
+        report = {
+            'positions': positions,
+            'gross_exposure': round(float(np.abs(exposure).sum()), 2),
+            'net_exposure': round(float(exposure.sum()), 2),
+            'exposure_by_symbol': {symbol: round(float(value), 2) for symbol, value in zip(symbols, exposure) if value},
+            'var': var,
+            'cvar': cvar,
+            'volatility': round(float(measures['volatility'][row]), 2),
+            'worst_day': round(float(measures['worst_day'][row]), 2),
+            'stress': stress,
+            'worst_scenario': worst,
+            'unmodelled': [symbol for symbol, ok, value in zip(symbols, measures['modelled'], exposure)
+                           if value and not ok],
+            'unmodelled_exposure': round(float(measures['unmodelled_exposure'][row]), 2),
+            'observations': measures['observations'],
+            'horizon_days': self.horizon_days,
+        }
+        if balance:
+            headline = var[_label(max(self.confidence_levels))]['historical']
+            worst_loss = -min(stress.values(), default=0.0)
+            report['balance'] = balance
+            report['var_pct'] = round(headline / balance * 100, 2)
+            report['cvar_pct'] = round(cvar[_label(max(self.confidence_levels))]['historical'] / balance * 100, 2)
+            report['stress_pct'] = round(worst_loss / balance * 100, 2)
+            report['risk_level'] = risk_level(report['var_pct'], report['stress_pct'])
+        return report
+
+    # ------------------------------------------------------------------
+    # Portfolios
+    # ------------------------------------------------------------------
+
+    def evaluate(self, exposures: Dict[str, float], balance: Optional[float] = None,
+                 positions: Optional[int] = None, fetch: bool = True) -> Optional[Dict]:
+        """
+        Risk report for one portfolio given as {symbol: signed notional}.
+
+        With ``fetch=False`` (callers that must not block on downloads) the
+        report is None until the model has been loaded.
+        """
+        symbols = list(exposures)
+        matrix = np.array([[exposures[symbol] for symbol in symbols]], dtype=float).reshape(1, len(symbols))
+        measures = self.measure(matrix, symbols, fetch)
+        if measures is None:
+            return None
+        report = self._report(measures, 0, balance, positions)
+        modelled = [symbol for symbol, ok in zip(measures['symbols'], measures['modelled']) if ok]
+        z = NormalDist().inv_cdf(max(self.confidence_levels)) * np.sqrt(self.horizon_days)
+        report['contributions'] = {symbol: round(float(value * z), 2)
+                                   for symbol, value in zip(modelled, measures['contributions'][0]) if value}
+        self.stats['portfolios'] += 1
+        return report
+
+    def evaluate_positions(self, positions: List[Dict], balance: Optional[float] = None) -> Dict:
+        """Risk report for position dicts (book positions, paper/broker trades, risk manager inputs)"""
+        return self.evaluate(exposures_from_positions(positions), balance, positions=len(positions))
+
+    def evaluate_user(self, user_id: int, balance: Optional[float] = None, book: Optional[PositionBook] = None,
+                      source: Optional[str] = None) -> Dict:
+        """Risk report for one user's open positions in the book"""
+        book = book if book is not None else get_position_book()
+        _, symbols, matrix = book.exposures(user_id, source, quote_to_usd=quote_to_usd_rate)
+        exposures = dict(zip(symbols, matrix[0])) if len(matrix) else {}
+        return self.evaluate(exposures, balance, positions=book.position_counts(source).get(int(user_id), 0))
+
+    def evaluate_book(self, book: Optional[PositionBook] = None, balances: Optional[Dict[int, float]] = None,
+                      source: Optional[str] = None) -> Dict[int, Dict]:
+        """Risk reports for every user in the book from one set of matrix products"""
+        book = book if book is not None else get_position_book()
+        balances = balances or {}
+        user_ids, symbols, matrix = book.exposures(source=source, quote_to_usd=quote_to_usd_rate)
+        if not len(user_ids):
+            return {}
+        measures = self.measure(matrix, symbols)
+        counts = book.position_counts(source)
+        reports = {int(user_id): self._report(measures, row, balances.get(int(user_id)), counts.get(int(user_id)))
+                   for row, user_id in enumerate(user_ids)}
+        self.stats['batches'] += 1
+        return reports
+
+    def nightly_report(self, book: Optional[PositionBook] = None, balances: Optional[Dict[int, float]] = None,
+                       source: Optional[str] = None, top: int = 10) -> Dict:
+        """evaluate_book() plus book-wide totals and the riskiest users"""
+        start = time.perf_counter()
+        reports = self.evaluate_book(book, balances, source)
+        headline = _label(max(self.confidence_levels))
+        ranked = sorted(reports, key=lambda user_id: reports[user_id]['var'][headline]['historical'], reverse=True)
+        return {
+            'generated_at': datetime.now().isoformat(),
+            'users': reports,
+            'totals': {
+                'users': len(reports),
+                'positions': sum(report['positions'] or 0 for report in reports.values()),
+                'gross_exposure': round(sum(report['gross_exposure'] for report in reports.values()), 2),
+                f'sum_var_{headline}': round(sum(report['var'][headline]['historical']
+                                                 for report in reports.values()), 2),
+                'high_risk_users': sum(1 for report in reports.values() if report.get('risk_level') == 'HIGH'),
+            },
+            'top_risk': [{'user_id': user_id, 'var': reports[user_id]['var'][headline]['historical'],
+                          'risk_level': reports[user_id].get('risk_level')} for user_id in ranked[:top]],
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 1),
+        }
+
+    def get_stats(self) -> Dict:
+        model = self._model
+        return dict(self.stats, symbols=len(model.symbols) if model else 0,
+                    observations=model.observations if model else 0, cache=self.closes.get_stats())
+
+
+def exposures_from_positions(positions: Iterable[Dict]) -> Dict[str, float]:
+    """
+    Signed USD notional per symbol from position dicts.
+
+    Uses position_value (USD) when given, otherwise size * multiplier * price
+    (current_price, then entry) converted from the quote currency. Direction
+    defaults to BUY.
+    """
+    exposures: Dict[str, float] = {}
+    for position in positions:
+        symbol = position.get('symbol') or position.get('asset') or position.get('pair')
+        if not symbol:
+            continue
+        value = position.get('position_value')
+        if value is None:
+            price = position.get('current_price') or position.get('entry') or position.get('entry_price') or 0.0
+            size = position.get('size', position.get('lots', position.get('position_size', 0.0)))
+            value = float(size or 0.0) * float(position.get('multiplier', 1.0)) * float(price) \
+                * float(quote_to_usd_rate(symbol, float(price)))
+        try:
+            sign = parse_direction(position.get('direction', 'BUY'))
+        except ValueError:
+            sign = 1
+        symbol = canonical_symbol(symbol)
+        exposures[symbol] = exposures.get(symbol, 0.0) + sign * abs(float(value))
+    return exposures
+
+
+def risk_level(var_pct: float, stress_pct: float) -> str:
+    """LOW / MEDIUM / HIGH from VaR and worst stress loss as % of balance"""
+    if var_pct > 6 or stress_pct > 15:
+        return 'HIGH'
+    if var_pct > 3 or stress_pct > 8:
+        return 'MEDIUM'
+    return 'LOW'
+
+
+# Global risk engine
+portfolio_risk_engine = PortfolioRiskEngine()
+
+
+def get_portfolio_risk_engine() -> PortfolioRiskEngine:
+    """Get the global portfolio risk engine"""
+    return portfolio_risk_engine
+
+
+def main():
+    """Nightly batch over a synthetic book, then a single-user /risk style query"""
+    import random
+
+    print("=" * 60)
+    print("PORTFOLIO RISK ENGINE DEMO")
+    print("=" * 60)
+
+    prices = {'EURUSD': 1.085, 'GBPUSD': 1.275, 'XAUUSD': 1950.0, 'BTCUSD': 45000.0, 'ETHUSD': 2400.0,
+              'ES': 4700.0}
+    vols = {'EURUSD': 0.005, 'GBPUSD': 0.006, 'XAUUSD': 0.009, 'BTCUSD': 0.03, 'ETHUSD': 0.04, 'ES': 0.01}
+    rng = np.random.default_rng(3)
+    market = rng.normal(0, 1, 400)
+    days = pd.date_range(end=datetime.now(), periods=400, freq='D')
+
+    def synthetic_loader(symbol, lookback):
+        if symbol not in prices:
+            return None
+        shocks = 0.5 * market + rng.normal(0, 1, len(days))
+        return pd.Series(prices[symbol] * np.exp(np.cumsum(vols[symbol] * shocks)), index=days)
+
+    engine = PortfolioRiskEngine(loader=synthetic_loader)
+    book = PositionBook()
+    picker = random.Random(7)
+    for i in range(20000):
+        symbol = picker.choice(list(prices))
+        book.open('demo', i % 2000, i, symbol, picker.choice(['BUY', 'SELL']), prices[symbol],
+                  picker.choice([0.01, 0.05, 0.1]), multiplier=100 if symbol == 'XAUUSD' else
+                  100000 if symbol in ('EURUSD', 'GBPUSD') else 1)
+    balances = {user_id: 100000.0 for user_id in range(2000)}
+
+    engine.model(prices)          # warm the model, as the bot does on its first risk query
+    report = engine.nightly_report(book, balances)
+    print(f"Nightly batch: {report['totals']['users']:,} users, {report['totals']['positions']:,} positions "
+          f"in {report['elapsed_ms']:.1f}ms")
+    print(f"High risk users: {report['totals']['high_risk_users']}")
+
+    start = time.perf_counter()
+    single = engine.evaluate_user(0, balance=100000.0, book=book)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"\nUser 0 ({single['positions']} positions) in {elapsed:.2f}ms")
+    print(f"  99% VaR: ${single['var']['99%']['historical']:,.2f} (hist) "
+          f"${single['var']['99%']['parametric']:,.2f} (param)")
+    print(f"  99% CVaR: ${single['cvar']['99%']['historical']:,.2f}")
+    print(f"  Worst scenario: {single['worst_scenario']} ${single['stress'][single['worst_scenario']]:,.2f}")
+    print(f"  Risk level: {single['risk_level']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,438 @@
+"""
+Position Book
+Columnar mark-to-market of every open position across all users
+
+The execution engine, paper trading, broker paper fills and the dashboard
+used to walk one user's positions at a time, recomputing P&L and checking
+SL/TP per trade in Python. The book keeps every open position in columnar
+NumPy arrays (symbol id, direction, entry, SL, TP, size, multiplier). A price
+update for a symbol marks all positions on that symbol in one vectorized
+step: unrealized P&L for each, and SL/TP crossings that close positions and
+emit close events to subscribers. Dashboards and alerts read P&L from the
+book instead of recomputing it.
+
+Positions are keyed by (source, user_id, position_id), so the engine, paper
+accounts and broker paper fills share one book without clashing ids.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PositionKey = Tuple[str, int, Hashable]
+
+_DIRECTIONS = {'BUY': 1, 'LONG': 1, 'SELL': -1, 'SHORT': -1}
+
+
+def parse_direction(direction: Any) -> int:
+    """+1 for buy/long, -1 for sell/short (accepts enums with a string value)"""
+    value = getattr(direction, 'value', direction)
+    try:
+        return _DIRECTIONS[str(value).upper()]
+    except KeyError:
+        raise ValueError(f"Unknown direction: {direction!r}")
+
+
+@dataclass
+class PositionEvent:
+    """A position closed by a price update crossing its SL or TP"""
+    source: str
+    user_id: int
+    position_id: Hashable
+    symbol: str
+    direction: str
+    entry: float
+    exit_price: float
+    exit_type: str       # 'SL' or 'TP1'
+    size: float
+    pnl: float
+    info: Dict = field(default_factory=dict)
+    timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
+
+    @property
+    def key(self) -> PositionKey:
+        return (self.source, self.user_id, self.position_id)
+
+
+class PositionBook:
+    """Open positions of every user, stored column-wise for vectorized marking"""
+
+    def __init__(self, capacity: int = 1024):
+        self._lock = threading.RLock()
+        self._capacity = 0
+        self._size = 0                       # Rows handed out so far (live or free)
+        self._free: List[int] = []
+        self._keys: Dict[PositionKey, int] = {}
+        self._row_keys: List[Optional[PositionKey]] = []
+        self._info: List[Optional[Dict]] = []
+        self._symbols: Dict[str, int] = {}
+        self._symbol_names: List[str] = []
+        self._symbol_rows: Dict[int, set] = {}
+        self._symbol_arrays: Dict[int, np.ndarray] = {}   # Cached row indices per symbol
+        self._user_rows: Dict[int, set] = {}
+        self._subscribers: List[Callable[[PositionEvent], None]] = []
+        self.last_prices: Dict[str, float] = {}
+        self.stats = {'opened': 0, 'closed': 0, 'sl_hits': 0, 'tp_hits': 0, 'price_updates': 0}
+
+        self.symbol_id = np.zeros(0, dtype=np.int32)
+        self.direction = np.zeros(0, dtype=np.int8)
+        self.entry = np.zeros(0)
+        self.stop_loss = np.zeros(0)
+        self.take_profit = np.zeros(0)
+        self.size = np.zeros(0)
+        self.multiplier = np.zeros(0)
+        self.mark = np.zeros(0)
+        self.unrealized = np.zeros(0)
+        self._grow(capacity)
+
+    _COLUMNS = ('symbol_id', 'direction', 'entry', 'stop_loss', 'take_profit', 'size', 'multiplier',
+                'mark', 'unrealized')
+
+    def _grow(self, capacity: int):
+        for name in self._COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+        self._row_keys.extend([None] * (capacity - self._capacity))
+        self._info.extend([None] * (capacity - self._capacity))
+        self._capacity = capacity
+
+    def _symbol(self, symbol: str) -> int:
+        symbol = symbol.upper()
+        if symbol not in self._symbols:
+            self._symbols[symbol] = len(self._symbol_names)
+            self._symbol_names.append(symbol)
+            self._symbol_rows[self._symbols[symbol]] = set()
+        return self._symbols[symbol]
+
+    # ------------------------------------------------------------------
+    # Positions
+    # ------------------------------------------------------------------
+
+    def open(self, source: str, user_id: int, position_id: Hashable, symbol: str, direction: Any,
+             entry: float, size: float, stop_loss: Optional[float] = None,
+             take_profit: Optional[float] = None, multiplier: float = 1.0, **info) -> PositionKey:
+        """
+        Add (or replace) an open position.
+
+        P&L is direction * (price - entry) * size * multiplier. A missing or
+        zero SL/TP is never hit. Extra keyword arguments are kept as info and
+        returned with positions and close events.
+        """
+        key = (source, int(user_id), position_id)
+        sign = parse_direction(direction)
+        with self._lock:
+            if key in self._keys:
+                self._remove(self._keys[key])
+            if self._free:
+                row = self._free.pop()
+            else:
+                if self._size == self._capacity:
+                    self._grow(self._capacity * 2)
+                row = self._size
+                self._size += 1
+
+            symbol_id = self._symbol(symbol)
+            self.symbol_id[row] = symbol_id
+            self.direction[row] = sign
+            self.entry[row] = entry
+            self.stop_loss[row] = stop_loss if stop_loss else np.nan
+            self.take_profit[row] = take_profit if take_profit else np.nan
+            self.size[row] = size
+            self.multiplier[row] = multiplier
+            self.mark[row] = self.last_prices.get(self._symbol_names[symbol_id], entry)
+            self.unrealized[row] = sign * (self.mark[row] - entry) * size * multiplier
+
+            self._keys[key] = row
+            self._row_keys[row] = key
+            self._info[row] = dict(info, opened_at=info.get('opened_at', datetime.now().isoformat()))
+            self._symbol_rows[symbol_id].add(row)
+            self._symbol_arrays.pop(symbol_id, None)
+            self._user_rows.setdefault(key[1], set()).add(row)
+            self.stats['opened'] += 1
+        return key
+
+    def _remove(self, row: int):
+        key = self._row_keys[row]
+        del self._keys[key]
+        self._row_keys[row] = None
+        self._info[row] = None
+        self._symbol_rows[int(self.symbol_id[row])].discard(row)
+        self._symbol_arrays.pop(int(self.symbol_id[row]), None)
+        user_rows = self._user_rows.get(key[1])
+        if user_rows is not None:
+            user_rows.discard(row)
+            if not user_rows:
+                del self._user_rows[key[1]]
+        self._free.append(row)
+
+    def close(self, source: str, user_id: int, position_id: Hashable) -> Optional[Dict]:
+        """Remove a position (manual close); returns its last marked state, or None if unknown"""
+        with self._lock:
+            row = self._keys.get((source, int(user_id), position_id))
+            if row is None:
+                return None
+            position = self._position(row)
+            self._remove(row)
+            self.stats['closed'] += 1
+            return position
+
+    def modify(self, source: str, user_id: int, position_id: Hashable, stop_loss: Optional[float] = None,
+               take_profit: Optional[float] = None) -> bool:
+        """Move a position's SL and/or TP; False if the position is unknown"""
+        with self._lock:
+            row = self._keys.get((source, int(user_id), position_id))
+            if row is None:
+                return False
+            if stop_loss is not None:
+                self.stop_loss[row] = stop_loss or np.nan
+            if take_profit is not None:
+                self.take_profit[row] = take_profit or np.nan
+            return True
+
+    def get(self, source: str, user_id: int, position_id: Hashable) -> Optional[Dict]:
+        with self._lock:
+            row = self._keys.get((source, int(user_id), position_id))
+            return None if row is None else self._position(row)
+
+    def __contains__(self, key: PositionKey) -> bool:
+        source, user_id, position_id = key
+        return (source, int(user_id), position_id) in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    # ------------------------------------------------------------------
+    # Marking
+    # ------------------------------------------------------------------
+
+    def subscribe(self, callback: Callable[[PositionEvent], None]):
+        """Call callback(event) for every position closed by a price update"""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[PositionEvent], None]):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def update_price(self, symbol: str, price: float) -> List[PositionEvent]:
+        """
+        Mark every open position on symbol to price in one vectorized step.
+
+        Positions whose SL or TP is crossed are closed at that level (TP wins
+        if a price crosses both) and returned as events, after subscribers
+        have been notified.
+        """
+        with self._lock:
+            symbol = symbol.upper()
+            self.last_prices[symbol] = price
+            self.stats['price_updates'] += 1
+            symbol_id = self._symbols.get(symbol)
+            if symbol_id is None or not self._symbol_rows[symbol_id]:
+                return []
+
+            rows = self._symbol_arrays.get(symbol_id)
+            if rows is None:
+                rows = np.fromiter(self._symbol_rows[symbol_id], dtype=np.intp)
+                self._symbol_arrays[symbol_id] = rows
+            sign = self.direction[rows]
+            moved = sign * (price - self.entry[rows])
+            self.mark[rows] = price
+            self.unrealized[rows] = moved * self.size[rows] * self.multiplier[rows]
+
+            with np.errstate(invalid='ignore'):
+                sl_hit = sign * (price - self.stop_loss[rows]) <= 0
+                tp_hit = sign * (price - self.take_profit[rows]) >= 0
+            hit = sl_hit | tp_hit
+            if not hit.any():
+                return []
+
+            events = []
+            for row, take_profit in zip(rows[hit], tp_hit[hit]):
+                level = self.take_profit[row] if take_profit else self.stop_loss[row]
+                pnl = self.direction[row] * (level - self.entry[row]) * self.size[row] * self.multiplier[row]
+                source, user_id, position_id = self._row_keys[row]
+                events.append(PositionEvent(
+                    source=source, user_id=user_id, position_id=position_id, symbol=symbol,
+                    direction='BUY' if self.direction[row] > 0 else 'SELL',
+                    entry=float(self.entry[row]), exit_price=float(level),
+                    exit_type='TP1' if take_profit else 'SL', size=float(self.size[row]),
+                    pnl=float(pnl), info=self._info[row]))
+                self._remove(row)
+            self.stats['closed'] += len(events)
+            self.stats['tp_hits'] += int(tp_hit[hit].sum())
+            self.stats['sl_hits'] += int((~tp_hit[hit]).sum())
+
+        for event in events:
+            for callback in list(self._subscribers):
+                try:
+                    callback(event)
+                except Exception as e:
+                    logger.error(f"Position close subscriber failed for {event.key}: {e}")
+        return events
+
+    def update_prices(self, prices: Dict[str, float]) -> List[PositionEvent]:
+        """Mark several symbols; one vectorized step per symbol"""
+        events = []
+        for symbol, price in prices.items():
+            events.extend(self.update_price(symbol, price))
+        return events
+
+    # ------------------------------------------------------------------
+    # Views
+    # ------------------------------------------------------------------
+
+    def _position(self, row: int) -> Dict:
+        source, user_id, position_id = self._row_keys[row]
+        entry, mark = float(self.entry[row]), float(self.mark[row])
+        sign = int(self.direction[row])
+        return {
+            **self._info[row],
+            'source': source,
+            'user_id': user_id,
+            'id': position_id,
+            'symbol': self._symbol_names[int(self.symbol_id[row])],
+            'direction': 'BUY' if sign > 0 else 'SELL',
+            'entry': entry,
+            'stop_loss': None if np.isnan(self.stop_loss[row]) else float(self.stop_loss[row]),
+            'take_profit': None if np.isnan(self.take_profit[row]) else float(self.take_profit[row]),
+            'size': float(self.size[row]),
+            'multiplier': float(self.multiplier[row]),
+            'current_price': mark,
+            'pnl': float(self.unrealized[row]),
+            'pnl_pct': sign * (mark - entry) / entry * 100 if entry else 0.0,
+        }
+
+    def positions(self, user_id: Optional[int] = None, source: Optional[str] = None,
+                  symbol: Optional[str] = None) -> List[Dict]:
+        """Open positions with their current mark and unrealized P&L"""
+        with self._lock:
+            if user_id is not None:
+                rows: Iterable[int] = self._user_rows.get(int(user_id), ())
+            elif symbol is not None:
+                rows = self._symbol_rows.get(self._symbols.get(symbol.upper(), -1), ())
+            else:
+                rows = self._keys.values()
+            result = [self._position(row) for row in sorted(rows)]
+        if source is not None:
+            result = [position for position in result if position['source'] == source]
+        if symbol is not None:
+            result = [position for position in result if position['symbol'] == symbol.upper()]
+        return result
+
+    def unrealized_by_user(self, source: Optional[str] = None) -> Dict[int, float]:
+        """Total unrealized P&L per user, summed in one pass over the book"""
+        with self._lock:
+            rows = [row for key, row in self._keys.items() if source is None or key[0] == source]
+            if not rows:
+                return {}
+            rows = np.array(rows, dtype=np.intp)
+            users = np.array([self._row_keys[row][1] for row in rows])
+            ids, index = np.unique(users, return_inverse=True)
+            totals = np.bincount(index, weights=self.unrealized[rows])
+        return {int(user): float(total) for user, total in zip(ids, totals)}
+
+    def position_counts(self, source: Optional[str] = None) -> Dict[int, int]:
+        """Open positions per user"""
+        with self._lock:
+            if source is None:
+                return {user_id: len(rows) for user_id, rows in self._user_rows.items()}
+            counts: Dict[int, int] = {}
+            for key_source, user_id, _ in self._keys:
+                if key_source == source:
+                    counts[user_id] = counts.get(user_id, 0) + 1
+            return counts
+
+    def user_unrealized(self, user_id: int, source: Optional[str] = None) -> float:
+        with self._lock:
+            rows = [row for row in self._user_rows.get(int(user_id), ())
+                    if source is None or self._row_keys[row][0] == source]
+            return float(self.unrealized[rows].sum()) if rows else 0.0
+
+    def exposures(self, user_id: Optional[int] = None, source: Optional[str] = None,
+                  quote_to_usd: Optional[Callable] = None) -> Tuple[np.ndarray, List[str], np.ndarray]:
+        """
+        Signed notional per user and symbol, summed in one pass over the book.
+
+        Notional is direction * size * multiplier * mark, so a relative price
+        move r changes a user's P&L by exposure @ r. It is in the symbol's
+        quote currency unless quote_to_usd(symbol, marks) gives the USD rate.
+        Returns (user ids, symbols, users x symbols matrix).
+        """
+        with self._lock:
+            rows = self._user_rows.get(int(user_id), ()) if user_id is not None else self._keys.values()
+            rows = np.array([row for row in rows if source is None or self._row_keys[row][0] == source],
+                            dtype=np.intp)
+            users = np.array([self._row_keys[row][1] for row in rows], dtype=np.int64)
+            symbol_ids = self.symbol_id[rows]
+            marks = self.mark[rows]
+            notional = self.direction[rows] * self.size[rows] * self.multiplier[rows] * marks
+            names = list(self._symbol_names)
+
+        used, symbol_index = np.unique(symbol_ids, return_inverse=True)
+        if quote_to_usd is not None:
+            for k, symbol_id in enumerate(used):
+                in_symbol = symbol_index == k
+                notional[in_symbol] *= quote_to_usd(names[symbol_id], marks[in_symbol])
+        user_ids, user_index = np.unique(users, return_inverse=True)
+        matrix = np.zeros((len(user_ids), len(used)))
+        np.add.at(matrix, (user_index, symbol_index), notional)
+        return user_ids, [names[i] for i in used], matrix
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats, open=len(self._keys), symbols=sum(1 for rows in self._symbol_rows.values() if rows),
+                        users=len(self._user_rows))
+
+
+# Global position book
+position_book = PositionBook()
+
+
+def get_position_book() -> PositionBook:
+    """Get the global position book"""
+    return position_book
+
+
+def main():
+    """Mark a large book against a few price updates"""
+    import random
+    import time
+
+    print("=" * 60)
+    print("POSITION BOOK DEMO")
+    print("=" * 60)
+
+    rng = random.Random(7)
+    book = PositionBook()
+    symbols = {'EURUSD': 1.0850, 'GBPUSD': 1.2750, 'XAUUSD': 1950.0, 'BTCUSD': 45000.0}
+    closes = []
+    book.subscribe(closes.append)
+
+    for i in range(50000):
+        symbol = rng.choice(list(symbols))
+        price = symbols[symbol]
+        side = rng.choice(['BUY', 'SELL'])
+        sign = 1 if side == 'BUY' else -1
+        book.open('demo', user_id=i % 5000, position_id=i, symbol=symbol, direction=side, entry=price,
+                  size=1.0, stop_loss=price * (1 - sign * rng.uniform(0.002, 0.02)),
+                  take_profit=price * (1 + sign * rng.uniform(0.002, 0.02)))
+
+    start = time.perf_counter()
+    for symbol, price in symbols.items():
+        book.update_price(symbol, price * 1.005)
+    elapsed = time.perf_counter() - start
+
+    print(f"Marked {len(book) + len(closes):,} positions across {len(symbols)} symbols in {elapsed * 1000:.1f}ms")
+    print(f"Closed by SL/TP: {len(closes):,}  still open: {len(book):,}")
+    print(f"Unrealized P&L of user 0: {book.user_unrealized(0):,.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Position Sizing
+Batch lot sizes for every subscriber of a signal in one vectorized step
+
+Signal alerts went out with one generic message, and the sizing helpers
+(pip_calculator.calculate_position_size, EnhancedRiskManager.calculate_position_size,
+DailySignalsSystem._calculate_position_size) each re-derived pip sizes and
+pip values on every call, one user at a time. Instrument specs are now
+derived once per symbol, and size_positions() takes one signal plus arrays
+of subscriber balances and risk percentages and returns every subscriber's
+lot size, risk amount and pip info as NumPy columns. The single-user helpers
+are a batch of one.
+
+Lots are floored to the instrument's lot step, so the risk actually taken
+never exceeds the subscriber's budget; budgets too small for the minimum lot
+size to zero and are flagged.
+"""
+
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from portfolio_risk import asset_class, canonical_symbol, quote_to_usd_rate
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAPITAL = 500.0
+DEFAULT_RISK_PCT = 1.0
+FOREX_CONTRACT = 100000
+
+_SPECS = {
+    'XAUUSD': dict(pip_size=0.1, contract_size=100),
+    'XAGUSD': dict(pip_size=0.01, contract_size=5000),
+    'BTCUSD': dict(pip_size=1.0, contract_size=1, lot_step=0.001, min_lot=0.001),
+    'ETHUSD': dict(pip_size=0.1, contract_size=1, lot_step=0.001, min_lot=0.001),
+    # Futures: a pip is one tick, a lot is one contract
+    'ES': dict(pip_size=0.25, contract_size=50, lot_step=1, min_lot=1),
+    'NQ': dict(pip_size=0.25, contract_size=20, lot_step=1, min_lot=1),
+    'YM': dict(pip_size=1.0, contract_size=5, lot_step=1, min_lot=1),
+    'RTY': dict(pip_size=0.1, contract_size=50, lot_step=1, min_lot=1),
+}
+
+
+@dataclass(frozen=True)
+class InstrumentSpec:
+    """Pip size and contract size of an instrument; P&L per pip per lot is pip_size * contract_size"""
+    symbol: str
+    pip_size: float
+    contract_size: float
+    lot_step: float = 0.01
+    min_lot: float = 0.01
+    max_lot: float = 100.0
+    quote: str = 'USD'
+
+    def pip_value_per_lot(self, price: float, quote_to_usd: Optional[float] = None) -> float:
+        """USD value of a one-pip move on one lot"""
+        value = self.pip_size * self.contract_size
+        if quote_to_usd is not None:
+            return value * quote_to_usd
+        return value * float(quote_to_usd_rate(self.symbol, price))   # USDJPY: yen per pip at the pair's own rate
+
+
+@lru_cache(maxsize=256)
+def instrument_spec(symbol: str) -> InstrumentSpec:
+    """Spec for a symbol ('BTC', 'GOLD' and 'EURUSD=X' style aliases accepted)"""
+    symbol = canonical_symbol(symbol)
+    if symbol in _SPECS:
+        return InstrumentSpec(symbol, **_SPECS[symbol])
+    kind = asset_class(symbol)
+    if kind == 'crypto':
+        return InstrumentSpec(symbol, pip_size=0.01, contract_size=1, lot_step=0.001, min_lot=0.001)
+    if kind.startswith('fx_'):
+        quote = symbol[3:]
+        return InstrumentSpec(symbol, pip_size=0.01 if quote == 'JPY' else 0.0001,
+                              contract_size=FOREX_CONTRACT, quote=quote)
+    return InstrumentSpec(symbol, pip_size=0.0001, contract_size=FOREX_CONTRACT)
+
+
+@dataclass
+class SizingBatch:
+    """Per-subscriber sizing for one signal; every array has one entry per subscriber"""
+    spec: InstrumentSpec
+    entry: float
+    stop_loss: float
+    sl_pips: float
+    pip_value_per_lot: float
+    user_ids: Optional[np.ndarray]
+    balances: np.ndarray
+    risk_pct: np.ndarray
+    risk_amount: np.ndarray
+    raw_lots: np.ndarray             # Before rounding to the lot step
+    lots: np.ndarray
+    units: np.ndarray
+    actual_risk: np.ndarray          # Loss at the stop with the rounded lot size
+    below_minimum: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.lots)
+
+    @property
+    def pip_value(self) -> np.ndarray:
+        """USD per pip of each subscriber's position"""
+        return self.lots * self.pip_value_per_lot
+
+    def row(self, i: int) -> Dict:
+        """One subscriber's sizing in the pip_calculator.calculate_position_size format plus extras"""
+        return {
+            'user_id': None if self.user_ids is None else int(self.user_ids[i]),
+            'lots': float(self.lots[i]),
+            'units': int(self.units[i]),
+            'risk_amount': round(float(self.risk_amount[i]), 2),
+            'risk_pct': float(self.risk_pct[i]),
+            'actual_risk': round(float(self.actual_risk[i]), 2),
+            'sl_pips': round(self.sl_pips, 1),
+            'pip_value': round(float(self.lots[i] * self.pip_value_per_lot), 2),
+            'pip_value_per_lot': round(self.pip_value_per_lot, 4),
+            'below_minimum': bool(self.below_minimum[i]),
+        }
+
+    def by_user(self) -> Dict[int, Dict]:
+        if self.user_ids is None:
+            return {i: self.row(i) for i in range(len(self))}
+        return {int(user_id): self.row(i) for i, user_id in enumerate(self.user_ids)}
+
+    def sizing_lines(self) -> List[str]:
+        """A short personalized sizing line per subscriber, for appending to an alert"""
+        pips = f"{self.sl_pips:,.1f}"
+        lots = self.lots.tolist()
+        risks = self.actual_risk.tolist()
+        budgets = self.risk_amount.tolist()
+        pcts = self.risk_pct.tolist()
+        small = self.below_minimum.tolist()
+        min_lot = f"{self.spec.min_lot:g}"
+        return [
+            f"📏 *Your size:* below the {min_lot} lot minimum at {pct:g}% risk (${budget:,.2f})" if too_small else
+            f"📏 *Your size:* {lot:g} lots | Risk ${risk:,.2f} ({pct:g}%) | SL {pips} pips"
+            for lot, risk, budget, pct, too_small in zip(lots, risks, budgets, pcts, small)
+        ]
+
+
+def size_positions(symbol: str, entry: float, stop_loss: float, balances: Sequence[float],
+                   risk_pcts, max_risk_pct: Optional[float] = None, quote_to_usd: Optional[float] = None,
+                   user_ids: Optional[Sequence[int]] = None) -> SizingBatch:
+    """
+    Size one signal for many accounts at once.
+
+    Args:
+        balances: Account balances in USD
+        risk_pcts: Risk per trade in percent (e.g. 1 for 1%), one per balance or a scalar
+        max_risk_pct: Cap applied to every risk percentage
+        quote_to_usd: USD per unit of the quote currency, when a live rate is known
+    """
+    spec = instrument_spec(symbol)
+    balances = np.asarray(balances, dtype=float)
+    risk_pct = np.broadcast_to(np.asarray(risk_pcts, dtype=float), balances.shape).copy()
+    if max_risk_pct is not None:
+        np.minimum(risk_pct, max_risk_pct, out=risk_pct)
+
+    risk_amount = balances * risk_pct / 100
+    sl_pips = round(abs(entry - stop_loss) / spec.pip_size, 6)       # Drop float noise before flooring
+    pip_value = spec.pip_value_per_lot(entry, quote_to_usd)
+    risk_per_lot = sl_pips * pip_value
+    raw_lots = risk_amount / risk_per_lot if risk_per_lot > 0 else np.zeros_like(risk_amount)
+
+    steps = np.floor(raw_lots / spec.lot_step + 1e-6)
+    lots = np.minimum(steps * spec.lot_step, spec.max_lot)
+    below_minimum = (lots < spec.min_lot - 1e-12) & (risk_amount > 0) & (risk_per_lot > 0)
+    lots[lots < spec.min_lot - 1e-12] = 0.0
+    lots = np.round(lots, max(0, -int(np.floor(np.log10(spec.lot_step)))))
+
+    return SizingBatch(
+        spec=spec, entry=entry, stop_loss=stop_loss, sl_pips=sl_pips, pip_value_per_lot=pip_value,
+        user_ids=None if user_ids is None else np.asarray(user_ids),
+        balances=balances, risk_pct=risk_pct, risk_amount=risk_amount, raw_lots=raw_lots, lots=lots,
+        units=lots * spec.contract_size, actual_risk=lots * risk_per_lot, below_minimum=below_minimum,
+    )
+
+
+def size_for_risk(symbol: str, entry: float, stop_loss: float, risk_amounts: Sequence[float],
+                  **kwargs) -> SizingBatch:
+    """size_positions() for fixed dollar risk amounts instead of balance percentages"""
+    return size_positions(symbol, entry, stop_loss, risk_amounts, 100.0, **kwargs)
+
+
+def signal_levels(signal: Dict):
+    """(symbol, entry, stop_loss) from the signal dict shapes used across the bot"""
+    symbol = signal.get('symbol') or signal.get('asset') or signal.get('pair')
+    entry = signal.get('entry', signal.get('entry_price', signal.get('price')))
+    stop_loss = signal.get('stop_loss', signal.get('sl'))
+    if symbol is None or entry is None or stop_loss is None:
+        raise ValueError("Signal needs a symbol, an entry and a stop loss")
+    return symbol, float(entry), float(stop_loss)
+
+
+def size_for_subscribers(signal: Dict, user_ids: Iterable[int], user_manager=None,
+                         max_risk_pct: Optional[float] = None) -> SizingBatch:
+    """Size a signal for subscribers using their capital and risk_per_trade from the user manager"""
+    user_ids = list(user_ids)
+    if user_manager is not None:
+        balances, risk_pcts = user_manager.get_risk_profiles(user_ids)
+    else:
+        balances, risk_pcts = [DEFAULT_CAPITAL] * len(user_ids), DEFAULT_RISK_PCT
+    symbol, entry, stop_loss = signal_levels(signal)
+    return size_positions(symbol, entry, stop_loss, balances, risk_pcts, max_risk_pct=max_risk_pct,
+                          user_ids=user_ids)
+
+
+def main():
+    """Size one EURUSD signal for 100,000 subscribers"""
+    import time
+
+    print("=" * 60)
+    print("POSITION SIZING DEMO")
+    print("=" * 60)
+
+    rng = np.random.default_rng(1)
+    n = 100000
+    balances = rng.choice([100.0, 500.0, 1000.0, 5000.0, 25000.0], n)
+    risk_pcts = rng.choice([0.5, 1.0, 1.5, 2.0], n)
+
+    start = time.perf_counter()
+    batch = size_positions('EURUSD', 1.0850, 1.0820, balances, risk_pcts, max_risk_pct=2.0,
+                           user_ids=np.arange(n))
+    lines = batch.sizing_lines()
+    elapsed = (time.perf_counter() - start) * 1000
+
+    print(f"Sized {len(batch):,} subscribers (with alert lines) in {elapsed:.1f}ms")
+    print(f"SL: {batch.sl_pips:.1f} pips | ${batch.pip_value_per_lot:.2f} per pip per lot")
+    print(f"Below the minimum lot: {int(batch.below_minimum.sum()):,}")
+    for i in range(3):
+        print(f"  ${balances[i]:>9,.2f} @ {risk_pcts[i]}%: {lines[i]}")
+
+    for symbol, entry, stop in (('USDJPY', 157.50, 156.90), ('GOLD', 2050.0, 2040.0), ('BTC', 45000, 44100)):
+        row = size_positions(symbol, entry, stop, [1000.0], [1.0]).row(0)
+        print(f"{symbol:<7} $1,000 @ 1%: {row['lots']} lots, {row['sl_pips']} pips, ${row['pip_value']}/pip")
+
+
+if __name__ == "__main__":
+    main()
@@ -32,6 +32,8 @@ try:
 except ImportError:
     REDIS_AVAILABLE = False
 
+from unified_cache import TTLCache
+
 # Add staging directory to path for AI imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'staging'))
 
@@ -44,20 +46,12 @@ if not REDIS_AVAILABLE:
 class AdvancedCache:
     """Advanced caching system with Redis and memory fallback"""
 
-    def __init__(self, redis_url: str = "redis://localhost:6379", ttl_seconds: int = 300):
-        self.memory_cache = {}
-        self.cache_metadata = {}
+    def __init__(self, redis_url: str = "redis://localhost:6379", ttl_seconds: int = 300,
+                 max_entries: int = 1000):
         self.ttl_seconds = ttl_seconds
-        self.redis_client = None
-
-        if REDIS_AVAILABLE:
-            try:
-                self.redis_client = redis.from_url(redis_url, decode_responses=True)
-                self.redis_client.ping()  # Test connection
-                logger.info("[CACHE] Redis cache initialized")
-            except Exception as e:
-                logger.warning(f"[CACHE] Redis connection failed: {e}, falling back to memory cache")
-                self.redis_client = None
+        self.cache = TTLCache(name='quantum_elite', maxsize=max_entries, ttl=ttl_seconds,
+                              redis_url=redis_url if REDIS_AVAILABLE else None)
+        self.redis_client = self.cache.redis_client
 
     def _generate_cache_key(self, data: Any) -> str:
         """Generate a deterministic cache key from data"""
@@ -71,99 +65,35 @@ class AdvancedCache:
     def get(self, key: str) -> Optional[Any]:
         """Get cached data with TTL check"""
         cache_key = self._generate_cache_key(key) if not isinstance(key, str) else key
-
-        # Try Redis first
-        if self.redis_client:
-            try:
-                data = self.redis_client.get(cache_key)
-                if data:
-                    return json.loads(data)
-            except Exception as e:
-                logger.debug(f"[CACHE] Redis get failed: {e}")
-
-        # Fallback to memory cache
-        if cache_key in self.memory_cache:
-            entry = self.memory_cache[cache_key]
-            if datetime.now().timestamp() - entry['timestamp'] < self.ttl_seconds:
-                return entry['data']
-            else:
-                # Expired, remove it
-                del self.memory_cache[cache_key]
-
-        return None
+        return self.cache.get(cache_key)
 
     def set(self, key: str, data: Any, custom_ttl: Optional[int] = None) -> None:
-        """Set cached data with TTL"""
+        """Set cached data with TTL (a falsy custom_ttl means the default TTL)"""
         cache_key = self._generate_cache_key(key) if not isinstance(key, str) else key
-        ttl = custom_ttl or self.ttl_seconds
-        timestamp = datetime.now().timestamp()
-
-        cache_entry = {
-            'data': data,
-            'timestamp': timestamp,
-            'ttl': ttl
-        }
+        self.cache.set(cache_key, data, custom_ttl or None)
 
-        # Try Redis first
-        if self.redis_client:
-            try:
-                self.redis_client.setex(cache_key, ttl, json.dumps(data, default=str))
-            except Exception as e:
-                logger.debug(f"[CACHE] Redis set failed: {e}")
-
-        # Always update memory cache
-        self.memory_cache[cache_key] = cache_entry
-
-        # Clean up old entries periodically
-        if len(self.memory_cache) > 1000:  # Memory limit
-            self._cleanup_expired_entries()
+    def get_or_compute(self, key: str, compute, custom_ttl: Optional[int] = None, cache_if=None) -> Any:
+        """Cached data, or compute it once even when several callers miss together"""
+        cache_key = self._generate_cache_key(key) if not isinstance(key, str) else key
+        return self.cache.get_or_compute(cache_key, compute, custom_ttl or None, cache_if)
 
     def invalidate_pattern(self, pattern: str) -> int:
         """Invalidate cache entries matching a pattern"""
-        invalidated = 0
-
-        # Redis pattern invalidation
-        if self.redis_client:
-            try:
-                keys = self.redis_client.keys(pattern)
-                if keys:
-                    self.redis_client.delete(*keys)
-                    invalidated += len(keys)
-            except Exception as e:
-                logger.debug(f"[CACHE] Redis pattern invalidation failed: {e}")
-
-        # Memory cache pattern invalidation
-        import re
-        pattern_regex = re.compile(pattern.replace('*', '.*'))
-        keys_to_remove = [k for k in self.memory_cache.keys() if pattern_regex.match(k)]
-
-        for key in keys_to_remove:
-            del self.memory_cache[key]
-            invalidated += 1
-
-        return invalidated
+        return self.cache.invalidate_pattern(pattern)
 
     def get_cache_stats(self) -> Dict:
         """Get cache statistics"""
+        stats = self.cache.get_stats()
         return {
-            'memory_entries': len(self.memory_cache),
+            'memory_entries': stats['entries'],
             'redis_available': self.redis_client is not None,
-            'default_ttl': self.ttl_seconds
+            'default_ttl': self.ttl_seconds,
+            'hits': stats['hits'],
+            'misses': stats['misses'],
+            'evictions': stats['evictions'],
+            'hit_rate': stats['hit_rate']
         }
 
-    def _cleanup_expired_entries(self):
-        """Clean up expired memory cache entries"""
-        current_time = datetime.now().timestamp()
-        expired_keys = [
-            k for k, v in self.memory_cache.items()
-            if current_time - v['timestamp'] > v['ttl']
-        ]
-
-        for key in expired_keys:
-            del self.memory_cache[key]
-
-        logger.debug(f"[CACHE] Cleaned up {len(expired_keys)} expired entries")
-
 class CircuitBreaker:
     """Circuit breaker pattern for resilient AI module calls"""
 
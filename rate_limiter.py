@@ -1,123 +1,316 @@
 """
 Rate Limiting Module for UR Trading Expert Bot
 Implements per-user rate limiting to prevent abuse
+
+Limits use GCRA (generic cell rate algorithm): each key stores a single
+"theoretical arrival time", so a check is O(1) in time and memory no matter
+how many requests were made. A key whose arrival time has passed is identical
+to a fresh one and is evicted, so idle users cost nothing. State lives in a
+backend: MemoryBackend for a single process, or RedisBackend (set
+RATE_LIMIT_REDIS_URL) to share limits across bot processes.
 """
 
+import os
+import threading
 import time
-from collections import defaultdict
-from typing import Dict, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
 from functools import wraps
 import logging
 
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Per-command limits are multiplied by the user's tier (user_manager tiers; admins resolve to 'vip')
+TIER_MULTIPLIERS = {
+    'free': 1.0,
+    'premium': 3.0,
+    'vip': 5.0,
+}
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """At most ``limit`` requests per ``period`` seconds (bursts up to ``limit``)"""
+    limit: int
+    period: float
+
+    @property
+    def emission_interval(self) -> float:
+        """Seconds after which one request's worth of capacity is regained"""
+        return self.period / self.limit
+
+    @property
+    def tolerance(self) -> float:
+        """How far ahead of now the arrival time may run before requests are refused"""
+        return self.period - self.emission_interval
+
+    def scaled(self, multiplier: float) -> 'RateLimit':
+        return RateLimit(max(1, int(round(self.limit * multiplier))), self.period)
+
+
+@dataclass
+class RateLimitResult:
+    """Outcome of one rate limit check"""
+    allowed: bool
+    remaining: int
+    retry_after: float
+    limit: int
+
+
+def _evaluate(tat: Optional[float], now: float, rate: RateLimit) -> Tuple[bool, float, float]:
+    """GCRA decision: (allowed, new arrival time, retry_after)"""
+    tat = now if tat is None or tat < now else tat
+    if tat - now > rate.tolerance + 1e-9:
+        return False, tat, tat - rate.tolerance - now
+    return True, tat + rate.emission_interval, 0.0
+
+
+def _remaining(tat: float, now: float, rate: RateLimit) -> int:
+    """Requests still allowed right now given the key's arrival time"""
+    backlog = max(tat - now, 0.0)
+    return max(0, int((rate.period - backlog) / rate.emission_interval + 1e-9))
+
+
+class MemoryBackend:
+    """In-process GCRA state: {key: arrival time}, least recently used first"""
+
+    def __init__(self, max_keys: int = 100000, evict_per_call: int = 8):
+        self._tats: 'OrderedDict[str, float]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_keys = max_keys
+        self.evict_per_call = evict_per_call
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+    def peek(self, key: str) -> Optional[float]:
+        return self._tats.get(key)
+
+    def acquire(self, key: str, now: float, rate: RateLimit) -> Tuple[bool, float, float]:
+        with self._lock:
+            allowed, tat, retry_after = _evaluate(self._tats.get(key), now, rate)
+            if allowed:
+                self._tats[key] = tat
+                self._tats.move_to_end(key)
+            self._evict(now)
+            return allowed, tat, retry_after
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._tats.pop(key, None)
+
+    def cleanup(self, now: Optional[float] = None) -> int:
+        """Drop every idle key (full sweep); returns how many were removed"""
+        now = time.time() if now is None else now
+        with self._lock:
+            idle = [key for key, tat in self._tats.items() if tat <= now]
+            for key in idle:
+                del self._tats[key]
+            self.evictions += len(idle)
+            return len(idle)
+
+    def _evict(self, now: float):
+        """Amortized O(1) eviction from the least recently used end"""
+        for _ in range(self.evict_per_call):
+            if not self._tats:
+                return
+            key, tat = next(iter(self._tats.items()))
+            if tat > now and len(self._tats) <= self.max_keys:
+                return
+            del self._tats[key]
+            self.evictions += 1
+
+
+# KEYS[1] = key, ARGV = now, emission interval, tolerance. Returns {allowed, tat, retry_after} as strings.
+_GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local tolerance = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+if tat - now > tolerance + 1e-9 then
+    return {0, tostring(tat), tostring(tat - tolerance - now)}
+end
+local new_tat = tat + interval
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, tostring(new_tat), '0'}
+"""
+
+
+class RedisBackend:
+    """
+    GCRA state shared through Redis.
+
+    The check runs as one Lua script, so concurrent bot processes can not race,
+    and every key expires when it goes idle, so Redis needs no cleanup either.
+    """
+
+    def __init__(self, client, prefix: str = 'ratelimit:'):
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(_GCRA_SCRIPT)
+
+    def peek(self, key: str) -> Optional[float]:
+        value = self.client.get(self.prefix + key)
+        return float(value) if value is not None else None
+
+    def acquire(self, key: str, now: float, rate: RateLimit) -> Tuple[bool, float, float]:
+        allowed, tat, retry_after = self._script(keys=[self.prefix + key],
+                                                 args=[repr(now), repr(rate.emission_interval), repr(rate.tolerance)])
+        return bool(int(allowed)), float(tat), float(retry_after)
+
+    def delete(self, *keys: str):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def cleanup(self, now: Optional[float] = None) -> int:
+        return 0    # Keys expire on their own
+
+
 class RateLimiter:
     """Rate limiter with per-user tracking"""
-    
-    def __init__(self):
-        # Store request timestamps per user
-        # Format: {user_id: [timestamp1, timestamp2, ...]}
-        self.user_requests: Dict[int, list] = defaultdict(list)
-        
-        # Rate limit configuration
+
+    def __init__(self, backend=None, tier_resolver: Optional[Callable[[int], str]] = None,
+                 tier_cache_ttl: float = 60.0):
+        """
+        Args:
+            backend: MemoryBackend (default) or RedisBackend
+            tier_resolver: user_id -> tier ('free'/'premium'/'vip'), e.g. UserManager.get_user_tier
+            tier_cache_ttl: Seconds a resolved tier is reused before asking the resolver again
+        """
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.tier_resolver = tier_resolver
+        self.tier_cache_ttl = tier_cache_ttl
+        self._tier_cache: 'OrderedDict[int, Tuple[str, float]]' = OrderedDict()
+        self._tier_cache_size = 10000
+
+        # Global per-user limits (all commands together)
         self.requests_per_minute = 100  # 100 requests per minute per user
         self.requests_per_hour = 1000   # 1000 requests per hour per user
         self.burst_limit = 20           # Max 20 requests in 10 seconds
-        
-        # Cleanup old entries periodically
-        self.last_cleanup = time.time()
-        self.cleanup_interval = 3600  # Clean up every hour
-    
-    def _cleanup_old_entries(self):
-        """Remove old request timestamps to prevent memory bloat"""
-        current_time = time.time()
-        if current_time - self.last_cleanup < self.cleanup_interval:
-            return
-        
-        cutoff_time = current_time - 3600  # Keep only last hour
-        for user_id in list(self.user_requests.keys()):
-            self.user_requests[user_id] = [
-                ts for ts in self.user_requests[user_id] 
-                if ts > cutoff_time
-            ]
-            # Remove empty entries
-            if not self.user_requests[user_id]:
-                del self.user_requests[user_id]
-        
-        self.last_cleanup = current_time
-    
+
+    def _user_limits(self):
+        return (
+            ('burst', RateLimit(self.burst_limit, 10)),
+            ('minute', RateLimit(self.requests_per_minute, 60)),
+            ('hour', RateLimit(self.requests_per_hour, 3600)),
+        )
+
     def check_rate_limit(self, user_id: int) -> Tuple[bool, str]:
         """
         Check if user has exceeded rate limits
-        
+
         Returns:
             (allowed: bool, message: str)
         """
         current_time = time.time()
-        
-        # Cleanup old entries periodically
-        self._cleanup_old_entries()
-        
-        # Get user's request history
-        user_history = self.user_requests[user_id]
-        
-        # Remove requests older than 1 hour
-        one_hour_ago = current_time - 3600
-        user_history = [ts for ts in user_history if ts > one_hour_ago]
-        self.user_requests[user_id] = user_history
-        
-        # Check burst limit (last 10 seconds)
-        ten_seconds_ago = current_time - 10
-        recent_requests = [ts for ts in user_history if ts > ten_seconds_ago]
-        if len(recent_requests) >= self.burst_limit:
-            wait_time = int(10 - (current_time - recent_requests[0]))
-            return False, f"⏳ Too many requests. Please wait {wait_time} seconds."
-        
-        # Check per-minute limit
-        one_minute_ago = current_time - 60
-        minute_requests = [ts for ts in user_history if ts > one_minute_ago]
-        if len(minute_requests) >= self.requests_per_minute:
-            wait_time = int(60 - (current_time - minute_requests[0]))
-            return False, f"⏳ Rate limit exceeded. Please wait {wait_time} seconds."
-        
-        # Check per-hour limit
-        if len(user_history) >= self.requests_per_hour:
-            wait_time = int(3600 - (current_time - user_history[0]))
-            minutes = wait_time // 60
-            return False, f"⏳ Hourly limit exceeded. Please wait {minutes} minutes."
-        
-        # All checks passed - record this request
-        user_history.append(current_time)
-        self.user_requests[user_id] = user_history
-        
+        limits = self._user_limits()
+
+        # Look before consuming, so a refused request does not use up the other windows
+        for name, rate in limits:
+            allowed, _, retry_after = _evaluate(self.backend.peek(f"user:{name}:{user_id}"), current_time, rate)
+            if not allowed:
+                return False, self._limit_message(name, retry_after)
+
+        for name, rate in limits:
+            allowed, _, retry_after = self.backend.acquire(f"user:{name}:{user_id}", current_time, rate)
+            if not allowed:
+                return False, self._limit_message(name, retry_after)
+
         return True, "OK"
-    
+
+    def _limit_message(self, name: str, retry_after: float) -> str:
+        wait_time = max(1, int(retry_after + 0.999))
+        if name == 'burst':
+            return f"⏳ Too many requests. Please wait {wait_time} seconds."
+        if name == 'minute':
+            return f"⏳ Rate limit exceeded. Please wait {wait_time} seconds."
+        return f"⏳ Hourly limit exceeded. Please wait {max(1, wait_time // 60)} minutes."
+
+    def check_command(self, user_id: int, command: str, max_calls: int = 5, period: float = 60,
+                      tier: Optional[str] = None) -> RateLimitResult:
+        """Per-command limit of ``max_calls`` per ``period`` seconds, scaled by the user's tier"""
+        tier = tier or self.get_tier(user_id)
+        rate = RateLimit(max_calls, period).scaled(TIER_MULTIPLIERS.get(tier, 1.0))
+        now = time.time()
+        allowed, tat, retry_after = self.backend.acquire(f"cmd:{command}:{user_id}", now, rate)
+        return RateLimitResult(allowed, _remaining(tat, now, rate), retry_after, rate.limit)
+
+    def get_tier(self, user_id: int) -> str:
+        """User tier via tier_resolver, cached for tier_cache_ttl seconds"""
+        if self.tier_resolver is None:
+            return 'free'
+        now = time.time()
+        cached = self._tier_cache.get(user_id)
+        if cached and cached[1] > now:
+            return cached[0]
+        try:
+            tier = (self.tier_resolver(user_id) or 'free').lower()
+        except Exception as e:
+            logger.warning(f"Tier lookup failed for user {user_id}: {e}")
+            tier = 'free'
+        self._tier_cache[user_id] = (tier, now + self.tier_cache_ttl)
+        self._tier_cache.move_to_end(user_id)
+        while len(self._tier_cache) > self._tier_cache_size:
+            self._tier_cache.popitem(last=False)
+        return tier
+
     def get_user_stats(self, user_id: int) -> Dict:
         """Get rate limit statistics for a user"""
-        current_time = time.time()
-        user_history = self.user_requests[user_id]
-        
-        # Remove old entries
-        one_hour_ago = current_time - 3600
-        user_history = [ts for ts in user_history if ts > one_hour_ago]
-        
+        now = time.time()
+        remaining = {}
+        for name, rate in self._user_limits():
+            tat = self.backend.peek(f"user:{name}:{user_id}")
+            remaining[name] = _remaining(tat if tat is not None else now, now, rate)
+
         return {
-            'requests_last_minute': len([ts for ts in user_history if ts > current_time - 60]),
-            'requests_last_hour': len(user_history),
+            'requests_last_minute': self.requests_per_minute - remaining['minute'],
+            'requests_last_hour': self.requests_per_hour - remaining['hour'],
+            'remaining_burst': remaining['burst'],
             'limit_per_minute': self.requests_per_minute,
             'limit_per_hour': self.requests_per_hour,
             'burst_limit': self.burst_limit
         }
-    
-    def reset_user_limit(self, user_id: int):
+
+    def reset_user_limit(self, user_id: int, commands: Tuple[str, ...] = ()):
         """Reset rate limit for a user (admin function)"""
-        if user_id in self.user_requests:
-            del self.user_requests[user_id]
+        keys = [f"user:{name}:{user_id}" for name, _ in self._user_limits()]
+        keys += [f"cmd:{command}:{user_id}" for command in commands]
+        self.backend.delete(*keys)
+        self._tier_cache.pop(user_id, None)
         logger.info(f"Rate limit reset for user {user_id}")
 
 
+def _create_backend():
+    """RedisBackend when RATE_LIMIT_REDIS_URL is set and reachable, MemoryBackend otherwise"""
+    redis_url = os.getenv('RATE_LIMIT_REDIS_URL')
+    if redis_url and REDIS_AVAILABLE:
+        try:
+            client = redis.from_url(redis_url, decode_responses=True)
+            client.ping()
+            logger.info("Rate limiter using shared Redis state")
+            return RedisBackend(client)
+        except Exception as e:
+            logger.warning(f"Rate limiter Redis connection failed: {e}, using in-memory state")
+    return MemoryBackend()
+
+
 # Global rate limiter instance
-rate_limiter = RateLimiter()
+rate_limiter = RateLimiter(backend=_create_backend())
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get the global rate limiter"""
+    return rate_limiter
 
 
 def rate_limit_decorator(func):
@@ -125,17 +318,17 @@ def rate_limit_decorator(func):
     @wraps(func)
     async def wrapper(update: 'Update', context: 'ContextTypes.DEFAULT_TYPE'):
         user_id = update.effective_user.id
-        
+
         # Check rate limit
         allowed, message = rate_limiter.check_rate_limit(user_id)
-        
+
         if not allowed:
             await update.message.reply_text(message)
             return
-        
+
         # Call original function
         return await func(update, context)
-    
+
     return wrapper
 
 
@@ -147,6 +340,3 @@ def check_rate_limit(user_id: int) -> Tuple[bool, str]:
 def get_rate_limit_stats(user_id: int) -> Dict:
     """Get rate limit statistics for a user"""
     return rate_limiter.get_user_stats(user_id)
-
-
-
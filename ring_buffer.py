@@ -0,0 +1,178 @@
+"""
+Ring Buffer
+Preallocated NumPy ring buffer and Welford online statistics for streaming data
+
+Rows are written twice (at ``i`` and ``i + capacity``) into a ``2 * capacity``
+backing array, so the most recent ``k`` rows are always one contiguous slice
+and windows can be handed out as views without copying.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-capacity 2-D buffer with O(1) append and zero-copy windows"""
+
+    def __init__(self, capacity: int, width: int, dtype=np.float64):
+        if capacity <= 0 or width <= 0:
+            raise ValueError("capacity and width must be positive")
+        self.capacity = capacity
+        self.width = width
+        self._data = np.zeros((2 * capacity, width), dtype=dtype)
+        self._next = 0      # Slot (0..capacity-1) the next row goes into
+        self._size = 0
+        self.total_appended = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def dtype(self):
+        return self._data.dtype
+
+    @property
+    def is_full(self) -> bool:
+        return self._size == self.capacity
+
+    def next_slot(self) -> np.ndarray:
+        """Writable view of the row the next append will occupy (fill it, then commit())"""
+        return self._data[self._next]
+
+    def commit(self) -> np.ndarray:
+        """Publish the row written through next_slot(); returns a view of it"""
+        slot = self._next
+        self._data[slot + self.capacity] = self._data[slot]
+        self._next = (slot + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        self.total_appended += 1
+        return self._data[slot + self.capacity]
+
+    def append(self, row: np.ndarray) -> np.ndarray:
+        """Copy ``row`` into the buffer (O(1), no allocation); returns a view of it"""
+        self._data[self._next] = row
+        return self.commit()
+
+    def latest(self) -> Optional[np.ndarray]:
+        """View of the most recent row"""
+        if self._size == 0:
+            return None
+        return self._data[self._next - 1 + self.capacity]
+
+    def window(self, size: Optional[int] = None) -> np.ndarray:
+        """
+        Contiguous view of the last ``size`` rows, oldest first.
+
+        The view aliases the buffer: copy it if it must outlive later appends.
+        """
+        size = self._size if size is None else min(size, self._size)
+        end = self._next + self.capacity
+        return self._data[end - size:end]
+
+    def clear(self):
+        self._next = 0
+        self._size = 0
+
+
+class OnlineStatistics:
+    """Per-column running mean/variance using Welford's algorithm (preallocated)"""
+
+    def __init__(self, width: int, min_std: float = 1e-8):
+        self.count = 0
+        self.mean = np.zeros(width)
+        self.m2 = np.zeros(width)
+        self.std = np.ones(width)
+        self.min_std = min_std
+        self._delta = np.empty(width)
+        self._scratch = np.empty(width)
+
+    def update(self, x: np.ndarray):
+        """Add one observation, without allocating temporaries"""
+        self.count += 1
+        np.subtract(x, self.mean, out=self._delta)                # delta = x - mean
+        np.divide(self._delta, self.count, out=self._scratch)
+        self.mean += self._scratch                                # mean += delta / n
+        np.subtract(x, self.mean, out=self._scratch)              # delta2 = x - new mean
+        self._scratch *= self._delta
+        self.m2 += self._scratch                                  # M2 += delta * delta2
+        np.divide(self.m2, self.count, out=self.std)
+        np.sqrt(self.std, out=self.std)                           # population std
+
+    @property
+    def variance(self) -> np.ndarray:
+        return self.m2 / self.count if self.count else np.zeros_like(self.m2)
+
+    def standardize(self, x: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """(x - mean) / std, with constant columns mapped to 0 instead of inf"""
+        out = np.subtract(x, self.mean, out=out)
+        np.maximum(self.std, self.min_std, out=self._scratch)
+        np.divide(out, self._scratch, out=out)
+        return out
+
+
+class ZScoreScratch:
+    """Preallocated work arrays for scoring windows of up to ``rows`` x ``width``"""
+
+    def __init__(self, rows: int, width: int):
+        self.mean = np.empty(width)
+        self.std = np.empty(width)
+        self.active = np.empty(width, dtype=bool)
+        self.centered = np.empty((rows, width))
+        self.z = np.empty((rows, width))
+        self.scores = np.empty(rows)
+
+
+def window_zscores(window: np.ndarray, min_std: float = 1e-8,
+                   scratch: Optional[ZScoreScratch] = None) -> np.ndarray:
+    """
+    Z-score of every row against the window's own column mean/std, in one pass.
+
+    With ``scratch`` nothing is allocated: the result is a view into
+    ``scratch.z`` that the next call overwrites.
+    """
+    n = len(window)
+    if scratch is None:
+        scratch = ZScoreScratch(n, window.shape[1])
+    np.mean(window, axis=0, out=scratch.mean)
+    centered = np.subtract(window, scratch.mean, out=scratch.centered[:n])
+    np.einsum('ij,ij->j', centered, centered, out=scratch.std)
+    scratch.std /= n
+    np.sqrt(scratch.std, out=scratch.std)
+    np.greater(scratch.std, min_std, out=scratch.active)
+    z = scratch.z[:n]
+    z.fill(0.0)
+    np.divide(centered, scratch.std, out=z, where=scratch.active)
+    return z
+
+
+def anomaly_scores(window: np.ndarray, min_std: float = 1e-8,
+                   scratch: Optional[ZScoreScratch] = None) -> np.ndarray:
+    """
+    Anomaly score in [0, 1) for every row of ``window``.
+
+    Based on the RMS z-score over the columns that vary within the window:
+    rows at or below one standard deviation score 0, a score of 0.5 is an
+    RMS z-score of about 1.7. With ``scratch`` the scores are a view into
+    ``scratch.scores``.
+    """
+    n = len(window)
+    if n < 2:
+        return np.zeros(n)
+    if scratch is None:
+        scratch = ZScoreScratch(n, window.shape[1])
+    z = window_zscores(window, min_std, scratch)
+    scores = scratch.scores[:n]
+    active = np.count_nonzero(scratch.active)
+    if active == 0:
+        scores.fill(0.0)
+        return scores
+    np.einsum('ij,ij->i', z, z, out=scores)
+    scores /= active
+    np.sqrt(scores, out=scores)
+    scores -= 1.0
+    np.maximum(scores, 0.0, out=scores)
+    np.negative(scores, out=scores)
+    np.exp(scores, out=scores)
+    np.subtract(1.0, scores, out=scores)
+    return scores
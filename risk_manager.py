@@ -9,9 +9,18 @@ from datetime import datetime, timedelta
 import numpy as np
 from typing import Dict, List, Optional
 from global_error_learning import global_error_manager, record_error
+from position_sizing import size_positions
+
+try:
+    from portfolio_risk import get_portfolio_risk_engine, exposures_from_positions
+    PORTFOLIO_RISK_AVAILABLE = True
+except ImportError:
+    PORTFOLIO_RISK_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+_RISK_LEVELS = ('LOW', 'MEDIUM', 'HIGH')
+
 class EnhancedRiskManager:
     def __init__(self):
         # Base risk limits
@@ -311,6 +320,11 @@ class EnhancedRiskManager:
             elif total_risk_pct > 5 or concentration_risk > 2.5:
                 risk_level = 'MEDIUM'
 
+            # Correlated VaR/stress can only raise the stop-distance level
+            var_report = self.portfolio_var(open_positions, account_balance)
+            if var_report and var_report.get('risk_level'):
+                risk_level = max(risk_level, var_report['risk_level'], key=_RISK_LEVELS.index)
+
             return {
                 'total_risk_amount': round(total_risk_amount, 2),
                 'total_risk_pct': round(total_risk_pct, 2),
@@ -318,6 +332,7 @@ class EnhancedRiskManager:
                 'concentration_risk_pct': round(concentration_risk, 2),
                 'risk_level': risk_level,
                 'risk_by_asset': risk_by_asset,
+                'var_report': var_report,
                 'max_positions_allowed': self._calculate_max_positions(total_risk_pct),
                 'recommendations': self._get_risk_recommendations(risk_level, concentration_risk)
             }
@@ -325,6 +340,26 @@ class EnhancedRiskManager:
         except Exception as e:
             return {'error': f"Portfolio risk assessment failed: {e}"}
 
+    def portfolio_var(self, positions: List[Dict], balance: float) -> Optional[Dict]:
+        """
+        VaR/CVaR and stress report from the portfolio risk engine.
+
+        None when the engine is unavailable, the positions carry no size or
+        position_value to build exposures from, or the engine is still loading
+        price histories (this never waits on a download).
+        """
+        if not PORTFOLIO_RISK_AVAILABLE:
+            return None
+        try:
+            exposures = exposures_from_positions(positions)
+            if not any(exposures.values()):
+                return None
+            return get_portfolio_risk_engine().evaluate(exposures, balance or None, positions=len(positions),
+                                                        fetch=False)
+        except Exception as e:
+            logger.warning(f"Portfolio VaR failed: {e}")
+            return None
+
     def _calculate_max_positions(self, current_risk_pct: float) -> int:
         """Calculate maximum additional positions allowed"""
         remaining_risk_capacity = max(0, self.MAX_PORTFOLIO_RISK * 100 - current_risk_pct)
@@ -365,58 +400,45 @@ class EnhancedRiskManager:
         """
         if risk_pct > self.MAX_RISK_PER_TRADE:
             risk_pct = self.MAX_RISK_PER_TRADE
-            
-        risk_amount = balance * risk_pct
-        price_diff = abs(entry_price - stop_loss)
-        
-        if price_diff == 0:
+
+        if entry_price == stop_loss:
             return None
-            
-        # Standard Forex Calculation (approximate for USD base)
-        # Risk = (Entry - SL) * Units
-        # Units = Risk / (Entry - SL)
-        
-        # Adjust for JPY pairs (multiplier 100) or Gold (multiplier 1)
-        multiplier = 1.0
-        if "JPY" in pair:
-            multiplier = 0.01 # JPY pips are 0.01
-        elif "XAU" in pair or "GOLD" in pair:
-            multiplier = 1.0
-        else:
-            multiplier = 0.0001 # Standard pips
-            
-        # Calculate pip value roughly (assuming USD account)
-        # This is a simplified calculation. For precise values, we'd need exchange rates.
-        # Position Size = Risk Amount / (Stop Loss Pips * Pip Value)
-        
-        pips = price_diff / multiplier
-        
-        # Standard lot = $10/pip (approx for EURUSD)
-        # Mini lot = $1/pip
-        # Micro lot = $0.10/pip
-        
-        # Simplified: Units = Risk Amount / Price Diff
-        units = risk_amount / price_diff
-        
-        # Convert to lots (1 standard lot = 100,000 units)
-        lots = units / 100000
-        
+
+        batch = size_positions(pair, entry_price, stop_loss, [balance], [risk_pct * 100])
+        return self._size_result(batch, 0)
+
+    @staticmethod
+    def _size_result(batch, i: int) -> Dict:
+        """calculate_position_size() dict for row i of a sizing batch"""
+        raw_lots = float(batch.raw_lots[i])
         return {
-            'risk_pct': risk_pct * 100,
-            'risk_amount': risk_amount,
-            'units': units,
-            'lots': round(lots, 2),
-            'pips': int(pips)
+            'risk_pct': float(batch.risk_pct[i]),
+            'risk_amount': float(batch.risk_amount[i]),
+            'units': raw_lots * batch.spec.contract_size,
+            'lots': round(raw_lots, 2),
+            'pips': int(batch.sl_pips)
         }
 
+    def calculate_position_sizes(self, balances, entry_price, stop_loss, risk_pcts=0.01, pair="EURUSD",
+                                 user_ids=None):
+        """
+        Size one setup for many accounts at once (signal fan-out)
+        Returns: position_sizing.SizingBatch, risk capped at MAX_RISK_PER_TRADE
+        """
+        return size_positions(pair, entry_price, stop_loss, balances, np.asarray(risk_pcts, dtype=float) * 100,
+                              max_risk_pct=self.MAX_RISK_PER_TRADE * 100, user_ids=user_ids)
+
     def calculate_risk_scenarios(self, balance, entry, stop_loss, pair="EURUSD"):
         """
         Calculate 3 risk scenarios: Conservative, Moderate, Aggressive
         """
+        if entry == stop_loss:
+            return {'conservative': None, 'moderate': None, 'aggressive': None}
+
+        # 0.5%, 1.0% and 2.0% sized together
+        batch = self.calculate_position_sizes([balance] * 3, entry, stop_loss, [0.005, 0.01, 0.02], pair)
         scenarios = {
-            'conservative': self.calculate_position_size(balance, entry, stop_loss, 0.005, pair), # 0.5%
-            'moderate': self.calculate_position_size(balance, entry, stop_loss, 0.01, pair),      # 1.0%
-            'aggressive': self.calculate_position_size(balance, entry, stop_loss, 0.02, pair)     # 2.0%
+            name: self._size_result(batch, i) for i, name in enumerate(('conservative', 'moderate', 'aggressive'))
         }
         return scenarios
 
@@ -449,17 +471,20 @@ class EnhancedRiskManager:
                 asset_types['stocks'].append((pair, risk))
 
         risk_pct = total_risk / balance if balance > 0 else 0
+        var_report = self.portfolio_var(open_trades, balance)
 
         return {
             'total_risk_amount': total_risk,
             'total_risk_pct': risk_pct * 100,
-            'is_overexposed': risk_pct > self.MAX_PORTFOLIO_RISK,
+            'is_overexposed': risk_pct > self.MAX_PORTFOLIO_RISK or
+                              bool(var_report and var_report.get('risk_level') == 'HIGH'),
             'exposure_map': exposure_map,
             'asset_types': asset_types,
-            'heat_map': self._generate_heat_map(exposure_map, total_risk, risk_pct * 100)
+            'var_report': var_report,
+            'heat_map': self._generate_heat_map(exposure_map, total_risk, risk_pct * 100, var_report)
         }
 
-    def _generate_heat_map(self, exposure_map, total_risk, total_risk_pct):
+    def _generate_heat_map(self, exposure_map, total_risk, total_risk_pct, var_report=None):
         """Generate a visual heat map representation"""
         if not exposure_map:
             return "🔥 PORTFOLIO HEAT MAP\n\n⚪ No open trades - Portfolio is cool!"
@@ -509,6 +534,9 @@ class EnhancedRiskManager:
 
         heat_map += "\n" + "─" * 30 + "\n"
 
+        if var_report:
+            heat_map += format_var_summary(var_report) + "\n" + "─" * 30 + "\n"
+
         # Recommendations
         if total_risk_pct > self.MAX_PORTFOLIO_RISK * 100:
             heat_map += "💡 **RECOMMENDATIONS:**\n"
@@ -688,5 +716,22 @@ class EnhancedRiskManager:
         }
 
 
+def format_var_summary(report: Dict) -> str:
+    """Markdown lines for a portfolio risk engine report (VaR, CVaR, worst stress)"""
+    msg = f"📐 *VALUE AT RISK* ({report['horizon_days']}-day, {report['observations']} days of returns)\n"
+    for label, values in report['var'].items():
+        msg += f"{label} VaR: ${values['historical']:,.2f} hist | ${values['parametric']:,.2f} param\n"
+    for label, values in report['cvar'].items():
+        msg += f"{label} CVaR: ${values['historical']:,.2f}\n"
+    if 'var_pct' in report:
+        msg += f"VaR {report['var_pct']:.2f}% | CVaR {report['cvar_pct']:.2f}% of balance\n"
+    if report.get('worst_scenario'):
+        worst = report['worst_scenario']
+        msg += f"Worst stress ({worst.replace('_', ' ')}): ${report['stress'][worst]:,.2f}\n"
+    if report.get('unmodelled'):
+        msg += f"⚠️ No price history for: {', '.join(report['unmodelled'])}\n"
+    return msg
+
+
 # Backward compatibility alias
 RiskManager = EnhancedRiskManager
@@ -4,6 +4,7 @@ Standalone version that returns JSON for easy integration
 Can be called from Claude AI or any application
 """
 
+import os
 import subprocess
 import sys
 import re
@@ -22,6 +23,8 @@ except ImportError:
     REDIS_AVAILABLE = False
     print("⚠️ Redis not available - caching disabled. Install with: pip install redis")
 
+from unified_cache import TTLCache
+
 
 class UltimateSignalAPI:
     """API-ready signal analyzer for Claude AI integration with caching"""
@@ -31,7 +34,9 @@ class UltimateSignalAPI:
         self.gold_script = "Gold expert/elite_signal_generator.py"
         self.redis_client = redis_client
         self.cache_ttl = cache_ttl  # 5 minutes default
-        self.memory_cache = {}  # Fallback in-memory cache
+        # In-memory LRU in front of Redis (when a client is given); keys stay unprefixed in Redis
+        self.memory_cache = TTLCache(name='signal_api', maxsize=100, ttl=cache_ttl,
+                                     redis_client=redis_client, redis_prefix='')
         self.performance_mode = performance_mode
     
     def run_generator(self, script):
@@ -159,51 +164,21 @@ class UltimateSignalAPI:
     
     def _get_from_cache(self, key: str) -> Optional[Dict]:
         """Get data from cache (Redis or memory)"""
-        # Try Redis first
-        if self.redis_client:
-            try:
-                cached = self.redis_client.get(key)
-                if cached:
-                    return json.loads(cached)
-            except Exception as e:
-                print(f"[CACHE] Redis error: {e}")
-        
-        # Fallback to memory cache
-        if key in self.memory_cache:
-            cached_data, timestamp = self.memory_cache[key]
-            if time.time() - timestamp < self.cache_ttl:
-                return cached_data
-        
-        return None
+        return self.memory_cache.get(key)
     
     def _set_cache(self, key: str, data: Dict):
         """Set data in cache (Redis or memory)"""
-        # Try Redis first
-        if self.redis_client:
-            try:
-                self.redis_client.setex(key, self.cache_ttl, json.dumps(data))
-                return
-            except Exception as e:
-                print(f"[CACHE] Redis error: {e}")
-        
-        # Fallback to memory cache
-        self.memory_cache[key] = (data, time.time())
-        # Clean old entries (keep last 100)
-        if len(self.memory_cache) > 100:
-            oldest_key = min(self.memory_cache.keys(), 
-                           key=lambda k: self.memory_cache[k][1])
-            del self.memory_cache[oldest_key]
+        self.memory_cache.set(key, data)
     
     def get_complete_analysis(self, use_cache: bool = True):
         """Get complete analysis and return as JSON with caching"""
-        
-        cache_key = "complete_analysis"
-        if use_cache:
-            cached = self._get_from_cache(cache_key)
-            if cached:
-                print("[CACHE] Returning cached analysis")
-                return cached
-        
+        if not use_cache:
+            return self._build_complete_analysis()
+        # Callers that miss together wait for one run of the generators instead of starting their own
+        return self.memory_cache.get_or_compute("complete_analysis", self._build_complete_analysis)
+    
+    def _build_complete_analysis(self) -> Dict:
+        """Run both generators and assemble the analysis"""
         # Get signals
         btc_output = self.run_generator(self.btc_script)
         gold_output = self.run_generator(self.gold_script)
@@ -259,10 +234,6 @@ class UltimateSignalAPI:
             'cached': False
         }
         
-        # Cache the response
-        if use_cache:
-            self._set_cache(cache_key, response)
-        
         return response
 
 
@@ -6,11 +6,12 @@ Logs signal lifecycle: generated → executed → outcome
 
 import json
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List, Optional
-from collections import defaultdict
 import statistics
 
+from trade_stats import ALL, TradeStatsAggregator
+
 
 class SignalPerformanceTracker:
     """
@@ -20,6 +21,9 @@ class SignalPerformanceTracker:
     def __init__(self, storage_file: str = "signal_performance.json"):
         self.storage_file = storage_file
         self.signals = self._load_signals()
+        self._signal_index = {}
+        self.stats = TradeStatsAggregator()
+        self._load_statistics(self.stats)
     
     def _load_signals(self) -> List[Dict]:
         """Load signals from storage file"""
@@ -31,6 +35,38 @@ class SignalPerformanceTracker:
                 return []
         return []
     
+    def _record_generated(self, stats: TradeStatsAggregator, signal: Dict):
+        stats.record_open(signal['generated_at'], asset=signal.get('symbol', 'UNKNOWN'),
+                          tier=signal.get('quality_grade'))
+    
+    def _record_outcome(self, stats: TradeStatsAggregator, signal: Dict):
+        # Outcomes count toward the day the signal was generated, matching the days filter
+        stats.record_close(signal['generated_at'], signal.get('final_pnl') or 0.0, won=bool(signal.get('win')),
+                           asset=signal.get('symbol', 'UNKNOWN'), tier=signal.get('quality_grade'))
+    
+    def _load_statistics(self, stats: TradeStatsAggregator):
+        """Index signals by ID and feed their history into an aggregator"""
+        self._signal_index = {}
+        for signal in self.signals:
+            self._signal_index.setdefault(signal.get('signal_id'), signal)
+            if signal.get('generated_at'):
+                self._record_generated(stats, signal)
+                if signal.get('status') == 'CLOSED':
+                    self._record_outcome(stats, signal)
+    
+    def rebuild_statistics(self) -> Dict:
+        """
+        Recompute the running statistics from the signal log and report any drift
+        
+        Returns:
+            {'series': count, 'mismatches': [...]}; the rebuilt figures replace the running ones
+        """
+        fresh = TradeStatsAggregator(clock=self.stats.clock)
+        self._load_statistics(fresh)
+        mismatches = self.stats.compare(fresh)
+        self.stats = fresh
+        return {'series': len(fresh), 'mismatches': mismatches}
+    
     def _save_signals(self):
         """Save signals to storage file"""
         try:
@@ -73,6 +109,8 @@ class SignalPerformanceTracker:
         }
         
         self.signals.append(signal_record)
+        self._signal_index.setdefault(signal_id, signal_record)
+        self._record_generated(self.stats, signal_record)
         self._save_signals()
         
         return signal_id
@@ -108,6 +146,7 @@ class SignalPerformanceTracker:
         """
         signal = self._find_signal(signal_id)
         if signal:
+            already_closed = signal.get('status') == 'CLOSED'
             signal['outcome'] = outcome
             signal['win'] = (outcome == 'WIN')
             signal['final_price'] = final_price
@@ -115,14 +154,16 @@ class SignalPerformanceTracker:
             signal['status'] = 'CLOSED'
             if pnl is not None:
                 signal['final_pnl'] = pnl
+            if already_closed:
+                # Corrected outcome: running totals can not be undone, so recount
+                self.rebuild_statistics()
+            else:
+                self._record_outcome(self.stats, signal)
             self._save_signals()
     
     def _find_signal(self, signal_id: str) -> Optional[Dict]:
         """Find signal by ID"""
-        for signal in self.signals:
-            if signal.get('signal_id') == signal_id:
-                return signal
-        return None
+        return self._signal_index.get(signal_id)
     
     def calculate_win_rate(self, days: Optional[int] = None, 
                          symbol: Optional[str] = None) -> Dict:
@@ -136,27 +177,9 @@ class SignalPerformanceTracker:
         Returns:
             Dict with win rate statistics
         """
-        # Filter signals
-        filtered_signals = self.signals
+        stats = self.stats.summary(asset=symbol or ALL, days=days)
         
-        if days:
-            cutoff_date = datetime.now() - timedelta(days=days)
-            filtered_signals = [
-                s for s in filtered_signals
-                if s.get('generated_at') and 
-                datetime.fromisoformat(s['generated_at']) >= cutoff_date
-            ]
-        
-        if symbol:
-            filtered_signals = [
-                s for s in filtered_signals
-                if s.get('symbol') == symbol
-            ]
-        
-        # Only count closed signals
-        closed_signals = [s for s in filtered_signals if s.get('status') == 'CLOSED']
-        
-        if not closed_signals:
+        if not stats.trades:
             return {
                 'total_signals': 0,
                 'closed_signals': 0,
@@ -166,18 +189,12 @@ class SignalPerformanceTracker:
                 'message': 'No closed signals found'
             }
         
-        wins = sum(1 for s in closed_signals if s.get('win') == True)
-        losses = sum(1 for s in closed_signals if s.get('win') == False)
-        total = len(closed_signals)
-        
-        win_rate = (wins / total * 100) if total > 0 else 0
-        
         return {
-            'total_signals': len(filtered_signals),
-            'closed_signals': total,
-            'wins': wins,
-            'losses': losses,
-            'win_rate': round(win_rate, 2),
+            'total_signals': stats.opened,
+            'closed_signals': stats.trades,
+            'wins': stats.wins,
+            'losses': stats.losses,
+            'win_rate': round(stats.win_rate, 2),
             'period': f"{days} days" if days else "All time",
             'symbol': symbol or "All symbols"
         }
@@ -224,30 +241,18 @@ class SignalPerformanceTracker:
     
     def calculate_performance_by_symbol(self) -> Dict:
         """Calculate performance breakdown by trading symbol"""
-        closed_signals = [s for s in self.signals if s.get('status') == 'CLOSED']
+        symbol_stats = self.stats.breakdown('asset')
         
-        if not closed_signals:
+        if not symbol_stats:
             return {'message': 'No closed signals found'}
         
-        symbol_stats = defaultdict(lambda: {'wins': 0, 'losses': 0})
-        
-        for signal in closed_signals:
-            symbol = signal.get('symbol', 'UNKNOWN')
-            if signal.get('win'):
-                symbol_stats[symbol]['wins'] += 1
-            else:
-                symbol_stats[symbol]['losses'] += 1
-        
-        # Calculate win rates
         results = {}
         for symbol, stats in symbol_stats.items():
-            total = stats['wins'] + stats['losses']
-            win_rate = (stats['wins'] / total * 100) if total > 0 else 0
             results[symbol] = {
-                'wins': stats['wins'],
-                'losses': stats['losses'],
-                'total': total,
-                'win_rate': round(win_rate, 2)
+                'wins': stats.wins,
+                'losses': stats.losses,
+                'total': stats.trades,
+                'win_rate': round(stats.win_rate, 2)
             }
         
         return results
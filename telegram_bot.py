@@ -18,21 +18,18 @@ import time
 import json
 import html
 
-# #region agent log - Capture any startup errors
-try:
-    log_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cursor', 'debug.log')
-    os.makedirs(os.path.dirname(log_path), exist_ok=True)
-    with open(log_path, 'a', encoding='utf-8') as f:
-        f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"telegram_bot.py:15","message":"Bot script started - after basic imports","data":{},"timestamp":int(time.time()*1000)}) + "\n")
-except Exception as e:
-    # If logging fails, at least try to print
-    try:
-        print(f"[DEBUG] Logging failed: {e}")
-    except:
-        pass
+# Startup profiling and deferred feature imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from lazy_loader import (
+    startup_profiler, get_boot_profile, module_available,
+    lazy_attr, lazy_instance, lazy_object, warm_up
+)
+if __name__ == "__main__":
+    # Only a real bot start is profiled; importers (tests, load tests) keep sys.meta_path clean
+    startup_profiler.install()
+BOOT_PROFILE = get_boot_profile()
+STARTUP_PROFILE_REPORT = os.getenv("BOT_STARTUP_PROFILE", "false").lower() == "true"
 
-import time
-# #endregion
 if sys.platform == 'win32':
     try:
         sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
@@ -58,14 +55,15 @@ def safe_print(*args, **kwargs):
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
 from telegram.ext import Application, CommandHandler, ContextTypes, CallbackQueryHandler
 
-# Error learning integration
-from global_error_learning import global_error_manager, record_error
+# Error learning integration (pandas/scikit-learn; resolved on first use)
+global_error_manager = lazy_attr('global_error_learning', 'global_error_manager')
+record_error = lazy_attr('global_error_learning', 'record_error')
 from telegram.error import TimedOut, NetworkError, RetryAfter
 from feature_monitoring import monitor
 import asyncio
 from datetime import datetime
 from functools import wraps
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import time
 import os
 import json
@@ -89,19 +87,10 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 # Import local modules (with error handling to prevent crashes)
 try:
-    from signal_api import UltimateSignalAPI
     from trade_tracker import TradeTracker
     from performance_analytics import PerformanceAnalytics
-    from tradingview_data_client import TradingViewDataClient
     from localization_system import localization, get_localized_message
     from user_preferences import user_prefs, get_user_prefs, update_user_prefs, get_localized_msg
-    from daily_signals_system import (
-        generate_daily_signal, 
-        get_daily_signals_status,
-        get_daily_signals_analytics,
-        get_daily_signals_history,
-        update_daily_signal_outcome
-    )
     from user_management_service import (
         authenticate_user,
         get_user_portfolio_data,
@@ -109,35 +98,41 @@ try:
         record_user_trade,
         get_user_statistics
     )
-    from trading_execution_engine import (
-        execute_user_signal,
-        get_user_trading_performance,
-        simulate_user_market_movement
-    )
     from onboarding_flow import onboarding_manager
     from search_handler import search_handler
-    from advanced_order_manager import (
-        create_bracket_order, create_oco_order, create_trailing_stop,
-        cancel_order, get_portfolio_summary, update_price_feed
-    )
     from bot_templates import (
         get_error_message, get_success_message, get_welcome_message,
         get_onboarding_message, get_help_message, get_status_message
     )
+
+    # Feature modules pulling in pandas/yfinance/scikit-learn are resolved by
+    # the command handlers on first use; only check that they exist here.
+    DEFERRED_CORE_MODULES = [
+        'signal_api', 'tradingview_data_client', 'daily_signals_system',
+        'trading_execution_engine', 'advanced_order_manager'
+    ]
+    missing_modules = [m for m in DEFERRED_CORE_MODULES if not module_available(m)]
+    if missing_modules:
+        raise ImportError(f"No module named {', '.join(missing_modules)}")
+
+    UltimateSignalAPI = lazy_attr('signal_api', 'UltimateSignalAPI')
+    TradingViewDataClient = lazy_attr('tradingview_data_client', 'TradingViewDataClient')
+    generate_daily_signal = lazy_attr('daily_signals_system', 'generate_daily_signal')
+    get_daily_signals_status = lazy_attr('daily_signals_system', 'get_daily_signals_status')
+    get_daily_signals_analytics = lazy_attr('daily_signals_system', 'get_daily_signals_analytics')
+    get_daily_signals_history = lazy_attr('daily_signals_system', 'get_daily_signals_history')
+    update_daily_signal_outcome = lazy_attr('daily_signals_system', 'update_daily_signal_outcome')
+    execute_user_signal = lazy_attr('trading_execution_engine', 'execute_user_signal')
+    get_user_trading_performance = lazy_attr('trading_execution_engine', 'get_user_trading_performance')
+    simulate_user_market_movement = lazy_attr('trading_execution_engine', 'simulate_user_market_movement')
+    create_bracket_order = lazy_attr('advanced_order_manager', 'create_bracket_order')
+    create_oco_order = lazy_attr('advanced_order_manager', 'create_oco_order')
+    create_trailing_stop = lazy_attr('advanced_order_manager', 'create_trailing_stop')
+    cancel_order = lazy_attr('advanced_order_manager', 'cancel_order')
+    get_portfolio_summary = lazy_attr('advanced_order_manager', 'get_portfolio_summary')
+    update_price_feed = lazy_attr('advanced_order_manager', 'update_price_feed')
     print("[OK] Core modules imported successfully")
-    # #region agent log
-    try:
-        with open(log_path, 'a', encoding='utf-8') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"telegram_bot.py:92","message":"Core modules imported successfully","data":{},"timestamp":int(time.time()*1000)}) + "\n")
-    except: pass
-    # #endregion
 except ImportError as e:
-    # #region agent log
-    try:
-        with open(log_path, 'a', encoding='utf-8') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"telegram_bot.py:94","message":"CRITICAL: Core modules import FAILED","data":{"error":str(e)},"timestamp":int(time.time()*1000)}) + "\n")
-    except: pass
-    # #endregion
     print(f"[!] CRITICAL: Failed to import core modules: {e}")
     print("[!] Please check that all required files exist:")
     print("    - signal_api.py")
@@ -161,13 +156,13 @@ except Exception as e:
 try:
     from monitoring import get_logger, get_perf_monitor, get_health_checker
     from error_messages import format_error, get_user_friendly_error, ErrorMessages
-    from performance_optimizer import get_cache_manager
     from support_system import SupportTicketSystem, format_ticket_message, TicketPriority
     
     # Initialize monitoring components
     logger = get_logger()
     perf_monitor = get_perf_monitor()
-    cache = get_cache_manager()
+    cache = lazy_instance(lambda: importlib.import_module('performance_optimizer').get_cache_manager(),
+                          'performance_optimizer.cache_manager')
     support = SupportTicketSystem()
     
     MONITORING_ENABLED = True
@@ -192,13 +187,15 @@ sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'For
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Forex expert', 'USDCAD'))
 
 # Import Quantum Elite AI Integration
-try:
-    from quantum_elite_signal_integration import enhance_signal_with_quantum_elite, get_ai_enhancement_stats
-    QUANTUM_ELITE_AVAILABLE = True
-    print("[OK] Quantum Elite AI integration loaded")
-except ImportError as e:
-    print(f"[WARN] Quantum Elite AI integration not available: {e}")
-    QUANTUM_ELITE_AVAILABLE = False
+QUANTUM_ELITE_AVAILABLE = module_available('quantum_elite_signal_integration')
+if QUANTUM_ELITE_AVAILABLE:
+    enhance_signal_with_quantum_elite = lazy_attr('quantum_elite_signal_integration',
+                                                  'enhance_signal_with_quantum_elite', optional=True)
+    get_ai_enhancement_stats = lazy_attr('quantum_elite_signal_integration',
+                                         'get_ai_enhancement_stats', optional=True)
+    print("[OK] Quantum Elite AI integration found (loads on first use)")
+else:
+    print("[WARN] Quantum Elite AI integration not available")
     enhance_signal_with_quantum_elite = None
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Forex expert', 'EURJPY'))
 
@@ -262,10 +259,10 @@ try:
     import config
     performance_mode = getattr(config, 'PERFORMANCE_MODE', True)
 
-    api = UltimateSignalAPI(performance_mode=performance_mode)
+    api = lazy_instance(lambda: UltimateSignalAPI(performance_mode=performance_mode), 'signal_api.api')
     tracker = TradeTracker()
     analytics = PerformanceAnalytics(tracker)
-    tv_client = TradingViewDataClient()  # For live market data
+    tv_client = lazy_instance(TradingViewDataClient, 'tradingview_data_client.tv_client')  # For live market data
     print("[OK] Core components initialized")
 except Exception as e:
     print(f"[!] WARNING: Error initializing core components: {e}")
@@ -421,6 +418,24 @@ def check_news_conflict(pair):
 # AUTO-ALERT SYSTEM
 # ============================================================================
 
+def _subscriber_sizing_lines(signal: Dict, chat_ids: List[int]) -> Dict[int, str]:
+    """Personalized lot size line per subscriber for one alert, sized in a single batch"""
+    from position_sizing import size_for_subscribers
+
+    try:
+        batch = size_for_subscribers(signal, chat_ids, user_manager,
+                                     max_risk_pct=risk_manager.MAX_RISK_PER_TRADE * 100)
+    except (ValueError, TypeError) as e:
+        print(f"[AUTO-ALERT] Position sizing skipped: {e}")
+        return {}
+    return dict(zip(chat_ids, batch.sizing_lines()))
+
+
+def _personalized(msg: str, sizing_lines: Dict[int, str], chat_id: int) -> str:
+    line = sizing_lines.get(chat_id)
+    return f"{msg}\n\n{line}" if line else msg
+
+
 async def check_signals_and_alert(application):
     """Background task to check for signals and send alerts"""
     global last_btc_signal, last_gold_signal
@@ -473,12 +488,14 @@ async def check_signals_and_alert(application):
             msg += f"Confidence: {btc['confidence']}%\n\n"
             msg += "Use /btc for full analysis!"
             
-            # Send to all subscribed users
-            for chat_id in subscribed_users:
+            # Send to all subscribed users, each with their own lot size
+            chat_ids = list(subscribed_users)
+            sizing_lines = _subscriber_sizing_lines(dict(btc, symbol='BTCUSD'), chat_ids)
+            for chat_id in chat_ids:
                 try:
                     await application.bot.send_message(
                         chat_id=chat_id,
-                        text=msg,
+                        text=_personalized(msg, sizing_lines, chat_id),
                         parse_mode='Markdown'
                     )
                 except:
@@ -496,11 +513,13 @@ async def check_signals_and_alert(application):
             msg += f"Confidence: {gold['confidence']}%\n\n"
             msg += "Use /gold for full analysis!"
             
-            for chat_id in subscribed_users:
+            chat_ids = list(subscribed_users)
+            sizing_lines = _subscriber_sizing_lines(dict(gold, symbol='XAUUSD'), chat_ids)
+            for chat_id in chat_ids:
                 try:
                     await application.bot.send_message(
                         chat_id=chat_id,
-                        text=msg,
+                        text=_personalized(msg, sizing_lines, chat_id),
                         parse_mode='Markdown'
                     )
                 except:
@@ -575,8 +594,10 @@ async def check_daily_signals_and_alert(application):
                 # Send to subscribed users, respecting their preferences
                 alerted_count = 0
                 skipped_count = 0
+                chat_ids = list(subscribed_users)
+                sizing_lines = _subscriber_sizing_lines(signal, chat_ids)
                 
-                for chat_id in subscribed_users:
+                for chat_id in chat_ids:
                     try:
                         # Check user preferences
                         user_id = chat_id  # Assuming chat_id is user_id for direct messages
@@ -605,7 +626,7 @@ async def check_daily_signals_and_alert(application):
                         # Send the alert
                         await application.bot.send_message(
                             chat_id=chat_id,
-                            text=msg,
+                            text=_personalized(msg, sizing_lines, chat_id),
                             parse_mode='Markdown'
                         )
                         alerted_count += 1
@@ -708,28 +729,28 @@ async def check_daily_limit_with_upgrade(update: Update, user_id: int, user_tier
     
     return can_receive
 
-# Rate limiting storage
-_rate_limit_storage: Dict[str, Dict[int, float]] = {}
+# Rate limiting: O(1) GCRA state per (command, user), idle keys evicted, limits scaled by tier
+from rate_limiter import get_rate_limiter
+_rate_limiter = get_rate_limiter()
+if user_manager:
+    _rate_limiter.tier_resolver = user_manager.get_user_tier
 
 def check_rate_limit(user_id: int, command: str, max_calls: int = 5, period: int = 60) -> bool:
-    """Check if user can make request (rate limiting)"""
-    key = f"{command}_{user_id}"
-    now = time.time()
-    
-    if key not in _rate_limit_storage:
-        _rate_limit_storage[key] = {}
-    
-    # Clean old entries
-    user_calls = [t for t in _rate_limit_storage[key].values() if now - t < period]
-    _rate_limit_storage[key] = {i: t for i, t in enumerate(user_calls)}
-    
-    # Check limit
-    if len(user_calls) >= max_calls:
-        return False
-    
-    # Record this call
-    _rate_limit_storage[key][len(user_calls)] = now
-    return True
+    """Check if user can make request (rate limiting, limits scaled by the user's tier)"""
+    return _rate_limiter.check_command(user_id, command, max_calls, period).allowed
+
+# Expensive command work (signal generation) runs through tier lanes off the event loop
+from command_scheduler import get_command_scheduler, SchedulerBusy
+command_scheduler = get_command_scheduler()
+command_scheduler.lane_resolver = lambda user_id: 'admin' if is_admin(user_id) else _rate_limiter.get_tier(user_id)
+
+def _generate_enhanced_btc_signal():
+    from enhanced_btc_signal_generator import EnhancedBTCSignalGenerator
+    return EnhancedBTCSignalGenerator().generate_signal()
+
+def _generate_enhanced_gold_signal():
+    from enhanced_gold_signal_generator import EnhancedGoldSignalGenerator
+    return EnhancedGoldSignalGenerator().generate_signal()
 
 def get_user_balance(user_id: int) -> float:
     """Get user's account balance from tracker"""
@@ -2925,11 +2946,8 @@ async def btc_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         # Quantum Intraday check removed in Phase 1 optimization
         
-        # FALLBACK: Import Enhanced BTC signal generator (regular signal)
-        from enhanced_btc_signal_generator import EnhancedBTCSignalGenerator
-        
-        generator = EnhancedBTCSignalGenerator()
-        signal = generator.generate_signal()
+        # FALLBACK: Enhanced BTC signal generator (regular signal)
+        signal = await command_scheduler.run(user_id, _generate_enhanced_btc_signal)
 
         # Ensure we always have a safe fallback structure to avoid crashes
         if not signal:
@@ -3010,6 +3028,9 @@ async def btc_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if user_tier == 'free' and user_manager:
             user_manager.increment_daily_signals(user_id)
         
+    except SchedulerBusy as busy:
+        await status_msg.edit_text(busy.message)
+
     except Exception as e:
         print(f"BTC error: {e}")
         import traceback
@@ -3091,11 +3112,8 @@ async def gold_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         # Quantum Intraday check removed in Phase 1 optimization
         
-        # FALLBACK: Import Enhanced Gold signal generator (regular signal)
-        from enhanced_gold_signal_generator import EnhancedGoldSignalGenerator
-        
-        generator = EnhancedGoldSignalGenerator()
-        signal = generator.generate_signal()
+        # FALLBACK: Enhanced Gold signal generator (regular signal)
+        signal = await command_scheduler.run(user_id, _generate_enhanced_gold_signal)
         
         # Enhanced Gold signal processing
         if signal and signal.get('direction') != 'HOLD':
@@ -3161,6 +3179,9 @@ async def gold_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Edit the status message with results
         await status_msg.edit_text(msg, parse_mode='Markdown')
         
+    except SchedulerBusy as busy:
+        await status_msg.edit_text(busy.message)
+
     except Exception as e:
         print(f"Gold error: {e}")
         import traceback
@@ -4803,17 +4824,18 @@ async def market_heatmap_command(update: Update, context: ContextTypes.DEFAULT_T
 
     try:
         # Get data from multiple sources
-        from international_signal_api import get_international_signal, get_international_symbols
+        from international_signal_api import get_all_international_signals, get_international_symbols
         from timezone_session_manager import get_current_sessions
 
         symbols = get_international_symbols()
         sessions = get_current_sessions(include_upcoming=False)
 
-        # Get signals for all markets
+        # Get signals for all markets (one panel pass)
+        signals = get_all_international_signals()
         market_data = {}
         for symbol in symbols:
             try:
-                signal = get_international_signal(symbol)
+                signal = signals.get(symbol)
                 if signal and signal.get('direction') != 'ERROR':
                     market_data[symbol] = {
                         'direction': signal['direction'],
@@ -6631,66 +6653,74 @@ async def forex_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(f"Error: {str(e)}")
 
 
+def _scan_all_assets(user_id: int):
+    """Run every asset generator the user can access; returns (active_signals, no_signals)"""
+    active_signals = []
+    no_signals = []
+    
+    # List of all assets to check
+    assets = [
+        ('btc', 'BTC expert/btc_elite_signal_generator.py', 'BTCEliteSignalGenerator', '🪙 BTC'),
+        ('eth', None, None, '💎 ETH'),  # ETH uses BTC generator as template
+        ('gold', 'Gold expert/gold_elite_signal_generator.py', 'GoldEliteSignalGenerator', '🥇 Gold'),
+        ('es', 'Futures expert/ES/elite_signal_generator.py', 'ESEliteSignalGenerator', '📊 ES'),
+        ('nq', 'Futures expert/NQ/elite_signal_generator.py', 'NQEliteSignalGenerator', '🚀 NQ'),
+        ('eurusd', 'Forex expert/EURUSD/elite_signal_generator.py', 'EURUSDEliteSignalGenerator', '🇪🇺🇺🇸 EUR/USD'),
+        ('gbpusd', 'Forex expert/GBPUSD/elite_signal_generator.py', 'GBPUSDEliteSignalGenerator', '🇬🇧🇺🇸 GBP/USD'),
+        ('usdjpy', 'Forex expert/USDJPY/elite_signal_generator.py', 'USDJPYEliteSignalGenerator', '🇺🇸🇯🇵 USD/JPY'),
+        ('audusd', 'Forex expert/AUDUSD/elite_signal_generator.py', 'AUDUSDEliteSignalGenerator', '🇦🇺🇺🇸 AUD/USD'),
+        ('nzdusd', 'Forex expert/NZDUSD/elite_signal_generator.py', 'NZDUSDEliteSignalGenerator', '🇳🇿🇺🇸 NZD/USD'),
+        ('usdchf', 'Forex expert/USDCHF/elite_signal_generator.py', 'USDCHFEliteSignalGenerator', '🇺🇸🇨🇭 USD/CHF'),
+    ]
+    
+    # Check each asset
+    for symbol, path, class_name, display in assets:
+        try:
+            # Check premium access for restricted forex pairs
+            if symbol in ['usdjpy', 'audusd', 'nzdusd', 'usdchf']:
+                if not check_feature_access(user_id, 'all_assets'):
+                    # User doesn't have premium access - skip this asset
+                    no_signals.append(f"{display} (Premium)")
+                    continue
+
+            if symbol == 'eth':
+                # ETH uses BTC generator as template
+                from enhanced_btc_signal_generator import EnhancedBTCSignalGenerator
+                generator = EnhancedBTCSignalGenerator()
+                signal = generator.generate_signal()
+            else:
+                spec = importlib.util.spec_from_file_location(f"{symbol}_gen", os.path.join(os.path.dirname(__file__), path))
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+
+                generator_class = getattr(module, class_name)
+                generator = generator_class()
+                signal = generator.generate_signal()
+
+            if signal:
+                active_signals.append({
+                    'display': display,
+                    'command': f'/{symbol}',
+                    'direction': signal['direction'],
+                    'confidence': signal['confidence'],
+                    'score': signal['score']
+                })
+            else:
+                no_signals.append(display)
+        except:
+            no_signals.append(display)
+
+    return active_signals, no_signals
+
+
 async def allsignals_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Check all available assets for active signals (based on subscription level)"""
+    user_id = update.effective_user.id
     await update.message.reply_text("🔍 Scanning ALL 16 Assets for Signals...")
     
     try:
-        active_signals = []
-        no_signals = []
-        
-        # List of all assets to check
-        assets = [
-            ('btc', 'BTC expert/btc_elite_signal_generator.py', 'BTCEliteSignalGenerator', '🪙 BTC'),
-            ('eth', None, None, '💎 ETH'),  # ETH uses BTC generator as template
-            ('gold', 'Gold expert/gold_elite_signal_generator.py', 'GoldEliteSignalGenerator', '🥇 Gold'),
-            ('es', 'Futures expert/ES/elite_signal_generator.py', 'ESEliteSignalGenerator', '📊 ES'),
-            ('nq', 'Futures expert/NQ/elite_signal_generator.py', 'NQEliteSignalGenerator', '🚀 NQ'),
-            ('eurusd', 'Forex expert/EURUSD/elite_signal_generator.py', 'EURUSDEliteSignalGenerator', '🇪🇺🇺🇸 EUR/USD'),
-            ('gbpusd', 'Forex expert/GBPUSD/elite_signal_generator.py', 'GBPUSDEliteSignalGenerator', '🇬🇧🇺🇸 GBP/USD'),
-            ('usdjpy', 'Forex expert/USDJPY/elite_signal_generator.py', 'USDJPYEliteSignalGenerator', '🇺🇸🇯🇵 USD/JPY'),
-            ('audusd', 'Forex expert/AUDUSD/elite_signal_generator.py', 'AUDUSDEliteSignalGenerator', '🇦🇺🇺🇸 AUD/USD'),
-            ('nzdusd', 'Forex expert/NZDUSD/elite_signal_generator.py', 'NZDUSDEliteSignalGenerator', '🇳🇿🇺🇸 NZD/USD'),
-            ('usdchf', 'Forex expert/USDCHF/elite_signal_generator.py', 'USDCHFEliteSignalGenerator', '🇺🇸🇨🇭 USD/CHF'),
-        ]
-        
-        # Check each asset
-        for symbol, path, class_name, display in assets:
-            try:
-                # Check premium access for restricted forex pairs
-                if symbol in ['usdjpy', 'audusd', 'nzdusd', 'usdchf']:
-                    if not check_feature_access(user_id, 'all_assets'):
-                        # User doesn't have premium access - skip this asset
-                        no_signals.append(f"{display} (Premium)")
-                        continue
-
-                if symbol == 'eth':
-                    # ETH uses BTC generator as template
-                    from enhanced_btc_signal_generator import EnhancedBTCSignalGenerator
-                    generator = EnhancedBTCSignalGenerator()
-                    signal = generator.generate_signal()
-                else:
-                    spec = importlib.util.spec_from_file_location(f"{symbol}_gen", os.path.join(os.path.dirname(__file__), path))
-                    module = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(module)
-
-                    generator_class = getattr(module, class_name)
-                    generator = generator_class()
-                    signal = generator.generate_signal()
+        active_signals, no_signals = await command_scheduler.run(user_id, _scan_all_assets, user_id)
 
-                if signal:
-                    active_signals.append({
-                        'display': display,
-                        'command': f'/{symbol}',
-                        'direction': signal['direction'],
-                        'confidence': signal['confidence'],
-                        'score': signal['score']
-                    })
-                else:
-                    no_signals.append(display)
-            except:
-                no_signals.append(display)
-        
         # Build message
         msg = f"🔍 *ALL ASSETS SCAN*\n"
         msg += f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
@@ -6714,6 +6744,9 @@ async def allsignals_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         
         await update.message.reply_text(msg, parse_mode='Markdown')
         
+    except SchedulerBusy as busy:
+        await update.message.reply_text(busy.message)
+
     except Exception as e:
         print(f"All signals error: {e}")
         import traceback
@@ -6758,7 +6791,7 @@ async def daily_signal_command(update: Update, context: ContextTypes.DEFAULT_TYP
             msg += f"📈 **Win Rate:** {signal['win_probability']*100:.0f}%\n"
             msg += f"💎 **Quality Score:** {signal['quality_score']:.1f}/100\n"
             msg += f"⚡ **Risk Amount:** ${signal['risk_amount']:.2f}\n"
-            msg += f"📊 **Position Size:** {signal['position_size']:.4f}\n"
+            msg += f"📊 **Position Size:** {signal['position_size']:.4f} lots\n"
             msg += f"🌍 **Session:** {signal['session']}\n"
             msg += f"⏰ **Valid Until:** {signal['valid_until'].strftime('%H:%M UTC')}\n"
             msg += f"\n━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
@@ -7284,9 +7317,34 @@ async def signal_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(f"❌ Error analyzing market. Try /btc or /gold individually.")
 
 
-# Import Risk Manager
-from risk_manager import RiskManager
-risk_manager = RiskManager()
+# Import Risk Manager (numpy + error learning; built on first use)
+risk_manager = lazy_object('risk_manager', 'RiskManager')
+
+
+def _portfolio_risk(user_id: int):
+    """
+    A user's open positions from the position book, their balance (paper
+    account, else profile capital) and the exposure analysis with VaR/CVaR
+    and stress from the portfolio risk engine. Blocking on the first call
+    while price histories load, so run it through the command scheduler.
+    """
+    from position_book import get_position_book
+
+    trades = []
+    for position in get_position_book().positions(user_id):
+        stop = position['stop_loss']
+        stop_risk = abs(position['current_price'] - stop) * position['size'] * position['multiplier'] if stop else 0.0
+        trades.append(dict(position, pair=position['symbol'], risk_amount=round(stop_risk, 2)))
+
+    account = paper_trading.get_account(user_id)
+    if account and account.get('enabled'):
+        balance = account['balance']
+    elif user_manager:
+        balance = user_manager.get_user(user_id).get('capital', 500.0)
+    else:
+        balance = 1000.0
+    return trades, balance, risk_manager.check_portfolio_exposure(trades, balance), account
+
 
 async def risk_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """🛡️ Complete Risk Management Suite - Position Sizing, Portfolio Heat Map, R:R Optimizer"""
@@ -7338,20 +7396,11 @@ async def risk_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 return
 
             try:
-                # Get mock portfolio data (in real implementation, fetch from database)
-                mock_trades = [
-                    {'pair': 'EURUSD', 'risk_amount': 25.0},
-                    {'pair': 'GBPUSD', 'risk_amount': 18.0},
-                    {'pair': 'BTC', 'risk_amount': 32.0},
-                    {'pair': 'XAUUSD', 'risk_amount': 15.0}
-                ]
-                balance = 1000.0  # Mock balance
-
-                exposure_analysis = risk_manager.check_portfolio_exposure(mock_trades, balance)
+                trades, balance, exposure_analysis, _ = await command_scheduler.run(user_id, _portfolio_risk, user_id)
                 heat_map = exposure_analysis['heat_map']
 
                 await update.message.reply_text(heat_map, parse_mode='Markdown')
-                monitor.track_feature_usage('risk_heatmap', user_id, user_tier, True, time.time() - start_time, {'trades_count': len(mock_trades)})
+                monitor.track_feature_usage('risk_heatmap', user_id, user_tier, True, time.time() - start_time, {'trades_count': len(trades)})
 
             except Exception as e:
                 monitor.track_error('risk_heatmap', type(e).__name__, str(e), user_id)
@@ -7481,23 +7530,80 @@ Example: `/risk optimize 1.0850 BUY`
 
 
 async def exposure_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Check portfolio exposure"""
-    # In a real scenario, we'd fetch actual open trades from TradeTracker
-    # For now, we'll simulate or show a placeholder
+    """Check portfolio exposure: stop-loss risk, VaR/CVaR and stress of open positions"""
+    user_id = update.effective_user.id
+    try:
+        trades, balance, exposure, _ = await command_scheduler.run(user_id, _portfolio_risk, user_id)
+    except SchedulerBusy as e:
+        await update.message.reply_text(e.message)
+        return
+
     msg = "📊 *PORTFOLIO EXPOSURE*\n\n"
-    msg += "Current Open Risk: 0.0% (No active trades)\n"
-    msg += "Max Allowed Risk: 6.0%\n\n"
-    msg += "✅ Safe to trade"
+    if not trades:
+        msg += "Current Open Risk: 0.0% (No active trades)\n"
+        msg += f"Max Allowed Risk: {risk_manager.MAX_PORTFOLIO_RISK * 100:.1f}%\n\n"
+        msg += "✅ Safe to trade"
+        await update.message.reply_text(msg, parse_mode='Markdown')
+        return
+
+    msg += f"Open Positions: {len(trades)} | Balance: ${balance:,.2f}\n"
+    msg += f"Stop-Loss Risk: ${exposure['total_risk_amount']:,.2f} ({exposure['total_risk_pct']:.1f}%)\n"
+    msg += f"Max Allowed Risk: {risk_manager.MAX_PORTFOLIO_RISK * 100:.1f}%\n\n"
+
+    report = exposure.get('var_report')
+    if report:
+        from risk_manager import format_var_summary
+
+        msg += f"Gross: ${report['gross_exposure']:,.2f} | Net: ${report['net_exposure']:,.2f}\n\n"
+        msg += format_var_summary(report) + "\n"
+        msg += "🧪 *STRESS SCENARIOS*\n"
+        for name, pnl in sorted(report['stress'].items(), key=lambda item: item[1]):
+            msg += f"{'🔴' if pnl < 0 else '🟢'} {name.replace('_', ' ').title()}: ${pnl:,.2f}\n"
+        msg += "\n"
+
+    msg += "⚠️ Overexposed - reduce positions" if exposure['is_overexposed'] else "✅ Safe to trade"
     await update.message.reply_text(msg, parse_mode='Markdown')
 
 
 async def drawdown_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Check drawdown status"""
-    # Placeholder for now
+    """Check drawdown status, including how far a VaR day or the worst stress scenario would take it"""
+    user_id = update.effective_user.id
+    try:
+        trades, balance, exposure, account = await command_scheduler.run(user_id, _portfolio_risk, user_id)
+    except SchedulerBusy as e:
+        await update.message.reply_text(e.message)
+        return
+
+    history = account.get('closed_positions', []) if account else []
+    starting = account.get('starting_balance', balance) if account else balance
+    drawdown = risk_manager.check_drawdown(history, starting)
+    unrealized = sum(trade['pnl'] for trade in trades)
+    peak = drawdown['peak_balance']
+    equity = drawdown['current_balance'] + unrealized
+    current_pct = max(0.0, (peak - equity) / peak * 100) if peak > 0 else 0.0
+    limit_pct = risk_manager.DRAWDOWN_LIMIT * 100
+
     msg = "📉 *DRAWDOWN STATUS*\n\n"
-    msg += "Current Drawdown: 0.0%\n"
-    msg += "Max Drawdown Limit: 10.0%\n\n"
-    msg += "✅ Capital Preservation Mode: OFF"
+    msg += f"Current Drawdown: {current_pct:.1f}%"
+    msg += f" (incl. ${unrealized:,.2f} open P&L)\n" if trades else "\n"
+    msg += f"Max Drawdown: {drawdown['max_drawdown_pct']:.1f}%\n"
+    msg += f"Max Drawdown Limit: {limit_pct:.1f}%\n\n"
+
+    report = exposure.get('var_report')
+    if report and peak > 0:
+        var_label = max(report['var'])
+        var_loss = report['var'][var_label]['historical']
+        stress_loss = max(0.0, -min(report['stress'].values(), default=0.0))
+        var_pct = max(0.0, (peak - equity + var_loss) / peak * 100)
+        stress_pct = max(0.0, (peak - equity + stress_loss) / peak * 100)
+        msg += f"After a {var_label} VaR day: {var_pct:.1f}%\n"
+        msg += f"After worst stress scenario: {stress_pct:.1f}%\n"
+        if stress_pct > limit_pct:
+            msg += "⚠️ Worst stress scenario would breach the drawdown limit\n"
+        msg += "\n"
+
+    msg += f"{'🛑' if current_pct > limit_pct else '✅'} Capital Preservation Mode: "
+    msg += "ON" if current_pct > limit_pct else "OFF"
     await update.message.reply_text(msg, parse_mode='Markdown')
 
 
@@ -7574,26 +7680,25 @@ broker_connector = BrokerConnector()
 from paper_trading import PaperTrading
 paper_trading = PaperTrading()
 
-# Import ML Predictor
-from ml_predictor import MLSignalPredictor
-ml_predictor = MLSignalPredictor()
-
-# Import Sentiment Analyzer
-from sentiment_analyzer import SentimentAnalyzer
-sentiment_analyzer = SentimentAnalyzer()
+# Optional AI analysis modules - built on first use (see lazy_loader.py)
+ml_predictor = lazy_object('ml_predictor', 'MLSignalPredictor')
+sentiment_analyzer = lazy_object('sentiment_analyzer', 'SentimentAnalyzer')
 
 # Import Phase 13 Advanced AI Modules
-from order_flow import OrderFlowAnalyzer
-order_flow_analyzer = OrderFlowAnalyzer()
-
-from market_maker import MarketMakerZones
-market_maker_zones = MarketMakerZones()
-
-from smart_money_tracker import SmartMoneyTracker
-smart_money_tracker = SmartMoneyTracker()
-
-from volume_profile import VolumeProfileAnalyzer
-volume_profile_analyzer = VolumeProfileAnalyzer()
+order_flow_analyzer = lazy_object('order_flow', 'OrderFlowAnalyzer')
+market_maker_zones = lazy_object('market_maker', 'MarketMakerZones')
+smart_money_tracker = lazy_object('smart_money_tracker', 'SmartMoneyTracker')
+volume_profile_analyzer = lazy_object('volume_profile', 'VolumeProfileAnalyzer')
+
+# Warmed right after the bot comes online in the lean boot profile
+DEFERRED_FEATURES = [
+    global_error_manager, record_error, api, tv_client, cache,
+    generate_daily_signal, execute_user_signal, create_bracket_order,
+    risk_manager, ml_predictor, sentiment_analyzer, order_flow_analyzer,
+    market_maker_zones, smart_money_tracker, volume_profile_analyzer,
+]
+if QUANTUM_ELITE_AVAILABLE:
+    DEFERRED_FEATURES.append(enhance_signal_with_quantum_elite)
 
 async def learn_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show a daily trading tip (with category support and user tracking)"""
@@ -9021,7 +9126,8 @@ async def leaderboard_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         msg += "`/leaderboard profit` - Most profitable 💰\n"
         msg += "`/leaderboard active` - Most active traders 📈\n"
         msg += "`/leaderboard streak` - Best win/loss streaks 🔥\n"
-        msg += "`/leaderboard myrank` - Your rankings 📊\n\n"
+        msg += "`/leaderboard myrank` - Your rankings 📊\n"
+        msg += "Add `weekly` or `monthly` for this week's/month's rankings\n\n"
         msg += "*Requirements:*\n"
         msg += "• Minimum 20 trades to qualify\n"
         msg += "• Must opt-in via privacy settings\n\n"
@@ -9039,7 +9145,10 @@ async def leaderboard_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
     
     if category in ['winrate', 'profit', 'active', 'streak']:
-        msg = leaderboard_manager.format_leaderboard_message(category, 'all', 10)
+        period = context.args[1].lower() if len(context.args) > 1 else 'all'
+        if period not in ['all', 'monthly', 'weekly']:
+            period = 'all'
+        msg = leaderboard_manager.format_leaderboard_message(category, period, 10)
         await update.message.reply_text(msg, parse_mode='Markdown')
     else:
         await update.message.reply_text("❌ Unknown category. Use: winrate, profit, active, streak, or myrank")
@@ -11438,7 +11547,12 @@ async def post_init(application):
         # Start Daily Signals alert loop (15-minute checks)
         asyncio.create_task(daily_signals_alert_loop(application))
         # Quantum Intraday alert loop removed in Phase 1 optimization
-        
+
+        # Lean boot: the bot is online, now load the optional feature stacks
+        if BOOT_PROFILE == 'lean':
+            warm_up(DEFERRED_FEATURES, background=True)
+        startup_profiler.mark('bot online')
+
         # Log bot startup
         if MONITORING_ENABLED:
             logger.app_logger.info("Bot started successfully")
@@ -11974,6 +12088,33 @@ async def monitor_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(f"❌ Error getting monitoring data: {str(e)}")
 
 
+async def rebuildstats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Recount trade statistics from history and report drift (admin only)"""
+    user_id = update.effective_user.id
+
+    if not is_admin(user_id):
+        await update.message.reply_text("❌ This command is for administrators only.")
+        return
+
+    try:
+        report = tracker.rebuild_statistics()
+        msg = "🔁 <b>TRADE STATISTICS REBUILT</b>\n\n"
+        msg += f"Series: {report['series']}\n"
+        msg += f"Mismatches: {len(report['mismatches'])}\n"
+        for line in report['mismatches'][:10]:
+            msg += f"• <code>{line}</code>\n"
+
+        for days in (7, 30):
+            stats = tracker.get_statistics(days=days)
+            msg += f"\n<b>Last {days} days:</b> {stats['total_trades']} trades, "
+            msg += f"{stats['win_rate']}% win rate, ${stats['total_pnl']:,.2f}"
+
+        await update.message.reply_text(msg, parse_mode='HTML')
+
+    except Exception as e:
+        await update.message.reply_text(f"❌ Error rebuilding statistics: {str(e)}")
+
+
 async def support_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Create and manage support tickets"""
     user_id = update.effective_user.id
@@ -12325,16 +12466,8 @@ Complete risk management tools:
                 await query.edit_message_text("🔥 Analyzing portfolio exposure...")
 
                 try:
-                    # Mock portfolio data for demo
-                    mock_trades = [
-                        {'pair': 'EURUSD', 'risk_amount': 25.0},
-                        {'pair': 'GBPUSD', 'risk_amount': 18.0},
-                        {'pair': 'BTC', 'risk_amount': 32.0},
-                        {'pair': 'XAUUSD', 'risk_amount': 15.0}
-                    ]
-                    balance = 1000.0
-
-                    exposure_analysis = risk_manager.check_portfolio_exposure(mock_trades, balance)
+                    _, _, exposure_analysis, _ = await command_scheduler.run(query.from_user.id, _portfolio_risk,
+                                                                             query.from_user.id)
                     heat_map = exposure_analysis['heat_map']
 
                     await query.edit_message_text(heat_map, parse_mode='Markdown')
@@ -13500,14 +13633,271 @@ Could not find order with ID: <code>{order_id}</code>
         await update.message.reply_text(f"❌ Error cancelling order: {str(e)}")
 
 
+def register_handlers(app):
+    """Add every command and callback handler to the application"""
+    # ========================================================================
+    # BASIC COMMANDS
+    # ========================================================================
+    app.add_handler(CommandHandler("start", start_command))
+    app.add_handler(CommandHandler("help", help_command))
+    app.add_handler(CommandHandler("quickstart", quickstart_command))
+    app.add_handler(CommandHandler("search", search_command))
+    app.add_handler(CommandHandler("dashboard", dashboard_command))
+    app.add_handler(CommandHandler("mobile", mobile_command))
+    app.add_handler(CommandHandler("app", mobile_command))
+    # who alias removed in Phase 4 duplicate cleanup
+    
+    # ========================================================================
+    # PROFESSIONAL HELP COMMANDS (with inline keyboard navigation)
+    # ========================================================================
+    app.add_handler(CommandHandler("help_signals", help_signals_command))
+    app.add_handler(CommandHandler("help_elite", help_elite_command))
+    app.add_handler(CommandHandler("help_tools", help_tools_command))
+    app.add_handler(CommandHandler("help_trading", help_trading_command))
+    app.add_handler(CommandHandler("help_account", help_account_command))
+    app.add_handler(CommandHandler("help_subscription", help_subscription_command))
+    app.add_handler(CommandHandler("help_preferences", help_preferences_command))
+    app.add_handler(CommandHandler("help_operations", help_operations_command))
+    app.add_handler(CommandHandler("help_admin", help_admin_command))
+
+    # Backward compatibility - old help1-help7 commands (aliases)
+    app.add_handler(CommandHandler("help1", help1_command))
+    app.add_handler(CommandHandler("help2", help2_command))
+    app.add_handler(CommandHandler("help3", help3_command))
+    app.add_handler(CommandHandler("help4", help4_command))
+    app.add_handler(CommandHandler("help5", help5_command))
+    app.add_handler(CommandHandler("help6", help6_command))
+    app.add_handler(CommandHandler("help7", help7_command))
+
+    # Callback handler for inline keyboard navigation in help commands
+    app.add_handler(CallbackQueryHandler(help_callback_handler, pattern="^help_"))
+    app.add_handler(CallbackQueryHandler(preferences_callback_handler, pattern="^(lang_|timezone_|region_)"))
+
+    # Main commands callback handler
+    app.add_handler(CallbackQueryHandler(main_commands_callback_handler, pattern="^cmd_"))
+
+    # Operations callback handlers
+    app.add_handler(CallbackQueryHandler(support_callback_handler, pattern="^(support_|ticket_)"))
+    app.add_handler(CallbackQueryHandler(incident_callback_handler, pattern="^(incident_|ops_)"))
+
+    # Upgrade path callback handler
+    app.add_handler(CallbackQueryHandler(upgrade_callback_handler, pattern="^upgrade_"))
+
+    # Onboarding callback handler
+    app.add_handler(CallbackQueryHandler(onboarding_callback_handler, pattern="^(onboard_|lang_|tz_|exp_|asset_|risk_|notif_)"))
+
+    # ========================================================================
+    # SIGNAL COMMANDS
+    # ========================================================================
+    app.add_handler(CommandHandler("signal", signal_command))
+    app.add_handler(CommandHandler("signals", signals_command)) # Scan all assets
+    app.add_handler(CommandHandler("allsignals", allsignals_command)) # Alias
+
+    # Daily Signals System - High Frequency Quality Signals
+    app.add_handler(CommandHandler("daily_signal", daily_signal_command))
+    app.add_handler(CommandHandler("daily_status", daily_status_command))
+    app.add_handler(CommandHandler("daily_prefs", daily_prefs_command))
+    app.add_handler(CommandHandler("daily_history", daily_history_command))
+    app.add_handler(CommandHandler("daily_summary", daily_summary_command))
+    app.add_handler(CommandHandler("ds", daily_signal_command))  # Quick alias
+    app.add_handler(CommandHandler("dprefs", daily_prefs_command))  # Quick alias
+    app.add_handler(CommandHandler("dhistory", daily_history_command))  # Quick alias
+    app.add_handler(CommandHandler("dsummary", daily_summary_command))  # Quick alias
+
+    app.add_handler(CommandHandler("status", status_command))
+    app.add_handler(CommandHandler("calendar", calendar_command))
+    app.add_handler(CommandHandler("news", news_command))
+    app.add_handler(CommandHandler("mtf", mtf_command))
+    app.add_handler(CommandHandler("btc", btc_command))
+    app.add_handler(CommandHandler("eth", eth_command))
+    app.add_handler(CommandHandler("eth_backtest", eth_backtest_command))
+    app.add_handler(CommandHandler("gold", gold_command))
+
+    # Ultra Elite commands (Ultra Premium tier)
+    app.add_handler(CommandHandler("ultra_btc", ultra_btc_command))
+    app.add_handler(CommandHandler("ultra_gold", ultra_gold_command))
+    app.add_handler(CommandHandler("ultra_eurusd", ultra_eurusd_command))
+
+    # Quantum Elite commands (AI/ML powered - Ultra Premium tier)
+    app.add_handler(CommandHandler("quantum_btc", quantum_btc_command))
+    app.add_handler(CommandHandler("quantum_gold", quantum_gold_command))
+    app.add_handler(CommandHandler("quantum_eurusd", quantum_eurusd_command))
+    app.add_handler(CommandHandler("quantum_allsignals", quantum_allsignals_command))
+    app.add_handler(CommandHandler("quantum", quantum_allsignals_command))  # Alias
+    app.add_handler(CommandHandler("ai_signals", ai_signals_command))  # Quantum Elite AI Enhanced
+
+    # Quantum Intraday commands (High quality intraday - 85-92% win rate)
+    app.add_handler(CommandHandler("quantum_intraday_btc", quantum_intraday_btc_command))
+    app.add_handler(CommandHandler("quantum_intraday_gold", quantum_intraday_gold_command))
+    app.add_handler(CommandHandler("quantum_intraday_allsignals", quantum_intraday_allsignals_command))
+    app.add_handler(CommandHandler("quantum_intraday", quantum_intraday_allsignals_command))  # Alias
+
+    # Futures Commands
+    app.add_handler(CommandHandler("es", es_command))
+    app.add_handler(CommandHandler("nq", nq_command))
+
+    # Forex Pair Commands (Forex Expert Section) - All 11 pairs
+    app.add_handler(CommandHandler("eurusd", eurusd_command))
+    app.add_handler(CommandHandler("gbpusd", gbpusd_command))
+    app.add_handler(CommandHandler("usdjpy", usdjpy_command))
+    app.add_handler(CommandHandler("audusd", audusd_command))
+    app.add_handler(CommandHandler("nzdusd", nzdusd_command))
+    app.add_handler(CommandHandler("usdchf", usdchf_command))
+    app.add_handler(CommandHandler("usdcad", usdcad_command))
+    app.add_handler(CommandHandler("eurjpy", eurjpy_command))
+    app.add_handler(CommandHandler("eurgbp", eurgbp_command))
+    app.add_handler(CommandHandler("gbpjpy", gbpjpy_command))
+    app.add_handler(CommandHandler("audjpy", audjpy_command))
+
+    # ========================================================================
+    # INTERNATIONAL MARKETS COMMANDS
+    # ========================================================================
+    
+    # Core International Features
+    # international command removed in Phase 3 optimization
+    app.add_handler(CommandHandler("global_scanner", allsignals_command))
+    app.add_handler(CommandHandler("sessions", session_analysis_command))
+    
+    # Individual International Market Commands
+    # International market commands removed in Phase 3 optimization
+    
+    # Advanced Analytics & Analysis
+    app.add_handler(CommandHandler("correlations", correlation_command))
+    # app.add_handler(CommandHandler("cross_market", cross_market_command))  # TODO: Implement cross_market_command
+    # app.add_handler(CommandHandler("currency_strength", currency_strength_command))  # TODO: Implement
+    # app.add_handler(CommandHandler("market_regime", market_regime_command))  # TODO: Implement
+    app.add_handler(CommandHandler("volatility", volatility_command))
+    app.add_handler(CommandHandler("market_heatmap", market_heatmap_command))
+    
+    # News & Events
+    app.add_handler(CommandHandler("international_news", international_news_command))
+    app.add_handler(CommandHandler("economic_calendar", economic_calendar_command))
+
+    # ========================================================================
+    # LOCALIZATION & PREFERENCES COMMANDS
+    # ========================================================================
+    app.add_handler(CommandHandler("language", language_command))
+    # lang alias removed in Phase 4 duplicate cleanup
+    app.add_handler(CommandHandler("timezone", timezone_command))
+    # tz alias removed in Phase 4 duplicate cleanup
+    app.add_handler(CommandHandler("preferences", preferences_command))
+    app.add_handler(CommandHandler("region", region_command))
+    app.add_handler(CommandHandler("settings", settings_command))
+    app.add_handler(CommandHandler("quiet", quiet_command))
+
+    # ========================================================================
+    # ANALYSIS & TOOLS COMMANDS
+    # ========================================================================
+    app.add_handler(CommandHandler("forex", forex_command))
+    app.add_handler(CommandHandler("chart", chart_command))
+    app.add_handler(CommandHandler("stats", stats_command))
+    app.add_handler(CommandHandler("analytics", analytics_command))
+    app.add_handler(CommandHandler("upgrade_dashboard", upgrade_dashboard_command))
+    app.add_handler(CommandHandler("dashboard", personal_dashboard_command))  # Personal dashboard
+    app.add_handler(CommandHandler("portfolio", portfolio_command))  # Portfolio details
+    app.add_handler(CommandHandler("execute", execute_command))  # Execute trading signals
+    app.add_handler(CommandHandler("bracket", bracket_order_command))  # Advanced bracket orders
+    app.add_handler(CommandHandler("oco", oco_order_command))  # One-Cancels-Other orders
+    app.add_handler(CommandHandler("trail", trailing_stop_command))  # Trailing stop orders
+    app.add_handler(CommandHandler("orders", orders_command))  # View active orders
+    app.add_handler(CommandHandler("cancel", cancel_order_command))  # Cancel orders
+    app.add_handler(CommandHandler("performance", performance_command))  # Trading performance
+    app.add_handler(CommandHandler("myid", myid_command))  # Show user ID
+    app.add_handler(CommandHandler("export", export_command))
+    # Duplicate correlation handler removed in Phase 4 cleanup
+    # Duplicate mtf handler removed in Phase 4 cleanup
+    
+    # ========================================================================
+    # RISK MANAGEMENT COMMANDS
+    # ========================================================================
+    app.add_handler(CommandHandler("risk", risk_command))
+    app.add_handler(CommandHandler("exposure", exposure_command))
+    app.add_handler(CommandHandler("drawdown", drawdown_command))
+    app.add_handler(CommandHandler("capital", capital_command))
+    
+    # ========================================================================
+    # EDUCATIONAL COMMANDS
+    # ========================================================================
+    app.add_handler(CommandHandler("learn", learn_command))
+    app.add_handler(CommandHandler("glossary", glossary_command))
+    app.add_handler(CommandHandler("strategy", strategy_command))
+    app.add_handler(CommandHandler("mistakes", mistakes_command))
+    app.add_handler(CommandHandler("explain", explain_command))
+    app.add_handler(CommandHandler("tutorials", tutorials_command))
+    
+    # ========================================================================
+    # NOTIFICATIONS & ALERTS COMMANDS
+    # ========================================================================
+    app.add_handler(CommandHandler("notifications", notifications_command))
+    app.add_handler(CommandHandler("pricealert", pricealert_command))
+    app.add_handler(CommandHandler("sessionalerts", sessionalerts_command))
+    app.add_handler(CommandHandler("performancealerts", performancealerts_command))
+    app.add_handler(CommandHandler("trademanagementalerts", trademanagementalerts_command))
+    app.add_handler(CommandHandler("alerts", alerts_command))
+    
+    # ========================================================================
+    # SUBSCRIPTION & PAYMENT COMMANDS
+    # ========================================================================
+    app.add_handler(CommandHandler("subscribe", subscribe_command))
+    app.add_handler(CommandHandler("billing", billing_command))
+    app.add_handler(CommandHandler("verify_email", verify_email_command))
+    app.add_handler(CommandHandler("verify", verify_command))
+    app.add_handler(CommandHandler("verification_status", verification_status_command))
+    
+    # ========================================================================
+    # ADMIN & TRADE MANAGEMENT COMMANDS
+    # ========================================================================
+    app.add_handler(CommandHandler("outcome", outcome_command))  # Admin
+
+    # ========================================================================
+    # OPERATIONS, MONITORING & SUPPORT COMMANDS
+    # ========================================================================
+    app.add_handler(CommandHandler("health", health_command))
+    app.add_handler(CommandHandler("monitor", monitor_command))
+    app.add_handler(CommandHandler("rebuildstats", rebuildstats_command))
+    app.add_handler(CommandHandler("support", support_command))
+    app.add_handler(CommandHandler("incident", incident_command))
+    app.add_handler(CommandHandler("ops", ops_command))
+    app.add_handler(CommandHandler("status_page", status_page_command))
+
+    app.add_handler(CommandHandler("admin", admin_command))
+    app.add_handler(CommandHandler("profile", profile_command))
+    app.add_handler(CommandHandler("follow", follow_command))
+    app.add_handler(CommandHandler("leaderboard", leaderboard_command))
+    app.add_handler(CommandHandler("rate", rate_command))
+    app.add_handler(CommandHandler("poll", poll_command))
+    app.add_handler(CommandHandler("success", success_command))
+    app.add_handler(CommandHandler("referral", referral_command))
+    app.add_handler(CommandHandler("broker", broker_command))
+    app.add_handler(CommandHandler("paper", paper_command))
+    app.add_handler(CommandHandler("aipredict", ai_predict_command))
+    app.add_handler(CommandHandler("sentiment", sentiment_command))
+    app.add_handler(CommandHandler("smartmoney", smartmoney_command))
+    app.add_handler(CommandHandler("orderflow", orderflow_command))
+    app.add_handler(CommandHandler("marketmaker", marketmaker_command))
+    app.add_handler(CommandHandler("volumeprofile", volumeprofile_command))
+    # Duplicate analytics handler removed in Phase 4 cleanup
+    # Duplicate export handler removed in Phase 4 cleanup
+    app.add_handler(CommandHandler("alerts", alerts_command))
+    # Duplicate correlation handler removed in Phase 4 cleanup
+    app.add_handler(CommandHandler("capital", capital_command))
+    app.add_handler(CommandHandler("opentrade", opentrade_command))
+    app.add_handler(CommandHandler("closetrade", closetrade_command))
+    app.add_handler(CommandHandler("trades", trades_command))
+    app.add_handler(CommandHandler("performance", performance_command))
+    
+    # New Premium Commands 🔥
+    app.add_handler(CommandHandler("portfolio_optimize", portfolio_optimize_command))
+    app.add_handler(CommandHandler("market_structure", market_structure_command))
+    app.add_handler(CommandHandler("session_analysis", session_analysis_command))
+    app.add_handler(CommandHandler("portfolio_risk", portfolio_risk_command))
+    app.add_handler(CommandHandler("correlation_matrix", correlation_matrix_command))
+    
+    # Support system commands are now handled by the new operations support_command function
+
+
 def main():
     """Start the enhanced bot with auto-alerts"""
-    # #region agent log
-    try:
-        with open(log_path, 'a', encoding='utf-8') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"telegram_bot.py:9454","message":"main() function called","data":{},"timestamp":int(time.time()*1000)}) + "\n")
-    except: pass
-    # #endregion
     
     print("\n" + "="*60, flush=True)
     print("BOT STARTUP INITIATED", flush=True)
@@ -13524,12 +13914,6 @@ def main():
         
         # Check network connectivity first (non-blocking - just a warning)
         print("[*] Checking network connectivity...", flush=True)
-        # #region agent log
-        try:
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"telegram_bot.py:9471","message":"Checking network connectivity","data":{},"timestamp":int(time.time()*1000)}) + "\n")
-        except: pass
-        # #endregion
         network_ok = check_network_connectivity()
         if not network_ok:
             print("\n[!] Warning: Network check failed, but continuing anyway...", flush=True)
@@ -13540,38 +13924,13 @@ def main():
         
         # Validate BOT_TOKEN
         print("[*] Validating BOT_TOKEN...", flush=True)
-        # #region agent log
-        try:
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"telegram_bot.py:9509","message":"Validating BOT_TOKEN","data":{"BOT_TOKEN_set":bool(BOT_TOKEN),"BOT_TOKEN_value":BOT_TOKEN[:10] + "..." if BOT_TOKEN and len(BOT_TOKEN) > 10 else "None"},"timestamp":int(time.time()*1000)}) + "\n")
-        except: pass
-        # #endregion
         if not BOT_TOKEN or BOT_TOKEN == "YOUR_BOT_TOKEN_HERE":
-            # #region agent log
-            try:
-                with open(log_path, 'a', encoding='utf-8') as f:
-                    f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"telegram_bot.py:9511","message":"BOT_TOKEN not set - EXITING","data":{},"timestamp":int(time.time()*1000)}) + "\n")
-            except: pass
-            # #endregion
             print("\n[!] ERROR: BOT_TOKEN is not set!", flush=True)
             print("[!] Please set your BOT_TOKEN in bot_config.py", flush=True)
             print("[!] Exiting...", flush=True)
             return
         print("[✓] BOT_TOKEN validated", flush=True)
-        # #region agent log
-        try:
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"telegram_bot.py:9515","message":"BOT_TOKEN validated - continuing","data":{},"timestamp":int(time.time()*1000)}) + "\n")
-        except: pass
-        # #endregion
     except Exception as e:
-        # #region agent log
-        try:
-            import traceback
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"telegram_bot.py:9517","message":"EXCEPTION in main() initialization","data":{"error":str(e),"traceback":traceback.format_exc()},"timestamp":int(time.time()*1000)}) + "\n")
-        except: pass
-        # #endregion
         print(f"\n[!] ERROR during initialization: {e}", flush=True, file=sys.stderr)
         import traceback
         traceback.print_exc(file=sys.stderr)
@@ -13606,266 +13965,8 @@ def main():
             print("[!] Bot cannot start. Please check your BOT_TOKEN and try again.", flush=True)
             return
     
-    # ========================================================================
-    # BASIC COMMANDS
-    # ========================================================================
     try:
-        app.add_handler(CommandHandler("start", start_command))
-        app.add_handler(CommandHandler("help", help_command))
-        app.add_handler(CommandHandler("quickstart", quickstart_command))
-        app.add_handler(CommandHandler("search", search_command))
-        app.add_handler(CommandHandler("dashboard", dashboard_command))
-        app.add_handler(CommandHandler("mobile", mobile_command))
-        app.add_handler(CommandHandler("app", mobile_command))
-    # who alias removed in Phase 4 duplicate cleanup
-    
-        # ========================================================================
-        # PROFESSIONAL HELP COMMANDS (with inline keyboard navigation)
-        # ========================================================================
-        app.add_handler(CommandHandler("help_signals", help_signals_command))
-        app.add_handler(CommandHandler("help_elite", help_elite_command))
-        app.add_handler(CommandHandler("help_tools", help_tools_command))
-        app.add_handler(CommandHandler("help_trading", help_trading_command))
-        app.add_handler(CommandHandler("help_account", help_account_command))
-        app.add_handler(CommandHandler("help_subscription", help_subscription_command))
-        app.add_handler(CommandHandler("help_preferences", help_preferences_command))
-        app.add_handler(CommandHandler("help_operations", help_operations_command))
-        app.add_handler(CommandHandler("help_admin", help_admin_command))
-
-        # Backward compatibility - old help1-help7 commands (aliases)
-        app.add_handler(CommandHandler("help1", help1_command))
-        app.add_handler(CommandHandler("help2", help2_command))
-        app.add_handler(CommandHandler("help3", help3_command))
-        app.add_handler(CommandHandler("help4", help4_command))
-        app.add_handler(CommandHandler("help5", help5_command))
-        app.add_handler(CommandHandler("help6", help6_command))
-        app.add_handler(CommandHandler("help7", help7_command))
-
-        # Callback handler for inline keyboard navigation in help commands
-        app.add_handler(CallbackQueryHandler(help_callback_handler, pattern="^help_"))
-        app.add_handler(CallbackQueryHandler(preferences_callback_handler, pattern="^(lang_|timezone_|region_)"))
-
-        # Main commands callback handler
-        app.add_handler(CallbackQueryHandler(main_commands_callback_handler, pattern="^cmd_"))
-
-        # Operations callback handlers
-        app.add_handler(CallbackQueryHandler(support_callback_handler, pattern="^(support_|ticket_)"))
-        app.add_handler(CallbackQueryHandler(incident_callback_handler, pattern="^(incident_|ops_)"))
-
-        # Upgrade path callback handler
-        app.add_handler(CallbackQueryHandler(upgrade_callback_handler, pattern="^upgrade_"))
-
-        # Onboarding callback handler
-        app.add_handler(CallbackQueryHandler(onboarding_callback_handler, pattern="^(onboard_|lang_|tz_|exp_|asset_|risk_|notif_)"))
-
-        # ========================================================================
-        # SIGNAL COMMANDS
-        # ========================================================================
-        app.add_handler(CommandHandler("signal", signal_command))
-        app.add_handler(CommandHandler("signals", signals_command)) # Scan all assets
-        app.add_handler(CommandHandler("allsignals", allsignals_command)) # Alias
-
-        # Daily Signals System - High Frequency Quality Signals
-        app.add_handler(CommandHandler("daily_signal", daily_signal_command))
-        app.add_handler(CommandHandler("daily_status", daily_status_command))
-        app.add_handler(CommandHandler("daily_prefs", daily_prefs_command))
-        app.add_handler(CommandHandler("daily_history", daily_history_command))
-        app.add_handler(CommandHandler("daily_summary", daily_summary_command))
-        app.add_handler(CommandHandler("ds", daily_signal_command))  # Quick alias
-        app.add_handler(CommandHandler("dprefs", daily_prefs_command))  # Quick alias
-        app.add_handler(CommandHandler("dhistory", daily_history_command))  # Quick alias
-        app.add_handler(CommandHandler("dsummary", daily_summary_command))  # Quick alias
-
-        app.add_handler(CommandHandler("status", status_command))
-        app.add_handler(CommandHandler("calendar", calendar_command))
-        app.add_handler(CommandHandler("news", news_command))
-        app.add_handler(CommandHandler("mtf", mtf_command))
-        app.add_handler(CommandHandler("btc", btc_command))
-        app.add_handler(CommandHandler("eth", eth_command))
-        app.add_handler(CommandHandler("eth_backtest", eth_backtest_command))
-        app.add_handler(CommandHandler("gold", gold_command))
-
-        # Ultra Elite commands (Ultra Premium tier)
-        app.add_handler(CommandHandler("ultra_btc", ultra_btc_command))
-        app.add_handler(CommandHandler("ultra_gold", ultra_gold_command))
-        app.add_handler(CommandHandler("ultra_eurusd", ultra_eurusd_command))
-
-        # Quantum Elite commands (AI/ML powered - Ultra Premium tier)
-        app.add_handler(CommandHandler("quantum_btc", quantum_btc_command))
-        app.add_handler(CommandHandler("quantum_gold", quantum_gold_command))
-        app.add_handler(CommandHandler("quantum_eurusd", quantum_eurusd_command))
-        app.add_handler(CommandHandler("quantum_allsignals", quantum_allsignals_command))
-        app.add_handler(CommandHandler("quantum", quantum_allsignals_command))  # Alias
-        app.add_handler(CommandHandler("ai_signals", ai_signals_command))  # Quantum Elite AI Enhanced
-
-        # Quantum Intraday commands (High quality intraday - 85-92% win rate)
-        app.add_handler(CommandHandler("quantum_intraday_btc", quantum_intraday_btc_command))
-        app.add_handler(CommandHandler("quantum_intraday_gold", quantum_intraday_gold_command))
-        app.add_handler(CommandHandler("quantum_intraday_allsignals", quantum_intraday_allsignals_command))
-        app.add_handler(CommandHandler("quantum_intraday", quantum_intraday_allsignals_command))  # Alias
-
-        # Futures Commands
-        app.add_handler(CommandHandler("es", es_command))
-        app.add_handler(CommandHandler("nq", nq_command))
-
-        # Forex Pair Commands (Forex Expert Section) - All 11 pairs
-        app.add_handler(CommandHandler("eurusd", eurusd_command))
-        app.add_handler(CommandHandler("gbpusd", gbpusd_command))
-        app.add_handler(CommandHandler("usdjpy", usdjpy_command))
-        app.add_handler(CommandHandler("audusd", audusd_command))
-        app.add_handler(CommandHandler("nzdusd", nzdusd_command))
-        app.add_handler(CommandHandler("usdchf", usdchf_command))
-        app.add_handler(CommandHandler("usdcad", usdcad_command))
-        app.add_handler(CommandHandler("eurjpy", eurjpy_command))
-        app.add_handler(CommandHandler("eurgbp", eurgbp_command))
-        app.add_handler(CommandHandler("gbpjpy", gbpjpy_command))
-        app.add_handler(CommandHandler("audjpy", audjpy_command))
-
-    # ========================================================================
-    # INTERNATIONAL MARKETS COMMANDS
-    # ========================================================================
-    
-    # Core International Features
-    # international command removed in Phase 3 optimization
-        app.add_handler(CommandHandler("global_scanner", allsignals_command))
-        app.add_handler(CommandHandler("sessions", session_analysis_command))
-    
-    # Individual International Market Commands
-    # International market commands removed in Phase 3 optimization
-    
-    # Advanced Analytics & Analysis
-        app.add_handler(CommandHandler("correlations", correlation_command))
-        # app.add_handler(CommandHandler("cross_market", cross_market_command))  # TODO: Implement cross_market_command
-        # app.add_handler(CommandHandler("currency_strength", currency_strength_command))  # TODO: Implement
-        # app.add_handler(CommandHandler("market_regime", market_regime_command))  # TODO: Implement
-        app.add_handler(CommandHandler("volatility", volatility_command))
-        app.add_handler(CommandHandler("market_heatmap", market_heatmap_command))
-    
-    # News & Events
-        app.add_handler(CommandHandler("international_news", international_news_command))
-        app.add_handler(CommandHandler("economic_calendar", economic_calendar_command))
-
-    # ========================================================================
-    # LOCALIZATION & PREFERENCES COMMANDS
-    # ========================================================================
-        app.add_handler(CommandHandler("language", language_command))
-    # lang alias removed in Phase 4 duplicate cleanup
-        app.add_handler(CommandHandler("timezone", timezone_command))
-    # tz alias removed in Phase 4 duplicate cleanup
-        app.add_handler(CommandHandler("preferences", preferences_command))
-        app.add_handler(CommandHandler("region", region_command))
-        app.add_handler(CommandHandler("settings", settings_command))
-        app.add_handler(CommandHandler("quiet", quiet_command))
-
-    # ========================================================================
-    # ANALYSIS & TOOLS COMMANDS
-    # ========================================================================
-        app.add_handler(CommandHandler("forex", forex_command))
-        app.add_handler(CommandHandler("chart", chart_command))
-        app.add_handler(CommandHandler("stats", stats_command))
-        app.add_handler(CommandHandler("analytics", analytics_command))
-        app.add_handler(CommandHandler("upgrade_dashboard", upgrade_dashboard_command))
-        app.add_handler(CommandHandler("dashboard", personal_dashboard_command))  # Personal dashboard
-        app.add_handler(CommandHandler("portfolio", portfolio_command))  # Portfolio details
-        app.add_handler(CommandHandler("execute", execute_command))  # Execute trading signals
-        app.add_handler(CommandHandler("bracket", bracket_order_command))  # Advanced bracket orders
-        app.add_handler(CommandHandler("oco", oco_order_command))  # One-Cancels-Other orders
-        app.add_handler(CommandHandler("trail", trailing_stop_command))  # Trailing stop orders
-        app.add_handler(CommandHandler("orders", orders_command))  # View active orders
-        app.add_handler(CommandHandler("cancel", cancel_order_command))  # Cancel orders
-        app.add_handler(CommandHandler("performance", performance_command))  # Trading performance
-        app.add_handler(CommandHandler("myid", myid_command))  # Show user ID
-        app.add_handler(CommandHandler("export", export_command))
-    # Duplicate correlation handler removed in Phase 4 cleanup
-    # Duplicate mtf handler removed in Phase 4 cleanup
-    
-    # ========================================================================
-    # RISK MANAGEMENT COMMANDS
-    # ========================================================================
-        app.add_handler(CommandHandler("risk", risk_command))
-        app.add_handler(CommandHandler("exposure", exposure_command))
-        app.add_handler(CommandHandler("drawdown", drawdown_command))
-        app.add_handler(CommandHandler("capital", capital_command))
-    
-    # ========================================================================
-    # EDUCATIONAL COMMANDS
-    # ========================================================================
-        app.add_handler(CommandHandler("learn", learn_command))
-        app.add_handler(CommandHandler("glossary", glossary_command))
-        app.add_handler(CommandHandler("strategy", strategy_command))
-        app.add_handler(CommandHandler("mistakes", mistakes_command))
-        app.add_handler(CommandHandler("explain", explain_command))
-        app.add_handler(CommandHandler("tutorials", tutorials_command))
-    
-    # ========================================================================
-    # NOTIFICATIONS & ALERTS COMMANDS
-    # ========================================================================
-        app.add_handler(CommandHandler("notifications", notifications_command))
-        app.add_handler(CommandHandler("pricealert", pricealert_command))
-        app.add_handler(CommandHandler("sessionalerts", sessionalerts_command))
-        app.add_handler(CommandHandler("performancealerts", performancealerts_command))
-        app.add_handler(CommandHandler("trademanagementalerts", trademanagementalerts_command))
-        app.add_handler(CommandHandler("alerts", alerts_command))
-    
-    # ========================================================================
-    # SUBSCRIPTION & PAYMENT COMMANDS
-    # ========================================================================
-        app.add_handler(CommandHandler("subscribe", subscribe_command))
-        app.add_handler(CommandHandler("billing", billing_command))
-        app.add_handler(CommandHandler("verify_email", verify_email_command))
-        app.add_handler(CommandHandler("verify", verify_command))
-        app.add_handler(CommandHandler("verification_status", verification_status_command))
-    
-    # ========================================================================
-    # ADMIN & TRADE MANAGEMENT COMMANDS
-    # ========================================================================
-        app.add_handler(CommandHandler("outcome", outcome_command))  # Admin
-
-    # ========================================================================
-    # OPERATIONS, MONITORING & SUPPORT COMMANDS
-    # ========================================================================
-        app.add_handler(CommandHandler("health", health_command))
-        app.add_handler(CommandHandler("monitor", monitor_command))
-        app.add_handler(CommandHandler("support", support_command))
-        app.add_handler(CommandHandler("incident", incident_command))
-        app.add_handler(CommandHandler("ops", ops_command))
-        app.add_handler(CommandHandler("status_page", status_page_command))
-
-        app.add_handler(CommandHandler("admin", admin_command))
-        app.add_handler(CommandHandler("profile", profile_command))
-        app.add_handler(CommandHandler("follow", follow_command))
-        app.add_handler(CommandHandler("leaderboard", leaderboard_command))
-        app.add_handler(CommandHandler("rate", rate_command))
-        app.add_handler(CommandHandler("poll", poll_command))
-        app.add_handler(CommandHandler("success", success_command))
-        app.add_handler(CommandHandler("referral", referral_command))
-        app.add_handler(CommandHandler("broker", broker_command))
-        app.add_handler(CommandHandler("paper", paper_command))
-        app.add_handler(CommandHandler("aipredict", ai_predict_command))
-        app.add_handler(CommandHandler("sentiment", sentiment_command))
-        app.add_handler(CommandHandler("smartmoney", smartmoney_command))
-        app.add_handler(CommandHandler("orderflow", orderflow_command))
-        app.add_handler(CommandHandler("marketmaker", marketmaker_command))
-        app.add_handler(CommandHandler("volumeprofile", volumeprofile_command))
-    # Duplicate analytics handler removed in Phase 4 cleanup
-    # Duplicate export handler removed in Phase 4 cleanup
-        app.add_handler(CommandHandler("alerts", alerts_command))
-        # Duplicate correlation handler removed in Phase 4 cleanup
-        app.add_handler(CommandHandler("capital", capital_command))
-        app.add_handler(CommandHandler("opentrade", opentrade_command))
-        app.add_handler(CommandHandler("closetrade", closetrade_command))
-        app.add_handler(CommandHandler("trades", trades_command))
-        app.add_handler(CommandHandler("performance", performance_command))
-    
-        # New Premium Commands 🔥
-        app.add_handler(CommandHandler("portfolio_optimize", portfolio_optimize_command))
-        app.add_handler(CommandHandler("market_structure", market_structure_command))
-        app.add_handler(CommandHandler("session_analysis", session_analysis_command))
-        app.add_handler(CommandHandler("portfolio_risk", portfolio_risk_command))
-        app.add_handler(CommandHandler("correlation_matrix", correlation_matrix_command))
-    
-    # Support system commands are now handled by the new operations support_command function
-
+        register_handlers(app)
     except Exception as e:
         print(f"[!] FATAL ERROR: Failed to add command handlers: {e}", flush=True)
         import traceback
@@ -13900,6 +14001,16 @@ def main():
     print("[*] Press Ctrl+C to stop the bot", flush=True)
     print("=" * 50, flush=True)
 
+    # Full profile loads every deferred feature before going online;
+    # lean profile warms them from post_init once polling has started.
+    print(f"[*] Boot profile: {BOOT_PROFILE}", flush=True)
+    if BOOT_PROFILE == 'full':
+        warm_up(DEFERRED_FEATURES, background=False)
+    startup_profiler.uninstall()
+    startup_profiler.finish_boot()
+    if STARTUP_PROFILE_REPORT:
+        print(startup_profiler.report(), flush=True)
+
     max_retries = 999999  # Keep retrying indefinitely
     retry_delay = 5  # Start with 5 seconds
     
@@ -13961,46 +14072,15 @@ def main():
 
 
 if __name__ == "__main__":
-    # #region agent log
-    try:
-        import json
-        log_path = os.path.join(os.path.dirname(__file__), '.cursor', 'debug.log')
-        os.makedirs(os.path.dirname(log_path), exist_ok=True)
-        with open(log_path, 'a', encoding='utf-8') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"telegram_bot.py:9909","message":"Entered if __name__ == __main__ block","data":{"__name__":__name__},"timestamp":int(time.time()*1000)}) + "\n")
-    except Exception as e:
-        try:
-            print(f"[DEBUG] Logging failed in __main__: {e}")
-        except:
-            pass
-    # #endregion
     
     print("\n" + "="*60, flush=True)
     print("SCRIPT EXECUTION STARTED", flush=True)
     print("="*60 + "\n", flush=True)
     
-    # #region agent log
-    try:
-        with open(log_path, 'a', encoding='utf-8') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"telegram_bot.py:9923","message":"About to call main() - before try block","data":{},"timestamp":int(time.time()*1000)}) + "\n")
-    except: pass
-    # #endregion
     
     try:
         print("[DEBUG] Calling main() function...", flush=True)
-        # #region agent log
-        try:
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"telegram_bot.py:9849","message":"Calling main() function","data":{},"timestamp":int(time.time()*1000)}) + "\n")
-        except: pass
-        # #endregion
         main()
-        # #region agent log
-        try:
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"telegram_bot.py:9850","message":"main() function returned normally","data":{},"timestamp":int(time.time()*1000)}) + "\n")
-        except: pass
-        # #endregion
         print("[DEBUG] main() function returned normally", flush=True)
     except KeyboardInterrupt:
         print("\n[*] Bot stopped by user (KeyboardInterrupt)", flush=True)
@@ -14008,13 +14088,6 @@ if __name__ == "__main__":
         # Allow sys.exit() to work normally
         raise
     except Exception as e:
-        # #region agent log
-        try:
-            import traceback
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"telegram_bot.py:9856","message":"FATAL ERROR in main","data":{"error":str(e),"traceback":traceback.format_exc()},"timestamp":int(time.time()*1000)}) + "\n")
-        except: pass
-        # #endregion
         print(f"\n[!] FATAL ERROR in main: {e}", flush=True)
         import traceback
         traceback.print_exc()
@@ -0,0 +1,141 @@
+"""
+Tests for the in-process AI model server (warm models and micro-batching)
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from ai_model_server import ModelServer
+
+
+class CountingModel:
+    """Stand-in for a Keras model that records every forward pass"""
+
+    def __init__(self, delay: float = 0.0):
+        self.calls = []
+        self.delay = delay
+
+    def __call__(self, x, training=False):
+        assert training is False
+        self.calls.append(len(x))
+        time.sleep(self.delay)
+        return x.sum(axis=(1, 2))[:, None]
+
+
+class TestModelServer:
+    """Test model loading, batching and statistics"""
+
+    def setup_method(self):
+        self.server = ModelServer(max_batch_size=32, max_latency_ms=50)
+
+    def teardown_method(self):
+        self.server.shutdown()
+
+    def test_loader_runs_once(self):
+        """A lazily loaded model is built once and shared by all callers"""
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return CountingModel()
+
+        self.server.register('asset', loader=loader)
+        for _ in range(3):
+            self.server.predict('asset', np.ones((1, 4, 2)))
+
+        assert len(loads) == 1
+        assert self.server.get_stats()['asset']['loaded']
+
+    def test_concurrent_requests_are_coalesced(self):
+        """Concurrent single-sample requests share a forward pass"""
+        model = CountingModel(delay=0.01)
+        self.server.register('asset', model=model)
+
+        sequences = [np.full((1, 4, 2), i, dtype=float) for i in range(15)]
+        with ThreadPoolExecutor(max_workers=15) as pool:
+            results = list(pool.map(lambda s: self.server.predict('asset', s), sequences))
+
+        # Every caller gets its own row back
+        for i, result in enumerate(results):
+            assert result.shape == (1, 1)
+            assert result[0, 0] == pytest.approx(i * 8)
+
+        assert sum(model.calls) == 15
+        assert len(model.calls) < 15
+
+    def test_predict_many_batches_requests(self):
+        """predict_many submits everything before waiting"""
+        model = CountingModel()
+        self.server.register('asset', model=model)
+
+        results = self.server.predict_many('asset', [np.ones((1, 3, 3)) for _ in range(5)])
+
+        assert len(results) == 5
+        assert model.calls == [5]
+
+    def test_multi_output_models_are_split_per_request(self):
+        """List outputs (multi-horizon models) are sliced per request"""
+        def two_heads(x, training=False):
+            return [x[:, 0, :1], x[:, -1, :1]]
+
+        self.server.register('multi', model=two_heads)
+        first, second = self.server.predict_many(
+            'multi', [np.zeros((1, 2, 1)), np.ones((2, 2, 1))]
+        )
+
+        assert isinstance(first, list) and len(first) == 2
+        assert first[0].shape == (1, 1)
+        assert second[1].shape == (2, 1)
+
+    def test_mismatched_shapes_run_separately(self):
+        """Requests with different feature counts are not stacked together"""
+        model = CountingModel()
+        self.server.register('asset', model=model)
+
+        results = self.server.predict_many('asset', [np.ones((1, 4, 2)), np.ones((1, 4, 3))])
+
+        assert results[0][0, 0] == pytest.approx(8)
+        assert results[1][0, 0] == pytest.approx(12)
+        assert sorted(model.calls) == [1, 1]
+
+    def test_errors_propagate_to_callers(self):
+        """An inference failure is raised in every waiting caller"""
+        def broken(x, training=False):
+            raise RuntimeError("boom")
+
+        self.server.register('broken', model=broken)
+
+        with pytest.raises(RuntimeError):
+            self.server.predict('broken', np.ones((1, 2, 2)))
+        assert self.server.get_stats()['broken']['errors'] == 1
+
+    def test_unknown_model(self):
+        """Predicting against an unregistered model fails fast"""
+        with pytest.raises(KeyError):
+            self.server.predict('missing', np.ones((1, 2, 2)))
+
+    def test_stats_report_latency_and_queue_depth(self):
+        """Per-model statistics include latency and queue depth"""
+        release = threading.Event()
+
+        def slow(x, training=False):
+            release.wait(1)
+            return x[:, 0, :1]
+
+        self.server.register('slow', model=slow, max_batch_size=1, max_latency_ms=0)
+        futures = [self.server.submit('slow', np.ones((1, 2, 1))) for _ in range(3)]
+        time.sleep(0.05)
+
+        assert self.server.get_stats()['slow']['queue_depth'] >= 1
+
+        release.set()
+        for f in futures:
+            f.result(timeout=5)
+
+        stats = self.server.get_stats()['slow']
+        assert stats['requests'] == 3
+        assert stats['latency_p95_ms'] > 0
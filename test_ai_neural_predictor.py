@@ -0,0 +1,145 @@
+"""
+Tests for the NeuralPredictor feature pipeline and sequence builder
+"""
+
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('tensorflow')
+
+from ai_neural_predictor import AdvancedAIPredictor, NeuralPredictor, StreamingFeaturePipeline, build_sequence_windows
+
+
+def make_ohlcv(n: int = 500, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.standard_normal(n).cumsum()
+    return pd.DataFrame({
+        'open': close,
+        'high': close + 1,
+        'low': close - 1,
+        'close': close,
+        'volume': rng.uniform(1, 10, n),
+        'rsi': 50 + rng.standard_normal(n),
+    }, index=pd.date_range('2024-01-01', periods=n, freq='h'))
+
+
+class TestStreamingFeaturePipeline:
+    """Incremental features must match a full recomputation"""
+
+    def test_features_are_float32(self):
+        features = StreamingFeaturePipeline.compute(make_ohlcv(100))
+        assert features.dtype == np.float32
+        assert features.shape[0] == 100
+
+    def test_appended_rows_match_full_pass(self):
+        df = make_ohlcv()
+        pipeline = StreamingFeaturePipeline()
+
+        pipeline.features(df.iloc[:400], 'BTC')
+        incremental = pipeline.features(df, 'BTC')
+
+        np.testing.assert_allclose(incremental, StreamingFeaturePipeline.compute(df), rtol=1e-6)
+        assert pipeline.stats['incremental'] == 1
+        # 100 new rows plus the previous (possibly still forming) last bar
+        assert pipeline.stats['rows_computed'] == 400 + 101
+
+    def test_sliding_window_matches_full_pass(self):
+        df = make_ohlcv()
+        pipeline = StreamingFeaturePipeline()
+
+        pipeline.features(df.iloc[:400], 'BTC')
+        for start in (1, 5, 50):
+            frame = df.iloc[start:400 + start]
+            np.testing.assert_allclose(pipeline.features(frame, 'BTC'),
+                                       StreamingFeaturePipeline.compute(frame), rtol=1e-6)
+        assert pipeline.stats['incremental'] == 3
+
+    def test_same_key_is_a_cache_hit(self):
+        df = make_ohlcv()
+        pipeline = StreamingFeaturePipeline()
+
+        first = pipeline.features(df, 'BTC')
+        second = pipeline.features(df, 'BTC')
+
+        assert first is second
+        assert pipeline.stats['hits'] == 1
+
+    def test_revised_last_bar_is_recomputed(self):
+        df = make_ohlcv()
+        pipeline = StreamingFeaturePipeline()
+        pipeline.features(df, 'BTC')
+
+        revised = df.copy()
+        revised.iloc[-1, revised.columns.get_loc('close')] += 5
+        features = pipeline.features(revised, 'BTC')
+
+        np.testing.assert_allclose(features, StreamingFeaturePipeline.compute(revised), rtol=1e-6)
+
+
+class TestSequenceWindows:
+    """Window views replace per-sequence copies"""
+
+    def test_windows_share_memory(self):
+        features = np.arange(200, dtype=np.float32).reshape(100, 2)
+        windows = build_sequence_windows(features, 10)
+
+        assert windows.shape == (91, 10, 2)
+        assert np.shares_memory(windows, features)
+        np.testing.assert_array_equal(windows[7], features[7:17])
+
+    def test_create_sequences_matches_loop(self):
+        predictor = NeuralPredictor.__new__(NeuralPredictor)
+        predictor.sequence_length = 60
+        predictor.prediction_horizon = 12
+
+        features = np.random.default_rng(1).standard_normal((300, 5)).astype(np.float32)
+        target = np.arange(300, dtype=np.float32)
+        X, y = predictor._create_sequences(features, target)
+
+        expected_n = 300 - 60 - 12
+        assert X.shape == (expected_n, 60, 5)
+        np.testing.assert_array_equal(X[-1], features[expected_n - 1:expected_n + 59])
+        np.testing.assert_array_equal(y, target[60:60 + expected_n])
+
+
+class EchoServer:
+    """Model server stand-in whose prediction is the last bar's scaled return"""
+
+    def submit(self, name, sequence):
+        future = Future()
+        future.set_result(np.array([[sequence[0, -1, 0] * 100]]))
+        return future
+
+
+class IdentityScaler:
+    def transform(self, x):
+        return x
+
+
+class TestBatchPrediction:
+    """Batched predictions line up with their inputs"""
+
+    def test_same_asset_twice_keeps_both_frames(self, tmp_path):
+        predictor = NeuralPredictor(model_dir=str(tmp_path))
+        predictor.models['EURUSD'] = object()
+        predictor.scaler = IdentityScaler()
+        predictor.model_server = EchoServer()
+
+        up = make_ohlcv(200)
+        down = up.copy()
+        up.iloc[-1, up.columns.get_loc('close')] *= 1.01
+        down.iloc[-1, down.columns.get_loc('close')] *= 0.99
+
+        results = predictor.predict_direction_batch([('EURUSD', up), ('EURUSD', down), ('GBPUSD', up)])
+        assert [r.get('direction') for r in results] == ['bullish', 'bearish', None]
+        assert 'error' in results[2]
+
+        advanced = AdvancedAIPredictor.__new__(AdvancedAIPredictor)
+        advanced.neural_predictor = predictor
+        signals = [{'asset': 'EURUSD', 'score': 15}, {'asset': 'EURUSD', 'score': 10}]
+        qualities = advanced.predict_signal_quality_batch([(signals[0], up), (signals[1], down)])
+        assert [q['neural_direction'] for q in qualities] == ['bullish', 'bearish']
+        assert [q['original_score'] for q in qualities] == [15, 10]
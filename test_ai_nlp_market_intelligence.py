@@ -0,0 +1,168 @@
+"""
+Tests for batched sentiment scoring, the sentiment cache and background news refresh
+"""
+
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip('tensorflow')
+pytest.importorskip('tensorflow_hub')
+pytest.importorskip('tensorflow_text')
+pytest.importorskip('transformers')
+
+from ai_nlp_market_intelligence import MarketSentimentAnalyzer, NewsAggregator, SentimentCache
+
+
+class FakeTokenizer:
+    def __call__(self, texts, **kwargs):
+        n = len(texts)
+        return {'input_ids': np.zeros((n, 4), dtype=np.int32),
+                'attention_mask': np.ones((n, 4), dtype=np.int32)}
+
+
+class FakeClassifier:
+    """Records batch sizes and predicts 'very_positive' for everything"""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, inputs, training=False):
+        n = len(inputs['input_ids'])
+        self.batches.append(n)
+        probs = np.zeros((n, 5), dtype=np.float32)
+        probs[:, 4] = 0.9
+        probs[:, 2] = 0.1
+        return probs
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    monkeypatch.setattr(MarketSentimentAnalyzer, '_initialize_model', lambda self: None)
+    return MarketSentimentAnalyzer(cache=SentimentCache(ttl_seconds=60))
+
+
+@pytest.fixture
+def bert_analyzer(analyzer):
+    analyzer.tokenizer = FakeTokenizer()
+    analyzer.classification_model = FakeClassifier()
+    analyzer.sentiment_model = object()
+    analyzer.bert_batch_size = 4
+    return analyzer
+
+
+class TestMarketSentimentAnalyzer:
+    """Test rule-based scoring, batching and caching"""
+
+    def test_rule_based_lexicon(self, analyzer):
+        result = analyzer.analyze_sentiment("Bitcoin rally and surge, analysts bullish! http://x.co")
+        assert result['sentiment'] == 'very_positive'
+        assert result['score'] == pytest.approx((0.8 + 0.9 + 1.0) / 3)
+
+        # Only whole tokens match, as with the original split-based scoring
+        assert analyzer.analyze_sentiment("rallying gains")['score'] == 0.0
+
+    def test_empty_text(self, analyzer):
+        assert analyzer.analyze_sentiment("   ")['sentiment'] == 'neutral'
+
+    def test_batch_uses_few_forward_passes(self, bert_analyzer):
+        texts = [f"market crash number {i}" for i in range(10)]
+        results = bert_analyzer.analyze_sentiment_batch(texts)
+
+        assert len(results) == 10
+        assert bert_analyzer.classification_model.batches == [4, 4, 2]
+        # 0.6 * crash(-1.0) + 0.4 * very_positive(1.0)
+        assert results[0]['score'] == pytest.approx(-0.2)
+
+    def test_cache_skips_rescoring(self, bert_analyzer):
+        bert_analyzer.analyze_sentiment("Gold surges on fear")
+        bert_analyzer.analyze_sentiment("GOLD surges on fear!")     # Same cleaned text
+
+        assert bert_analyzer.classification_model.batches == [1]
+        assert bert_analyzer.cache.get_stats()['hits'] == 1
+
+    def test_duplicates_in_one_batch_scored_once(self, bert_analyzer):
+        results = bert_analyzer.analyze_sentiment_batch(["oil drop", "oil drop", "oil gain"])
+
+        assert bert_analyzer.classification_model.batches == [2]
+        assert results[0] == results[1]
+        assert results[0] is not results[1]
+
+    def test_aspects_are_part_of_cache_key(self, analyzer):
+        plain = analyzer.analyze_sentiment("price rally")
+        with_aspects = analyzer.analyze_sentiment("price rally", aspects=['price'])
+
+        assert plain['aspects'] == {}
+        assert with_aspects['aspects']['price']['mentions'] == 1
+
+
+    def test_cache_hits_are_fresh_copies(self, analyzer, monkeypatch):
+        history = []
+        monkeypatch.setattr(analyzer, '_store_sentiment_history', history.append)
+        first = analyzer.analyze_sentiment("price rally", aspects=['price'])
+        first['aspects']['price']['mentions'] = 99
+
+        second = analyzer.analyze_sentiment("price rally", aspects=['price'])
+        assert second['aspects']['price']['mentions'] == 1
+        assert second['timestamp'] >= first['timestamp']
+        # Every analyzed text feeds the trend history, cached or not
+        assert len(history) == 2 and analyzer.cache.get_stats()['hits'] == 1
+
+    def test_analyzer_is_part_of_cache_key(self, analyzer):
+        rules = analyzer.analyze_sentiment("market crash")
+        analyzer.tokenizer = FakeTokenizer()
+        analyzer.classification_model = FakeClassifier()
+        analyzer.sentiment_model = object()
+        with_bert = analyzer.analyze_sentiment("market crash")
+
+        assert rules['score'] == pytest.approx(-1.0)
+        assert with_bert['score'] == pytest.approx(-0.2)
+        assert analyzer.classification_model.batches == [1]
+
+
+class TestSentimentCache:
+    def test_ttl_expiry(self):
+        cache = SentimentCache(ttl_seconds=0)
+        cache.set('k', {'score': 1})
+        assert cache.get('k') is None
+
+    def test_size_bound(self):
+        cache = SentimentCache(max_entries=2)
+        for key in 'abc':
+            cache.set(key, {})
+        assert cache.get('a') is None
+        assert cache.get('c') == {}
+
+
+class TestNewsAggregator:
+    """Test batched news analysis and non-blocking refresh"""
+
+    def test_fetch_latest_news_scores_in_one_batch(self, bert_analyzer):
+        aggregator = NewsAggregator(bert_analyzer)
+        news = aggregator.fetch_latest_news(max_articles=20)
+
+        assert news
+        assert all('sentiment' in item and 'entities' in item for item in news)
+        # Five sources repeat four headlines: only the unique ones are scored
+        assert sum(bert_analyzer.classification_model.batches) == 4
+        aggregator.shutdown()
+
+    def test_get_latest_news_does_not_block(self, analyzer, monkeypatch):
+        aggregator = NewsAggregator(analyzer)
+        release = threading.Event()
+        original = aggregator.fetch_latest_news
+
+        def slow_fetch(max_articles=50):
+            release.wait(5)
+            return original(max_articles)
+
+        monkeypatch.setattr(aggregator, 'fetch_latest_news', slow_fetch)
+
+        assert aggregator.get_latest_news(5) == []          # Returns before the fetch finishes
+        assert aggregator.refresh_news_async() is False    # Only one refresh in flight
+
+        release.set()
+        aggregator._refresh_future.result(timeout=5)
+        assert aggregator.get_latest_news(5)
+        aggregator.shutdown()
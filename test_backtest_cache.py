@@ -0,0 +1,170 @@
+"""
+Tests for the content-addressed backtest result cache
+"""
+
+import functools
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_cache import BacktestResultCache, UncacheableStrategy, fingerprint_data, strategy_identity
+from backtest_engine import BacktestEngine, ExecutionPriority
+
+
+def make_data(periods=600, seed=3):
+    rng = np.random.default_rng(seed)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.003, periods)))
+    index = pd.date_range('2024-01-01', periods=periods, freq='1h')
+    return pd.DataFrame({'open': prices, 'high': prices * 1.003, 'low': prices * 0.997,
+                         'close': prices, 'volume': 1.0}, index=index)
+
+
+def breakout_signals(data):
+    close = data['close']
+    direction = np.where(close > close.rolling(20).max().shift(1), 1.0, np.nan)
+    return {'direction': direction, 'entry_price': close.values, 'stop_loss': close.values * 0.97,
+            'take_profit_1': close.values * 1.03, 'take_profit_2': close.values * 1.06}
+
+
+def make_strategy(min_move):
+    """Sweep candidate: trade only moves larger than ``min_move``"""
+    def signals(data):
+        close = data['close']
+        direction = np.where(close.pct_change(20).abs() > min_move, 1.0, np.nan)
+        return {'direction': direction, 'entry_price': close.values, 'stop_loss': close.values * 0.97,
+                'take_profit_1': close.values * 1.03, 'take_profit_2': close.values * 1.06}
+    return signals
+
+
+def threshold_signals(data, min_move=0.01):
+    return make_strategy(min_move)(data)
+
+
+class TestBacktestResultCache:
+    """Test keys, round trips and LRU eviction"""
+
+    def test_second_run_is_a_hit_with_identical_frames(self, tmp_path):
+        cache = BacktestResultCache(str(tmp_path))
+        data = make_data()
+
+        first = cache.get_or_run(BacktestEngine(initial_capital=1000), data, breakout_signals,
+                                 method='run_vectorized_backtest', symbol='TEST')
+        second = cache.get_or_run(BacktestEngine(initial_capital=1000), data, breakout_signals,
+                                  method='run_vectorized_backtest', symbol='TEST')
+
+        assert not first.cache_hit and second.cache_hit
+        assert len(first.trades_df) > 0
+        pd.testing.assert_frame_equal(second.trades_df, first.trades_df, check_dtype=False)
+        pd.testing.assert_frame_equal(second.equity_curve_df, first.equity_curve_df,
+                                      check_dtype=False, check_freq=False, check_names=False)
+        assert second.metrics['total_trades'] == first.metrics['total_trades']
+        assert cache.get_stats()['hits'] == 1
+
+    def test_key_covers_data_engine_and_strategy(self, tmp_path):
+        cache = BacktestResultCache(str(tmp_path))
+        data = make_data()
+        base = cache.make_key(BacktestEngine(), data, breakout_signals)
+
+        changed_data = data.copy()
+        changed_data.iloc[-1, 3] += 1
+        assert cache.make_key(BacktestEngine(), changed_data, breakout_signals) != base
+        assert cache.make_key(BacktestEngine(execution_priority=ExecutionPriority.TAKE_PROFIT_FIRST),
+                              data, breakout_signals) != base
+        assert cache.make_key(BacktestEngine(slippage=0.001), data, breakout_signals) != base
+        assert cache.make_key(BacktestEngine(), data, breakout_signals, strategy_version='2') != base
+        assert cache.make_key(BacktestEngine(), data, breakout_signals,
+                              run_options={'performance_mode': True}) != base
+        assert cache.make_key(BacktestEngine(), data, breakout_signals) == base
+
+    def test_run_without_equity_curve_is_not_served_to_a_full_run(self, tmp_path):
+        cache = BacktestResultCache(str(tmp_path))
+        data = make_data()
+
+        lean = cache.get_or_run(BacktestEngine(initial_capital=1000, keep_equity_curve=False), data,
+                                breakout_signals, method='run_vectorized_backtest', symbol='TEST')
+        full = cache.get_or_run(BacktestEngine(initial_capital=1000), data, breakout_signals,
+                                method='run_vectorized_backtest', symbol='TEST')
+
+        assert lean.equity_curve_df.empty and not full.cache_hit
+        assert len(full.equity_curve_df) == len(data)
+        assert lean.metrics['total_trades'] == full.metrics['total_trades'] > 0
+        assert lean.metrics['max_drawdown_pct'] == pytest.approx(full.metrics['max_drawdown_pct'])
+
+    def test_lru_eviction_by_size(self, tmp_path):
+        cache = BacktestResultCache(str(tmp_path), max_bytes=1)
+        data = make_data(200)
+
+        first = cache.get_or_run(BacktestEngine(), data, breakout_signals, method='run_vectorized_backtest')
+        cache.get_or_run(BacktestEngine(risk_per_trade=0.02), data, breakout_signals,
+                         method='run_vectorized_backtest')
+
+        assert cache.get(first.key) is None
+        assert not os.path.exists(os.path.join(str(tmp_path), f"{first.key}.npz"))
+
+    def test_index_survives_reopen(self, tmp_path):
+        data = make_data(200)
+        result = BacktestResultCache(str(tmp_path)).get_or_run(
+            BacktestEngine(), data, breakout_signals, method='run_vectorized_backtest')
+
+        reopened = BacktestResultCache(str(tmp_path))
+        assert reopened.get(result.key).cache_hit
+
+    def test_fingerprint_and_identity_helpers(self):
+        data = make_data(50)
+        assert fingerprint_data(data) == fingerprint_data(data.copy())
+        assert fingerprint_data({'A': data}) != fingerprint_data({'B': data})
+
+        def versioned(d):
+            return None
+        versioned.__version__ = '1.4'
+        assert strategy_identity(versioned)['version'] == '1.4'
+        assert strategy_identity(breakout_signals)['version'].startswith('src:')
+
+    def test_captured_parameters_are_part_of_the_identity(self, tmp_path):
+        cache = BacktestResultCache(str(tmp_path))
+        data = make_data(300)
+
+        def run(strategy):
+            return cache.get_or_run(BacktestEngine(initial_capital=1000), data, strategy,
+                                    method='run_vectorized_backtest', symbol='TEST')
+
+        quiet, busy = run(make_strategy(0.5)), run(make_strategy(0.01))
+        assert not busy.cache_hit and len(quiet.trades_df) == 0 < len(busy.trades_df)
+        assert run(make_strategy(0.01)).cache_hit
+
+        loose = run(functools.partial(threshold_signals, min_move=0.01))
+        strict = run(functools.partial(threshold_signals, min_move=0.5))
+        assert not strict.cache_hit and len(strict.trades_df) == 0 < len(loose.trades_df)
+        assert strategy_identity(make_strategy(0.5)) != strategy_identity(make_strategy(0.01))
+
+    def test_unidentifiable_strategy_is_not_cached(self, tmp_path):
+        import threading
+
+        cache = BacktestResultCache(str(tmp_path))
+        data = make_data(200)
+        lock = threading.Lock()
+
+        def locked_signals(d):
+            with lock:
+                return breakout_signals(d)
+
+        with pytest.raises(UncacheableStrategy):
+            strategy_identity(locked_signals)
+        assert strategy_identity(locked_signals, version='1')['version'] == '1'
+
+        for _ in range(2):
+            result = cache.get_or_run(BacktestEngine(), data, locked_signals, method='run_vectorized_backtest')
+            assert not result.cache_hit
+        assert cache.get_stats()['entries'] == 0
+
+    def test_skipped_runs_are_not_cached(self, tmp_path, monkeypatch):
+        cache = BacktestResultCache(str(tmp_path))
+        data = make_data(200)
+        engine = BacktestEngine()
+        monkeypatch.setattr(engine, '_begin_run', lambda *args: engine._create_error_result('high error risk'))
+
+        result = cache.get_or_run(engine, data, breakout_signals, method='run_vectorized_backtest')
+        assert result.metrics['success'] is False and not result.cache_hit
+        assert cache.get(result.key) is None and cache.get_stats()['entries'] == 0
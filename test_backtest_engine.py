@@ -6,8 +6,9 @@ import pytest
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from backtest_engine import BacktestEngine, Trade, PositionMode, ExecutionPriority
-from backtest_analytics import BacktestAnalytics
+from backtest_engine import BacktestEngine, Trade, PositionMode, ExecutionPriority, merge_bar_streams
+from backtest_analytics import BacktestAnalytics, StreamingMetrics
+from intrabar_store import IntrabarStore
 
 
 class TestTrade:
@@ -446,5 +447,404 @@ class TestBacktestAnalytics:
         assert os.path.exists(result['csv_path'])
 
 
+class TestPortfolioBacktest:
+    """Test multi-symbol portfolio mode"""
+
+    def create_symbol_data(self, seed, periods=600, freq='15min', start='2024-01-01', price=100.0):
+        rng = np.random.default_rng(seed)
+        dates = pd.date_range(start=start, periods=periods, freq=freq)
+        prices = price * np.exp(np.cumsum(rng.normal(0, 0.002, periods)))
+        return pd.DataFrame({
+            'open': prices,
+            'high': prices * 1.002,
+            'low': prices * 0.998,
+            'close': prices,
+            'volume': 1000.0
+        }, index=dates)
+
+    def every_n_bars_strategy(self, n):
+        calls = []
+
+        def strategy(data):
+            calls.append(1)
+            if len(calls) % n:
+                return {'direction': 'HOLD'}
+            price = data['close'].iloc[-1]
+            return {
+                'direction': 'BUY',
+                'entry_price': price,
+                'stop_loss': price * 0.95,
+                'take_profit_1': price * 1.01,
+                'take_profit_2': price * 1.02
+            }
+        return strategy
+
+    def test_merge_bar_streams_orders_by_timestamp(self):
+        a = pd.DatetimeIndex(['2024-01-01 00:00', '2024-01-01 02:00'])
+        b = pd.DatetimeIndex(['2024-01-01 00:00', '2024-01-01 01:00', '2024-01-01 03:00'])
+
+        merged = list(merge_bar_streams({'A': a, 'B': b}))
+
+        assert [(s, i) for _, s, i in merged] == [('A', 0), ('B', 0), ('B', 1), ('A', 1), ('B', 2)]
+        timestamps = [t for t, _, _ in merged]
+        assert timestamps == sorted(timestamps)
+
+    def test_trades_are_tagged_per_symbol(self):
+        engine = BacktestEngine(initial_capital=10000, max_concurrent_trades=3, random_seed=1)
+        data = {
+            'BTC': self.create_symbol_data(1, price=40000.0),
+            'GOLD': self.create_symbol_data(2, freq='1h', price=2000.0),
+            'EURUSD': self.create_symbol_data(3, periods=300, price=1.1)
+        }
+
+        engine.run_portfolio_backtest(data, self.every_n_bars_strategy(25), verbose=False, lookback=50)
+
+        symbols = {t.symbol for t in engine.trades}
+        assert symbols == {'BTC', 'GOLD', 'EURUSD'}
+        assert not engine.open_trades
+        assert all(t.status == 'CLOSED' for t in engine.trades)
+
+        # One equity point per distinct timestamp
+        distinct = len(data['BTC'].index.union(data['GOLD'].index).union(data['EURUSD'].index))
+        assert len(engine.get_equity_curve_df()) == distinct
+
+    def test_shared_concurrency_limit(self):
+        """The concurrent trade cap applies across symbols, not per symbol"""
+        engine = BacktestEngine(initial_capital=100000, max_concurrent_trades=1, random_seed=1)
+        data = {'A': self.create_symbol_data(4), 'B': self.create_symbol_data(5)}
+        max_open = []
+
+        strategy = self.every_n_bars_strategy(10)
+
+        def tracking(d):
+            max_open.append(len(engine.open_trades))
+            return strategy(d)
+
+        engine.run_portfolio_backtest(data, {'A': tracking, 'B': tracking}, verbose=False)
+
+        assert engine.trades
+        assert max(max_open) <= 1
+
+    def test_shared_margin(self):
+        """Positions stop opening once the shared margin pool is used up"""
+        engine = BacktestEngine(initial_capital=1000, risk_per_trade=0.05, max_concurrent_trades=10,
+                                max_positions_per_symbol=5, margin_requirement=0.5, random_seed=1)
+        data = {s: self.create_symbol_data(i, periods=100) for i, s in enumerate(['A', 'B', 'C'])}
+
+        def always_buy(d):
+            price = d['close'].iloc[-1]
+            return {'direction': 'BUY', 'entry_price': price, 'stop_loss': price * 0.5,
+                    'take_profit_1': price * 10, 'take_profit_2': price * 20}
+
+        engine.run_portfolio_backtest(data, always_buy, verbose=False)
+
+        # Each trade posts ~50 of margin against ~1000 of cash
+        assert 10 <= len(engine.trades) <= 25
+        assert max(e['reserved_margin'] for e in engine.equity_curve) * 0.5 <= 1000
+
+    @pytest.mark.parametrize('margin_requirement', [None, 0.5])
+    def test_margin_is_released_exactly(self, margin_requirement):
+        """Open notional stays within capital and nothing stays reserved once every trade closes"""
+        engine = BacktestEngine(initial_capital=1000, risk_per_trade=0.05, max_concurrent_trades=3,
+                                max_positions_per_symbol=3, margin_requirement=margin_requirement,
+                                random_seed=1)
+        data = {s: self.create_symbol_data(i, periods=200) for i, s in enumerate(['A', 'B', 'C'])}
+        open_notional = []
+
+        def buy(d):
+            open_notional.append((sum(t.entry_price * t.remaining_size for t in engine.open_trades),
+                                  engine.cash))
+            price = d['close'].iloc[-1]
+            return {'direction': 'BUY', 'entry_price': price, 'stop_loss': price * 0.9,
+                    'take_profit_1': price * 1.003, 'take_profit_2': price * 1.006}
+
+        engine.run_portfolio_backtest(data, buy, verbose=False)
+
+        assert len(engine.trades) > 10 and any(t.tp1_hit for t in engine.trades)
+        assert not engine.open_trades and engine.reserved_margin == 0
+        assert all(t.margin_reserved == 0 for t in engine.trades)
+        share = 1.0 if margin_requirement is None else margin_requirement
+        assert all(notional * share <= cash + 1e-6 for notional, cash in open_notional)
+
+    def test_missing_strategy(self):
+        engine = BacktestEngine()
+        with pytest.raises(ValueError):
+            engine.run_portfolio_backtest({'A': self.create_symbol_data(1)}, {'B': lambda d: None},
+                                          verbose=False)
+
+
+class TestVectorizedBacktest:
+    """Test the whole-history (vectorized) strategy protocol"""
+
+    create_sample_data = TestBacktestEngine.create_sample_data
+    simple_strategy = TestBacktestEngine.simple_strategy
+
+    def vectorized_sma_strategy(self, data):
+        """simple_strategy computed over the whole history at once"""
+        close = data['close']
+        fast = close.rolling(5).mean()
+        slow = close.rolling(20).mean()
+        cross_up = (fast > slow) & (fast.shift(1) <= slow.shift(1))
+        cross_down = (fast < slow) & (fast.shift(1) >= slow.shift(1))
+
+        direction = np.where(cross_up, 1.0, np.where(cross_down, -1.0, np.nan))
+        return pd.DataFrame({
+            'direction': direction,
+            'entry_price': close,
+            'stop_loss': np.where(direction > 0, close * 0.98, close * 1.02),
+            'take_profit_1': np.where(direction > 0, close * 1.02, close * 0.98),
+            'take_profit_2': np.where(direction > 0, close * 1.04, close * 0.96)
+        }, index=data.index)
+
+    def test_matches_per_bar_engine(self):
+        """Same signals give the same trades as run_backtest's performance mode"""
+        data = self.create_sample_data(days=5)
+
+        per_bar = BacktestEngine(initial_capital=1000, random_seed=42)
+        per_bar.run_backtest(data, self.simple_strategy, verbose=False, performance_mode=True)
+
+        vectorized = BacktestEngine(initial_capital=1000, random_seed=42)
+        vectorized.run_vectorized_backtest(data, self.vectorized_sma_strategy, verbose=False, symbol='TEST')
+
+        expected = per_bar.get_trades_df()
+        actual = vectorized.get_trades_df()
+        assert len(expected) > 0
+        assert list(actual['entry_time']) == list(expected['entry_time'])
+        assert list(actual['exit_reason']) == list(expected['exit_reason'])
+        np.testing.assert_allclose(actual['pnl'], expected['pnl'])
+        assert vectorized.capital == pytest.approx(per_bar.capital)
+
+        # Skipped bars are forward-filled: one equity row per bar
+        expected_curve = per_bar.get_equity_curve_df()
+        actual_curve = vectorized.get_equity_curve_df()
+        assert len(actual_curve) == len(data)
+        np.testing.assert_allclose(actual_curve['equity'], expected_curve['equity'])
+
+    def test_string_directions_and_missing_targets(self):
+        data = self.create_sample_data(days=2)
+        n = len(data)
+        direction = np.array([None] * n, dtype=object)
+        direction[50] = 'BUY'
+        signals = {
+            'direction': direction,
+            'entry_price': data['close'].values,
+            'stop_loss': data['close'].values * 0.9
+        }
+
+        engine = BacktestEngine(initial_capital=1000)
+        engine.run_vectorized_backtest(data, lambda d: signals, verbose=False)
+
+        assert len(engine.trades) == 1
+        trade = engine.trades[0]
+        assert trade.entry_time == data.index[50]
+        # Default targets, as with dict signals missing take-profits
+        assert trade.take_profit_1 == pytest.approx(data['close'].iloc[50] * 1.01)
+
+    def test_misaligned_output_rejected(self):
+        data = self.create_sample_data(days=1)
+        engine = BacktestEngine()
+        with pytest.raises(ValueError):
+            engine.run_vectorized_backtest(
+                data, lambda d: {'direction': [1], 'entry_price': [1.0], 'stop_loss': [0.9]}, verbose=False
+            )
+
+
+class TestStreamingMetrics:
+    """Test the single-pass metrics accumulator against the frame-based analytics"""
+
+    create_sample_data = TestBacktestEngine.create_sample_data
+    simple_strategy = TestBacktestEngine.simple_strategy
+    vectorized_sma_strategy = TestVectorizedBacktest.vectorized_sma_strategy
+
+    def assert_matches_frames(self, engine):
+        trades_df = engine.get_trades_df()
+        equity_df = engine.get_equity_curve_df()
+        start_date, end_date = equity_df.index[0], equity_df.index[-1]
+
+        expected = BacktestAnalytics(trades_df, equity_df, engine.initial_capital,
+                                     start_date, end_date).calculate_all_metrics()
+        actual = BacktestAnalytics.from_engine(engine).calculate_all_metrics()
+
+        assert expected['total_trades'] > 0
+        assert set(actual) == set(expected)
+        for key, value in expected.items():
+            if isinstance(value, dict):
+                assert actual[key].keys() == value.keys(), key
+                for reason, item in value.items():
+                    assert actual[key][reason] == pytest.approx(item), key
+            else:
+                assert actual[key] == pytest.approx(value, rel=1e-9, abs=1e-12), key
+
+    def test_per_bar_run_matches_analytics(self):
+        data = self.create_sample_data(days=5)
+        engine = BacktestEngine(initial_capital=1000, random_seed=42)
+        engine.run_backtest(data, self.simple_strategy, verbose=False, performance_mode=True)
+
+        self.assert_matches_frames(engine)
+
+    def test_vectorized_run_streams_skipped_bars(self):
+        """Bars the vectorized loop jumps over count as flat equity, like the filled curve"""
+        data = self.create_sample_data(days=5)
+        engine = BacktestEngine(initial_capital=1000, random_seed=42)
+        engine.run_vectorized_backtest(data, self.vectorized_sma_strategy, verbose=False, symbol='TEST')
+
+        assert engine.metrics.bars == len(data)
+        self.assert_matches_frames(engine)
+
+    def test_without_equity_curve(self):
+        """Metrics are identical when the per-bar curve is not kept"""
+        data = self.create_sample_data(days=5)
+        full = BacktestEngine(initial_capital=1000, random_seed=42)
+        full.run_vectorized_backtest(data, self.vectorized_sma_strategy, verbose=False)
+        lean = BacktestEngine(initial_capital=1000, random_seed=42, keep_equity_curve=False)
+        lean.run_vectorized_backtest(data, self.vectorized_sma_strategy, verbose=False)
+
+        assert lean.equity_curve == []
+        assert lean.metrics.get_metrics() == full.metrics.get_metrics()
+
+    def test_mid_run_snapshot(self):
+        """Metrics can be read at any point while the run is in progress"""
+        data = self.create_sample_data(days=3)
+        engine = BacktestEngine(initial_capital=1000, random_seed=42)
+        snapshots = []
+
+        def strategy(history):
+            snapshots.append(engine.metrics.get_metrics())
+            return self.simple_strategy(history)
+
+        engine.run_backtest(data, strategy, verbose=False, performance_mode=True)
+
+        traded = [m['total_trades'] for m in snapshots]
+        assert traded == sorted(traded)
+        assert 0 < traded[-1] <= len(engine.trades)
+        assert engine.metrics.get_metrics()['total_trades'] == len(engine.trades)
+
+    def test_streaks_and_median(self):
+        metrics = StreamingMetrics(1000)
+        for pnl, hours in [(5, 1), (3, 4), (-2, 2), (0, 8), (-1, 3), (4, 5)]:
+            trade = Trade(entry_time=datetime(2024, 1, 1), entry_price=100, direction='BUY', lot_size=1,
+                          stop_loss=90, take_profit_1=110, take_profit_2=120)
+            trade.pnl = pnl
+            trade.duration_hours = hours
+            trade.exit_reason = 'TP2' if pnl > 0 else 'SL'
+            metrics.record_trade(trade)
+
+        assert metrics.max_win_streak == 2
+        assert metrics.max_loss_streak == 3      # Break-even trades extend a losing streak
+        assert metrics.loss_count == 2
+        assert metrics.median_duration_hours == 3.5
+
+    def test_drawdown_duration_and_hold(self):
+        metrics = StreamingMetrics(100)
+        times = pd.date_range('2024-01-01', periods=7, freq='1D')
+        for t, equity in zip(times[:3], [100, 110, 99]):
+            metrics.update_equity(t, equity)
+        metrics.hold_equity(times[3], times[5], 3)      # Still under water for three more bars
+        metrics.update_equity(times[6], 120)
+
+        assert metrics.bars == 7
+        assert metrics.max_drawdown_bars == 4
+        assert metrics.max_drawdown_pct == pytest.approx(-10.0)
+        assert metrics.drawdown_bars == 0
+        assert metrics.returns.count == 6
+
+
+class TestIntrabarExitResolution:
+    """Test sub-bar resolution of bars that touch both stop and target"""
+
+    def open_buy(self, engine, when):
+        return engine.open_trade({
+            'direction': 'BUY', 'entry_price': 100.0, 'stop_loss': 98.0,
+            'take_profit_1': 102.0, 'take_profit_2': 110.0, 'symbol': 'BTC'
+        }, when)
+
+    def minute_path(self, start, prices):
+        index = pd.date_range(start, periods=len(prices), freq='1min')
+        prices = np.asarray(prices, dtype=float)
+        return pd.DataFrame({'high': prices, 'low': prices, 'close': prices}, index=index)
+
+    def test_target_first_path(self, tmp_path):
+        """A 1h bar spanning stop and target takes TP1 first, then the rest of the path hits breakeven"""
+        bar_time = pd.Timestamp('2024-01-01 01:00')
+        path = [100.0] * 10 + [102.5] * 10 + [97.0] * 40   # Up to TP1, then down through the stop
+        store = IntrabarStore.from_dataframe(self.minute_path(bar_time, path), str(tmp_path / 'btc'))
+
+        engine = BacktestEngine(initial_capital=10000, slippage=0, bid_ask_spread=0)
+        engine.set_intrabar_store(store, symbol='BTC', bar_duration='1h')
+        trade = self.open_buy(engine, pd.Timestamp('2024-01-01 00:00'))
+
+        engine.check_exits({'high': 102.5, 'low': 97.0, 'close': 97.5}, bar_time)
+
+        assert trade.tp1_hit
+        assert trade.stop_loss == trade.entry_price   # Moved to breakeven
+        # The minutes then fall to 97, through the breakeven stop
+        assert (trade.status, trade.exit_reason, trade.exit_price) == ('CLOSED', 'SL', 100.0)
+        assert trade.pnl == pytest.approx(trade.lot_size * 0.5 * 2.0 - trade.total_fees)
+        assert engine.intrabar_stats == {'ambiguous_bars': 1, 'resolved': 1, 'target_first': 1, 'unresolved': 0}
+        assert not engine.open_trades and engine.reserved_margin == 0
+
+    def test_target_first_path_reaches_tp2(self, tmp_path):
+        bar_time = pd.Timestamp('2024-01-01 01:00')
+        path = [99.0] * 5 + [102.5] * 10 + [110.5] * 5 + [97.0] * 40
+        store = IntrabarStore.from_dataframe(self.minute_path(bar_time, path), str(tmp_path / 'btc'))
+
+        engine = BacktestEngine(initial_capital=10000, slippage=0, bid_ask_spread=0)
+        engine.set_intrabar_store(store, symbol='BTC', bar_duration='1h')
+        trade = self.open_buy(engine, pd.Timestamp('2024-01-01 00:00'))
+
+        engine.check_exits({'high': 110.5, 'low': 97.0, 'close': 97.5}, bar_time)
+
+        assert (trade.exit_reason, trade.exit_price) == ('TP2', 110.0)
+
+    def test_stop_first_path(self, tmp_path):
+        bar_time = pd.Timestamp('2024-01-01 01:00')
+        path = [97.0] * 10 + [102.5] * 50
+        store = IntrabarStore.from_dataframe(self.minute_path(bar_time, path), str(tmp_path / 'btc'))
+
+        engine = BacktestEngine(initial_capital=10000, slippage=0, bid_ask_spread=0)
+        engine.set_intrabar_store(store, bar_duration='1h')    # Default store for every symbol
+        trade = self.open_buy(engine, pd.Timestamp('2024-01-01 00:00'))
+
+        engine.check_exits({'high': 102.5, 'low': 97.0, 'close': 102.0}, bar_time)
+
+        assert trade.exit_reason == 'SL'
+        assert engine.intrabar_stats['target_first'] == 0
+
+    def test_uncovered_bar_falls_back_to_stop_first(self, tmp_path):
+        store = IntrabarStore.from_dataframe(self.minute_path('2023-06-01', [100.0] * 5), str(tmp_path / 'btc'))
+
+        engine = BacktestEngine(initial_capital=10000)
+        engine.set_intrabar_store(store, bar_duration='1h')
+        trade = self.open_buy(engine, pd.Timestamp('2024-01-01 00:00'))
+
+        engine.check_exits({'high': 102.5, 'low': 97.0, 'close': 100.0}, pd.Timestamp('2024-01-01 01:00'))
+
+        assert trade.exit_reason == 'SL'
+        assert engine.intrabar_stats['unresolved'] == 1
+
+    def test_uncovered_bar_follows_execution_priority(self, tmp_path):
+        store = IntrabarStore.from_dataframe(self.minute_path('2023-06-01', [100.0] * 5), str(tmp_path / 'btc'))
+
+        engine = BacktestEngine(initial_capital=10000, execution_priority=ExecutionPriority.TAKE_PROFIT_FIRST)
+        engine.set_intrabar_store(store, bar_duration='1h')
+        trade = self.open_buy(engine, pd.Timestamp('2024-01-01 00:00'))
+
+        engine.check_exits({'high': 102.5, 'low': 97.0, 'close': 100.0}, pd.Timestamp('2024-01-01 01:00'))
+
+        assert trade.tp1_hit and trade.status == 'OPEN'
+        assert engine.intrabar_stats['unresolved'] == 1
+
+    def test_unambiguous_bars_skip_the_store(self, tmp_path):
+        store = IntrabarStore.from_dataframe(self.minute_path('2024-01-01', [100.0] * 5), str(tmp_path / 'btc'))
+
+        engine = BacktestEngine(initial_capital=10000)
+        engine.set_intrabar_store(store, bar_duration='1h')
+        self.open_buy(engine, pd.Timestamp('2024-01-01 00:00'))
+
+        engine.check_exits({'high': 101.0, 'low': 99.0, 'close': 100.0}, pd.Timestamp('2024-01-01 01:00'))
+
+        assert engine.intrabar_stats['ambiguous_bars'] == 0
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,88 @@
+"""
+Tests for vectorized Monte Carlo trade resampling
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_monte_carlo import TradeMonteCarlo, trade_returns, run_monte_carlo
+
+
+def make_trades(pnls, price=100.0, lot_size=1.0):
+    times = pd.date_range('2024-01-01', periods=len(pnls), freq='1h')
+    return pd.DataFrame({
+        'entry_time': times,
+        'exit_time': times + pd.Timedelta(minutes=30),
+        'entry_price': price,
+        'lot_size': lot_size,
+        'pnl': pnls
+    })
+
+
+class TestTradeReturns:
+    def test_returns_compound_to_final_equity(self):
+        trades = make_trades([100.0, -50.0, 25.0])
+        inputs = trade_returns(trades, 1000)
+
+        assert np.prod(1 + inputs['returns']) * 1000 == pytest.approx(1075.0)
+        assert inputs['notional_fraction'][0] == pytest.approx(0.1)
+
+    def test_ordered_by_exit_time(self):
+        trades = make_trades([10.0, 20.0])
+        trades.loc[0, 'exit_time'] = trades['exit_time'].iloc[1] + pd.Timedelta(hours=1)
+        returns = trade_returns(trades, 100)['returns']
+
+        assert returns[0] == pytest.approx(0.2)
+        assert returns[1] == pytest.approx(10 / 120)
+
+
+class TestTradeMonteCarlo:
+    def test_permutation_preserves_final_equity(self):
+        """Reordering trades changes the path, not where it ends"""
+        trades = make_trades([50.0, -80.0, 120.0, -30.0, 10.0])
+        result = TradeMonteCarlo(n_simulations=500, method='permutation', random_seed=3).run(trades, 1000)
+
+        np.testing.assert_allclose(result.final_equity, 1070.0)
+        assert result.max_drawdown_pct.min() < result.max_drawdown_pct.max()
+        assert (result.max_drawdown_pct <= 0).all()
+
+    def test_drawdown_matches_explicit_path(self):
+        trades = make_trades([-100.0, -100.0, 400.0])
+        result = TradeMonteCarlo(n_simulations=1, method='permutation', random_seed=0).run(trades, 1000)
+
+        assert result.original['max_drawdown_pct'] == pytest.approx(-20.0)
+        assert result.original['final_equity'] == pytest.approx(1200.0)
+
+    def test_chunked_run(self):
+        trades = make_trades(list(np.random.default_rng(1).normal(5, 40, 60)))
+        whole = TradeMonteCarlo(n_simulations=300, random_seed=9).run(trades, 1000)
+        chunked = TradeMonteCarlo(n_simulations=300, random_seed=9, max_chunk_elements=600).run(trades, 1000)
+
+        # Same draws in a different number of calls: distributions agree closely
+        assert chunked.final_equity.shape == whole.final_equity.shape
+        assert np.median(chunked.final_equity) == pytest.approx(np.median(whole.final_equity), rel=0.05)
+
+    def test_shocks_hurt(self):
+        trades = make_trades([20.0] * 50)
+        base = TradeMonteCarlo(n_simulations=200, random_seed=1).run(trades, 1000)
+        shocked = TradeMonteCarlo(n_simulations=200, random_seed=1, skip_probability=0.2,
+                                  slippage_shock=0.01).run(trades, 1000)
+
+        assert shocked.final_equity.mean() < base.final_equity.mean()
+
+    def test_risk_of_ruin(self):
+        trades = make_trades([-300.0, -300.0, 50.0, 50.0])
+        summary = run_monte_carlo(trades, 1000, n_simulations=1000, ruin_threshold_pct=40, random_seed=2)
+
+        assert 0 < summary['risk_of_ruin'] < 1
+        assert summary['final_equity']['p5'] <= summary['final_equity']['p95']
+
+    def test_no_trades(self):
+        result = TradeMonteCarlo(n_simulations=10).run(pd.DataFrame(), 1000)
+        assert (result.final_equity == 1000).all()
+        assert result.risk_of_ruin == 0
+
+    def test_invalid_method(self):
+        with pytest.raises(ValueError):
+            TradeMonteCarlo(method='jackknife')
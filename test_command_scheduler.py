@@ -0,0 +1,193 @@
+"""
+Tests for the tier-aware command scheduler and the priority LoadBalancer
+"""
+
+import asyncio
+import threading
+import time
+
+from command_scheduler import CommandScheduler, LaneConfig, SchedulerBusy
+
+LANES = {
+    'vip': LaneConfig(weight=4, max_concurrency=4, max_queue=100, max_wait=1000),
+    'premium': LaneConfig(weight=2, max_concurrency=4, max_queue=100, max_wait=1000),
+    'free': LaneConfig(weight=1, max_concurrency=4, max_queue=100, max_wait=1000),
+}
+
+
+def scheduler_for(tiers, **kwargs):
+    kwargs.setdefault('lanes', LANES)
+    return CommandScheduler(lane_resolver=tiers.get, **kwargs)
+
+
+class TestScheduling:
+    def test_weighted_fair_order(self):
+        tiers = {1: 'vip', 2: 'premium', 3: 'free'}
+        scheduler = scheduler_for(tiers, max_workers=1)
+        order = []
+
+        async def job(tier):
+            order.append(tier)
+            await asyncio.sleep(0)
+
+        async def main():
+            blocker = asyncio.create_task(scheduler.run(3, asyncio.sleep, 0.05))
+            await asyncio.sleep(0)
+            jobs = [scheduler.run(user_id, job, tiers[user_id]) for user_id in (3, 2, 1) for _ in range(14)]
+            await asyncio.gather(blocker, *jobs)
+
+        asyncio.run(main())
+        # 4:2:1 over the first 15 slots, the blocker having taken one of free's
+        first = order[:14]
+        assert (first.count('vip'), first.count('premium'), first.count('free')) == (9, 4, 1)
+        assert len(order) == 42
+
+    def test_lane_concurrency_cap(self):
+        lanes = dict(LANES, free=LaneConfig(weight=1, max_concurrency=1, max_queue=100, max_wait=1000))
+        tiers = {1: 'free', 2: 'vip'}
+        scheduler = scheduler_for(tiers, lanes=lanes, max_workers=4)
+        running = {'free': 0, 'vip': 0}
+        peaks = {'free': 0, 'vip': 0}
+        lock = threading.Lock()
+
+        def work(tier):
+            with lock:
+                running[tier] += 1
+                peaks[tier] = max(peaks[tier], running[tier])
+            time.sleep(0.05)
+            with lock:
+                running[tier] -= 1
+
+        async def main():
+            await asyncio.gather(*(scheduler.run(user_id, work, tiers[user_id]) for user_id in (1, 2) for _ in range(4)))
+
+        asyncio.run(main())
+        assert peaks == {'free': 1, 'vip': 3}
+        scheduler.shutdown()
+
+    def test_blocking_work_leaves_event_loop_free(self):
+        scheduler = CommandScheduler(max_workers=2)
+        ticks = []
+
+        async def ticker():
+            for _ in range(10):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        async def main():
+            await asyncio.gather(scheduler.run(1, time.sleep, 0.2), ticker())
+
+        asyncio.run(main())
+        assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.1
+        scheduler.shutdown()
+
+    def test_cancelled_waiter_does_not_leak_slot(self):
+        scheduler = scheduler_for({1: 'free'}, max_workers=1)
+
+        async def main():
+            first = asyncio.create_task(scheduler.run(1, asyncio.sleep, 0.05))
+            second = asyncio.create_task(scheduler.run(1, asyncio.sleep, 0))
+            await asyncio.sleep(0.01)
+            second.cancel()
+            await first
+            assert await scheduler.run(1, lambda: 'ok') == 'ok'
+
+        asyncio.run(main())
+        assert scheduler.get_stats()['running'] == 0
+
+
+class TestShedding:
+    def test_queue_depth(self):
+        lanes = dict(LANES, free=LaneConfig(weight=1, max_concurrency=1, max_queue=2, max_wait=1000))
+        scheduler = scheduler_for({1: 'free'}, lanes=lanes, max_workers=1, default_service_time=3.0)
+
+        async def main():
+            return await asyncio.gather(*(scheduler.run(1, asyncio.sleep, 0.01) for _ in range(5)),
+                                        return_exceptions=True)
+
+        results = asyncio.run(main())
+        busy = [result for result in results if isinstance(result, SchedulerBusy)]
+        assert len(busy) == 2
+        assert busy[0].retry_after == 9 and 'retry in 9s' in busy[0].message
+        stats = scheduler.get_stats()['lanes']['free']
+        assert (stats['admitted'], stats['shed'], stats['completed']) == (3, 2, 3)
+
+    def test_latency_budget_protects_paid_lanes(self):
+        tiers = {user_id: 'free' for user_id in range(30)}
+        tiers.update({100: 'vip', 101: 'premium'})
+        lanes = {
+            'vip': LaneConfig(weight=4, max_concurrency=2, max_queue=20, max_wait=1.0),
+            'premium': LaneConfig(weight=2, max_concurrency=2, max_queue=20, max_wait=1.0),
+            'free': LaneConfig(weight=1, max_concurrency=1, max_queue=20, max_wait=0.5),
+        }
+        scheduler = scheduler_for(tiers, lanes=lanes, max_workers=2, default_service_time=0.05)
+
+        async def request(user_id):
+            start = time.monotonic()
+            try:
+                await scheduler.run(user_id, time.sleep, 0.05)
+            except SchedulerBusy:
+                return tiers[user_id], None
+            return tiers[user_id], time.monotonic() - start
+
+        async def main():
+            free = [asyncio.create_task(request(user_id)) for user_id in range(30)]
+            await asyncio.sleep(0.02)
+            return await asyncio.gather(*free, request(100), request(101))
+
+        results = asyncio.run(main())
+        paid = [latency for tier, latency in results if tier != 'free']
+        assert all(latency is not None and latency < 0.3 for latency in paid)
+        assert any(latency is None for tier, latency in results if tier == 'free')
+        scheduler.shutdown()
+
+
+def test_lane_resolution():
+    def resolver(user_id):
+        if user_id == 3:
+            raise KeyError(user_id)
+        return {1: 'VIP', 2: 'gold-member'}[user_id]
+
+    scheduler = CommandScheduler(lane_resolver=resolver)
+    assert [scheduler.lane_for(user_id) for user_id in (1, 2, 3)] == ['vip', 'free', 'free']
+    assert CommandScheduler().lane_for(1) == 'free'
+
+
+def test_load_balancer_honours_priority():
+    from performance_optimizer import LoadBalancer
+
+    balancer = LoadBalancer(max_workers=1)
+    gate = threading.Event()
+    order = []
+
+    async def main():
+        blocker = balancer.submit_operation(gate.wait, 'normal', 5)
+        futures = [balancer.submit_operation(order.append, priority, priority)
+                   for priority in ('low', 'normal', 'high_priority', 'urgent')]
+        assert balancer.get_queue_depths() == {'high': 1, 'normal': 2, 'low': 1}
+        gate.set()
+        await asyncio.gather(blocker, *futures)
+
+    asyncio.run(main())
+    assert order == ['high_priority', 'normal', 'urgent', 'low']
+
+
+def test_allsignals_runs_off_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import telegram_bot
+    from offline_load_test import FIRST_USER_ID, LoadProfile, OfflineLoadTester
+
+    scanned = []
+
+    def slow_scan(user_id):
+        scanned.append(user_id)
+        time.sleep(0.2)
+        return [], ['🪙 BTC']
+
+    monkeypatch.setattr(telegram_bot, '_scan_all_assets', slow_scan)
+    profile = LoadProfile(mix={'/allsignals': 1}, rate=10.0, duration=0.5, users=3, seed=1)
+    report = asyncio.run(OfflineLoadTester(profile).run())
+
+    assert report['handlers']['/allsignals']['errors'] == 0
+    assert scanned and all(FIRST_USER_ID <= user_id < FIRST_USER_ID + profile.users for user_id in scanned)
+    assert report['event_loop_lag']['max_ms'] < 150
@@ -0,0 +1,192 @@
+"""
+Tests for the priority-scheduled thread/process pool processor
+"""
+
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import concurrent_processor
+from concurrent_processor import (AdmissionRejected, ConcurrentProcessor, ExecutorBackend, TaskPriority,
+                                  TaskStatus, attach_dataframe, share_dataframe, submit_backtest_batch)
+
+
+def worker_pid():
+    return os.getpid()
+
+
+def close_sum(df):
+    return float(df['close'].sum()), df.index[-1]
+
+
+def sma_strategy(data):
+    if len(data) < 20:
+        return {'direction': 'HOLD'}
+    fast = data['close'].iloc[-5:].mean()
+    slow = data['close'].iloc[-20:].mean()
+    price = data['close'].iloc[-1]
+    if fast > slow:
+        return {'direction': 'BUY', 'entry_price': price, 'stop_loss': price * 0.98,
+                'take_profit_1': price * 1.02, 'take_profit_2': price * 1.04}
+    return {'direction': 'HOLD'}
+
+
+def ohlcv(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    index = pd.date_range('2025-01-01', periods=n, freq='h', tz='UTC')
+    return pd.DataFrame({'open': close, 'high': close * 1.005, 'low': close * 0.995,
+                         'close': close, 'volume': rng.integers(1, 1000, n)}, index=index)
+
+
+@pytest.fixture
+def processor():
+    processor = ConcurrentProcessor(max_workers=1, max_process_workers=2, sample_interval=0.05,
+                                    max_memory_percent=100.0, max_cpu_percent=100.0)
+    yield processor
+    processor.shutdown()
+
+
+class TestScheduling:
+    def test_priority_then_fifo_order(self, processor):
+        order = []
+        priorities = [TaskPriority.LOW, TaskPriority.NORMAL, TaskPriority.HIGH, TaskPriority.NORMAL,
+                      TaskPriority.HIGH]
+        for i, priority in enumerate(priorities):
+            processor.submit_task(f"t{i}", order.append, i, priority=priority)
+
+        processor.start_processing(enable_monitoring=False)
+        assert processor.wait_for_completion(timeout=5)
+        assert order == [2, 4, 1, 3, 0]
+
+    def test_full_queue_sheds_lower_priority_work(self, processor):
+        processor.max_queue_size = 2
+        processor.submit_task('a', time.sleep, 0, priority=TaskPriority.NORMAL)
+        processor.submit_task('b', time.sleep, 0, priority=TaskPriority.NORMAL)
+
+        with pytest.raises(AdmissionRejected):
+            processor.submit_task('c', time.sleep, 0, priority=TaskPriority.NORMAL)
+        processor.submit_task('d', time.sleep, 0, priority=TaskPriority.HIGH)
+
+        shed = processor.get_task_result('b')
+        assert shed.status == TaskStatus.CANCELLED and isinstance(shed.error, AdmissionRejected)
+        assert processor.get_stats()['tasks_rejected'] == 2
+        assert processor.get_stats()['queued']['thread'] == 2
+
+    def test_retries_then_failure(self, processor):
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ValueError('feed down')
+            return 'ok'
+
+        processor.submit_task('flaky', flaky, max_retries=3)
+        processor.submit_task('broken', lambda: 1 / 0, max_retries=1)
+        processor.start_processing(enable_monitoring=False)
+        assert processor.wait_for_completion(timeout=5)
+
+        flaky_task, broken_task = processor.get_task_result('flaky'), processor.get_task_result('broken')
+        assert flaky_task.status == TaskStatus.COMPLETED and flaky_task.result == 'ok'
+        assert flaky_task.retry_count == 2
+        assert broken_task.status == TaskStatus.FAILED and isinstance(broken_task.error, ZeroDivisionError)
+        stats = processor.get_stats()
+        assert (stats['tasks_completed'], stats['tasks_failed'], stats['tasks_retried']) == (1, 1, 3)
+
+    def test_cancel_pending_task(self, processor):
+        processor.submit_task('keep', time.sleep, 0)
+        processor.submit_task('drop', time.sleep, 0)
+        assert processor.cancel_task('drop') and not processor.cancel_task('missing')
+        processor.start_processing(enable_monitoring=False)
+        assert processor.wait_for_completion(timeout=5)
+        assert processor.get_task_result('drop').status == TaskStatus.CANCELLED
+        assert processor.get_task_result('keep').status == TaskStatus.COMPLETED
+
+
+class TestResourceLimits:
+    def test_check_reads_cached_snapshot(self, processor):
+        processor.start_processing()
+        start = time.perf_counter()
+        for _ in range(100):
+            processor._check_resource_limits()
+        assert time.perf_counter() - start < 0.05
+        assert processor.get_resource_snapshot().sampled_at > 0
+
+    def test_memory_pressure_holds_back_all_but_high(self, processor):
+        processor.max_memory_percent = 0.0
+        ran = []
+        processor.submit_task('normal', ran.append, 'normal')
+        processor.submit_task('high', ran.append, 'high', priority=TaskPriority.HIGH)
+        processor.start_processing()
+
+        assert not processor.wait_for_completion(timeout=0.3)
+        assert ran == ['high']
+
+        processor.max_memory_percent = 100.0
+        assert processor.wait_for_completion(timeout=5)
+        assert ran == ['high', 'normal']
+
+
+class TestProcessBackend:
+    def test_runs_in_worker_processes(self, processor):
+        processor.start_processing(enable_monitoring=False)
+        processor.submit_task('pid', worker_pid, backend=ExecutorBackend.PROCESS)
+        processor.submit_task('local', lambda: os.getpid(), backend=ExecutorBackend.PROCESS)
+        assert processor.wait_for_completion(timeout=30)
+
+        assert processor.get_task_result('pid').result != os.getpid()
+        fallback = processor.get_task_result('local')
+        assert fallback.backend == ExecutorBackend.THREAD and fallback.result == os.getpid()
+
+    def test_dataframes_are_shared_once_and_released(self, processor):
+        df = ohlcv()
+        processor.submit_task('a', close_sum, df, backend=ExecutorBackend.PROCESS)
+        processor.submit_task('b', close_sum, df, backend=ExecutorBackend.PROCESS)
+        assert processor.get_stats()['shared_frames'] == 1
+        name = processor._shared_frames[id(df)][1].shm_name
+
+        processor.start_processing(enable_monitoring=False)
+        assert processor.wait_for_completion(timeout=30)
+        assert processor.get_task_result('a').result == (pytest.approx(df['close'].sum()), df.index[-1])
+        assert processor.get_stats()['shared_frames'] == 0
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+    def test_backtest_batch(self, processor, monkeypatch, tmp_path):
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(concurrent_processor, '_processor_instance', processor)
+        task_ids = submit_backtest_batch(ohlcv(), sma_strategy, [{'slippage': 0.0005}, {'slippage': 0.002}])
+        processor.start_processing(enable_monitoring=False)
+        assert processor.wait_for_completion(timeout=120)
+
+        results = [processor.get_task_result(task_id) for task_id in task_ids]
+        assert all(task.status == TaskStatus.COMPLETED for task in results), [task.error for task in results]
+        low, high = (task.result for task in results)
+        assert low['params'] == {'slippage': 0.0005} and len(low['trades']) == len(high['trades']) > 0
+        assert low['final_capital'] > high['final_capital']
+
+
+def test_shared_frame_round_trip():
+    df = ohlcv(50)
+    df['flag'] = df['close'] > 100
+    df['symbol'] = 'BTC'
+    df['when'] = pd.Timestamp('2025-01-01') + pd.to_timedelta(np.arange(50), unit='min')
+
+    shm, handle = share_dataframe(df)
+    try:
+        frame, attached = attach_dataframe(handle)
+        pd.testing.assert_frame_equal(frame, df)
+        assert set(handle.layout) == {0, 1, 2, 3, 4, 5, 7} and set(handle.other_columns) == {6}
+        with pytest.raises(ValueError):
+            frame.iloc[0, 0] = 1.0
+        del frame
+        attached.close()
+    finally:
+        shm.close()
+        shm.unlink()
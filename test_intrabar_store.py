@@ -0,0 +1,92 @@
+"""
+Tests for the memory-mapped intrabar store and first-touch replay
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from intrabar_store import IntrabarStore, first_touch, replay_exits
+
+
+def make_minutes(periods=120, start='2024-01-01'):
+    index = pd.date_range(start, periods=periods, freq='1min')
+    price = 100 + np.arange(periods) * 0.01
+    return pd.DataFrame({'open': price, 'high': price + 0.005, 'low': price - 0.005, 'close': price}, index=index)
+
+
+class TestIntrabarStore:
+    """Test writing, memory-mapping and slicing a store"""
+
+    def test_roundtrip_is_memory_mapped(self, tmp_path):
+        store = IntrabarStore.from_dataframe(make_minutes(), str(tmp_path / 'BTC_1m'))
+
+        reopened = IntrabarStore(str(tmp_path / 'BTC_1m'))
+        assert len(reopened) == 120
+        assert isinstance(reopened.high_low, np.memmap)
+        np.testing.assert_allclose(reopened.high_low, store.high_low)
+
+    def test_window_covers_half_open_range(self, tmp_path):
+        data = make_minutes()
+        store = IntrabarStore.from_dataframe(data, str(tmp_path / 'store'))
+
+        high, low = store.window(pd.Timestamp('2024-01-01 01:00'), pd.Timestamp('2024-01-01 02:00'))
+
+        assert len(high) == 60
+        assert high[0] == pytest.approx(data['high'].iloc[60])
+        assert store.window(pd.Timestamp('2024-02-01'), pd.Timestamp('2024-02-02')) is None
+
+    def test_unsorted_input_is_sorted(self, tmp_path):
+        data = make_minutes(10).iloc[::-1]
+        store = IntrabarStore.from_dataframe(data, str(tmp_path / 'store'))
+        assert np.all(np.diff(store.timestamps) > 0)
+
+
+class TestFirstTouch:
+    """Test replaying sub-bars to find the first level hit"""
+
+    def test_buy_target_before_stop(self):
+        high = np.array([100.5, 102.5, 100.0])
+        low = np.array([99.5, 100.5, 97.0])
+        assert first_touch(high, low, 'BUY', stop_loss=98.0, target=102.0) == 'TP'
+
+    def test_sell_stop_before_target(self):
+        high = np.array([101.0, 103.0, 100.0])
+        low = np.array([100.0, 101.0, 96.0])
+        assert first_touch(high, low, 'SELL', stop_loss=102.0, target=97.0) == 'SL'
+
+    def test_unresolved(self):
+        assert first_touch(np.array([101.0]), np.array([99.0]), 'BUY', 98.0, 102.0) is None
+        assert first_touch(np.array([103.0]), np.array([97.0]), 'BUY', 98.0, 102.0) is None
+
+
+class TestReplayExits:
+    """Test walking sub-bars past the first touch"""
+
+    def test_breakeven_stop_after_tp1(self):
+        prices = np.array([100.0, 102.5, 101.0, 99.5, 111.0])
+        assert replay_exits(prices, prices, 'BUY', 100.0, 98.0, 102.0, 110.0) == [('TP1', 102.0), ('SL', 100.0)]
+
+    def test_tp1_then_tp2_in_one_bar(self):
+        high = np.array([100.5, 102.5, 111.0])
+        low = np.array([99.5, 100.5, 101.0])
+        assert replay_exits(high, low, 'BUY', 100.0, 98.0, 102.0, 110.0) == [('TP1', 102.0), ('TP2', 110.0)]
+        # One sub-bar through both targets; its low does not count against the new stop
+        assert replay_exits(np.array([111.0]), np.array([99.0]), 'BUY', 100.0, 98.0, 102.0, 110.0) == \
+            [('TP1', 102.0), ('TP2', 110.0)]
+
+    def test_sell_and_ties(self):
+        prices = np.array([100.0, 97.5, 98.0, 101.0])
+        assert replay_exits(prices, prices, 'SELL', 100.0, 102.0, 98.0, 95.0) == [('TP1', 98.0), ('SL', 100.0)]
+        assert replay_exits(np.array([103.0]), np.array([97.0]), 'SELL', 100.0, 102.0, 98.0, 95.0) is None
+        # A later tie follows the caller's priority
+        high, low = np.array([102.5, 111.0]), np.array([100.5, 99.0])
+        assert replay_exits(high, low, 'BUY', 100.0, 98.0, 102.0, 110.0)[-1] == ('SL', 100.0)
+        assert replay_exits(high, low, 'BUY', 100.0, 98.0, 102.0, 110.0, target_first_on_tie=True)[-1] == \
+            ('TP2', 110.0)
+
+    def test_after_tp1_already_hit(self):
+        prices = np.array([101.0, 99.0])
+        assert replay_exits(prices, prices, 'BUY', 100.0, 100.0, 102.0, 110.0, tp1_hit=True) == [('SL', 100.0)]
+        assert replay_exits(prices[:1], prices[:1], 'BUY', 100.0, 100.0, 102.0, 110.0, tp1_hit=True) == []
+
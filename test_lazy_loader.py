@@ -0,0 +1,130 @@
+"""
+Tests for deferred imports and the startup import profiler
+"""
+
+import os
+import sys
+import textwrap
+
+import pytest
+
+from lazy_loader import (
+    StartupProfiler, LazyProxy, lazy_attr, lazy_object, lazy_import,
+    module_available, get_boot_profile, warm_up
+)
+
+
+@pytest.fixture
+def feature_module(tmp_path, monkeypatch):
+    """A throwaway module that counts how often it is imported"""
+    (tmp_path / 'lazy_feature_mod.py').write_text(textwrap.dedent('''
+        IMPORTS = []
+        IMPORTS.append(1)
+
+        class Analyzer:
+            def __init__(self, scale=1):
+                self.scale = scale
+
+            def analyze(self, value):
+                return value * self.scale
+
+        def double(value):
+            return value * 2
+    '''))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield 'lazy_feature_mod'
+    sys.modules.pop('lazy_feature_mod', None)
+
+
+class TestLazyProxy:
+    """Test deferred resolution"""
+
+    def test_module_is_not_imported_until_used(self, feature_module):
+        double = lazy_attr(feature_module, 'double')
+        assert feature_module not in sys.modules
+        assert not double.is_loaded
+
+        assert double(21) == 42
+        assert feature_module in sys.modules
+        assert double.is_loaded
+
+    def test_lazy_object_constructs_once(self, feature_module):
+        analyzer = lazy_object(feature_module, 'Analyzer', scale=3)
+        assert analyzer.analyze(2) == 6
+        assert analyzer.analyze(3) == 9
+        assert sys.modules[feature_module].IMPORTS == [1]
+
+    def test_optional_failure_resolves_to_none(self):
+        proxy = lazy_object('module_that_does_not_exist_xyz', 'Thing')
+        assert not proxy
+        with pytest.raises(AttributeError):
+            proxy.anything
+
+    def test_required_failure_raises(self):
+        proxy = lazy_import('module_that_does_not_exist_xyz')
+        with pytest.raises(ImportError):
+            proxy.anything
+
+    def test_warm_up_resolves_all(self, feature_module):
+        proxies = [lazy_attr(feature_module, 'double'), lazy_object(feature_module, 'Analyzer')]
+        thread = warm_up(proxies, background=True)
+        thread.join(timeout=5)
+        assert all(p.is_loaded for p in proxies)
+
+
+class TestStartupProfiler:
+    """Test per-module import timing"""
+
+    def test_records_top_level_imports(self, feature_module):
+        profiler = StartupProfiler()
+        profiler.install()
+        try:
+            import lazy_feature_mod  # noqa: F401
+        finally:
+            profiler.uninstall()
+
+        record = profiler.imports[feature_module]
+        assert record.total_ms >= record.self_ms >= 0
+        assert not record.deferred
+        # The real loader is restored after timing
+        assert type(sys.modules[feature_module].__loader__).__name__ != '_TimingLoader'
+
+    def test_nested_profilers_restore_the_real_loader(self, feature_module):
+        outer, inner = StartupProfiler(), StartupProfiler()
+        outer.install()
+        inner.install()
+        try:
+            import lazy_feature_mod  # noqa: F401
+        finally:
+            inner.uninstall()
+            outer.uninstall()
+
+        assert feature_module in outer.imports and feature_module in inner.imports
+        module = sys.modules[feature_module]
+        assert type(module.__loader__).__name__ != '_TimingLoader'
+        assert type(module.__spec__.loader).__name__ != '_TimingLoader'
+
+    def test_importing_the_bot_does_not_install_the_profiler(self):
+        import telegram_bot  # noqa: F401
+        assert not any(type(finder).__name__ == '_ImportTimer' for finder in sys.meta_path)
+
+    def test_report_lists_deferred_features(self):
+        profiler = StartupProfiler()
+        profiler.finish_boot()
+        profiler.record_deferred('ai_stack', 1.5)
+
+        summary = profiler.summary()
+        assert summary['deferred_imports'][0][0] == 'ai_stack'
+        assert 'Deferred' in profiler.report()
+
+
+def test_module_available():
+    assert module_available('json')
+    assert not module_available('module_that_does_not_exist_xyz')
+
+
+def test_boot_profile_from_environment(monkeypatch):
+    monkeypatch.setenv('BOT_BOOT_PROFILE', 'full')
+    assert get_boot_profile() == 'full'
+    monkeypatch.setenv('BOT_BOOT_PROFILE', 'bogus')
+    assert get_boot_profile() == 'lean'
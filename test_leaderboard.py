@@ -0,0 +1,147 @@
+"""
+Tests for the incrementally maintained leaderboard indexes
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from leaderboard import LeaderboardManager, CATEGORIES
+from user_profiles import UserProfileManager
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def full_sort(profiles, category, min_trades=20):
+    """The previous implementation: filter and sort every profile"""
+    eligible = [p for p in profiles.values()
+                if p['privacy'].get('show_in_leaderboard', True) and p['stats']['total_trades'] >= min_trades]
+    keys = {
+        'winrate': lambda x: (x['stats']['win_rate'], x['stats']['total_trades']),
+        'profit': lambda x: x['stats']['total_pips'],
+        'active': lambda x: x['stats']['total_trades'],
+        'streak': lambda x: abs(x['stats']['best_streak']),
+    }
+    return [p['telegram_id'] for p in sorted(eligible, key=keys[category], reverse=True)]
+
+
+@pytest.fixture
+def profiles(tmp_path, monkeypatch):
+    manager = UserProfileManager(data_file=str(tmp_path / 'profiles.json'))
+    monkeypatch.setattr(manager, 'save_data', lambda: None)
+    return manager
+
+
+def trade(manager, user_id, won, pips=10.0):
+    manager.update_trade_stats(user_id, {'won': won, 'pips': pips if won else -pips, 'pnl': 0})
+
+
+class TestLeaderboardIndex:
+    def test_matches_full_sort(self, profiles):
+        board = LeaderboardManager(profiles)
+        rng = random.Random(5)
+        for user_id in range(60):
+            profiles.get_profile(user_id)
+        for _ in range(3000):
+            trade(profiles, rng.randrange(60), rng.random() < 0.55, rng.choice([5.0, 10.0, 20.0]))
+
+        for category in CATEGORIES:
+            expected = full_sort(profiles.profiles, category)
+            assert [e['user_id'] for e in board.get_leaderboard(category, limit=1000)] == expected
+            for rank, user_id in enumerate(expected[:10], 1):
+                assert board.get_user_rank(user_id, category) == rank
+
+    def test_existing_profiles_are_indexed_at_startup(self, profiles):
+        for _ in range(25):
+            trade(profiles, 1, True)
+        board = LeaderboardManager(profiles)
+        assert board.get_user_rank(1, 'active') == 1
+
+    def test_minimum_trades(self, profiles):
+        board = LeaderboardManager(profiles)
+        for _ in range(19):
+            trade(profiles, 1, True)
+        assert board.get_leaderboard('winrate') == []
+
+        trade(profiles, 1, True)
+        assert board.get_leaderboard('winrate')[0]['stats'] == {'win_rate': 100.0, 'total_trades': 20, 'wins': 20}
+
+    def test_privacy_opt_out(self, profiles):
+        board = LeaderboardManager(profiles)
+        for _ in range(20):
+            trade(profiles, 1, True)
+        assert board.get_user_rank(1, 'profit') == 1
+
+        profiles.update_privacy_settings(1, 'show_in_leaderboard', False)
+        assert board.get_user_rank(1, 'profit') is None
+        assert board.get_leaderboard('profit') == []
+
+        profiles.update_privacy_settings(1, 'show_in_leaderboard', True)
+        assert board.get_user_rank(1, 'profit') == 1
+
+    def test_unknown_category(self, profiles):
+        assert LeaderboardManager(profiles).get_leaderboard('karma') == []
+
+
+class TestPeriodWindows:
+    def test_weekly_window_rolls_off(self, profiles):
+        clock = Clock(datetime(2025, 3, 3, 12))      # Monday
+        board = LeaderboardManager(profiles, clock=clock)
+        for _ in range(20):
+            trade(profiles, 1, True)
+        clock.now += timedelta(days=7)
+        for _ in range(20):
+            trade(profiles, 2, False)
+
+        weekly = board.get_leaderboard('active', 'weekly')
+        assert [e['user_id'] for e in weekly] == [2]
+        assert weekly[0]['stats']['total_trades'] == 20
+
+        # Lifetime and monthly boards still include both users
+        assert len(board.get_leaderboard('active', 'all')) == 2
+        assert len(board.get_leaderboard('active', 'monthly')) == 2
+
+    def test_monthly_window_rolls_off_on_query(self, profiles):
+        clock = Clock(datetime(2025, 1, 31, 23))
+        board = LeaderboardManager(profiles, clock=clock)
+        for _ in range(20):
+            trade(profiles, 1, True)
+        assert board.get_user_rank(1, 'winrate', 'monthly') == 1
+
+        clock.now += timedelta(hours=2)
+        assert board.get_user_rank(1, 'winrate', 'monthly') is None
+        assert board.get_leaderboard('winrate', 'monthly') == []
+        assert board.get_user_rank(1, 'winrate', 'all') == 1
+
+    def test_window_stats_follow_profile_rules(self, profiles):
+        board = LeaderboardManager(profiles)
+        for won in [True] * 12 + [False] * 8:
+            trade(profiles, 1, won, pips=10.0)
+
+        entry = board.get_leaderboard('streak', 'weekly')[0]
+        assert entry['stats'] == {'best_streak': 12, 'current_streak': -8, 'win_rate': 60.0}
+        assert board.get_leaderboard('profit', 'weekly')[0]['stats']['total_pips'] == 40.0
+
+    def test_windows_survive_a_restart(self, profiles):
+        clock = Clock(datetime(2025, 3, 5, 12))
+        board = LeaderboardManager(profiles, clock=clock)
+        for _ in range(20):
+            trade(profiles, 1, True)
+        weekly = board.get_leaderboard('active', 'weekly')
+
+        restarted = LeaderboardManager(profiles, clock=clock)
+        assert restarted.get_leaderboard('active', 'weekly') == weekly
+        assert restarted.get_user_rank(1, 'winrate', 'monthly') == 1
+
+        # Saved windows from an earlier week are not restored
+        clock.now += timedelta(days=7)
+        later = LeaderboardManager(profiles, clock=clock)
+        assert later.get_leaderboard('active', 'weekly') == []
+        assert later.get_user_rank(1, 'winrate', 'monthly') == 1
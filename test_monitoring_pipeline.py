@@ -0,0 +1,157 @@
+"""
+Tests for the queue-backed JSONL logging pipeline and response time histogram
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+
+import pytest
+
+from monitoring import (BatchingJsonlFileHandler, DebugSampler, DropOnFullQueueHandler,
+                        ProductionLogger, ResponseTimeHistogram)
+
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def production_logger(tmp_path):
+    prod = ProductionLogger(log_dir=str(tmp_path), debug_sample_every=10)
+    yield prod
+    prod.close()
+
+
+class TestProductionLogger:
+    def test_records_are_routed_as_jsonl(self, production_logger, tmp_path):
+        production_logger.log_command('btc', 42, execution_time=0.25)
+        production_logger.log_error(ValueError('boom'), {'command': 'gold'})
+        production_logger.log_security_event('blocked', user_id=7)
+        production_logger.log_performance('fetch', 0.5)
+        production_logger.close()
+
+        app = read_jsonl(tmp_path / 'app.log')
+        errors = read_jsonl(tmp_path / 'errors.log')
+        security = read_jsonl(tmp_path / 'security.log')
+        perf = read_jsonl(tmp_path / 'performance.log')
+
+        assert [r['message'] for r in app] == ['command', 'error', 'security_event', 'performance']
+        assert app[0]['command'] == 'btc' and app[0]['execution_time'] == 0.25
+        assert errors == [app[1]]
+        assert errors[0]['error_type'] == 'ValueError'
+        assert security[0]['user_id'] == 7
+        assert perf[0]['duration_ms'] == 500.0
+
+    def test_log_info(self, production_logger, tmp_path):
+        production_logger.log_info("Daily signal alert sent", {'user_id': 1})
+        production_logger.log_info("No data")
+        production_logger.close()
+
+        records = read_jsonl(tmp_path / 'app.log')
+        assert records[0]['message'] == "Daily signal alert sent" and records[0]['user_id'] == 1
+        assert records[1]['message'] == "No data"
+
+    def test_debug_sampling(self, production_logger, tmp_path):
+        production_logger.app_logger.setLevel(logging.DEBUG)
+        for i in range(100):
+            production_logger.log_debug('tick', {'i': i})
+        production_logger.close()
+
+        kept = [r['i'] for r in read_jsonl(tmp_path / 'app.log')]
+        assert kept == list(range(0, 100, 10))
+        assert production_logger.debug_sampler.sampled_out == 90
+
+    def test_response_time_metrics(self, production_logger):
+        for ms in range(1, 1001):
+            production_logger.log_command('cmd', 1, execution_time=ms / 1000)
+
+        metrics = production_logger.get_metrics()
+        assert metrics['commands_executed'] == 1000
+        assert metrics['avg_response_time'] == pytest.approx(0.5005)
+        assert metrics['response_times']['p50'] == pytest.approx(0.5, rel=0.3)
+        assert metrics['response_times']['max'] == 1.0
+
+    def test_slow_disk_does_not_block_callers(self, tmp_path):
+        """A stalled writer only fills the queue; callers return immediately and overflow is dropped"""
+        prod = ProductionLogger(log_dir=str(tmp_path), queue_size=5)
+        gate = threading.Event()
+        handler = prod.file_handlers[0]
+        original_flush = handler.flush
+
+        def stalled_flush():
+            gate.wait(5)
+            original_flush()
+
+        handler.flush = stalled_flush
+        try:
+            for i in range(200):
+                prod.log_info('burst', {'i': i})
+            assert prod.queue_handler.dropped > 0
+        finally:
+            gate.set()
+            prod.close()
+
+
+class TestBatchingJsonlFileHandler:
+    def make_record(self, i):
+        return logging.LogRecord('trading_bot', logging.INFO, __file__, 1, 'line %d', (i,), None)
+
+    def test_writes_in_batches(self, tmp_path):
+        handler = BatchingJsonlFileHandler(str(tmp_path / 'app.log'), batch_size=10)
+        for i in range(25):
+            handler.handle(self.make_record(i))
+        assert handler.batches_written == 2
+        handler.close()
+
+        assert [r['message'] for r in read_jsonl(tmp_path / 'app.log')] == [f'line {i}' for i in range(25)]
+        assert handler.batches_written == 3
+
+    def test_size_rotation(self, tmp_path):
+        path = tmp_path / 'app.log'
+        handler = BatchingJsonlFileHandler(str(path), max_bytes=500, backup_count=2, batch_size=1)
+        for i in range(40):
+            handler.handle(self.make_record(i))
+        handler.close()
+
+        assert handler.rotations > 2
+        assert os.path.getsize(path) <= 500
+        assert os.path.exists(f"{path}.2") and not os.path.exists(f"{path}.3")
+        assert read_jsonl(path)[-1]['message'] == 'line 39'
+
+
+class TestHotPathPieces:
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = DropOnFullQueueHandler(queue.Queue(maxsize=1))
+        logger = logging.getLogger('test_monitoring_pipeline.drop')
+        logger.propagate = False
+        logger.addHandler(handler)
+        for _ in range(3):
+            logger.warning('x')
+        logger.removeHandler(handler)
+        assert handler.dropped == 2
+
+    def test_sampler_keeps_info(self):
+        sampler = DebugSampler(every=1000)
+        info = logging.LogRecord('a', logging.INFO, __file__, 1, 'm', None, None)
+        assert all(sampler.filter(info) for _ in range(5))
+
+
+class TestResponseTimeHistogram:
+    def test_fixed_size_and_percentiles(self):
+        hist = ResponseTimeHistogram()
+        buckets = len(hist.counts)
+        for i in range(1, 10001):
+            hist.record(i / 10000)          # 0.1ms .. 1s, uniform
+
+        assert len(hist.counts) == buckets
+        assert hist.count == 10000
+        assert hist.percentile(50) == pytest.approx(0.5, rel=0.26)
+        assert hist.percentile(99) == pytest.approx(0.99, rel=0.26)
+        assert hist.percentile(100) == 1.0
+
+    def test_empty(self):
+        assert ResponseTimeHistogram().snapshot()['p95'] == 0.0
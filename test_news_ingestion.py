@@ -0,0 +1,194 @@
+"""
+Tests for concurrent, conditional news ingestion
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from email.utils import format_datetime
+
+import pytest
+
+import news_ingestion
+from news_ingestion import NewsIngestionService, NewsStore, parse_feed
+from comprehensive_news_fetcher import ComprehensiveNewsFetcher
+from news_fetcher import NewsFetcher
+
+
+def rss(items, title='Test Feed'):
+    """RSS document from (guid, title, minutes ago) tuples; guid None leaves it out"""
+    body = ''
+    for guid, item_title, minutes_ago in items:
+        published = format_datetime((datetime.now() - timedelta(minutes=minutes_ago)).astimezone())
+        guid_tag = f'<guid>{guid}</guid>' if guid else ''
+        body += (f'<item><title>{item_title}</title><link>https://example.com/{item_title.replace(" ", "-")}</link>'
+                 f'{guid_tag}<pubDate>{published}</pubDate><description>&lt;p&gt;Body&lt;/p&gt;</description></item>')
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>{title}</title>{body}</channel></rss>'.encode()
+
+
+class Response:
+    def __init__(self, status_code, content=b'', headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+class FakeSession:
+    """Serves documents per URL, honouring ETags, with optional per-URL delays"""
+
+    def __init__(self):
+        self.documents = {}
+        self.delays = {}
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def serve(self, url, content):
+        self.documents[url] = (content, f'"{hash(content)}"')
+
+    def get(self, url, headers=None, timeout=None):
+        with self.lock:
+            self.requests.append((url, dict(headers or {})))
+        time.sleep(self.delays.get(url, 0))
+        content, etag = self.documents[url]
+        if (headers or {}).get('If-None-Match') == etag:
+            return Response(304)
+        return Response(200, content, {'ETag': etag, 'Last-Modified': 'Mon, 02 Jun 2025 10:00:00 GMT'})
+
+
+@pytest.fixture
+def session():
+    return FakeSession()
+
+
+def make_service(session, feeds, **kwargs):
+    return NewsIngestionService(feeds, session=session, **kwargs)
+
+
+class TestConditionalFetching:
+    def test_unchanged_feed_is_not_refetched(self, session):
+        session.serve('a', rss([('1', 'Bitcoin rallies', 5)]))
+        service = make_service(session, {'crypto': ['a']})
+
+        assert service.refresh()['added'] == 1
+        assert service.refresh()['added'] == 0
+
+        _, headers = session.requests[-1]
+        assert headers['If-None-Match'] == session.documents['a'][1]
+        assert headers['If-Modified-Since'] == 'Mon, 02 Jun 2025 10:00:00 GMT'
+        assert service.get_stats()['feeds']['crypto|a']['not_modified'] == 1
+
+    def test_items_are_deduplicated(self, session):
+        session.serve('a', rss([('1', 'First', 30), (None, 'No guid', 20)]))
+        service = make_service(session, {'crypto': ['a']})
+        service.refresh()
+
+        session.serve('a', rss([('1', 'First', 30), (None, 'No guid', 20), ('2', 'Second', 1)]))
+        assert service.refresh()['added'] == 1
+        titles = [item['title'] for item in service.store.query('crypto')]
+        assert titles == ['Second', 'No guid', 'First']
+
+    def test_feeds_are_fetched_concurrently(self, session):
+        urls = [f'feed{i}' for i in range(4)]
+        for url in urls:
+            session.serve(url, rss([(url, f'Story {url}', 1)]))
+            session.delays[url] = 0.3
+        service = make_service(session, {'forex': urls})
+
+        start = time.perf_counter()
+        assert service.refresh()['added'] == 4
+        assert time.perf_counter() - start < 0.9
+
+
+class TestReads:
+    def test_slow_host_does_not_hold_up_first_read(self, session):
+        session.serve('fast', rss([('f', 'Fast story', 1)]))
+        session.serve('slow', rss([('s', 'Slow story', 2)]))
+        session.delays['slow'] = 1.0
+        service = make_service(session, {'crypto': ['fast', 'slow']}, first_load_timeout=0.2)
+
+        start = time.perf_counter()
+        assert [n['title'] for n in service.get_news('crypto')] == ['Fast story']
+        assert time.perf_counter() - start < 0.8
+
+        time.sleep(1.0)
+        assert len(service.get_news('crypto')) == 2
+
+    def test_stale_store_refreshes_in_background(self, session):
+        now = [1000.0]
+        session.serve('a', rss([('1', 'Old', 10)]))
+        service = make_service(session, {'crypto': ['a']}, refresh_interval=60, clock=lambda: now[0])
+        service.get_news('crypto')
+
+        session.serve('a', rss([('1', 'Old', 10), ('2', 'New', 0)]))
+        session.delays['a'] = 0.5
+        now[0] += 61
+        start = time.perf_counter()
+        assert len(service.get_news('crypto')) == 1
+        assert time.perf_counter() - start < 0.3
+
+        time.sleep(0.8)
+        assert [n['title'] for n in service.get_news('crypto')] == ['New', 'Old']
+
+    def test_time_window_query(self):
+        store = NewsStore()
+        now = datetime.now()
+        store.add_many('forex', [{'id': str(i), 'title': str(i), 'published_at': now - timedelta(hours=i)}
+                                 for i in range(6)])
+        recent = store.query('forex', since=now - timedelta(hours=2, minutes=30))
+        assert [n['id'] for n in recent] == ['0', '1', '2']
+
+    def test_old_items_are_pruned(self):
+        store = NewsStore(max_age_hours=1, max_items_per_category=3)
+        now = datetime.now()
+        store.add_many('forex', [{'id': str(i), 'title': '', 'published_at': now - timedelta(minutes=20 * i)}
+                                 for i in range(6)])
+        assert [n['id'] for n in store.query('forex')] == ['0', '1', '2']
+
+
+class TestFetchers:
+    @pytest.fixture
+    def service(self, session):
+        session.serve('https://www.coindesk.com/arc/outboundfeeds/rss/',
+                      rss([('c1', 'Bitcoin breaks out', 10), ('c2', 'Ether upgrade', 20), ('c3', 'BTC ETF inflows', 30)]))
+        session.serve('https://cointelegraph.com/rss', rss([('t1', 'Crypto markets', 300)]))
+        session.serve('https://www.kitco.com/rss/KitcoNewsAll.xml', rss([('k1', 'Gold hits record', 15)]))
+        session.serve('https://www.forexlive.com/feed/news', rss([('x1', 'EUR slides on ECB', 5)]))
+        session.serve('https://finance.yahoo.com/news/rss/', rss([('y1', 'Nasdaq rebounds', 5)]))
+        session.serve('https://www.coindesk.com/arc/outboundfeeds/rss/?outputType=xml',
+                      rss([('c1', 'Bitcoin breaks out', 10), ('c3', 'BTC ETF inflows', 30), ('c4', 'BTC old', 600)]))
+        return make_service(session, None)
+
+    def test_comprehensive_lookups_read_the_store(self, service, session):
+        fetcher = ComprehensiveNewsFetcher(ingestion=service)
+        all_news = fetcher.get_all_news(limit_per_category=3)
+        assert [n['title'] for n in all_news['crypto']] == ['Bitcoin breaks out', 'Ether upgrade',
+                                                             'BTC ETF inflows']
+        fetched = len(session.requests)
+
+        impact = fetcher.check_high_impact_news('crypto', hours_back=1)
+        assert impact['has_high_impact'] and impact['news_count'] == 3
+        assert fetcher.get_news_by_asset('GOLD')[0]['title'] == 'Gold hits record'
+        assert fetcher.get_news_by_asset('NQ')[0]['title'] == 'Nasdaq rebounds'
+        assert fetcher.get_news_by_asset('EURUSD')[0]['title'] == 'EUR slides on ECB'
+        assert len(session.requests) == fetched
+
+    def test_btc_news_fetcher(self, service):
+        fetcher = NewsFetcher(ingestion=service)
+        news = fetcher.get_crypto_news(limit=10)
+        assert [n['title'] for n in news] == ['Bitcoin breaks out', 'BTC ETF inflows', 'BTC old']
+        assert isinstance(news[0]['published_at'], str)
+
+        impact = fetcher.check_high_impact_news(hours_back=2)
+        assert impact['news_count'] == 2 and impact['has_high_impact']
+
+
+def test_xml_fallback_matches_feedparser(monkeypatch):
+    content = rss([('1', 'Gold steady', 5), (None, 'Silver slips', 65)])
+    with_feedparser = parse_feed(content)
+    monkeypatch.setattr(news_ingestion, 'HAS_FEEDPARSER', False)
+    with_xml = parse_feed(content)
+
+    for a, b in zip(with_feedparser, with_xml):
+        assert (a['id'], a['title'], a['url'], a['source']) == (b['id'], b['title'], b['url'], b['source'])
+        assert a['published_at'] == b['published_at']
+        assert a['description'] == b['description'] == 'Body'
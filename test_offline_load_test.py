@@ -0,0 +1,131 @@
+"""
+Tests for the offline load test harness
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+import requests
+from telegram.ext import CallbackQueryHandler, CommandHandler
+
+from offline_load_test import (FixtureHTTP, LoadProfile, OfflineLoadTester, check_thresholds,
+                               parse_mix)
+
+
+async def echo(update, context):
+    await update.message.reply_text(update.message.text)
+
+
+async def menu(update, context):
+    await update.callback_query.answer()
+    await update.callback_query.edit_message_text("Menu")
+
+
+async def blocking(update, context):
+    time.sleep(0.2)
+    await update.message.reply_text("done")
+
+
+def register(app):
+    app.add_handler(CommandHandler("echo", echo))
+    app.add_handler(CommandHandler("slow", blocking))
+    app.add_handler(CallbackQueryHandler(menu, pattern="^help_"))
+
+
+def run(mix, duration=1.0, rate=30.0, **kwargs):
+    profile = LoadProfile(mix=mix, rate=rate, duration=duration, users=10, seed=7)
+    return asyncio.run(OfflineLoadTester(profile, register=register, **kwargs).run())
+
+
+class TestHarness:
+    def test_handlers_are_measured(self):
+        report = run({'/echo hello': 3, 'cb:help_signals': 1, '/unknown': 1})
+
+        assert set(report['handlers']) == {'/echo', 'cb:help_signals'}
+        echo_stats = report['handlers']['/echo']
+        assert echo_stats['count'] > 0 and echo_stats['errors'] == 0
+        assert echo_stats['p50_ms'] <= echo_stats['p95_ms'] <= echo_stats['p99_ms']
+
+        calls = report['bot_api_calls']
+        assert calls['sendMessage'] == echo_stats['count']
+        assert calls['answerCallbackQuery'] == calls['editMessageText'] == \
+            report['handlers']['cb:help_signals']['count']
+        assert report['started'] == report['completed'] + report['unhandled']
+        assert report['unhandled'] > 0 and report['throughput_per_s'] > 0
+
+    def test_api_latency_shows_in_handler_latency(self):
+        report = run({'/echo hi': 1}, duration=0.5, api_latency=0.05)
+        assert report['handlers']['/echo']['p50_ms'] >= 50
+
+    def test_blocking_handler_shows_as_loop_lag(self):
+        quiet = run({'/echo hi': 1}, duration=0.5)
+        blocked = run({'/slow': 1}, duration=0.5, rate=10.0)
+        assert blocked['event_loop_lag']['max_ms'] >= 150 > quiet['event_loop_lag']['max_ms']
+
+    def test_gate(self):
+        report = run({'/slow': 1}, duration=0.3, rate=10.0)
+        assert check_thresholds(report, max_p95_ms=10_000) == []
+        failures = check_thresholds(report, max_p95_ms=50, max_loop_lag_ms=50, min_throughput=1000)
+        assert len(failures) == 3 and failures[0].startswith('/slow: p95')
+
+
+class TestFixtures:
+    def test_replay_and_offline_misses(self, tmp_path):
+        fixture = {'method': 'GET', 'url': 'https://api.binance.com/api/v3/ticker/price?symbol=BTCUSDT',
+                   'status': 200, 'headers': {'Content-Type': 'application/json'},
+                   'body': '{"symbol": "BTCUSDT", "price": "65000.00"}'}
+        (tmp_path / 'btc.json').write_text(json.dumps(fixture))
+
+        with FixtureHTTP(str(tmp_path)) as fixtures:
+            exact = requests.get(fixture['url'], timeout=1)
+            other_query = requests.get('https://api.binance.com/api/v3/ticker/price?symbol=ETHUSDT', timeout=1)
+            missing = requests.get('https://example.com/prices', timeout=1)
+
+        assert exact.json()['price'] == '65000.00'
+        assert other_query.status_code == 200
+        assert missing.status_code == 503
+        assert fixtures.hits == {'api.binance.com': 2} and fixtures.misses == {'example.com': 1}
+
+
+def test_parse_mix():
+    assert parse_mix('/btc=5,cb:help_signals=1,alert=0.5') == {'/btc': 5, 'cb:help_signals': 1, 'alert': 0.5}
+    with pytest.raises(ValueError):
+        parse_mix('btc=5')
+
+
+def test_real_bot_handlers(tmp_path, monkeypatch):
+    # The bot's managers save their JSON files relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    profile = LoadProfile(mix={'/help': 1, 'cb:help_signals': 1}, rate=10.0, duration=1.0, users=5, seed=1)
+    report = asyncio.run(OfflineLoadTester(profile).run())
+    assert report['unhandled'] == 0
+    assert report['handlers'] and all(stats['errors'] == 0 for stats in report['handlers'].values())
+    assert report['bot_api_calls'].get('sendMessage', 0) > 0
+
+
+def test_alert_fan_out_restores_bot_state(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import telegram_bot
+
+    seen = []
+
+    async def check_signals_and_alert(app):
+        await asyncio.sleep(0.01)
+        seen.append(len(telegram_bot.subscribed_users))
+
+    monkeypatch.setattr(telegram_bot, 'check_signals_and_alert', check_signals_and_alert)
+    monkeypatch.setattr(telegram_bot, 'subscribed_users', {42})
+    monkeypatch.setattr(telegram_bot, 'last_btc_signal', 'BUY')
+    original = telegram_bot.subscribed_users
+
+    tester = OfflineLoadTester(LoadProfile(fanout_size=50))
+
+    async def overlapping():
+        await asyncio.gather(tester.fan_out_alert(), tester.fan_out_alert())
+
+    asyncio.run(overlapping())
+    assert seen == [51, 51]
+    assert telegram_bot.subscribed_users is original and original == {42}
+    assert telegram_bot.last_btc_signal == 'BUY'
@@ -0,0 +1,121 @@
+"""
+Tests for the vectorized panel indicators and the international panel mode
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import international_signal_api
+from international_signal_api import PANEL_SPECS, InternationalSignalAPI
+from panel_indicators import IndicatorSpec, compute_panel, ewm_mean, rolling_mean, rolling_std
+
+CRYPTO = IndicatorSpec(sma_fast=10, sma_slow=30, ema=12, macd_fast=8, macd_slow=21, macd_signal=5, bb_std=3.0,
+                       volatility_annualization=10.0, momentum_period=10)
+
+
+def frame(n, seed, scale=0.002):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, scale, n)))
+    return pd.DataFrame({'close': close, 'high': close * (1 + rng.uniform(0, 0.003, n)),
+                         'low': close * (1 - rng.uniform(0, 0.003, n))})
+
+
+def approx(value):
+    return None if value is None else pytest.approx(value, rel=1e-9, abs=1e-12)
+
+
+def assert_analysis_equal(actual, expected):
+    for key, value in expected.items():
+        if isinstance(value, dict):
+            assert_analysis_equal(actual[key], value)
+        elif key != 'trend':
+            assert actual[key] == approx(value), key
+
+
+class TestPrimitives:
+    def test_per_column_parameters_match_pandas(self):
+        frames = {'a': frame(120, 1), 'b': frame(120, 2)}
+        close = np.column_stack([frames['a']['close'], frames['b']['close']])
+        periods, spans = np.array([10, 30]), np.array([5.0, 21.0])
+
+        means, stds, emas = rolling_mean(close, periods), rolling_std(close, periods), ewm_mean(close, spans)
+        for j, name in enumerate(frames):
+            series = frames[name]['close']
+            np.testing.assert_allclose(means[:, j], series.rolling(periods[j]).mean(), rtol=1e-10)
+            np.testing.assert_allclose(stds[:, j], series.rolling(periods[j]).std(), rtol=1e-8)
+            np.testing.assert_allclose(emas[:, j], series.ewm(span=spans[j]).mean(), rtol=1e-10)
+
+    def test_short_histories_are_padded_not_truncated(self):
+        frames = {'long': frame(200, 1), 'short': frame(40, 2)}
+        indicators = compute_panel(frames, {})
+        short = frames['short']['close']
+
+        assert indicators.panel.close.shape == (200, 2)
+        np.testing.assert_allclose(indicators.ema[-40:, 1], short.ewm(span=21).mean(), rtol=1e-10)
+        analysis = indicators.analysis('short')
+        assert analysis['sma_20'] == approx(short.rolling(20).mean().iloc[-1])
+        assert analysis['sma_50'] is None and analysis['macd']['line'] is not None
+
+
+class TestMatchesGenerators:
+    @pytest.mark.skipif(not international_signal_api.INTERNATIONAL_GENERATORS_AVAILABLE,
+                        reason="International generators not available")
+    @pytest.mark.parametrize('key', sorted(PANEL_SPECS))
+    def test_panel_slice_matches_generator_analysis(self, key):
+        api = InternationalSignalAPI()
+        generator = api.generators[key]
+        frames = {name: api.generators[name]._get_sample_data('M15') for name in PANEL_SPECS}
+        indicators = compute_panel(frames, PANEL_SPECS)
+
+        expected = generator._analyze_timeframe(frames[key], 'M15')
+        actual = api._panel_analysis(key, indicators, frames[key])
+        assert set(actual) == set(expected)
+        assert_analysis_equal(actual, expected)
+        assert actual['trend'] == expected['trend']
+
+    def test_generic_spec_matches_pandas(self):
+        data = frame(150, 7, scale=0.01)
+        analysis = compute_panel({'eth': data, 'fx': frame(150, 8)}, {'eth': CRYPTO}).analysis('eth')
+        close = data['close']
+        macd = close.ewm(span=8).mean() - close.ewm(span=21).mean()
+        deltas = close.diff()
+        rsi = 100 - 100 / (1 + deltas.clip(lower=0).rolling(14).mean() / (-deltas.clip(upper=0)).rolling(14).mean())
+        returns = close.pct_change().iloc[-20:]
+
+        assert analysis['sma_10'] == approx(close.rolling(10).mean().iloc[-1])
+        assert analysis['rsi'] == approx(rsi.iloc[-1])
+        assert analysis['macd']['signal'] == approx(macd.ewm(span=5).mean().iloc[-1])
+        assert analysis['bollinger']['upper'] == approx((close.rolling(20).mean() + 3 * close.rolling(20).std()).iloc[-1])
+        assert analysis['support'] == approx(data['low'].iloc[-20:].min())
+        assert analysis['volatility'] == approx(np.std(returns.values) * 10.0)
+        assert analysis['momentum'] == approx((close.iloc[-1] / close.iloc[-11] - 1) * 100)
+
+
+@pytest.mark.skipif(not international_signal_api.INTERNATIONAL_GENERATORS_AVAILABLE,
+                    reason="International generators not available")
+class TestPanelMode:
+    def test_signals_match_per_symbol_generation(self):
+        api = InternationalSignalAPI()
+        signals = api.generate_all_signals()
+        assert set(signals) == set(api.get_available_symbols())
+
+        for symbol in api.get_available_symbols():
+            single = api.generate_signal(symbol)
+            for key in single.keys() - {'timestamp'}:
+                assert signals[symbol][key] == single[key], (symbol, key)
+
+    def test_one_indicator_pass_per_timeframe(self, monkeypatch):
+        api = InternationalSignalAPI()
+        passes = []
+
+        def counting(frames, specs):
+            passes.append(sorted(frames))
+            return compute_panel(frames, specs)
+
+        monkeypatch.setattr(international_signal_api, 'compute_panel', counting)
+        info = api.get_all_market_info(include_signals=True)
+
+        assert len(passes) == 4 and all(keys == sorted(PANEL_SPECS) for keys in passes)
+        assert info['ETH']['signal']['symbol'] == 'ETHUSD' and info['ETH']['category'] == 'Crypto Futures'
+        assert 'signal' not in api.get_all_market_info()['ETH']
@@ -0,0 +1,273 @@
+"""
+Tests for the portfolio risk engine and the risk managers reporting through it
+"""
+
+import importlib.util
+import os
+import threading
+import time
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import portfolio_risk
+from portfolio_risk import PortfolioRiskEngine, StressScenario, asset_class, canonical_symbol
+from position_book import PositionBook
+
+PRICES = {'EURUSD': 1.085, 'GBPUSD': 1.275, 'XAUUSD': 1950.0, 'BTCUSD': 45000.0, 'ETHUSD': 2400.0}
+DAYS = pd.date_range('2025-01-01', periods=300, freq='D')
+
+
+class FakeHistory:
+    """Correlated random-walk closes; counts loads per symbol"""
+
+    def __init__(self, seed=11):
+        rng = np.random.default_rng(seed)
+        market = rng.normal(0, 1, len(DAYS))
+        self.closes = {}
+        for i, (symbol, price) in enumerate(PRICES.items()):
+            shocks = (0.6 * market + rng.normal(0, 1, len(DAYS))) * (0.005 + 0.01 * i)
+            self.closes[symbol] = pd.Series(price * np.exp(np.cumsum(shocks)), index=DAYS)
+        self.loads = []
+
+    def __call__(self, symbol, lookback):
+        self.loads.append(symbol)
+        return self.closes.get(symbol)
+
+    def returns(self, symbols):
+        return pd.concat({s: self.closes[s] for s in symbols}, axis=1).pct_change().iloc[1:].to_numpy()
+
+
+def reference(history, exposures, confidence=0.99):
+    """One portfolio at a time: P&L series, quantile, tail mean, w'Cw"""
+    symbols = list(exposures)
+    returns = history.returns(symbols)
+    weights = np.array([exposures[s] for s in symbols])
+    pnl = np.array([sum(day[j] * weights[j] for j in range(len(symbols))) for day in returns])
+    cutoff = np.quantile(pnl, 1 - confidence)
+    sigma = np.sqrt(weights @ np.cov(returns, rowvar=False) @ weights)
+    mean = weights @ returns.mean(axis=0)
+    return -cutoff, -pnl[pnl <= cutoff].mean(), NormalDist().inv_cdf(confidence) * sigma - mean
+
+
+def random_book(n_users=40, per_user=12, seed=3):
+    rng = np.random.default_rng(seed)
+    book = PositionBook()
+    for user in range(n_users):
+        for i in range(per_user):
+            symbol = rng.choice(list(PRICES))
+            book.open('paper', user, i, symbol, rng.choice(['BUY', 'SELL']), PRICES[symbol],
+                      float(rng.choice([0.01, 0.1, 0.5])), multiplier=100000 if symbol in ('EURUSD', 'GBPUSD') else 1)
+    return book
+
+
+class TestMeasures:
+    def test_single_portfolio_matches_reference(self):
+        history = FakeHistory()
+        engine = PortfolioRiskEngine(loader=history, lookback=1000)
+        exposures = {'EURUSD': 54000.0, 'BTCUSD': -9000.0, 'XAUUSD': 19500.0}
+
+        report = engine.evaluate(exposures, balance=10000.0)
+        var, cvar, parametric = reference(history, exposures)
+        assert report['var']['99%']['historical'] == pytest.approx(var, abs=0.01)
+        assert report['cvar']['99%']['historical'] == pytest.approx(cvar, abs=0.01)
+        assert report['var']['99%']['parametric'] == pytest.approx(parametric, abs=0.01)
+        assert report['var_pct'] == pytest.approx(var / 100, abs=0.01)
+        assert report['observations'] == len(DAYS) - 1
+        # Euler contributions add back up to the parametric VaR before drift
+        z = NormalDist().inv_cdf(0.99)
+        assert sum(report['contributions'].values()) == pytest.approx(z * report['volatility'], abs=0.05)
+
+    def test_batch_matches_per_user(self):
+        history = FakeHistory()
+        engine = PortfolioRiskEngine(loader=history, lookback=1000)
+        book = random_book()
+        balances = {user: 50000.0 for user in range(40)}
+
+        reports = engine.evaluate_book(book, balances)
+        assert len(reports) == 40
+        for user in (0, 17, 39):
+            single = engine.evaluate_user(user, balance=50000.0, book=book)
+            single.pop('contributions')
+            assert reports[user] == single
+            exposures = {}
+            for position in book.positions(user):
+                sign = 1 if position['direction'] == 'BUY' else -1
+                notional = sign * position['size'] * position['multiplier'] * position['current_price']
+                exposures[position['symbol']] = exposures.get(position['symbol'], 0) + notional
+            var, cvar, parametric = reference(history, exposures, confidence=0.95)
+            assert reports[user]['var']['95%']['historical'] == pytest.approx(var, abs=0.01)
+            assert reports[user]['cvar']['95%']['historical'] == pytest.approx(cvar, abs=0.01)
+            assert reports[user]['var']['95%']['parametric'] == pytest.approx(parametric, abs=0.01)
+            assert reports[user]['positions'] == 12
+
+        nightly = engine.nightly_report(book, balances, top=3)
+        assert nightly['totals']['positions'] == 480 and len(nightly['top_risk']) == 3
+        assert nightly['top_risk'][0]['var'] == max(r['var']['99%']['historical'] for r in reports.values())
+
+    def test_stress_scenarios(self):
+        scenarios = [StressScenario('crash', 'Crash', {'crypto': -0.3, 'ETHUSD': -0.4}),
+                     StressScenario('usd', 'USD up', {'fx_usd_quote': -0.02, 'fx_usd_base': 0.02})]
+        engine = PortfolioRiskEngine(loader=FakeHistory(), scenarios=scenarios)
+        report = engine.evaluate({'BTC': 10000.0, 'ETHUSDT': -5000.0, 'EURUSD': 20000.0, 'USDJPY': 1000.0})
+
+        assert report['stress'] == {'crash': pytest.approx(-3000 + 2000), 'usd': pytest.approx(-400 + 20)}
+        assert report['worst_scenario'] == 'crash'
+        assert report['unmodelled'] == ['USDJPY'] and report['unmodelled_exposure'] == 1000.0
+
+
+class TestModel:
+    def test_markets_keep_their_own_trading_days(self):
+        rng = np.random.default_rng(2)
+        weekdays = DAYS[DAYS.dayofweek < 5]
+        fx = pd.Series(1.085 * np.exp(np.cumsum(rng.normal(0, 0.005, len(weekdays)))), index=weekdays)
+        crypto = pd.Series(45000 * np.exp(np.cumsum(rng.normal(0, 0.03, len(DAYS)))), index=DAYS)
+        short = crypto.iloc[-60:] * 0.05          # A young listing must not cut the others' history
+        closes = {'EURUSD': fx, 'BTCUSD': crypto, 'ETHUSD': short}
+        model = PortfolioRiskEngine(loader=lambda symbol, lookback: closes.get(symbol), lookback=1000).model(closes)
+
+        fx_returns = fx.pct_change().dropna()
+        eur = model.index['EURUSD']
+        assert model.traded[:, eur].sum() == len(fx_returns) and model.observations == len(DAYS) - 1
+        assert model.cov[eur, eur] == pytest.approx(fx_returns.var())
+        assert model.mean[eur] == pytest.approx(fx_returns.mean())
+
+        # An FX-only portfolio's history is its own weekdays, weekends are not zero P&L days
+        engine = PortfolioRiskEngine(loader=lambda symbol, lookback: closes.get(symbol), lookback=1000)
+        report = engine.evaluate({'EURUSD': 100000.0, 'ETHUSD': 0.0})
+        assert report['var']['99%']['historical'] == \
+            pytest.approx(-np.quantile(fx_returns.to_numpy() * 100000, 0.01), abs=0.01)
+
+
+    def test_histories_are_cached_and_extended(self):
+        history = FakeHistory()
+        engine = PortfolioRiskEngine(loader=history)
+
+        engine.evaluate({'EURUSD': 1000.0, 'NOPE': 50.0})
+        engine.evaluate({'EURUSD': -500.0, 'NOPE': 10.0})
+        assert sorted(history.loads) == ['EURUSD', 'NOPE']
+        assert engine.get_stats()['model_builds'] == 1
+
+        # A new symbol rebuilds the model from cached histories plus the new one
+        engine.evaluate({'BTC': 1000.0})
+        assert sorted(history.loads) == ['BTCUSD', 'EURUSD', 'NOPE']
+        assert engine.model().symbols == ['BTCUSD', 'EURUSD']
+
+    def test_model_expires(self):
+        now = [0.0]
+        history = FakeHistory()
+        engine = PortfolioRiskEngine(loader=history, ttl=60, clock=lambda: now[0])
+        engine.evaluate({'EURUSD': 1000.0})
+        now[0] = 30.0
+        engine.evaluate({'EURUSD': 1000.0})
+        assert engine.get_stats()['model_builds'] == 1
+        now[0] = 61.0
+        engine.evaluate({'EURUSD': 1000.0})
+        assert engine.get_stats()['model_builds'] == 2
+
+    def test_aliases_share_one_column(self):
+        engine = PortfolioRiskEngine(loader=FakeHistory())
+        merged = engine.evaluate({'BTC': 600.0, 'btc/usd': 400.0})
+        assert merged['exposure_by_symbol'] == {'BTCUSD': 1000.0}
+        assert merged['var'] == engine.evaluate({'BTCUSD': 1000.0})['var']
+
+
+def test_symbols():
+    assert [canonical_symbol(s) for s in ('BTC', 'BTCUSDT', 'eth-usd', 'GOLD', 'EURUSD=X', 'CME:ES1!')] == \
+        ['BTCUSD', 'BTCUSD', 'ETHUSD', 'XAUUSD', 'EURUSD', 'ES']
+    assert [asset_class(s) for s in ('GBPUSD', 'USDJPY', 'EURJPY', 'XAUUSD', 'NQ')] == \
+        ['fx_usd_quote', 'fx_usd_base', 'fx_cross', 'metals', 'indices']
+
+
+def test_notional_is_converted_to_usd():
+    engine = PortfolioRiskEngine(loader=FakeHistory())
+    book = PositionBook()
+    book.open('paper', 1, 1, 'USDJPY', 'BUY', 150.0, 1.0, multiplier=100000)
+    book.open('paper', 1, 2, 'EURJPY', 'SELL', 160.0, 1.0, multiplier=100000)
+    book.open('paper', 1, 3, 'EURUSD', 'BUY', 1.085, 1.0, multiplier=100000)
+
+    _, symbols, matrix = book.exposures(1, quote_to_usd=portfolio_risk.quote_to_usd_rate)
+    expected = {'USDJPY': 100000.0, 'EURJPY': -160.0 * 100000 / 150, 'EURUSD': 108500.0}
+    assert dict(zip(symbols, matrix[0])) == {s: pytest.approx(v) for s, v in expected.items()}
+    assert engine.evaluate_user(1, book=book)['exposure_by_symbol'] == pytest.approx(expected, abs=0.01)
+
+    positions = [{'pair': 'USDJPY', 'size': 0.5, 'multiplier': 100000, 'entry': 150.0},
+                 {'pair': 'XAUUSD', 'size': 1.0, 'multiplier': 100, 'current_price': 1950.0}]
+    assert portfolio_risk.exposures_from_positions(positions) == {'USDJPY': pytest.approx(50000.0),
+                                                                  'XAUUSD': 195000.0}
+
+
+def test_warm_query_is_fast():
+    engine = PortfolioRiskEngine(loader=FakeHistory())
+    book = random_book(n_users=1000, per_user=40)
+    engine.model(PRICES)
+
+    start = time.perf_counter()
+    for user in range(20):
+        engine.evaluate_user(user, balance=10000.0, book=book)
+    assert (time.perf_counter() - start) / 20 < 0.02
+
+
+def test_risk_manager_reports_var(monkeypatch):
+    from risk_manager import EnhancedRiskManager
+
+    engine = PortfolioRiskEngine(loader=FakeHistory())
+    engine.model(PRICES)
+    monkeypatch.setattr(portfolio_risk, 'portfolio_risk_engine', engine)
+    manager = EnhancedRiskManager()
+    trades = [{'pair': 'EURUSD', 'risk_amount': 25.0, 'direction': 'BUY', 'size': 0.5, 'multiplier': 100000,
+               'current_price': 1.085},
+              {'pair': 'BTC', 'risk_amount': 30.0, 'direction': 'SELL', 'position_value': 4500.0}]
+
+    exposure = manager.check_portfolio_exposure(trades, 1000.0)
+    report = exposure['var_report']
+    assert report['exposure_by_symbol'] == {'EURUSD': 54250.0, 'BTCUSD': -4500.0}
+    assert 'VALUE AT RISK' in exposure['heat_map'] and '99% VaR' in exposure['heat_map']
+    # Stops look small, but the notional behind them is 50x the balance
+    assert exposure['total_risk_pct'] == pytest.approx(5.5) and exposure['is_overexposed']
+
+    assessment = manager.assess_portfolio_risk(
+        [{'asset': 'EURUSD', 'risk_amount': 20.0, 'position_value': 54250.0}], 1000.0)
+    assert assessment['risk_level'] == 'HIGH' and assessment['var_report']['risk_level'] == 'HIGH'
+    assert manager.check_portfolio_exposure([{'pair': 'EURUSD', 'risk_amount': 10.0}], 1000.0)['var_report'] is None
+
+
+class SlowHistory(FakeHistory):
+    """Histories that only arrive once the test releases them"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def __call__(self, symbol, lookback):
+        assert self.release.wait(10)
+        return super().__call__(symbol, lookback)
+
+
+def test_cold_engine_does_not_block_risk_managers(monkeypatch):
+    from risk_manager import EnhancedRiskManager
+
+    path = os.path.join(os.path.dirname(__file__), 'BTC expert', 'risk_manager.py')
+    spec = importlib.util.spec_from_file_location('btc_expert_risk_manager', path)
+    btc_expert = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(btc_expert)
+
+    history = SlowHistory()
+    engine = PortfolioRiskEngine(loader=history)
+    monkeypatch.setattr(portfolio_risk, 'portfolio_risk_engine', engine)
+    trades = [{'pair': 'EURUSD', 'risk_amount': 25.0, 'size': 0.5, 'multiplier': 100000, 'current_price': 1.085}]
+
+    for manager in (EnhancedRiskManager(), btc_expert.EnhancedRiskManager()):
+        start = time.perf_counter()
+        assert manager.check_portfolio_exposure(trades, 1000.0)['var_report'] is None
+        assert time.perf_counter() - start < 1.0
+
+    # The histories load in the background; later queries get the report
+    history.release.set()
+    engine._warming.join(10)
+    for manager in (EnhancedRiskManager(), btc_expert.EnhancedRiskManager()):
+        report = manager.check_portfolio_exposure(trades, 1000.0)['var_report']
+        assert report['exposure_by_symbol'] == {'EURUSD': 54250.0}
+    assert engine.get_stats()['model_builds'] == 1
@@ -0,0 +1,191 @@
+"""
+Tests for the columnar position book and the modules marking through it
+"""
+
+import random
+
+import pytest
+
+from position_book import PositionBook
+
+
+def reference_mark(position, price):
+    """The previous per-trade loop: P&L, then SL and TP checks (TP wins)"""
+    sign = 1 if position['direction'] == 'BUY' else -1
+    exit_type = None
+    if position['sl'] and sign * (price - position['sl']) <= 0:
+        exit_type = 'SL'
+    if position['tp'] and sign * (price - position['tp']) >= 0:
+        exit_type = 'TP1'
+    return sign * (price - position['entry']) * position['size'] * 100000, exit_type
+
+
+def random_positions(n=2000, seed=5):
+    rng = random.Random(seed)
+    positions = []
+    for i in range(n):
+        direction = rng.choice(['BUY', 'SELL'])
+        sign = 1 if direction == 'BUY' else -1
+        entry = rng.uniform(1.07, 1.10)
+        positions.append({
+            'user': rng.randrange(300), 'id': i, 'symbol': rng.choice(['EURUSD', 'GBPUSD']),
+            'direction': direction, 'entry': entry, 'size': rng.choice([0.01, 0.1, 1.0]),
+            'sl': entry * (1 - sign * rng.uniform(0.001, 0.02)) if i % 7 else None,
+            'tp': entry * (1 + sign * rng.uniform(0.001, 0.02)) if i % 11 else None,
+        })
+    return positions
+
+
+class TestMarking:
+    def test_matches_per_trade_loop(self):
+        book = PositionBook(capacity=16)
+        positions = random_positions()
+        for p in positions:
+            book.open('engine', p['user'], p['id'], p['symbol'], p['direction'], p['entry'], p['size'],
+                      stop_loss=p['sl'], take_profit=p['tp'], multiplier=100000)
+        closed = []
+        book.subscribe(closed.append)
+
+        events = book.update_price('eurusd', 1.085)
+        assert events == closed
+
+        expected_closes = {}
+        for p in positions:
+            if p['symbol'] != 'EURUSD':
+                continue
+            pnl, exit_type = reference_mark(p, 1.085)
+            key = ('engine', p['user'], p['id'])
+            if exit_type:
+                expected_closes[key] = exit_type
+                assert key not in book
+            else:
+                assert book.get(*key)['pnl'] == pytest.approx(pnl)
+        assert {event.key: event.exit_type for event in events} == expected_closes
+
+        for event in events:
+            p = positions[event.position_id]
+            assert event.exit_price == pytest.approx(p['tp'] if event.exit_type == 'TP1' else p['sl'])
+
+        untouched = [p for p in positions if p['symbol'] == 'GBPUSD']
+        assert all(book.get('engine', p['user'], p['id'])['pnl'] == 0 for p in untouched)
+        stats = book.get_stats()
+        assert stats['open'] == len(positions) - len(events)
+        assert stats['sl_hits'] + stats['tp_hits'] == len(events)
+
+    def test_user_views_and_totals(self):
+        book = PositionBook()
+        book.open('paper', 1, 1, 'XAUUSD', 'buy', 1950.0, 2.0, multiplier=100)
+        book.open('paper', 1, 2, 'BTCUSD', 'sell', 45000.0, 0.5)
+        book.open('engine', 2, 'a', 'XAUUSD', 'SELL', 1960.0, 1.0, multiplier=100)
+        book.update_prices({'XAUUSD': 1955.0, 'BTCUSD': 44000.0})
+
+        assert book.user_unrealized(1) == pytest.approx(1000 + 500)
+        assert book.user_unrealized(1, source='engine') == 0.0
+        assert book.unrealized_by_user() == {1: pytest.approx(1500), 2: pytest.approx(500)}
+        assert [p['id'] for p in book.positions(symbol='xauusd')] == [1, 'a']
+        gold = book.positions(1, source='paper')[0]
+        assert gold['pnl_pct'] == pytest.approx(5 / 1950 * 100) and gold['current_price'] == 1955.0
+
+        closed = book.close('paper', 1, 1)
+        assert closed['pnl'] == pytest.approx(1000) and book.close('paper', 1, 1) is None
+        # Freed rows are reused; new positions start marked at the last price
+        book.open('paper', 3, 9, 'XAUUSD', 'BUY', 1950.0, 1.0, multiplier=100)
+        assert book.get('paper', 3, 9)['pnl'] == pytest.approx(500)
+        assert book.get_stats()['open'] == 3
+
+    def test_modify_moves_levels(self):
+        book = PositionBook()
+        book.open('broker_mt4', 1, 't1', 'EURUSD', 'BUY', 1.10, 1.0, stop_loss=1.09)
+        assert book.modify('broker_mt4', 1, 't1', stop_loss=1.095, take_profit=1.12)
+        assert not book.modify('broker_mt4', 1, 'missing', stop_loss=1.0)
+        assert book.update_price('EURUSD', 1.096) == []
+        [event] = book.update_price('EURUSD', 1.094)
+        assert (event.exit_type, event.exit_price) == ('SL', 1.095)
+
+
+class TestConsumers:
+    def test_engine_closes_trades_hit_by_a_price_update(self, monkeypatch):
+        import trading_execution_engine
+        from trading_execution_engine import TradingExecutionEngine
+
+        closed = []
+        monkeypatch.setattr(trading_execution_engine, 'close_user_trade',
+                            lambda trade_id, exit_price, exit_type: closed.append((trade_id, exit_price, exit_type)) or True)
+        book = PositionBook()
+        engine = TradingExecutionEngine(book=book)
+        for user in range(3):
+            engine._track(user, {'id': f't{user}', 'asset': 'EURUSD', 'direction': 'BUY', 'entry': 1.10,
+                                 'stop_loss': 1.09, 'tp1': 1.12 + user * 0.01, 'position_size': 0.1})
+
+        events = engine.mark_to_market({'EURUSD': 1.125})
+        assert closed == [('t0', 1.12, 'TP1')] and [event.user_id for event in events] == [0]
+        assert engine.stats.summary(user=0).trades == 1
+
+        summary = engine.get_user_performance_summary(1)
+        assert summary['overview']['active_positions'] == 1
+        assert summary['overview']['unrealized_pnl'] == pytest.approx(0.025 * 0.1 * 100000)
+
+        result = engine.simulate_market_movement(2)
+        assert result['success'] and {update['trade_id'] for update in result['updates']} == {'t2'}
+
+    def test_simulation_leaves_other_users_alone(self, monkeypatch):
+        import trading_execution_engine
+        from trading_execution_engine import TradingExecutionEngine
+
+        closed = []
+        monkeypatch.setattr(trading_execution_engine, 'close_user_trade',
+                            lambda trade_id, exit_price, exit_type: closed.append(trade_id) or True)
+        monkeypatch.setattr(trading_execution_engine, 'get_user_portfolio_data', lambda telegram_id: {})
+        book = PositionBook()
+        engine = TradingExecutionEngine(book=book, trade_history=[])
+        book.open('paper', 111, 'p1', 'EURUSD', 'BUY', 1.08, 0.1, stop_loss=1.0799, take_profit=1.0801)
+        engine._track(222, {'id': 'e1', 'asset': 'EURUSD', 'direction': 'BUY', 'entry': 1.08,
+                            'stop_loss': 1.0799, 'tp1': 1.0801, 'position_size': 0.1})
+
+        for _ in range(5):
+            engine.simulate_market_movement(222)
+
+        assert closed == ['e1'] and ('engine', 222, 'e1') not in book
+        assert ('paper', 111, 'p1') in book and book.get('paper', 111, 'p1')['current_price'] == 1.08
+        assert 'EURUSD' not in book.last_prices
+
+    def test_paper_accounts_close_at_stop_and_target(self, tmp_path):
+        from paper_trading import PaperTrading
+
+        book = PositionBook()
+        paper = PaperTrading(data_file=str(tmp_path / 'paper.json'), book=book)
+        for user in (1, 2):
+            paper.enable_paper_trading(user)
+        paper.open_position(1, 'EURUSD', 'buy', 1.1000, 0.1, sl=1.0950, tp=1.1100)
+        paper.open_position(2, 'EURUSD', 'sell', 1.1000, 0.2, sl=1.1040, tp=1.0900)
+        paper.open_position(2, 'GBPUSD', 'buy', 1.2700, 0.1, sl=1.2600, tp=1.2800)
+
+        paper.mark_to_market({'EURUSD': 1.1050})
+        assert paper.get_unrealized_pnl(1) == pytest.approx(50)
+        account = paper.get_account(2)
+        assert [p['exit_type'] for p in account['closed_positions']] == ['SL']
+        assert account['total_pnl'] == pytest.approx(-80)
+        assert 'P&L $50.00' in paper.get_account_summary(1)
+
+        # Reloading the file puts the remaining open positions back in a book
+        reloaded = PaperTrading(data_file=str(tmp_path / 'paper.json'), book=PositionBook())
+        assert len(reloaded.book) == 2
+        assert paper.open_position(2, 'EURUSD', 'buy', 1.1, 0.1, sl=1.0, tp=1.2)['position_id'] == 3
+
+    def test_broker_paper_fills_are_marked(self, tmp_path, monkeypatch):
+        from broker_connector import BrokerConnector
+
+        book = PositionBook()
+        broker = BrokerConnector(data_file=str(tmp_path / 'connections.json'), book=book)
+        monkeypatch.setattr(broker, '_get_current_price', lambda symbol: 1.2500)
+        assert broker.connect_broker(7, 'mt4', {'login': 1, 'password': 'x', 'server': 'demo'})
+        trade = broker.execute_trade(7, 'mt4', {'symbol': 'GBPUSD', 'direction': 'buy', 'lots': 0.5,
+                                                'sl': 1.2400, 'tp': 1.2700})
+        assert trade['success']
+
+        book.update_price('GBPUSD', 1.2520)
+        [position] = broker.get_open_positions(7, 'mt4')
+        assert position['ticket'] == trade['trade_id'] and position['profit'] == pytest.approx(100)
+
+        closed = broker.close_position(7, 'mt4', trade['trade_id'])
+        assert closed['pnl'] == pytest.approx(100) and broker.get_open_positions(7, 'mt4') == []
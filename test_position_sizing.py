@@ -0,0 +1,103 @@
+"""
+Tests for batch position sizing and the sizing helpers built on it
+"""
+
+import importlib.util
+import math
+import os
+
+import numpy as np
+import pytest
+
+from position_sizing import instrument_spec, size_for_risk, size_for_subscribers, size_positions
+
+
+def reference_lots(risk_amount, sl_pips, pip_value, step=0.01, min_lot=0.01):
+    """One account at a time: lots floored to the step, zero below the minimum"""
+    lots = math.floor(risk_amount / (sl_pips * pip_value) / step + 1e-6) * step
+    return round(lots, 3) if lots >= min_lot - 1e-12 else 0.0
+
+
+class FakeUsers:
+    def __init__(self, profiles):
+        self.profiles = profiles
+
+    def get_risk_profiles(self, telegram_ids):
+        rows = [self.profiles.get(i, (500.0, 1.0)) for i in telegram_ids]
+        return [r[0] for r in rows], [r[1] for r in rows]
+
+
+class TestBatch:
+    def test_matches_per_account_loop(self):
+        rng = np.random.default_rng(4)
+        balances = rng.uniform(50, 50000, 5000).round(2)
+        risk_pcts = rng.choice([0.5, 1.0, 1.5, 2.0, 3.0], 5000)
+
+        batch = size_positions('EURUSD', 1.0850, 1.0820, balances, risk_pcts, max_risk_pct=2.0)
+        assert batch.sl_pips == pytest.approx(30) and batch.pip_value_per_lot == pytest.approx(10)
+        for i in range(0, 5000, 97):
+            risk = balances[i] * min(risk_pcts[i], 2.0) / 100
+            assert batch.risk_amount[i] == pytest.approx(risk)
+            assert batch.lots[i] == pytest.approx(reference_lots(risk, 30, 10))
+            assert batch.actual_risk[i] <= risk + 1e-9
+        assert batch.risk_pct.max() == 2.0
+
+    def test_floor_and_minimum(self):
+        batch = size_positions('EURUSD', 1.1000, 1.0950, [1000.0, 99.0, 0.0], 1.0, user_ids=[1, 2, 3])
+        # $10 over 50 pips at $10/pip is 0.02 lots; $0.99 is below 0.01 lots
+        assert batch.lots.tolist() == [0.02, 0.0, 0.0]
+        assert batch.below_minimum.tolist() == [False, True, False]
+        rows = batch.by_user()
+        assert rows[1]['units'] == 2000 and rows[1]['actual_risk'] == 10.0
+        lines = batch.sizing_lines()
+        assert '0.02 lots' in lines[0] and 'SL 50.0 pips' in lines[0]
+        assert 'below the 0.01 lot minimum' in lines[1]
+
+    def test_instrument_specs(self):
+        # USDJPY pips are yen; $1,000 per pip per lot at 100.00
+        assert instrument_spec('USDJPY').pip_value_per_lot(100.0) == pytest.approx(10)
+        assert instrument_spec('EURJPY').pip_value_per_lot(160.0, quote_to_usd=0.0066) == pytest.approx(6.6)
+        gold = size_positions('GOLD', 2050.0, 2040.0, [10000.0], 1.0)
+        assert (gold.spec.symbol, gold.sl_pips, gold.pip_value_per_lot) == ('XAUUSD', 100, 10)
+        assert gold.lots[0] == pytest.approx(0.1)
+        btc = size_for_risk('BTC', 45000, 44100, [100.0])
+        assert btc.lots[0] == pytest.approx(0.111) and btc.units[0] == pytest.approx(0.111)
+        es = size_positions('ES', 4250.0, 4240.0, [10000.0, 50000.0], 2.0)
+        assert es.lots.tolist() == [0.0, 2.0]          # 40 ticks at $12.50 is $500 a contract
+
+    def test_subscribers_use_their_profiles(self):
+        users = FakeUsers({7: (10000.0, 1.0), 8: (2000.0, 5.0)})
+        signal = {'asset': 'GBPUSD', 'entry_price': 1.2750, 'stop_loss': 1.2700}
+        batch = size_for_subscribers(signal, [7, 8, 9], users, max_risk_pct=2.0)
+        assert batch.by_user()[7]['lots'] == pytest.approx(0.2)
+        assert batch.by_user()[8]['risk_amount'] == 40.0
+        assert batch.by_user()[9]['lots'] == pytest.approx(0.01)
+        with pytest.raises(ValueError):
+            size_for_subscribers({'asset': 'GBPUSD'}, [7], users)
+
+
+class TestWrappers:
+    def test_pip_calculator_is_a_batch_of_one(self):
+        path = os.path.join(os.path.dirname(__file__), 'Forex expert', 'shared', 'pip_calculator.py')
+        spec = importlib.util.spec_from_file_location('pip_calculator', path)
+        pip_calculator = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(pip_calculator)
+
+        single = pip_calculator.calculate_position_size('EURUSD', 10000, 1, 1.1000, 1.0975)
+        assert single == {'lots': 0.4, 'units': 40000, 'risk_amount': 100.0, 'sl_pips': 25.0, 'pip_value': 4.0}
+        many = pip_calculator.calculate_position_sizes('EURUSD', [10000, 5000], [1, 2], 1.1000, 1.0975)
+        assert many == [single, single]
+
+    def test_risk_manager_caps_and_scenarios(self):
+        from risk_manager import EnhancedRiskManager
+
+        manager = EnhancedRiskManager()
+        size = manager.calculate_position_size(10000, 1.1000, 1.0950, risk_pct=0.05)
+        assert size['risk_pct'] == 2.0 and size['lots'] == 0.4 and size['pips'] == 50
+        assert manager.calculate_position_size(10000, 1.1, 1.1) is None
+
+        scenarios = manager.calculate_risk_scenarios(10000, 1.1000, 1.0950)
+        assert [s['lots'] for s in scenarios.values()] == [0.1, 0.2, 0.4]
+
+        batch = manager.calculate_position_sizes([1000.0, 20000.0], 1.1000, 1.0950, [0.01, 0.05], user_ids=[1, 2])
+        assert batch.by_user()[2]['risk_amount'] == 400.0
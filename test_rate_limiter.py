@@ -0,0 +1,153 @@
+"""
+Tests for the GCRA rate limiter
+"""
+
+import pytest
+
+import rate_limiter as rl
+from rate_limiter import MemoryBackend, RateLimit, RateLimiter
+
+
+class FakeClock:
+    def __init__(self, start=1000.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rl.time, 'time', clock)
+    return clock
+
+
+class TestCommandLimits:
+    def test_burst_then_steady_rate(self, clock):
+        limiter = RateLimiter()
+        results = [limiter.check_command(1, 'btc', max_calls=5, period=60) for _ in range(6)]
+
+        assert [r.allowed for r in results] == [True] * 5 + [False]
+        assert [r.remaining for r in results[:5]] == [4, 3, 2, 1, 0]
+        assert results[-1].retry_after == pytest.approx(12.0)
+
+        clock.now += 12
+        assert limiter.check_command(1, 'btc', max_calls=5, period=60).allowed
+        assert not limiter.check_command(1, 'btc', max_calls=5, period=60).allowed
+
+    def test_keys_are_per_user_and_command(self, clock):
+        limiter = RateLimiter()
+        assert limiter.check_command(1, 'gold', max_calls=1).allowed
+        assert not limiter.check_command(1, 'gold', max_calls=1).allowed
+        assert limiter.check_command(2, 'gold', max_calls=1).allowed
+        assert limiter.check_command(1, 'btc', max_calls=1).allowed
+
+    def test_tier_scaling(self, clock):
+        tiers = {1: 'free', 2: 'vip'}
+        limiter = RateLimiter(tier_resolver=tiers.get)
+
+        free = sum(limiter.check_command(1, 'es', max_calls=2).allowed for _ in range(20))
+        vip = sum(limiter.check_command(2, 'es', max_calls=2).allowed for _ in range(20))
+
+        assert free == 2
+        assert vip == 10
+
+    def test_tier_lookups_are_cached(self, clock):
+        calls = []
+        limiter = RateLimiter(tier_resolver=lambda uid: calls.append(uid) or 'premium', tier_cache_ttl=60)
+        for _ in range(5):
+            limiter.check_command(7, 'btc')
+        assert calls == [7]
+
+        clock.now += 61
+        limiter.check_command(7, 'btc')
+        assert calls == [7, 7]
+
+
+class TestMemoryBackend:
+    def test_idle_keys_are_evicted(self, clock):
+        backend = MemoryBackend()
+        limiter = RateLimiter(backend=backend)
+        for user_id in range(100):
+            limiter.check_command(user_id, 'btc', max_calls=5, period=60)
+        assert len(backend) == 100
+
+        # After one emission interval every key is back to a full bucket
+        clock.now += 12
+        for _ in range(20):
+            limiter.check_command(999, 'btc', max_calls=5, period=60)
+            clock.now += 12
+        assert len(backend) == 1
+        assert backend.evictions == 100
+
+    def test_max_keys_bound(self, clock):
+        backend = MemoryBackend(max_keys=10)
+        for key in range(50):
+            backend.acquire(str(key), clock.now, RateLimit(5, 60))
+        assert len(backend) <= 10 + backend.evict_per_call
+
+    def test_cleanup_sweep(self, clock):
+        backend = MemoryBackend()
+        backend.acquire('a', clock.now, RateLimit(1, 10))
+        assert backend.cleanup(clock.now + 5) == 0
+        assert backend.cleanup(clock.now + 10) == 1
+
+
+class TestUserLimits:
+    def test_burst_message(self, clock):
+        limiter = RateLimiter()
+        for _ in range(limiter.burst_limit):
+            assert limiter.check_rate_limit(5)[0]
+
+        allowed, message = limiter.check_rate_limit(5)
+        assert not allowed
+        assert "Too many requests" in message
+
+    def test_refused_request_does_not_consume_other_windows(self, clock):
+        limiter = RateLimiter()
+        for _ in range(limiter.burst_limit + 10):
+            limiter.check_rate_limit(5)
+
+        stats = limiter.get_user_stats(5)
+        assert stats['requests_last_minute'] == limiter.burst_limit
+
+    def test_reset(self, clock):
+        limiter = RateLimiter()
+        limiter.requests_per_hour = 1
+        assert limiter.check_rate_limit(3)[0]
+        assert "Hourly" in limiter.check_rate_limit(3)[1]
+
+        limiter.reset_user_limit(3)
+        assert limiter.check_rate_limit(3)[0]
+
+
+class TestRedisBackend:
+    """Shared-state backend, against an in-process Redis when fakeredis[lua] is installed"""
+
+    @pytest.fixture
+    def backend(self):
+        fakeredis = pytest.importorskip('fakeredis')
+        pytest.importorskip('lupa')
+        return rl.RedisBackend(fakeredis.FakeRedis(decode_responses=True))
+
+    def test_matches_memory_backend(self, backend, clock):
+        shared = RateLimiter(backend=backend)
+        local = RateLimiter()
+        for _ in range(8):
+            expected = local.check_command(1, 'btc', max_calls=5, period=60)
+            actual = shared.check_command(1, 'btc', max_calls=5, period=60)
+            assert (actual.allowed, actual.remaining) == (expected.allowed, expected.remaining)
+            assert actual.retry_after == pytest.approx(expected.retry_after)
+
+    def test_two_processes_share_limits(self, backend, clock):
+        first = RateLimiter(backend=backend)
+        second = RateLimiter(backend=rl.RedisBackend(backend.client))
+
+        assert first.check_command(1, 'gold', max_calls=1).allowed
+        assert not second.check_command(1, 'gold', max_calls=1).allowed
+
+    def test_keys_expire_when_idle(self, backend, clock):
+        RateLimiter(backend=backend).check_command(1, 'es', max_calls=5, period=60)
+        ttl = backend.client.pttl('ratelimit:cmd:es:1')
+        assert 0 < ttl <= 12000
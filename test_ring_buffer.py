@@ -0,0 +1,151 @@
+"""
+Tests for the streaming ring buffer and Welford statistics
+"""
+
+import numpy as np
+import pytest
+
+from ring_buffer import RingBuffer, OnlineStatistics, ZScoreScratch, anomaly_scores, window_zscores
+
+
+class TestRingBuffer:
+    """Test appends, wrap-around and zero-copy windows"""
+
+    def test_window_is_ordered_after_wraparound(self):
+        """Windows stay oldest-first once the buffer has wrapped"""
+        buf = RingBuffer(capacity=4, width=2)
+        for i in range(10):
+            buf.append(np.array([i, -i]))
+
+        assert len(buf) == 4
+        assert buf.is_full
+        assert buf.window()[:, 0].tolist() == [6, 7, 8, 9]
+        assert buf.window(2)[:, 1].tolist() == [-8, -9]
+        assert buf.latest()[0] == 9
+        assert buf.total_appended == 10
+
+    def test_window_is_a_contiguous_view(self):
+        """Windows alias the backing array instead of copying"""
+        buf = RingBuffer(capacity=8, width=3)
+        for i in range(13):
+            buf.append(np.full(3, i))
+
+        window = buf.window(5)
+        assert window.flags['C_CONTIGUOUS']
+        assert np.shares_memory(window, buf._data)
+
+    def test_in_place_writes(self):
+        """Rows can be filled through next_slot() and published with commit()"""
+        buf = RingBuffer(capacity=3, width=2, dtype=np.float32)
+        for i in range(5):
+            slot = buf.next_slot()
+            slot[:] = (i, i * 2)
+            row = buf.commit()
+            assert row.tolist() == [i, i * 2]
+
+        assert buf.window().dtype == np.float32
+        assert buf.window()[:, 0].tolist() == [2, 3, 4]
+
+    def test_partial_and_empty_windows(self):
+        """Asking for more rows than stored returns what is there"""
+        buf = RingBuffer(capacity=5, width=1)
+        assert len(buf.window()) == 0
+        assert buf.latest() is None
+
+        buf.append(np.array([1.0]))
+        assert len(buf.window(3)) == 1
+
+    def test_invalid_shape(self):
+        with pytest.raises(ValueError):
+            RingBuffer(capacity=0, width=2)
+
+
+class TestOnlineStatistics:
+    """Test Welford mean/variance against NumPy"""
+
+    def test_matches_numpy(self):
+        rng = np.random.default_rng(7)
+        data = rng.normal(100, 5, size=(500, 4))
+        stats = OnlineStatistics(4)
+        for row in data:
+            stats.update(row)
+
+        assert stats.count == 500
+        np.testing.assert_allclose(stats.mean, data.mean(axis=0))
+        np.testing.assert_allclose(stats.variance, data.var(axis=0))
+        np.testing.assert_allclose(stats.std, data.std(axis=0))
+
+    def test_standardize_handles_constant_columns(self):
+        """Constant columns standardize to 0 rather than inf/nan"""
+        stats = OnlineStatistics(2)
+        for value in (1.0, 2.0, 3.0):
+            stats.update(np.array([value, 5.0]))
+
+        out = stats.standardize(np.array([3.0, 5.0]))
+        assert np.isfinite(out).all()
+        assert out[1] == 0.0
+        assert out[0] == pytest.approx(1.0 / np.std([1, 2, 3]))
+
+
+class TestAnomalyScores:
+    """Test vectorized anomaly scoring"""
+
+    def test_outlier_scores_highest(self):
+        rng = np.random.default_rng(1)
+        window = rng.normal(size=(100, 5))
+        window[42] = 8.0
+
+        scores = anomaly_scores(window)
+
+        assert scores.shape == (100,)
+        assert scores.argmax() == 42
+        assert 0.0 <= scores.min() and scores.max() < 1.0
+
+    def test_flat_window_scores_zero(self):
+        assert not anomaly_scores(np.ones((10, 3))).any()
+
+    def test_scratch_matches_fresh_arrays(self):
+        """Scoring into scratch buffers gives the same answer as allocating"""
+        rng = np.random.default_rng(3)
+        window = rng.normal(size=(100, 6)).astype(np.float32)
+        window[:, 2] = 4.0                  # constant column is ignored
+
+        expected_z = (window - window.mean(axis=0, dtype=np.float64)) / window.std(axis=0, dtype=np.float64)
+        expected_z[:, 2] = 0.0
+        scratch = ZScoreScratch(100, 6)
+        np.testing.assert_allclose(window_zscores(window, scratch=scratch), expected_z, rtol=1e-5)
+
+        expected = anomaly_scores(window)
+        scores = anomaly_scores(window, scratch=scratch)
+        np.testing.assert_allclose(scores, expected)
+        assert np.shares_memory(scores, scratch.scores)
+
+        # A shorter window reuses the leading rows of the same scratch
+        np.testing.assert_allclose(anomaly_scores(window[-10:], scratch=scratch), anomaly_scores(window[-10:]))
+
+
+class TestStreamingDataProcessor:
+    """Test the streaming processor's use of the ring buffers"""
+
+    @pytest.fixture
+    def processor(self):
+        pytest.importorskip('tensorflow')
+        from ai_realtime_predictive_analytics import StreamingDataProcessor
+
+        processor = StreamingDataProcessor(window_size=200, feature_dim=8)
+        rng = np.random.default_rng(5)
+        for price in 100 + rng.normal(size=150).cumsum():
+            processor.process_streaming_data({'price': price, 'volume': 1000.0})
+        return processor
+
+    def test_detect_anomaly_scores_latest_row(self, processor):
+        window = processor.feature_buffer.window(processor.ANOMALY_MIN_ROWS)
+        assert processor._detect_anomaly() == pytest.approx(anomaly_scores(window)[-1])
+
+    def test_recent_window_is_a_copy(self, processor):
+        window = processor.get_recent_window(50)
+        before = window.copy()
+        processor.process_streaming_data({'price': 500.0, 'volume': 1000.0})
+
+        np.testing.assert_array_equal(window, before)
+        assert not np.shares_memory(window, processor.feature_buffer.window())
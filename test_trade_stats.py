@@ -0,0 +1,268 @@
+"""
+Tests for the running trade statistics aggregator and its consumers
+"""
+
+import json
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from trade_stats import ALL, TradeStatsAggregator
+from trade_tracker import TradeTracker
+from performance_analytics import PerformanceAnalytics
+from signal_performance_tracker import SignalPerformanceTracker
+
+NOW = datetime(2025, 6, 15, 12, 0, 0)
+
+
+def make_history(path, n=300, seed=3):
+    """Closed trades spread over the last 60 days, plus a few open ones"""
+    rng = random.Random(seed)
+    trades, capital = [], 1000.0
+    for i in range(n):
+        opened = NOW - timedelta(days=rng.uniform(0, 60))
+        closed = opened + timedelta(hours=rng.uniform(1, 30))
+        is_open = i % 25 == 0 or closed > NOW
+        pnl = round(rng.gauss(5, 40), 2) if i % 17 else 0.0
+        daily = rng.random() < 0.5
+        trades.append({
+            'id': i + 1,
+            'asset': rng.choice(['BTC', 'GOLD', 'EURUSD']),
+            'direction': 'BUY',
+            'entry': 100.0, 'stop_loss': 99.0, 'tp1': 101.0, 'tp2': 102.0,
+            'position_size': 1.0,
+            'status': 'OPEN' if is_open else 'CLOSED',
+            'opened_at': opened.strftime('%Y-%m-%d %H:%M:%S'),
+            'closed_at': None if is_open else closed.strftime('%Y-%m-%d %H:%M:%S'),
+            'exit_price': None if is_open else 100.0,
+            'pips': None if is_open else round(abs(pnl) / 3, 2),
+            'pnl': None if is_open else pnl,
+            'capital_before': capital,
+            'capital_after': None if is_open else capital + pnl,
+            'return_pct': None,
+            'signal_id': None,
+            'signal_tier': rng.choice(['A_PLUS', 'A_GRADE', 'B_GRADE', None]) if daily else None,
+            'is_daily_signal': daily,
+        })
+        if not is_open:
+            capital += pnl
+    with open(path, 'w') as f:
+        json.dump({'trades': trades, 'initial_capital': 1000, 'current_capital': capital}, f)
+
+
+def scan_statistics(trades, daily_signals_only=False, since=None):
+    """The previous full-scan implementation of TradeTracker.get_statistics"""
+    closed = [t for t in trades if t['status'] == 'CLOSED']
+    if daily_signals_only:
+        closed = [t for t in closed if t.get('is_daily_signal', False)]
+    if since is not None:
+        closed = [t for t in closed if t['closed_at'][:10] >= since.isoformat()]
+    wins = [t for t in closed if t['pnl'] > 0]
+    losses = [t for t in closed if t['pnl'] <= 0]
+    gross_loss = abs(sum(t['pnl'] for t in losses))
+    stats = {
+        'total_trades': len(closed),
+        'wins': len(wins),
+        'losses': len(losses),
+        'win_rate': round(len(wins) / len(closed) * 100, 2),
+        'total_pips': round(sum(t['pips'] for t in wins) - sum(t['pips'] for t in closed if t['pnl'] < 0), 2),
+        'total_pnl': round(sum(t['pnl'] for t in closed), 2),
+        'avg_win': round(sum(t['pnl'] for t in wins) / len(wins), 2),
+        'avg_loss': round(sum(t['pnl'] for t in losses) / len(losses), 2),
+        'profit_factor': round(sum(t['pnl'] for t in wins) / gross_loss, 2),
+    }
+    if daily_signals_only:
+        tiers = {}
+        for tier in ['A_PLUS', 'A_GRADE', 'B_GRADE']:
+            tier_trades = [t for t in closed if t.get('signal_tier') == tier]
+            if tier_trades:
+                tier_wins = len([t for t in tier_trades if t['pnl'] > 0])
+                tiers[tier] = {'count': len(tier_trades), 'wins': tier_wins,
+                               'win_rate': round(tier_wins / len(tier_trades) * 100, 2),
+                               'total_pnl': round(sum(t['pnl'] for t in tier_trades), 2)}
+        stats['tier_statistics'] = tiers
+    return stats
+
+
+@pytest.fixture
+def tracker(tmp_path):
+    path = tmp_path / 'trade_history.json'
+    make_history(path)
+    tracker = TradeTracker(str(path))
+    tracker.stats.clock = lambda: NOW
+    return tracker
+
+
+class TestTradeTrackerStatistics:
+    @pytest.mark.parametrize('daily_signals_only', [False, True])
+    @pytest.mark.parametrize('days', [None, 7, 30])
+    def test_matches_full_scan(self, tracker, daily_signals_only, days):
+        since = NOW.date() - timedelta(days=days - 1) if days else None
+        expected = scan_statistics(tracker.trades, daily_signals_only, since)
+        stats = tracker.get_statistics(daily_signals_only=daily_signals_only, days=days)
+
+        for key, value in expected.items():
+            if key == 'tier_statistics':
+                assert stats.get(key, {}) == value
+            else:
+                assert stats[key] == pytest.approx(value, abs=0.011), key
+
+    def test_add_and_close_update_running_totals(self, tmp_path):
+        tracker = TradeTracker(str(tmp_path / 'history.json'))
+        assert tracker.get_statistics()['total_trades'] == 0
+
+        first = tracker.add_trade('BTC', 'BUY', 100, 90, 110, 120, 1)
+        second = tracker.add_trade('GOLD', 'SELL', 2000, 2010, 1990, 1980, 1, is_daily_signal=True,
+                                   signal_tier='A_PLUS')
+        assert tracker.stats.summary().opened == 2
+
+        tracker.close_trade(first, 110)
+        tracker.close_trade(second, 2010)
+        stats = tracker.get_statistics()
+        assert (stats['wins'], stats['losses'], stats['total_pnl']) == (1, 1, 0)
+        assert stats['total_pips'] == pytest.approx(10 - 100)
+        assert tracker.get_statistics(daily_signals_only=True)['tier_statistics']['A_PLUS']['wins'] == 0
+        assert tracker.get_statistics(days=7)['total_trades'] == 2
+
+    def test_rebuild_reports_drift(self, tracker):
+        assert tracker.rebuild_statistics()['mismatches'] == []
+
+        # History edited behind the tracker's back
+        closed = next(t for t in tracker.trades if t['status'] == 'CLOSED')
+        closed['pnl'] += 1000
+        report = tracker.rebuild_statistics()
+        assert any('total_pnl' in line for line in report['mismatches'])
+        assert tracker.rebuild_statistics()['mismatches'] == []
+
+
+class TestPerformanceAnalytics:
+    def test_pair_breakdown_and_distribution(self, tracker):
+        analytics = PerformanceAnalytics(tracker)
+        closed = tracker.get_closed_trades()
+
+        pairs = analytics.get_win_rate_by_pair()
+        for asset in ['BTC', 'GOLD', 'EURUSD']:
+            trades = [t for t in closed if t['asset'] == asset]
+            assert pairs[asset]['total'] == len(trades)
+            assert pairs[asset]['wins'] == sum(t['pnl'] > 0 for t in trades)
+
+        dist = analytics.get_pnl_distribution()
+        best = max((t for t in closed if t['pnl'] > 0), key=lambda t: t['pnl'])
+        worst = min(closed, key=lambda t: t['pnl'])
+        assert (dist['biggest_win'], dist['biggest_win_pair']) == (best['pnl'], best['asset'])
+        assert (dist['biggest_loss'], dist['biggest_loss_pair']) == (worst['pnl'], worst['asset'])
+
+    def test_monthly_summary(self, tracker):
+        month = [t for t in tracker.get_closed_trades() if t['closed_at'].startswith('2025-05')]
+        summary = PerformanceAnalytics(tracker).get_monthly_summary(2025, 5)
+
+        first = min(month, key=lambda t: t['opened_at'])
+        net = sum(t['pnl'] for t in month)
+        assert summary['total_trades'] == len(month)
+        assert summary['net_pnl'] == pytest.approx(round(net, 2))
+        assert summary['roi'] == round(net / first['capital_before'] * 100, 1)
+        assert PerformanceAnalytics(tracker).get_monthly_summary(2024, 12) is None
+
+
+class TestSignalPerformanceTracker:
+    def test_win_rate_windows(self, tmp_path):
+        path = tmp_path / 'signals.json'
+        signals = []
+        for i in range(40):
+            day = NOW - timedelta(days=i)
+            signals.append({'signal_id': f'S{i}', 'symbol': 'BTC' if i % 2 else 'ES',
+                            'generated_at': day.isoformat(), 'status': 'CLOSED' if i % 5 else 'GENERATED',
+                            'win': i % 3 == 0 if i % 5 else None})
+        path.write_text(json.dumps(signals))
+
+        tracker = SignalPerformanceTracker(str(path))
+        tracker.stats.clock = lambda: NOW
+
+        week = tracker.calculate_win_rate(days=7)
+        assert (week['total_signals'], week['closed_signals']) == (7, 5)
+        assert week['wins'] == sum(1 for i in range(7) if i % 5 and i % 3 == 0)
+
+        btc = tracker.calculate_win_rate(symbol='BTC')
+        assert btc['closed_signals'] == sum(1 for i in range(1, 40, 2) if i % 5)
+
+    def test_outcome_logging(self, tmp_path):
+        tracker = SignalPerformanceTracker(str(tmp_path / 'signals.json'))
+        signal_id = tracker.log_signal_generated({'symbol': 'GOLD', 'direction': 'BUY', 'entry': 2000})
+        assert tracker.calculate_win_rate()['closed_signals'] == 0
+
+        tracker.log_signal_outcome(signal_id, 'WIN', 2010, 10)
+        assert tracker.calculate_win_rate(days=7)['wins'] == 1
+
+        # A corrected outcome replaces the first one rather than counting twice
+        tracker.log_signal_outcome(signal_id, 'LOSS', 1990, -10)
+        result = tracker.calculate_win_rate()
+        assert (result['wins'], result['losses']) == (0, 1)
+
+
+class TestAggregator:
+    def test_rollups_and_windows(self):
+        stats = TradeStatsAggregator(clock=lambda: NOW)
+        stats.record_close(date(2025, 6, 15), 10, user=1, asset='BTC')
+        stats.record_close(date(2025, 6, 1), -5, user=1, asset='GOLD')
+        stats.record_close(date(2025, 6, 15), 7, user=2, asset='BTC')
+
+        assert stats.summary(user=1).total_pnl == 5
+        assert stats.summary(user=1, days=7).trades == 1
+        assert stats.summary(asset='BTC').trades == 2
+        assert set(stats.breakdown('user', asset='BTC')) == {1, 2}
+        assert stats.summary(user=3).trades == 0
+        assert stats.daily(user=1) == [{'date': '2025-06-01', 'pnl': -5, 'trades': 1},
+                                       {'date': '2025-06-15', 'pnl': 10, 'trades': 1}]
+        assert ALL not in stats.breakdown('asset')
+
+
+class TestTradingExecutionEngine:
+    def test_summary_survives_a_restart(self, tmp_path, monkeypatch):
+        import trading_execution_engine
+        import user_management_service
+        from position_book import PositionBook
+
+        monkeypatch.setattr(user_management_service, '_DEFAULT_TRADES_PATH', str(tmp_path / 'trades.json'))
+        before = trading_execution_engine.TradingExecutionEngine(book=PositionBook())
+        for i, exit_price in enumerate([1.1010, 1.0990, 1.1020]):
+            trade = {'id': f't{i}', 'asset': 'EURUSD', 'direction': 'BUY', 'entry': 1.1000, 'position_size': 0.1}
+            assert user_management_service.record_user_trade(5, trade)
+            assert before.close_position_for_user(5, f't{i}', exit_price)['success']
+
+        # Trades closed before the restart come back from the recorded history
+        after = trading_execution_engine.TradingExecutionEngine(book=PositionBook())
+        restored, live = after.stats.summary(user=5), before.stats.summary(user=5)
+        assert (restored.trades, restored.wins, restored.opened) == (live.trades, live.wins, 3)
+        assert restored.total_pnl == pytest.approx(live.total_pnl)
+        overview = after.get_user_performance_summary(5)['overview']
+        assert (overview['total_trades'], overview['winning_trades']) == (3, 2)
+        assert overview['win_rate'] == pytest.approx(66.67, abs=0.01)
+        assert after.get_user_performance_summary(6)['overview']['total_trades'] == 0
+
+    def test_closes_use_the_recorded_time_and_count_once(self, tmp_path, monkeypatch):
+        import datetime as dt
+        import trading_execution_engine
+        import user_management_service
+        from position_book import PositionBook
+
+        class LateEvening(dt.datetime):
+            @classmethod
+            def utcnow(cls):
+                return dt.datetime(2025, 1, 1, 23, 30)
+
+        monkeypatch.setattr(user_management_service, '_DEFAULT_TRADES_PATH', str(tmp_path / 'trades.json'))
+        monkeypatch.setattr(user_management_service, 'datetime', LateEvening)
+        engine = trading_execution_engine.TradingExecutionEngine(book=PositionBook())
+        trade = {'id': 't1', 'asset': 'EURUSD', 'direction': 'BUY', 'entry': 1.1000, 'position_size': 0.1}
+        assert user_management_service.record_user_trade(5, trade)
+
+        assert engine.close_position_for_user(5, 't1', 1.1010)['success']
+        assert not engine.close_position_for_user(5, 't1', 1.1050)['success']   # e.g. a duplicate book event
+        assert user_management_service.get_trade_history(5)[0]['exit_price'] == 1.1010
+
+        new_year = dt.date(2025, 1, 1)
+        restarted = trading_execution_engine.TradingExecutionEngine(book=PositionBook())
+        for stats in (engine.stats, restarted.stats):
+            assert stats.summary(user=5).trades == 1
+            assert stats.summary(user=5, start=new_year, end=new_year).trades == 1
@@ -0,0 +1,269 @@
+"""
+Tests for the unified TTL/LRU cache and the callers moved onto it
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from unified_cache import TTLCache, cache_stats
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    """Dict-backed stand-in for the few redis-py calls the cache makes"""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+        self.ttls[key] = ttl
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def scan_iter(self, pattern):
+        import fnmatch
+        return [key for key in self.data if fnmatch.fnmatchcase(key, pattern)]
+
+
+class TestLimits:
+    def test_lru_eviction(self):
+        cache = TTLCache(maxsize=3)
+        for key in 'abc':
+            cache.set(key, key)
+        cache.get('a')
+        cache.set('d', 'd')
+
+        assert 'b' not in cache and all(key in cache for key in 'acd')
+        assert cache.stats.evictions == 1
+
+    def test_ttl_expiry(self):
+        clock = Clock()
+        cache = TTLCache(ttl=10, clock=clock)
+        cache.set('short', 1, ttl=1)
+        cache.set('default', 2)
+        clock.now += 5
+
+        assert cache.get('short') is None
+        assert cache.get('default') == 2
+        clock.now += 6
+        assert cache.get('default', 'gone') == 'gone'
+        assert (cache.stats.expirations, cache.stats.hits, cache.stats.misses) == (2, 1, 2)
+
+    def test_expired_entries_go_before_live_ones(self):
+        clock = Clock()
+        cache = TTLCache(maxsize=2, clock=clock)
+        cache.set('old', 1, ttl=1)
+        cache.set('live', 2)
+        clock.now += 2
+        cache.set('new', 3)
+
+        assert 'live' in cache and 'new' in cache
+        assert (cache.stats.expirations, cache.stats.evictions) == (1, 0)
+
+    def test_byte_budget(self):
+        cache = TTLCache(maxsize=None, max_bytes=1000, sizeof=len)
+        for i in range(5):
+            cache.set(i, b'x' * 300)
+        assert len(cache) == 3 and cache.bytes == 900
+
+        cache.set('huge', b'x' * 2000)
+        assert 'huge' not in cache and len(cache) == 3
+
+        cache.set(4, b'x' * 10)
+        assert cache.bytes == 610
+
+    def test_oversized_value_replaces_the_old_one(self):
+        redis = FakeRedis()
+        cache = TTLCache(name='sized', maxsize=None, max_bytes=1000, sizeof=len, redis_client=redis)
+        cache.set('k', 'small')
+        cache.set('k', 'x' * 5000)
+
+        assert cache.get('k') is None
+        assert 'k' not in cache and cache.bytes == 0 and 'cache:sized:k' not in redis.data
+
+    def test_invalidate_pattern(self):
+        cache = TTLCache()
+        for key in ['signal_btc', 'signal_gold', 'news_btc']:
+            cache.set(key, 1)
+        assert cache.invalidate_pattern('signal_*') == 2
+        assert len(cache) == 1
+
+
+class TestSingleFlight:
+    def test_concurrent_misses_share_one_load(self):
+        cache = TTLCache()
+        calls = []
+
+        def load():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('k', load)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == ['value'] * 8 and len(calls) == 1
+        assert cache.stats.loads == 1 and cache.stats.coalesced == 7
+        assert cache.get_or_compute('k', load) == 'value' and len(calls) == 1
+
+    def test_errors_reach_waiters_and_are_not_cached(self):
+        cache = TTLCache()
+        barrier = threading.Event()
+
+        def fail():
+            barrier.wait(1)
+            raise ValueError('feed down')
+
+        errors = []
+
+        def call():
+            try:
+                cache.get_or_compute('k', fail)
+            except ValueError as e:
+                errors.append(str(e))
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        barrier.set()
+        for thread in threads:
+            thread.join()
+
+        assert errors == ['feed down'] * 3
+        assert cache.get_or_compute('k', lambda: 'recovered') == 'recovered'
+
+    def test_cache_if_skips_empty_results(self):
+        cache = TTLCache()
+        assert cache.get_or_compute('k', lambda: {}, cache_if=bool) == {}
+        assert 'k' not in cache
+
+    def test_async_single_flight(self):
+        cache = TTLCache()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 42
+
+        async def main():
+            return await asyncio.gather(*(cache.aget_or_compute('k', load) for _ in range(10)))
+
+        assert asyncio.run(main()) == [42] * 10
+        assert len(calls) == 1 and cache.stats.coalesced == 9
+
+
+class TestRedisTier:
+    def test_read_through_and_write_through(self):
+        redis = FakeRedis()
+        writer = TTLCache(name='shared', ttl=60, redis_client=redis)
+        writer.set('analysis', {'btc': 1})
+        assert redis.ttls == {'cache:shared:analysis': 60}
+
+        reader = TTLCache(name='shared', ttl=60, redis_client=redis)
+        assert reader.get('analysis') == {'btc': 1}
+        assert reader.stats.redis_hits == 1
+        assert reader.get('analysis') == {'btc': 1} and reader.stats.redis_hits == 1
+
+        assert reader.delete('analysis') and 'cache:shared:analysis' not in redis.data
+
+    def test_redis_errors_fall_back_to_memory(self):
+        class BrokenRedis(FakeRedis):
+            def get(self, key):
+                raise ConnectionError('down')
+
+            def setex(self, key, ttl, value):
+                raise ConnectionError('down')
+
+        cache = TTLCache(ttl=60, redis_client=BrokenRedis())
+        cache.set('k', 1)
+        assert cache.get('k') == 1
+        assert cache.get('missing') is None
+        assert cache.stats.redis_errors == 2
+
+
+def test_stats_are_summed_per_name():
+    first, second = TTLCache(name='stats_test'), TTLCache(name='stats_test')
+    first.set('a', 1)
+    first.get('a')
+    second.get('a')
+    stats = cache_stats()['stats_test']
+    assert (stats['instances'], stats['hits'], stats['misses'], stats['entries']) == (2, 1, 1, 1)
+    assert stats['hit_rate'] == 0.5
+
+
+class TestCallers:
+    def test_signal_api_runs_generators_once_for_concurrent_callers(self, monkeypatch):
+        from signal_api import UltimateSignalAPI
+
+        api = UltimateSignalAPI()
+        runs = []
+
+        def run_generator(script):
+            runs.append(script)
+            time.sleep(0.2)
+            return None
+
+        monkeypatch.setattr(api, 'run_generator', run_generator)
+        monkeypatch.setattr(api, 'get_order_book_data', lambda symbol: None)
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(api.get_complete_analysis()))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(runs) == 2 and len(results) == 5
+        assert all(result is results[0] for result in results)
+        api.get_complete_analysis(use_cache=False)
+        assert len(runs) == 4
+
+    def test_advanced_cache_zero_ttl_means_default(self):
+        from quantum_elite_signal_integration import AdvancedCache
+
+        clock = Clock()
+        cache = AdvancedCache(redis_url=None, ttl_seconds=300)
+        cache.cache.clock = clock
+        cache.set('signal', {'score': 18}, custom_ttl=0)
+        clock.now += 299
+        assert cache.get('signal') == {'score': 18}
+        assert cache.get_or_compute('other', lambda: 1, custom_ttl=0) == 1
+        assert cache.get_or_compute('other', lambda: 2) == 1
+
+    def test_cache_manager(self):
+        from performance_optimizer import CacheManager
+
+        manager = CacheManager(max_entries=2)
+        assert manager.get_cached_result('double', lambda x: x * 2, 4) == 8
+        assert manager.get_cached_result('double', lambda x: x * 3, 4) == 8
+        for key in 'abc':
+            manager.set(key, key)
+        assert manager.get('a') is None
+        assert manager.get_cache_hit_rate() == pytest.approx(1 / 3)
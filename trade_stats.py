@@ -0,0 +1,293 @@
+"""
+Trade Statistics Aggregator
+Running per-user trade statistics, updated as trades open and close
+
+Every closed trade is added to a small set of running buckets keyed by
+(user, asset, tier, source), each with a per-day breakdown. Totals are a dict
+lookup and rolling 7/30-day windows merge at most that many day buckets, so
+summaries no longer rescan the trade history. Any dimension can be queried as
+ALL. Buckets only ever grow; rebuild from the stored history (see main()) to
+check the running figures or after editing history by hand.
+"""
+
+import argparse
+import logging
+from dataclasses import dataclass, field, asdict
+from datetime import date, datetime, timedelta
+from itertools import product
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Wildcard for a dimension in queries
+ALL = '*'
+DIMENSIONS = ('user', 'asset', 'tier', 'source')
+WINDOWS = (7, 30)
+
+
+def to_day(value) -> date:
+    """Calendar day of a date, datetime or ISO-style timestamp string"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+@dataclass
+class StatsBucket:
+    """Running totals for one slice of trades"""
+    opened: int = 0
+    trades: int = 0
+    wins: int = 0
+    losses: int = 0
+    net_pips: float = 0.0
+    total_pnl: float = 0.0
+    gross_profit: float = 0.0      # Sum of winning P&L
+    loss_pnl: float = 0.0          # Sum of losing P&L (zero or negative)
+    biggest_win: Optional[float] = None
+    biggest_win_asset: Optional[str] = None
+    biggest_loss: Optional[float] = None
+    biggest_loss_asset: Optional[str] = None
+    first_opened_at: Optional[str] = None
+    first_capital_before: Optional[float] = None
+
+    def record(self, pnl: float, pips: float, won: bool, asset: Optional[str] = None,
+               opened_at: Optional[str] = None, capital_before: Optional[float] = None):
+        self.trades += 1
+        self.net_pips += pips
+        self.total_pnl += pnl
+        if won:
+            self.wins += 1
+            self.gross_profit += pnl
+            if self.biggest_win is None or pnl > self.biggest_win:
+                self.biggest_win, self.biggest_win_asset = pnl, asset
+        else:
+            self.losses += 1
+            self.loss_pnl += pnl
+            if self.biggest_loss is None or pnl < self.biggest_loss:
+                self.biggest_loss, self.biggest_loss_asset = pnl, asset
+        if opened_at is not None and (self.first_opened_at is None or opened_at < self.first_opened_at):
+            self.first_opened_at, self.first_capital_before = opened_at, capital_before
+
+    def merge(self, other: 'StatsBucket') -> 'StatsBucket':
+        """Add another bucket's trades into this one"""
+        self.opened += other.opened
+        self.trades += other.trades
+        self.wins += other.wins
+        self.losses += other.losses
+        self.net_pips += other.net_pips
+        self.total_pnl += other.total_pnl
+        self.gross_profit += other.gross_profit
+        self.loss_pnl += other.loss_pnl
+        if other.biggest_win is not None and (self.biggest_win is None or other.biggest_win > self.biggest_win):
+            self.biggest_win, self.biggest_win_asset = other.biggest_win, other.biggest_win_asset
+        if other.biggest_loss is not None and (self.biggest_loss is None or other.biggest_loss < self.biggest_loss):
+            self.biggest_loss, self.biggest_loss_asset = other.biggest_loss, other.biggest_loss_asset
+        if other.first_opened_at is not None and (self.first_opened_at is None
+                                                  or other.first_opened_at < self.first_opened_at):
+            self.first_opened_at, self.first_capital_before = other.first_opened_at, other.first_capital_before
+        return self
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.trades * 100 if self.trades else 0.0
+
+    @property
+    def avg_win(self) -> float:
+        return self.gross_profit / self.wins if self.wins else 0.0
+
+    @property
+    def avg_loss(self) -> float:
+        return self.loss_pnl / self.losses if self.losses else 0.0
+
+    @property
+    def gross_loss(self) -> float:
+        return abs(self.loss_pnl)
+
+    @property
+    def profit_factor(self) -> float:
+        return self.gross_profit / self.gross_loss if self.gross_loss > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data.update(win_rate=round(self.win_rate, 2), avg_win=round(self.avg_win, 2),
+                    avg_loss=round(self.avg_loss, 2), profit_factor=round(self.profit_factor, 2))
+        return data
+
+
+@dataclass
+class _Series:
+    """All-time bucket plus one bucket per day for one key"""
+    total: StatsBucket = field(default_factory=StatsBucket)
+    days: Dict[date, StatsBucket] = field(default_factory=dict)
+
+    def day(self, day: date) -> StatsBucket:
+        bucket = self.days.get(day)
+        if bucket is None:
+            bucket = self.days[day] = StatsBucket()
+        return bucket
+
+
+class TradeStatsAggregator:
+    """Running trade statistics by user, asset, tier and source, with per-day buckets"""
+
+    def __init__(self, clock: Callable[[], datetime] = datetime.now):
+        """
+        Args:
+            clock: Returns the current time; rolling windows end on its date
+        """
+        self.clock = clock
+        self._series: Dict[Tuple, _Series] = {}
+        self._values: Dict[str, Dict] = {dimension: {} for dimension in DIMENSIONS}
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def clear(self):
+        self._series.clear()
+        for values in self._values.values():
+            values.clear()
+
+    def _rollups(self, key: Tuple) -> Iterable[_Series]:
+        """The series for every combination of the key's values and ALL (16 for four dimensions)"""
+        for dimension, value in zip(DIMENSIONS, key):
+            self._values[dimension].setdefault(value, None)
+        for mask in product((False, True), repeat=len(key)):
+            rollup = tuple(ALL if wildcard else value for wildcard, value in zip(mask, key))
+            series = self._series.get(rollup)
+            if series is None:
+                series = self._series[rollup] = _Series()
+            yield series
+
+    def record_open(self, day, user=None, asset=None, tier=None, source=None):
+        """Count a newly opened trade (or generated signal) on ``day``"""
+        day = to_day(day)
+        for series in self._rollups((user, asset, tier, source)):
+            series.total.opened += 1
+            series.day(day).opened += 1
+
+    def record_close(self, day, pnl: float, pips: float = 0.0, won: Optional[bool] = None,
+                     user=None, asset=None, tier=None, source=None,
+                     opened_at: Optional[str] = None, capital_before: Optional[float] = None):
+        """
+        Add a closed trade to every bucket it belongs to
+
+        Args:
+            day: Day the result is attributed to (usually the close time)
+            pnl: Realized P&L
+            pips: Signed pips (negative for losers)
+            won: Whether the trade counts as a win (default pnl > 0)
+        """
+        day = to_day(day)
+        won = pnl > 0 if won is None else won
+        for series in self._rollups((user, asset, tier, source)):
+            series.total.record(pnl, pips, won, asset, opened_at, capital_before)
+            series.day(day).record(pnl, pips, won, asset, opened_at, capital_before)
+
+    def _window(self, days: Optional[int], start: Optional[date], end: Optional[date]):
+        if days is not None:
+            end = self.clock().date()
+            return end - timedelta(days=days - 1), end
+        return start, end
+
+    def summary(self, user=ALL, asset=ALL, tier=ALL, source=ALL, days: Optional[int] = None,
+                start: Optional[date] = None, end: Optional[date] = None) -> StatsBucket:
+        """
+        Statistics for one slice
+
+        Args:
+            days: Rolling window of this many calendar days ending today
+            start/end: Inclusive day range (instead of ``days``)
+        """
+        series = self._series.get((user, asset, tier, source))
+        if series is None:
+            return StatsBucket()
+        start, end = self._window(days, start, end)
+        if start is None and end is None:
+            return StatsBucket().merge(series.total)
+
+        bucket = StatsBucket()
+        if start is None or end is None or (end - start).days + 1 > len(series.days):
+            # Open-ended or wider than the active days: walk the days that exist
+            for day, day_bucket in series.days.items():
+                if (start is None or day >= start) and (end is None or day <= end):
+                    bucket.merge(day_bucket)
+            return bucket
+        day = start
+        while day <= end:
+            day_bucket = series.days.get(day)
+            if day_bucket is not None:
+                bucket.merge(day_bucket)
+            day += timedelta(days=1)
+        return bucket
+
+    def breakdown(self, dimension: str, days: Optional[int] = None, start: Optional[date] = None,
+                  end: Optional[date] = None, **filters) -> Dict:
+        """{value: StatsBucket} for each value of ``dimension`` with closed trades, e.g. per asset"""
+        index = DIMENSIONS.index(dimension)
+        key = [filters.get(name, ALL) for name in DIMENSIONS]
+        results = {}
+        for value in self._values[dimension]:
+            key[index] = value
+            bucket = self.summary(*key, days=days, start=start, end=end)
+            if bucket.trades:
+                results[value] = bucket
+        return results
+
+    def daily(self, user=ALL, asset=ALL, tier=ALL, source=ALL, days: int = 30) -> List[Dict]:
+        """[{'date', 'pnl', 'trades'}] for each day with closed trades in the last ``days`` days"""
+        series = self._series.get((user, asset, tier, source))
+        if series is None:
+            return []
+        start, end = self._window(days, None, None)
+        return [{'date': day.isoformat(), 'pnl': bucket.total_pnl, 'trades': bucket.trades}
+                for day, bucket in sorted(series.days.items())
+                if start <= day <= end and bucket.trades]
+
+    def compare(self, other: 'TradeStatsAggregator', tolerance: float = 1e-6) -> List[str]:
+        """Keys whose all-time totals differ between two aggregators (empty when consistent)"""
+        mismatches = []
+        for key in set(self._series) | set(other._series):
+            mine = self._series.get(key, _Series()).total
+            theirs = other._series.get(key, _Series()).total
+            for name, value in asdict(mine).items():
+                expected = getattr(theirs, name)
+                if isinstance(value, float) and isinstance(expected, float):
+                    if abs(value - expected) > tolerance:
+                        mismatches.append(f"{key}: {name} {value} != {expected}")
+                elif value != expected:
+                    mismatches.append(f"{key}: {name} {value} != {expected}")
+        return sorted(mismatches)
+
+
+def main():
+    """Rebuild statistics from stored history and print the rolling windows"""
+    parser = argparse.ArgumentParser(description="Rebuild trade statistics from history")
+    parser.add_argument('--trades', default='trade_history.json', help="TradeTracker data file")
+    parser.add_argument('--signals', default='signal_performance.json', help="SignalPerformanceTracker file")
+    args = parser.parse_args()
+
+    from trade_tracker import TradeTracker
+    from signal_performance_tracker import SignalPerformanceTracker
+
+    print("=" * 60)
+    print("TRADE STATISTICS REBUILD")
+    print("=" * 60)
+
+    for name, owner in (('Trades', TradeTracker(args.trades)),
+                        ('Signals', SignalPerformanceTracker(args.signals))):
+        report = owner.rebuild_statistics()
+        print(f"\n{name}: {report['series']} series, {len(report['mismatches'])} mismatches")
+        for line in report['mismatches'][:20]:
+            print(f"  {line}")
+        for days in (None,) + WINDOWS:
+            stats = owner.stats.summary(days=days)
+            label = f"{days}d" if days else "all"
+            print(f"  {label:>4}: {stats.trades} closed, {stats.win_rate:.1f}% win rate, P&L {stats.total_pnl:,.2f}")
+
+    print("\n" + "=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,15 +6,24 @@ import json
 import os
 from datetime import datetime
 
+from trade_stats import ALL, TradeStatsAggregator
+
 
 class TradeTracker:
     """Track trading performance with pip calculations"""
     
-    def __init__(self, data_file="trade_history.json"):
+    def __init__(self, data_file="trade_history.json", user_id=None):
+        """
+        Args:
+            data_file: JSON file holding the trade history
+            user_id: Key this tracker's trades are aggregated under
+        """
         self.data_file = data_file
         self.trades = []
         self.initial_capital = 1000  # Default starting capital
         self.current_capital = 1000
+        self.user_id = user_id
+        self.stats = TradeStatsAggregator()
         self.load_data()
     
     def load_data(self):
@@ -28,6 +37,8 @@ class TradeTracker:
                     self.current_capital = data.get('current_capital', 1000)
             except:
                 pass
+        self.stats.clear()
+        self._load_statistics(self.stats)
     
     def save_data(self):
         """Save trade history to file"""
@@ -107,6 +118,7 @@ class TradeTracker:
         
         self.trades.append(trade)
         self.save_data()
+        self.stats.record_open(trade['opened_at'], **self._stats_key(trade))
         return trade['id']
     
     def close_trade(self, trade_id, exit_price, exit_type="TP"):
@@ -147,6 +159,7 @@ class TradeTracker:
         
         self.current_capital = new_capital
         self.save_data()
+        self._record_close(self.stats, trade)
         
         # If this is a daily signal, update the daily signals system
         if trade.get('is_daily_signal') and trade.get('signal_id'):
@@ -160,6 +173,42 @@ class TradeTracker:
         
         return trade
     
+    def _stats_key(self, trade):
+        """Aggregator dimensions of a trade"""
+        return {
+            'user': self.user_id,
+            'asset': trade['asset'],
+            'tier': trade.get('signal_tier'),
+            'source': 'daily' if trade.get('is_daily_signal', False) else 'manual',
+        }
+    
+    def _record_close(self, stats, trade):
+        """Add a closed trade to the aggregator"""
+        pnl = trade['pnl']
+        pips = trade['pips'] if pnl > 0 else -trade['pips'] if pnl < 0 else 0.0
+        stats.record_close(trade['closed_at'], pnl, pips, won=pnl > 0,
+                           opened_at=trade['opened_at'], capital_before=trade['capital_before'],
+                           **self._stats_key(trade))
+    
+    def _load_statistics(self, stats):
+        """Feed the whole trade history into an aggregator"""
+        for trade in self.trades:
+            stats.record_open(trade['opened_at'], **self._stats_key(trade))
+            if trade['status'] == 'CLOSED':
+                self._record_close(stats, trade)
+    
+    def rebuild_statistics(self):
+        """Recompute the running statistics from the trade history and report any drift
+        
+        Returns:
+            {'series': count, 'mismatches': [...]}; the rebuilt figures replace the running ones
+        """
+        fresh = TradeStatsAggregator(clock=self.stats.clock)
+        self._load_statistics(fresh)
+        mismatches = self.stats.compare(fresh)
+        self.stats = fresh
+        return {'series': len(fresh), 'mismatches': mismatches}
+    
     def get_open_trades(self):
         """Get all open trades"""
         return [t for t in self.trades if t['status'] == 'OPEN']
@@ -168,19 +217,17 @@ class TradeTracker:
         """Get all closed trades"""
         return [t for t in self.trades if t['status'] == 'CLOSED']
     
-    def get_statistics(self, daily_signals_only=False):
+    def get_statistics(self, daily_signals_only=False, days=None):
         """Get trading statistics
         
         Args:
             daily_signals_only: If True, only include trades from daily signals system
+            days: Only include trades closed in the last N calendar days (e.g. 7 or 30)
         """
-        closed = self.get_closed_trades()
-        
-        # Filter for daily signals if requested
-        if daily_signals_only:
-            closed = [t for t in closed if t.get('is_daily_signal', False)]
+        source = 'daily' if daily_signals_only else ALL
+        summary = self.stats.summary(user=self.user_id, source=source, days=days)
         
-        if not closed:
+        if not summary.trades:
             return {
                 'total_trades': 0,
                 'wins': 0,
@@ -198,19 +245,6 @@ class TradeTracker:
                 'daily_signals_only': daily_signals_only
             }
         
-        wins = [t for t in closed if t['pnl'] > 0]
-        losses = [t for t in closed if t['pnl'] <= 0]
-        
-        total_pips = sum(t['pips'] for t in closed if t['pnl'] > 0) - sum(t['pips'] for t in closed if t['pnl'] < 0)
-        total_pnl = sum(t['pnl'] for t in closed)
-        
-        avg_win = sum(t['pnl'] for t in wins) / len(wins) if wins else 0
-        avg_loss = sum(t['pnl'] for t in losses) / len(losses) if losses else 0
-        
-        gross_profit = sum(t['pnl'] for t in wins)
-        gross_loss = abs(sum(t['pnl'] for t in losses))
-        profit_factor = gross_profit / gross_loss if gross_loss > 0 else 0
-        
         total_return = self.current_capital - self.initial_capital
         total_return_pct = (total_return / self.initial_capital) * 100
         
@@ -218,27 +252,25 @@ class TradeTracker:
         tier_stats = {}
         if daily_signals_only:
             for tier in ['A_PLUS', 'A_GRADE', 'B_GRADE']:
-                tier_trades = [t for t in closed if t.get('signal_tier') == tier]
-                if tier_trades:
-                    tier_wins = len([t for t in tier_trades if t['pnl'] > 0])
-                    tier_pnl = sum(t['pnl'] for t in tier_trades)
+                tier_summary = self.stats.summary(user=self.user_id, tier=tier, source='daily', days=days)
+                if tier_summary.trades:
                     tier_stats[tier] = {
-                        'count': len(tier_trades),
-                        'wins': tier_wins,
-                        'win_rate': round((tier_wins / len(tier_trades)) * 100, 2),
-                        'total_pnl': round(tier_pnl, 2)
+                        'count': tier_summary.trades,
+                        'wins': tier_summary.wins,
+                        'win_rate': round(tier_summary.win_rate, 2),
+                        'total_pnl': round(tier_summary.total_pnl, 2)
                     }
         
         stats = {
-            'total_trades': len(closed),
-            'wins': len(wins),
-            'losses': len(losses),
-            'win_rate': round((len(wins) / len(closed)) * 100, 2) if closed else 0,
-            'total_pips': round(total_pips, 2),
-            'total_pnl': round(total_pnl, 2),
-            'avg_win': round(avg_win, 2),
-            'avg_loss': round(avg_loss, 2),
-            'profit_factor': round(profit_factor, 2),
+            'total_trades': summary.trades,
+            'wins': summary.wins,
+            'losses': summary.losses,
+            'win_rate': round(summary.win_rate, 2),
+            'total_pips': round(summary.net_pips, 2),
+            'total_pnl': round(summary.total_pnl, 2),
+            'avg_win': round(summary.avg_win, 2),
+            'avg_loss': round(summary.avg_loss, 2),
+            'profit_factor': round(summary.profit_factor, 2),
             'initial_capital': self.initial_capital,
             'current_capital': round(self.current_capital, 2),
             'total_return': round(total_return, 2),
@@ -246,6 +278,8 @@ class TradeTracker:
             'daily_signals_only': daily_signals_only
         }
         
+        if days is not None:
+            stats['days'] = days
         if tier_stats:
             stats['tier_statistics'] = tier_stats
         
@@ -10,8 +10,10 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 from enum import Enum
 from database import TradeDirection
-from user_management_service import record_user_trade, close_user_trade, get_user_portfolio_data
+from user_management_service import record_user_trade, close_user_trade, get_user_portfolio_data, get_trade_history
 from quantum_elite_signal_integration import enhance_signal_with_quantum_elite
+from trade_stats import TradeStatsAggregator
+from position_book import PositionBook, PositionEvent, get_position_book
 
 logger = logging.getLogger(__name__)
 
@@ -21,12 +23,36 @@ class TradeStatus(Enum):
     CLOSED = "closed"
     CANCELLED = "cancelled"
 
+# Position book source tag and P&L per unit of price move per unit of size
+BOOK_SOURCE = 'engine'
+FOREX_MULTIPLIER = 100000
+
 class TradingExecutionEngine:
     """Engine for executing trades based on signals and tracking performance"""
 
-    def __init__(self):
+    def __init__(self, book: Optional[PositionBook] = None, trade_history: Optional[List[Dict]] = None):
         self.active_trades = {}  # telegram_id -> list of active trade IDs
         self.pending_signals = {}  # telegram_id -> list of pending signals
+        self.stats = TradeStatsAggregator()  # Running results of every recorded trade, seeded from history
+        self.book = book if book is not None else get_position_book()  # Open positions, marked to market for all users at once
+        self.book.subscribe(self._on_position_closed)
+        self._seed_stats(get_trade_history() if trade_history is None else trade_history)
+
+    def _seed_stats(self, trades: List[Dict]):
+        """Replay recorded trades into the stats so results survive a restart"""
+        seeded = 0
+        for trade in trades:
+            try:
+                user = int(trade['telegram_id'])
+                self.stats.record_open(trade.get('timestamp') or datetime.now(), user=user, asset=trade.get('asset'))
+                if trade.get('closed_at') and trade.get('exit_price') is not None:
+                    self.stats.record_close(trade['closed_at'], self._calculate_pnl(trade, float(trade['exit_price'])),
+                                            user=user, asset=trade.get('asset'))
+                    seeded += 1
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f"Skipping unreadable trade record {trade.get('id')}: {e}")
+        if seeded:
+            logger.info(f"Seeded performance stats with {seeded} closed trades")
 
     def execute_signal_for_user(self, telegram_id: int, signal: Dict, risk_amount: float = None) -> Dict[str, Any]:
         """Execute a trading signal for a user"""
@@ -53,7 +79,8 @@ class TradingExecutionEngine:
                 'tp1': enhanced_signal.get('tp1'),
                 'tp2': enhanced_signal.get('tp2'),
                 'position_size': position_size,
-                'is_open': True
+                'is_open': True,
+                'id': f"{telegram_id}_{int(datetime.now().timestamp() * 1000000)}"
             }
 
             # Record the trade
@@ -63,7 +90,9 @@ class TradingExecutionEngine:
                 # Add to active trades
                 if telegram_id not in self.active_trades:
                     self.active_trades[telegram_id] = []
-                # Note: We'd need to get the trade ID back from record_user_trade
+                self.active_trades[telegram_id].append(trade_data['id'])
+                self._track(telegram_id, trade_data)
+                self.stats.record_open(datetime.utcnow(), user=telegram_id, asset=trade_data['asset'])  # UTC, as recorded
 
                 return {
                     'success': True,
@@ -87,12 +116,26 @@ class TradingExecutionEngine:
             }
 
     def close_position_for_user(self, telegram_id: int, trade_id: int, exit_price: float,
-                               exit_type: str = 'MANUAL') -> Dict[str, Any]:
-        """Close an open position for a user"""
+                               exit_type: str = 'MANUAL', trade: Optional[Dict] = None) -> Dict[str, Any]:
+        """Close an open position for a user (the trade record is looked up in history if not passed)
+
+        Already closed trades are not closed (or counted) again, and the close
+        is counted on the record's UTC closed_at, as _seed_stats replays it.
+        """
         try:
             success = close_user_trade(trade_id, exit_price, exit_type)
 
             if success:
+                self.book.close(BOOK_SOURCE, telegram_id, trade_id)
+                record = next((t for t in reversed(get_trade_history(telegram_id))
+                               if str(t.get('id')) == str(trade_id) and t.get('closed_at')), None)
+                if trade is None:
+                    trade = record
+                if trade is not None:
+                    closed_at = record['closed_at'] if record is not None else datetime.utcnow()
+                    self.stats.record_close(closed_at, self._calculate_pnl(trade, exit_price),
+                                            user=telegram_id, asset=trade.get('asset'))
+
                 # Remove from active trades
                 if telegram_id in self.active_trades:
                     if trade_id in self.active_trades[telegram_id]:
@@ -126,58 +169,68 @@ class TradingExecutionEngine:
             logger.error(f"Error getting active trades for user {telegram_id}: {e}")
             return []
 
+    def _track(self, telegram_id: int, trade: Dict):
+        """Put an open trade in the position book"""
+        self.book.open(BOOK_SOURCE, telegram_id, trade['id'], trade['asset'], trade['direction'],
+                       trade['entry'], trade.get('position_size', 0), stop_loss=trade.get('stop_loss'),
+                       take_profit=trade.get('tp1'), multiplier=FOREX_MULTIPLIER, trade=trade)
+
+    def _on_position_closed(self, event: PositionEvent):
+        """Book callback: a price update crossed a trade's SL or TP"""
+        if event.source != BOOK_SOURCE:
+            return
+        self.close_position_for_user(event.user_id, event.position_id, event.exit_price, event.exit_type,
+                                     event.info.get('trade'))
+
+    def mark_to_market(self, prices: Dict[str, float]) -> List[PositionEvent]:
+        """Mark every user's open positions to the given prices; returns positions closed at SL/TP"""
+        return self.book.update_prices(prices)
+
     def simulate_market_movement(self, telegram_id: int) -> Dict[str, Any]:
-        """Simulate market movement and update positions (for demo purposes)"""
+        """Simulate market movement and update positions (for demo purposes)
+
+        Simulated prices are applied to a private copy of this user's rows, so
+        other users' positions in the shared book never see them. Trades the
+        simulation stops out or takes profit on are closed for real.
+        """
         try:
-            active_trades = self.get_user_active_trades(telegram_id)
-
-            updates = []
-            for trade in active_trades:
-                # Simulate price movement (±0.1% to ±2%)
-                import random
-                price_change_pct = random.uniform(-0.02, 0.02)
-                current_price = trade['entry'] * (1 + price_change_pct)
-
-                # Check if stop loss or take profit hit
-                should_close = False
-                exit_type = 'MANUAL'
-
-                if trade.get('stop_loss'):
-                    if trade['direction'] == 'BUY' and current_price <= trade['stop_loss']:
-                        should_close = True
-                        exit_type = 'SL'
-                        current_price = trade['stop_loss']
-                    elif trade['direction'] == 'SELL' and current_price >= trade['stop_loss']:
-                        should_close = True
-                        exit_type = 'SL'
-                        current_price = trade['stop_loss']
-
-                if trade.get('tp1'):
-                    if trade['direction'] == 'BUY' and current_price >= trade['tp1']:
-                        should_close = True
-                        exit_type = 'TP1'
-                        current_price = trade['tp1']
-                    elif trade['direction'] == 'SELL' and current_price <= trade['tp1']:
-                        should_close = True
-                        exit_type = 'TP1'
-                        current_price = trade['tp1']
-
-                if should_close:
-                    result = self.close_position_for_user(telegram_id, trade['id'], current_price, exit_type)
-                    updates.append({
-                        'trade_id': trade['id'],
-                        'action': 'closed',
-                        'exit_price': current_price,
-                        'exit_type': exit_type,
-                        'result': result
-                    })
-                else:
-                    updates.append({
-                        'trade_id': trade['id'],
-                        'action': 'updated',
-                        'current_price': current_price,
-                        'pnl': self._calculate_pnl(trade, current_price)
-                    })
+            import random
+
+            for trade in self.get_user_active_trades(telegram_id):
+                if 'id' in trade and (BOOK_SOURCE, telegram_id, trade['id']) not in self.book:
+                    self._track(telegram_id, trade)
+
+            # Simulate price movement (±0.1% to ±2%) on a private book holding only this user's trades
+            simulation = PositionBook()
+            prices = {}
+            for position in self.book.positions(telegram_id, source=BOOK_SOURCE):
+                symbol = position['symbol']
+                simulation.open(BOOK_SOURCE, telegram_id, position['id'], symbol, position['direction'],
+                                position['entry'], position['size'], stop_loss=position['stop_loss'],
+                                take_profit=position['take_profit'], multiplier=position['multiplier'],
+                                trade=position.get('trade'))
+                if symbol not in prices:
+                    reference = self.book.last_prices.get(symbol, position['entry'])
+                    prices[symbol] = reference * (1 + random.uniform(-0.02, 0.02))
+
+            events = simulation.update_prices(prices)
+            for event in events:
+                self.close_position_for_user(telegram_id, event.position_id, event.exit_price, event.exit_type,
+                                             event.info.get('trade'))
+
+            updates = [{
+                'trade_id': event.position_id,
+                'action': 'closed',
+                'exit_price': event.exit_price,
+                'exit_type': event.exit_type,
+                'pnl': event.pnl
+            } for event in events]
+            updates.extend({
+                'trade_id': position['id'],
+                'action': 'updated',
+                'current_price': position['current_price'],
+                'pnl': position['pnl']
+            } for position in simulation.positions(telegram_id, source=BOOK_SOURCE))
 
             return {
                 'success': True,
@@ -269,6 +322,11 @@ class TradingExecutionEngine:
             active_positions = portfolio_data.get('active_positions', [])
             recent_trades = portfolio_data.get('recent_trades', [])
 
+            # Open positions come marked to market from the position book when it has them
+            booked = self.book.positions(telegram_id, source=BOOK_SOURCE)
+            if booked:
+                active_positions = booked
+
             # Calculate additional metrics
             total_trades = performance.get('total_trades', 0)
             winning_trades = performance.get('winning_trades', 0)
@@ -277,33 +335,53 @@ class TradingExecutionEngine:
             # Risk metrics
             max_drawdown = performance.get('max_drawdown', 0)
             profit_factor = performance.get('profit_factor', 0)
+            avg_win = performance.get('avg_win', 0)
+            avg_loss = performance.get('avg_loss', 0)
+            largest_win = max([t.get('pnl', 0) for t in recent_trades if t.get('pnl', 0) > 0] or [0])
+            largest_loss = min([t.get('pnl', 0) for t in recent_trades if t.get('pnl', 0) < 0] or [0])
+            daily_pnl = None
+
+            # Prefer the running stats of recorded trades (seeded from history at startup)
+            tracked = self.stats.summary(user=telegram_id)
+            if tracked.trades:
+                total_trades = tracked.trades
+                winning_trades = tracked.wins
+                win_rate = round(tracked.win_rate, 2)
+                profit_factor = round(tracked.profit_factor, 2)
+                avg_win = round(tracked.avg_win, 2)
+                avg_loss = round(tracked.avg_loss, 2)
+                largest_win = max(tracked.biggest_win or 0, 0)
+                largest_loss = min(tracked.biggest_loss or 0, 0)
+                daily_pnl = [{'date': d['date'], 'pnl': d['pnl']} for d in self.stats.daily(user=telegram_id, days=30)]
 
             # Current exposure
-            active_exposure = sum([pos.get('position_size', 0) for pos in active_positions])
+            active_exposure = sum([pos.get('position_size', pos.get('size', 0)) for pos in active_positions])
             total_exposure_pct = (active_exposure / portfolio.get('current_capital', 1)) * 100
 
             return {
                 'overview': {
                     'total_trades': total_trades,
+                    'winning_trades': winning_trades,
                     'win_rate': win_rate,
                     'total_pnl': portfolio.get('total_pnl', 0),
                     'current_capital': portfolio.get('current_capital', 0),
                     'capital_growth': portfolio.get('capital_growth', 0),
                     'active_positions': len(active_positions),
                     'total_exposure': active_exposure,
-                    'exposure_percentage': total_exposure_pct
+                    'exposure_percentage': total_exposure_pct,
+                    'unrealized_pnl': self.book.user_unrealized(telegram_id, source=BOOK_SOURCE)
                 },
                 'risk_metrics': {
                     'max_drawdown': max_drawdown,
                     'profit_factor': profit_factor,
-                    'avg_win': performance.get('avg_win', 0),
-                    'avg_loss': performance.get('avg_loss', 0),
-                    'largest_win': max([t.get('pnl', 0) for t in recent_trades if t.get('pnl', 0) > 0] or [0]),
-                    'largest_loss': min([t.get('pnl', 0) for t in recent_trades if t.get('pnl', 0) < 0] or [0])
+                    'avg_win': avg_win,
+                    'avg_loss': avg_loss,
+                    'largest_win': largest_win,
+                    'largest_loss': largest_loss
                 },
                 'active_positions': active_positions,
                 'recent_trades': recent_trades[:10],  # Last 10 trades
-                'daily_pnl': self._calculate_daily_pnl(recent_trades)
+                'daily_pnl': daily_pnl if daily_pnl is not None else self._calculate_daily_pnl(recent_trades)
             }
 
         except Exception as e:
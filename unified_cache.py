@@ -0,0 +1,384 @@
+"""
+Unified Cache
+O(1) LRU/TTL cache with byte limits, an optional Redis tier and single-flight loads
+
+TTLCache keeps entries in an OrderedDict in recency order, so reads, writes and
+evictions are constant time: expiry is checked when an entry is read or reaches
+the LRU end, never by scanning. Limits can be an entry count, an approximate
+byte budget, or both. With a Redis client (or URL) the cache becomes two-tier:
+writes go to both, memory misses read through to Redis. get_or_compute() and
+aget_or_compute() make concurrent misses for one key share a single load.
+
+Every cache registers itself under its name; cache_stats() returns hit, miss,
+eviction and load counters per name for the monitoring report.
+"""
+
+import asyncio
+import fnmatch
+import json
+import logging
+import math
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+_caches = weakref.WeakSet()
+
+
+def approx_size(value: Any, _depth: int = 0) -> int:
+    """Approximate memory footprint in bytes (containers are followed three levels deep)"""
+    nbytes = getattr(value, 'nbytes', None)
+    if isinstance(nbytes, int):
+        return nbytes
+    if hasattr(value, 'memory_usage') and hasattr(value, 'index'):
+        usage = value.memory_usage(index=True)
+        return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+    size = sys.getsizeof(value)
+    if _depth < 3:
+        if isinstance(value, dict):
+            size += sum(approx_size(k, _depth + 1) + approx_size(v, _depth + 1) for k, v in value.items())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            size += sum(approx_size(v, _depth + 1) for v in value)
+    return size
+
+
+@dataclass
+class CacheStats:
+    """Counters for one cache"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0          # Dropped to stay within maxsize / max_bytes
+    expirations: int = 0        # Dropped because their TTL ran out
+    redis_hits: int = 0         # Memory misses served from Redis (also counted as hits)
+    redis_errors: int = 0
+    loads: int = 0              # get_or_compute calls that ran the loader
+    coalesced: int = 0          # get_or_compute calls that waited on another caller's load
+    load_errors: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class _Call:
+    """A load in progress, shared by every thread that missed on the same key"""
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry TTL, byte budget and optional Redis tier"""
+
+    def __init__(self, name: str = 'cache', maxsize: Optional[int] = 1024, ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = None, sizeof: Callable[[Any], int] = approx_size,
+                 redis_client=None, redis_url: Optional[str] = None, redis_prefix: Optional[str] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            name: Reported in cache_stats(); caches with the same name are summed
+            maxsize: Maximum number of entries (None for no limit)
+            ttl: Default time to live in seconds (None never expires)
+            max_bytes: Approximate memory budget, measured with ``sizeof``
+            redis_client / redis_url: Second tier; values must be JSON-serializable
+            redis_prefix: Key prefix in Redis (default "cache:<name>:")
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.clock = clock
+        self.stats = CacheStats()
+        self._data: 'OrderedDict[Hashable, tuple]' = OrderedDict()   # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._inflight: Dict[Hashable, _Call] = {}
+        self._async_inflight: Dict[Hashable, asyncio.Future] = {}
+
+        self.redis_prefix = redis_prefix if redis_prefix is not None else f"cache:{name}:"
+        self.redis_client = redis_client
+        if redis_client is None and redis_url and REDIS_AVAILABLE:
+            try:
+                self.redis_client = redis.from_url(redis_url, decode_responses=True)
+                self.redis_client.ping()
+                logger.info("[CACHE] %s: Redis tier enabled", name)
+            except Exception as e:
+                logger.warning(f"[CACHE] {name}: Redis connection failed: {e}, using memory only")
+                self.redis_client = None
+        _caches.add(self)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key) -> bool:
+        return self._peek(key) is not _MISSING
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    # ------------------------------------------------------------------
+    # Memory tier
+    # ------------------------------------------------------------------
+
+    def _expired(self, entry: tuple, now: float) -> bool:
+        return entry[1] is not None and now >= entry[1]
+
+    def _remove(self, key):
+        entry = self._data.pop(key)
+        self._bytes -= entry[2]
+
+    def _peek(self, key):
+        """Fresh value without touching recency or counters"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or self._expired(entry, self.clock()):
+                return _MISSING
+            return entry[0]
+
+    def _store(self, key, value, ttl: Optional[float]) -> bool:
+        """Put a value in the memory tier; False (and any old value dropped) if it can never fit"""
+        size = self.sizeof(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            with self._lock:
+                if key in self._data:
+                    self._remove(key)
+            return False
+        now = self.clock()
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, None if ttl is None else now + ttl, size)
+            self._bytes += size
+            # Oldest first: expired entries at the LRU end go before live ones are evicted
+            while self._data:
+                oldest_key, oldest = next(iter(self._data.items()))
+                if self._expired(oldest, now):
+                    self.stats.expirations += 1
+                elif ((self.maxsize is not None and len(self._data) > self.maxsize)
+                      or (self.max_bytes and self._bytes > self.max_bytes)):
+                    self.stats.evictions += 1
+                else:
+                    break
+                self._remove(oldest_key)
+        return True
+
+    # ------------------------------------------------------------------
+    # Redis tier
+    # ------------------------------------------------------------------
+
+    def _redis_get(self, key):
+        try:
+            data = self.redis_client.get(f"{self.redis_prefix}{key}")
+        except Exception as e:
+            self.stats.redis_errors += 1
+            logger.debug(f"[CACHE] {self.name}: Redis get failed: {e}")
+            return _MISSING
+        return _MISSING if data is None else json.loads(data)
+
+    def _redis_set(self, key, value, ttl: Optional[float]):
+        try:
+            data = json.dumps(value, default=str)
+            if ttl is None:
+                self.redis_client.set(f"{self.redis_prefix}{key}", data)
+            else:
+                self.redis_client.setex(f"{self.redis_prefix}{key}", max(1, math.ceil(ttl)), data)
+        except Exception as e:
+            self.stats.redis_errors += 1
+            logger.debug(f"[CACHE] {self.name}: Redis set failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get(self, key, default=None):
+        """Cached value, or ``default`` on a miss"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if not self._expired(entry, self.clock()):
+                    self._data.move_to_end(key)
+                    self.stats.hits += 1
+                    return entry[0]
+                self._remove(key)
+                self.stats.expirations += 1
+
+        if self.redis_client is not None:
+            value = self._redis_get(key)
+            if value is not _MISSING:
+                self._store(key, value, self.ttl)
+                with self._lock:
+                    self.stats.hits += 1
+                    self.stats.redis_hits += 1
+                return value
+
+        with self._lock:
+            self.stats.misses += 1
+        return default
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        """Cache ``value``; ``ttl`` overrides the default time to live"""
+        ttl = self.ttl if ttl is None else ttl
+        if not self._store(key, value, ttl):
+            self.delete(key)  # Too big to cache: don't keep serving the previous value
+            return
+        if self.redis_client is not None:
+            self._redis_set(key, value, ttl)
+
+    def delete(self, key) -> bool:
+        with self._lock:
+            found = key in self._data
+            if found:
+                self._remove(key)
+        if self.redis_client is not None:
+            try:
+                found = bool(self.redis_client.delete(f"{self.redis_prefix}{key}")) or found
+            except Exception as e:
+                self.stats.redis_errors += 1
+                logger.debug(f"[CACHE] {self.name}: Redis delete failed: {e}")
+        return found
+
+    def invalidate_pattern(self, pattern: str) -> int:
+        """Delete string keys matching a glob pattern (``signal_*``); returns how many"""
+        with self._lock:
+            keys = [key for key in self._data if isinstance(key, str) and fnmatch.fnmatchcase(key, pattern)]
+            for key in keys:
+                self._remove(key)
+        invalidated = len(keys)
+        if self.redis_client is not None:
+            try:
+                redis_keys = list(self.redis_client.scan_iter(f"{self.redis_prefix}{pattern}"))
+                if redis_keys:
+                    self.redis_client.delete(*redis_keys)
+                    invalidated = max(invalidated, len(redis_keys))
+            except Exception as e:
+                self.stats.redis_errors += 1
+                logger.debug(f"[CACHE] {self.name}: Redis pattern invalidation failed: {e}")
+        return invalidated
+
+    def clear(self):
+        """Empty the memory tier (Redis entries expire on their own)"""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def get_or_compute(self, key, compute: Callable[[], Any], ttl: Optional[float] = None,
+                       cache_if: Optional[Callable[[Any], bool]] = None):
+        """
+        Cached value, or the result of ``compute()``; concurrent misses share one call
+
+        Args:
+            cache_if: Only cache results for which this returns True (e.g. skip empty results)
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            value = self._peek(key)
+            if value is not _MISSING:
+                return value
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                self.stats.loads += 1
+            else:
+                self.stats.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = compute()
+            if cache_if is None or cache_if(call.value):
+                self.set(key, call.value, ttl)
+            return call.value
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.stats.load_errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.event.set()
+
+    async def aget_or_compute(self, key, compute: Callable[[], Awaitable[Any]], ttl: Optional[float] = None,
+                              cache_if: Optional[Callable[[Any], bool]] = None):
+        """get_or_compute for coroutines: concurrent tasks missing on one key await a single load"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        future = self._async_inflight.get(key)
+        if future is not None:
+            self.stats.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._async_inflight[key] = future
+        self.stats.loads += 1
+        try:
+            value = await compute()
+            if cache_if is None or cache_if(value):
+                self.set(key, value, ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            self.stats.load_errors += 1
+            future.set_exception(e)
+            future.exception()  # Waiters re-raise it; don't warn when there are none
+            raise
+        finally:
+            self._async_inflight.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = asdict(self.stats)
+        stats.update(name=self.name, entries=len(self._data), bytes=self._bytes,
+                     hit_rate=round(self.stats.hit_rate, 4), redis=self.redis_client is not None)
+        return stats
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Counters for every live cache, summed per cache name"""
+    totals: Dict[str, Dict[str, Any]] = {}
+    for cache in list(_caches):
+        stats = cache.get_stats()
+        total = totals.get(cache.name)
+        if total is None:
+            totals[cache.name] = dict(stats, instances=1)
+            continue
+        total['instances'] += 1
+        for name, value in stats.items():
+            if isinstance(value, int) and not isinstance(value, bool) and name != 'instances':
+                total[name] += value
+        total['redis'] = total['redis'] or stats['redis']
+    for total in totals.values():
+        lookups = total['hits'] + total['misses']
+        total['hit_rate'] = round(total['hits'] / lookups, 4) if lookups else 0.0
+    return totals
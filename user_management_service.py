@@ -10,7 +10,7 @@ Primary responsibilities:
 - Authenticate/lookup a user by Telegram ID
 - Return user portfolio data (best-effort; falls back to empty data)
 - Build a dashboard link for a user
-- Record trades (append-only JSON)
+- Record trades (append-only JSON) and read them back
 """
 
 from __future__ import annotations
@@ -142,12 +142,14 @@ def close_user_trade(trade_id: Any, exit_price: Any = None, exit_type: str = "ma
     Close an existing trade record (best-effort JSON fallback).
 
     The production system likely updates an 'active trade' record. In this local
-    fallback, we will attempt to find a matching trade by `trade_id` and add
-    closure fields; if not found we return False.
+    fallback, we will attempt to find a matching open trade by `trade_id` and add
+    closure fields; if none is found (or it is already closed) we return False.
     """
     try:
         trades: List[Dict[str, Any]] = _read_json(_DEFAULT_TRADES_PATH, default=[])
         for t in reversed(trades):
+            if t.get("closed_at"):
+                continue
             if str(t.get("trade_id")) == str(trade_id) or str(t.get("id")) == str(trade_id):
                 t["closed_at"] = datetime.utcnow().isoformat()
                 t["exit_price"] = exit_price
@@ -159,18 +161,25 @@ def close_user_trade(trade_id: Any, exit_price: Any = None, exit_type: str = "ma
         return False
 
 
-def get_user_statistics(telegram_id: int) -> Dict[str, Any]:
+def get_trade_history(telegram_id: Optional[int] = None) -> List[Dict[str, Any]]:
     """
-    Very lightweight stats computed from recorded trades (if any).
+    Recorded trades in the order they were opened, for every user or one.
     """
     trades: List[Dict[str, Any]] = _read_json(_DEFAULT_TRADES_PATH, default=[])
     if not isinstance(trades, list):
         trades = []  # Reset if corrupted
 
-    user_trades = []
-    for t in trades:
-        if isinstance(t, dict) and int(t.get("telegram_id", -1)) == int(telegram_id):
-            user_trades.append(t)
+    return [
+        t for t in trades
+        if isinstance(t, dict) and (telegram_id is None or int(t.get("telegram_id", -1)) == int(telegram_id))
+    ]
+
+
+def get_user_statistics(telegram_id: int) -> Dict[str, Any]:
+    """
+    Very lightweight stats computed from recorded trades (if any).
+    """
+    user_trades = get_trade_history(telegram_id)
 
     return {
         "telegram_id": int(telegram_id),
@@ -6,7 +6,7 @@ Handles user tier management, feature access control, and subscription logic
 import json
 import os
 from datetime import datetime, timedelta
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 from functools import wraps
 
 # Admin user IDs - get free access to all features
@@ -367,6 +367,15 @@ class UserManager:
         
         return stats
     
+    def get_risk_profiles(self, telegram_ids: List[int]) -> Tuple[List[float], List[float]]:
+        """Capital and risk_per_trade (%) per user for batch sizing; read-only, unknown users get the defaults"""
+        capitals, risks = [], []
+        for telegram_id in telegram_ids:
+            user = self.users.get(str(telegram_id), {})
+            capitals.append(float(user.get('capital', 500.0)))
+            risks.append(float(user.get('risk_per_trade', 1.0)))
+        return capitals, risks
+    
     def get_all_users_stats(self) -> Dict:
         """Get platform-wide user statistics"""
         total = len(self.users)
@@ -14,6 +14,7 @@ class UserProfileManager:
     def __init__(self, data_file="user_profiles.json"):
         self.data_file = data_file
         self.profiles = {}
+        self.change_listeners = []  # callback(telegram_id, profile, trade_result or None)
         self.load_data()
     
     def load_data(self):
@@ -30,6 +31,16 @@ class UserProfileManager:
         with open(self.data_file, 'w') as f:
             json.dump(self.profiles, f, indent=2)
     
+    def add_change_listener(self, callback):
+        """Call ``callback(telegram_id, profile, trade_result)`` when a profile is created,
+        a trade is recorded (trade_result is the trade) or privacy changes (trade_result is None)"""
+        self.change_listeners.append(callback)
+    
+    def _notify_change(self, telegram_id: int, trade_result: Optional[Dict] = None):
+        profile = self.profiles[str(telegram_id)]
+        for callback in self.change_listeners:
+            callback(telegram_id, profile, trade_result)
+    
     # ============================================================================
     # PROFILE MANAGEMENT
     # ============================================================================
@@ -82,6 +93,7 @@ class UserProfileManager:
                 'blocked_users': []
             }
             self.save_data()
+            self._notify_change(telegram_id)
         
         return self.profiles[user_id_str]
     
@@ -104,6 +116,7 @@ class UserProfileManager:
         if setting in profile['privacy']:
             profile['privacy'][setting] = value
             self.save_data()
+            self._notify_change(telegram_id)
             return True
         return False
     
@@ -174,6 +187,7 @@ class UserProfileManager:
             stats['worst_trade'] = pnl
         
         self.save_data()
+        self._notify_change(telegram_id, trade_result)
         
         # Check for achievements
         self._check_achievements(telegram_id)